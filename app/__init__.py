@@ -5,7 +5,7 @@ from flask import Flask, send_from_directory
 import os
 
 # Importar extensiones desde módulo separado
-from app.extensions import db, login_manager, bcrypt, migrate
+from app.extensions import db, login_manager, bcrypt, migrate, result_cache, audit_writer, icecat_cache
 
 
 def create_app(config_name='development'):
@@ -22,6 +22,13 @@ def create_app(config_name='development'):
     login_manager.init_app(app)
     bcrypt.init_app(app)
     migrate.init_app(app, db)
+    result_cache.init_app(app)
+    audit_writer.init_app(app)
+    icecat_cache.init_app(app)
+
+    # Rollup de ventas al dia con cambios de costo/marca/categoria
+    from app.services.sales_fact_service import register_snapshot_events
+    register_snapshot_events()
 
     # Configurar Flask-Login
     login_manager.login_view = 'auth.login'
@@ -36,7 +43,9 @@ def create_app(config_name='development'):
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Usuario + sesión + roles en una consulta (queda en g para la petición)
+        from app.utils.session_manager import load_request_auth
+        return load_request_auth(int(user_id))
 
     # Registrar context processors desde módulo separado
     from app.utils.context_processors import register_context_processors
@@ -45,7 +54,10 @@ def create_app(config_name='development'):
     # --- SEGURIDAD: Validar sesión en cada request ---
     from flask import request, redirect, url_for, session
     from flask_login import current_user, logout_user
-    from app.utils.session_manager import validate_session
+    from app.utils.session_manager import validate_session, activity_buffer
+
+    # Última actividad pendiente: se escribe al cerrar el proceso
+    activity_buffer.init_app(app)
     
     @app.before_request
     def check_valid_session():
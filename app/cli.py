@@ -448,4 +448,234 @@ def register_cli_commands(app):
             click.echo(f"✅ {result}")
         except Exception as e:
             click.echo(f"❌ Error: {str(e)}")
-            db.session.rollback()
\ No newline at end of file
+            db.session.rollback()
+
+    # ===== COMANDO: rebuild-sales-facts =====
+    @app.cli.command('rebuild-sales-facts')
+    @click.option('--start', 'start', default=None, help='Fecha inicial (YYYY-MM-DD). Por defecto: primera factura')
+    @click.option('--end', 'end', default=None, help='Fecha final (YYYY-MM-DD). Por defecto: ultima factura')
+    def rebuild_sales_facts(start, end):
+        """Reconstruye el rollup diario de ventas (daily_sales_facts)"""
+        from datetime import datetime
+        from app.services.sales_fact_service import SalesFactService
+
+        try:
+            start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+
+            click.echo("📊 Reconstruyendo rollup diario de ventas...")
+            chunks = SalesFactService.rebuild(start_date, end_date)
+            click.echo(f"✅ Rollup reconstruido ({chunks} bloques procesados)")
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.session.rollback()
+
+    # ===== COMANDO: archive-partitions =====
+    @app.cli.command('archive-partitions')
+    @click.option('--table', 'table', default=None, type=click.Choice(['audit_logs', 'serial_movements']),
+                  help='Tabla a archivar. Por defecto: todas')
+    @click.option('--before', 'before', default=None, help='Primer mes que se conserva (YYYY-MM). Por defecto: según retención')
+    @click.option('--dry-run', is_flag=True, help='Solo mostrar los meses que se archivarían')
+    def archive_partitions(table, before, dry_run):
+        """Crea las particiones próximas y archiva (JSONL.gz) los meses vencidos"""
+        from app.services.partition_service import PartitionService
+
+        try:
+            created = PartitionService.ensure_partitions()
+            if created:
+                click.echo(f"🧱 Particiones creadas: {', '.join(created)}")
+
+            before_month = PartitionService.parse_month(before) if before else None
+            for name in ([table] if table else PartitionService.TABLES):
+                results = PartitionService.archive(name, before=before_month, dry_run=dry_run)
+                if not results:
+                    click.echo(f"✅ {name}: nada que archivar")
+                for result in results:
+                    if dry_run:
+                        click.echo(f"   {name} {result['month']:%Y-%m} (se archivaría)")
+                    else:
+                        click.echo(f"📦 {name} {result['month']:%Y-%m}: {result['rows']} filas -> {result['path']}")
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.session.rollback()
+
+    # ===== COMANDO: restore-partition =====
+    @app.cli.command('restore-partition')
+    @click.argument('table', type=click.Choice(['audit_logs', 'serial_movements']))
+    @click.argument('month')
+    @click.option('--file', 'path', default=None, help='Archivo JSONL.gz. Por defecto: el del directorio de archivo')
+    def restore_partition(table, month, path):
+        """Restaura un mes archivado (MONTH = YYYY-MM)"""
+        from app.services.partition_service import PartitionService
+
+        try:
+            rows = PartitionService.restore(table, PartitionService.parse_month(month), path)
+            click.echo(f"✅ {table} {month}: {rows} filas restauradas")
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.session.rollback()
+
+    # ===== COMANDO: ncf-gaps =====
+    @app.cli.command('ncf-gaps')
+    @click.option('--type', 'ncf_type', default=None, help='Tipo de NCF (ej: B01). Por defecto: todos los de venta')
+    def ncf_gaps(ncf_type):
+        """Lista los NCF emitidos por las secuencias que no están en ninguna factura"""
+        from app.models.invoice import NCF_SALES_TYPES
+        from app.services.sequence_allocator import SequenceAllocator
+
+        for code in ([ncf_type.upper()] if ncf_type else NCF_SALES_TYPES):
+            gaps = SequenceAllocator.find_gaps(code)
+            if not gaps:
+                click.echo(f"✅ {code}: sin huecos")
+                continue
+            click.echo(f"⚠️  {code}: {len(gaps)} NCF no utilizados")
+            for gap in gaps:
+                click.echo(f"   {gap['ncf']}  {gap['reason'] or 'sin registrar'}")
+
+    # ===== COMANDO: release-expired-reservations =====
+    @app.cli.command('release-expired-reservations')
+    @click.option('--batch', 'batch', default=500, help='Reservas por lote')
+    def release_expired_reservations(batch):
+        """Libera las reservas de stock vencidas (programar en cron)"""
+        from app.services.reservation_service import ReservationService
+
+        total = 0
+        try:
+            while True:
+                count = ReservationService.release_expired(limit=batch)
+                db.session.commit()
+                total += count
+                if count < batch:
+                    break
+            click.echo(f"✅ {total} reservas vencidas liberadas")
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.session.rollback()
+
+    # ===== COMANDO: clear-cache =====
+    @app.cli.command('clear-cache')
+    def clear_cache():
+        """Vacía la caché de resultados (nivel local y compartido)"""
+        from app.extensions import result_cache
+
+        try:
+            result_cache.clear()
+            backend = result_cache.stats()['shared_backend'] or 'desactivado'
+            click.echo(f"✅ Caché vaciada (nivel compartido: {backend})")
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+
+    # ===== COMANDO: icecat-cache =====
+    @app.cli.command('icecat-cache')
+    @click.option('--purge', is_flag=True, help='Borrar entradas caducadas')
+    @click.option('--clear', 'clear_all', is_flag=True, help='Vaciar la caché completa')
+    @click.option('--clear-negative', is_flag=True, help='Olvidar los "no encontrado"')
+    def icecat_cache_command(purge, clear_all, clear_negative):
+        """Estadísticas y mantenimiento de la caché de respuestas de Icecat"""
+        from app.extensions import icecat_cache
+
+        try:
+            if clear_all:
+                icecat_cache.clear()
+                click.echo("✅ Caché de Icecat vaciada")
+            elif clear_negative:
+                icecat_cache.clear_negative()
+                click.echo("✅ Entradas negativas eliminadas")
+            elif purge:
+                click.echo(f"✅ {icecat_cache.purge()} entradas caducadas eliminadas")
+
+            stats = icecat_cache.stats()
+            click.echo(
+                f"📦 {stats.get('entries', 0)} entradas ({stats.get('negative_entries', 0)} negativas), "
+                f"{stats.get('stored_bytes', 0) / 1024:.0f} KB en {icecat_cache.path}"
+            )
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+
+    # ===== COMANDO: icecat-import =====
+    @app.cli.command('icecat-import')
+    @click.argument('csv_file', required=False, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--store', 'store_id', type=int, default=None, help='ID de la tienda destino')
+    @click.option('--condition', default='new', help='Condición de las laptops (default: new)')
+    @click.option('--publish', is_flag=True, help='Publicar las laptops creadas')
+    @click.option('--no-images', is_flag=True, help='No descargar imágenes de Icecat')
+    @click.option('--resume', is_flag=True, help='Retomar importaciones interrumpidas')
+    def icecat_import_command(csv_file, store_id, condition, publish, no_images, resume):
+        """Importación masiva de laptops por GTIN desde un CSV (gtin, costo, precio, cantidad)"""
+        from app.services.icecat_import_service import IcecatImportService
+
+        try:
+            if resume:
+                job_ids = IcecatImportService.resume_interrupted(start=False)
+            elif csv_file:
+                with open(csv_file, 'rb') as fh:
+                    rows = IcecatImportService.parse_rows(fh.read())
+                if not rows:
+                    click.echo("❌ El archivo no contiene GTINs")
+                    return
+                job = IcecatImportService.create_job(rows, {
+                    'store_id': store_id,
+                    'condition': condition,
+                    'is_published': publish,
+                    'download_images': not no_images,
+                })
+                job_ids = [job.id]
+            else:
+                click.echo("❌ Indica un archivo CSV o --resume")
+                return
+
+            if not job_ids:
+                click.echo("✅ No hay importaciones pendientes")
+            for job_id in job_ids:
+                click.echo(f"🔄 Procesando importación {job_id}...")
+                job = IcecatImportService.run_job(job_id)
+                click.echo(
+                    f"{'✅' if job.status == 'completed' else '❌'} Importación {job.id} {job.status_display}: "
+                    f"{job.succeeded} creadas, {job.failed} con error de {job.total}"
+                )
+                if job.error:
+                    click.echo(f"   {job.error}")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error: {str(e)}")
+
+    # ===== COMANDO: icecat-resync =====
+    @app.cli.command('icecat-resync')
+    @click.option('--max-age-days', type=int, default=None,
+                  help='Antigüedad mínima de los datos de Icecat (default: ICECAT_RESYNC_MAX_AGE_DAYS)')
+    @click.option('--limit', type=int, default=None, help='Máximo de laptops a re-sincronizar')
+    def icecat_resync_command(max_age_days, limit):
+        """Re-sincroniza con Icecat las laptops con datos vencidos (programar en cron)"""
+        from app.services.icecat_sync_service import IcecatSyncService
+
+        try:
+            job_ids = IcecatSyncService.resume_interrupted(start=False)
+            if job_ids:
+                click.echo(f"🔄 Retomando re-sincronizaciones interrumpidas: {job_ids}")
+            elif IcecatSyncService.running_job():
+                click.echo("✅ Ya hay una re-sincronización en curso")
+                return
+            else:
+                job = IcecatSyncService.create_job(max_age_days=max_age_days, limit=limit)
+                if job is None:
+                    click.echo("✅ No hay laptops con datos de Icecat vencidos")
+                    return
+                job_ids = [job.id]
+
+            for job_id in job_ids:
+                click.echo(f"🔄 Re-sincronizando trabajo {job_id}...")
+                job = IcecatSyncService.run_job(job_id)
+                click.echo(
+                    f"{'✅' if job.status == 'completed' else '❌'} Re-sincronización {job.id} {job.status_display}: "
+                    f"{job.succeeded} al día, {job.failed} con error de {job.total}"
+                )
+                for timing in job.batch_timings or []:
+                    click.echo(
+                        f"   Lote {timing['batch']}: {timing['rows']} laptops, "
+                        f"Icecat {timing['fetch_ms']:.0f} ms, escritura {timing['write_ms']:.0f} ms"
+                    )
+                if job.error:
+                    click.echo(f"   {job.error}")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error: {str(e)}")
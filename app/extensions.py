@@ -7,8 +7,15 @@ from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
 
+from app.utils.audit_writer import AuditWriter
+from app.utils.cache import ResultCache
+from app.utils.icecat_cache import IcecatCache
+
 # Inicializar extensiones como variables globales
 db = SQLAlchemy()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
-migrate = Migrate()
\ No newline at end of file
+migrate = Migrate()
+result_cache = ResultCache()
+audit_writer = AuditWriter()
+icecat_cache = IcecatCache()
@@ -11,7 +11,8 @@ from app.models.laptop import (
     Screen, GraphicsCard, Storage, Ram,
     Store, Location, Supplier, Laptop, LaptopImage
 )
-from app.models.serial import LaptopSerial, InvoiceItemSerial, SerialMovement
+from app.models.serial import LaptopSerial, InvoiceItemSerial, SerialMovement, StockReservation
+from app.models.icecat_job import IcecatJob, IcecatJobItem
 
 __all__ = [
     # User
@@ -43,5 +44,10 @@ __all__ = [
     # Serial Models
     'LaptopSerial',
     'InvoiceItemSerial',
-    'SerialMovement'
+    'SerialMovement',
+    'StockReservation',
+
+    # Icecat
+    'IcecatJob',
+    'IcecatJobItem'
 ]
\ No newline at end of file
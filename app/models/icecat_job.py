@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# MODELO: TRABAJOS DE ICECAT EN SEGUNDO PLANO
+# ============================================
+# Un IcecatJob es una importación masiva de GTINs (kind = 'import'); cada
+# fila de la lista/CSV es un IcecatJobItem. El estado vive en la base de
+# datos, no en memoria, así el endpoint de progreso funciona desde
+# cualquier worker y un trabajo interrumpido se retoma por sus filas
+# pendientes (ver IcecatImportService.resume_interrupted).
+# Una re-sincronización (kind = 'resync') no tiene filas: recorre las laptops
+# vencidas por (icecat_last_synced_at, id) y guarda la última procesada en
+# options['cursor'] (ver IcecatSyncService).
+
+from datetime import datetime
+from app import db
+
+
+JOB_STATUS_CHOICES = [
+    ('pending', 'Pendiente'),
+    ('running', 'En proceso'),
+    ('completed', 'Completado'),
+    ('failed', 'Fallido'),
+    ('cancelled', 'Cancelado'),
+]
+
+ITEM_STATUS_CHOICES = [
+    ('pending', 'Pendiente'),
+    ('created', 'Creada'),
+    ('not_found', 'No encontrado en Icecat'),
+    ('invalid', 'Fila inválida'),
+    ('error', 'Error'),
+]
+
+
+class IcecatJob(db.Model):
+    """Trabajo en segundo plano contra Icecat, con contadores de progreso"""
+    __tablename__ = 'icecat_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='import')
+    status = db.Column(db.String(20), nullable=False, default='pending')
+
+    # Opciones de la corrida (tienda, condición, publicar, ...)
+    options = db.Column(db.JSON, nullable=True)
+
+    # ===== PROGRESO =====
+    total = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    succeeded = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    # [{'batch', 'rows', 'fetch_ms', 'write_ms'}] de los últimos lotes
+    batch_timings = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    items = db.relationship('IcecatJobItem', backref='job', lazy='dynamic', cascade='all, delete-orphan')
+
+    @property
+    def progress_percent(self):
+        return round(self.processed / self.total * 100, 1) if self.total else 0
+
+    @property
+    def status_display(self):
+        return dict(JOB_STATUS_CHOICES).get(self.status, self.status)
+
+    def to_dict(self):
+        """Serializa a diccionario (endpoint de progreso)"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'status_display': self.status_display,
+            'total': self.total,
+            'processed': self.processed,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'progress_percent': self.progress_percent,
+            'batch_timings': self.batch_timings or [],
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<IcecatJob {self.id} {self.kind} {self.status} {self.processed}/{self.total}>'
+
+    __table_args__ = (
+        db.Index('idx_icecat_job_status', 'status', 'kind'),
+    )
+
+
+class IcecatJobItem(db.Model):
+    """Fila de una importación masiva: GTIN + costo/precio/cantidad y su resultado"""
+    __tablename__ = 'icecat_job_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('icecat_jobs.id', ondelete='CASCADE'), nullable=False)
+    line_number = db.Column(db.Integer, nullable=False)
+
+    gtin = db.Column(db.String(20), nullable=True)
+    purchase_cost = db.Column(db.Numeric(12, 2), nullable=True)
+    sale_price = db.Column(db.Numeric(12, 2), nullable=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    laptop_id = db.Column(db.Integer, db.ForeignKey('laptops.id', ondelete='SET NULL'), nullable=True)
+    error = db.Column(db.String(500), nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def status_display(self):
+        return dict(ITEM_STATUS_CHOICES).get(self.status, self.status)
+
+    def to_dict(self):
+        return {
+            'line': self.line_number,
+            'gtin': self.gtin,
+            'quantity': self.quantity,
+            'status': self.status,
+            'laptop_id': self.laptop_id,
+            'error': self.error,
+        }
+
+    def __repr__(self):
+        return f'<IcecatJobItem {self.job_id}:{self.line_number} {self.gtin} {self.status}>'
+
+    __table_args__ = (
+        # Pendientes de un trabajo en orden (reanudación)
+        db.Index('idx_icecat_item_job_status', 'job_id', 'status', 'id'),
+    )
@@ -192,12 +192,9 @@ class NCFSequence(TimestampMixin, db.Model):
 
     # ===== METODOS =====
 
-    def get_next_ncf(self):
+    def check_usable(self, count=1):
         """
-        Genera el siguiente NCF de esta secuencia.
-
-        Returns:
-            str: El NCF generado (ej: 'B0100000001')
+        Verifica que la secuencia pueda entregar `count` numeros.
 
         Raises:
             ValueError: Si la secuencia no es valida
@@ -211,19 +208,30 @@ class NCFSequence(TimestampMixin, db.Model):
                 f"Solicite una nueva autorizacion a la DGII."
             )
 
-        if self.is_exhausted:
+        if self.range_end and self.current_sequence + count - 1 > self.range_end:
             raise ValueError(
                 f"Se agoto el rango de NCF para {self.ncf_type} "
                 f"(maximo: {self.range_end}). Solicite mas NCF a la DGII."
             )
 
-        # Generar NCF
-        ncf = f"{self.ncf_type}{str(self.current_sequence).zfill(8)}"
+    def get_next_ncf(self):
+        """
+        Genera el siguiente NCF de esta secuencia.
+
+        El numero se toma con un UPDATE ... RETURNING atomico (ver
+        SequenceAllocator): dos cajeros facturando a la vez nunca reciben
+        el mismo NCF.
 
-        # Incrementar secuencia
-        self.current_sequence += 1
+        Returns:
+            str: El NCF generado (ej: 'B0100000001')
+
+        Raises:
+            ValueError: Si la secuencia no es valida
+        """
+        from app.services.sequence_allocator import SequenceAllocator
 
-        return ncf
+        self.check_usable()
+        return SequenceAllocator.next_ncf(self.ncf_type)
 
     # ===== METODOS DE CLASE =====
 
@@ -302,6 +310,56 @@ class NCFSequence(TimestampMixin, db.Model):
         return f'<NCFSequence {self.ncf_type}: {self.current_sequence}>'
 
 
+# ============================================
+# MODELO: HUECOS EN SECUENCIAS
+# ============================================
+# Numeros asignados que nunca llegaron a una factura (bloques no usados,
+# anulaciones). Se reportan a la DGII como comprobantes no utilizados.
+
+class SequenceGap(db.Model):
+    """Numero de NCF o de factura asignado y no utilizado"""
+    __tablename__ = 'sequence_gaps'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # 'ncf' o 'invoice'
+    kind = db.Column(db.String(10), nullable=False)
+
+    # Tipo de NCF (B01...) o prefijo de factura (INV)
+    prefix = db.Column(db.String(10), nullable=False)
+
+    number = db.Column(db.Integer, nullable=False)
+
+    # 'block_unused', 'voided', ...
+    reason = db.Column(db.String(30), nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'prefix', 'number', name='uq_sequence_gap'),
+    )
+
+    @property
+    def formatted(self):
+        """Numero con formato (B0100000012 / INV-00000012)"""
+        if self.kind == 'ncf':
+            return f"{self.prefix}{str(self.number).zfill(8)}"
+        return f"{self.prefix}-{str(self.number).zfill(8)}"
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'prefix': self.prefix,
+            'number': self.number,
+            'formatted': self.formatted,
+            'reason': self.reason,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<SequenceGap {self.formatted} ({self.reason})>'
+
+
 # ============================================
 # MODELO: FACTURA
 # ============================================
@@ -395,6 +453,61 @@ class Invoice(TimestampMixin, db.Model):
             return delta.days
         return None
 
+    # ===== CONSULTAS =====
+
+    @staticmethod
+    def overdue_condition(today=None):
+        """Equivalente SQL de is_overdue (para filtros y conteos)"""
+        return db.and_(
+            Invoice.due_date != None,
+            Invoice.status.notin_(['paid', 'cancelled']),
+            Invoice.due_date < (today or date.today())
+        )
+
+    @staticmethod
+    def get_list_stats(query):
+        """
+        Estadisticas del listado de facturas en una sola consulta agrupada
+
+        Agrupa la consulta filtrada por (estado, tipo de NCF); solo viajan
+        unas pocas filas sin importar cuantas facturas haya.
+
+        Args:
+            query: Query de Invoice ya filtrada (se ignoran orden y paginacion)
+
+        Returns:
+            dict: {'total_invoices', 'total_amount', 'status_counts', 'ncf_type_counts'}
+        """
+        groups = query.order_by(None).with_entities(
+            Invoice.status,
+            Invoice.ncf_type,
+            db.func.count(Invoice.id),
+            db.func.coalesce(db.func.sum(Invoice.total), 0),
+            db.func.count(Invoice.id).filter(Invoice.overdue_condition())
+        ).group_by(Invoice.status, Invoice.ncf_type).all()
+
+        status_counts = dict.fromkeys(['draft', 'issued', 'paid', 'cancelled', 'overdue'], 0)
+        ncf_type_counts = dict.fromkeys(NCF_SALES_TYPES, 0)
+        total_invoices = 0
+        total_amount = Decimal('0')
+
+        for status, ncf_type, count, amount, overdue in groups:
+            total_invoices += count
+            total_amount += Decimal(str(amount))
+            # 'overdue' se cuenta por vencimiento (is_overdue), no por el estado
+            status_counts['overdue'] += overdue
+            if status in status_counts and status != 'overdue':
+                status_counts[status] += count
+            if ncf_type in ncf_type_counts:
+                ncf_type_counts[ncf_type] += count
+
+        return {
+            'total_invoices': total_invoices,
+            'total_amount': total_amount,
+            'status_counts': status_counts,
+            'ncf_type_counts': ncf_type_counts
+        }
+
     # ===== METODOS =====
 
     def calculate_totals(self):
@@ -644,10 +757,10 @@ class InvoiceSettings(db.Model):
         return os.path.exists(logo_full_path)
 
     def get_next_invoice_number(self):
-        """Genera el siguiente numero de factura"""
-        number = f"{self.invoice_prefix}-{str(self.invoice_sequence).zfill(8)}"
-        self.invoice_sequence += 1
-        return number
+        """Genera el siguiente numero de factura (asignacion atomica)"""
+        from app.services.sequence_allocator import SequenceAllocator
+
+        return SequenceAllocator.next_invoice_number(self)
 
     def get_next_ncf(self, ncf_type=None):
         """
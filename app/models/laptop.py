@@ -19,6 +19,8 @@ CaracterÃ­sticas:
 
 from app import db
 from app.models.mixins import TimestampMixin, CatalogMixin
+from sqlalchemy import inspect
+from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime, date
 import json
 
@@ -421,6 +423,20 @@ class Supplier(CatalogMixin, db.Model):
 # MODELO PRINCIPAL: LAPTOP
 # =============================================================================
 
+# Columnas pesadas (JSON de Icecat, specs completas, HTML largo) que se cargan
+# en diferido: los listados no las leen. Las vistas de detalle/edición las
+# cargan de una vez con .options(Laptop.with_heavy_columns())
+HEAVY_COLUMNS_GROUP = 'heavy_specs'
+HEAVY_COLUMNS = (
+    'long_description_html', 'unified_specs', 'connectivity_ports',
+    'full_specs_json', 'normalized_specs', 'icecat_raw_data'
+)
+
+# Estados de las laptops que vinieron de Icecat y se re-sincronizan
+# (IcecatSyncService). 'pending' son las cargadas a mano: no se tocan.
+ICECAT_SYNC_STATUSES = ('imported', 'synced', 'not_found')
+
+
 class Laptop(TimestampMixin, db.Model):
     """
     Modelo principal de inventario de laptops - V2.0 Mejorado
@@ -440,7 +456,7 @@ class Laptop(TimestampMixin, db.Model):
     # ===== 2. MARKETING Y WEB (SEO) =====
     display_name = db.Column(db.String(400), nullable=False)
     short_description = db.Column(db.String(500), nullable=True)
-    long_description_html = db.Column(db.Text, nullable=True)
+    long_description_html = db.deferred(db.Column(db.Text, nullable=True), group=HEAVY_COLUMNS_GROUP)
     is_published = db.Column(db.Boolean, default=False, nullable=False)
     is_featured = db.Column(db.Boolean, default=False, nullable=False)
     seo_title = db.Column(db.String(70), nullable=True)
@@ -465,7 +481,7 @@ class Laptop(TimestampMixin, db.Model):
 
     # ===== 4. ESPECIFICACIONES TÃ‰CNICAS (VINCULADAS) =====
     # Almacena las especificaciones unificadas completas para referencia
-    unified_specs = db.Column(db.JSON, default=dict, nullable=True)
+    unified_specs = db.deferred(db.Column(db.JSON, default=dict, nullable=True), group=HEAVY_COLUMNS_GROUP)
     weight_lbs = db.Column(db.Numeric(5, 2), nullable=True)  # Peso en libras
 
     # ===== 5. DETALLES TÃ‰CNICOS ESPECÃFICOS =====
@@ -492,21 +508,21 @@ class Laptop(TimestampMixin, db.Model):
     stylus_support = db.Column(db.Boolean, default=False, nullable=True)
     
     # Conectividad
-    connectivity_ports = db.Column(db.JSON, default=dict, nullable=True)  # Lista de puertos
+    connectivity_ports = db.deferred(db.Column(db.JSON, default=dict, nullable=True), group=HEAVY_COLUMNS_GROUP)  # Lista de puertos
     wifi_standard = db.Column(db.String(50), nullable=True)  # Wi-Fi 6, Wi-Fi 6E
     bluetooth_version = db.Column(db.String(20), nullable=True)  # 5.0, 5.2
     ethernet_port = db.Column(db.Boolean, default=False, nullable=True)
     cellular = db.Column(db.String(20), nullable=True)  # 4G, 5G
     
     # Datos de Icecat
-    full_specs_json = db.Column(db.JSON, default=dict, nullable=True)
-    normalized_specs = db.Column(db.JSON, default=dict, nullable=True)
+    full_specs_json = db.deferred(db.Column(db.JSON, default=dict, nullable=True), group=HEAVY_COLUMNS_GROUP)
+    normalized_specs = db.deferred(db.Column(db.JSON, default=dict, nullable=True), group=HEAVY_COLUMNS_GROUP)
     last_icecat_sync = db.Column(db.DateTime, nullable=True)
     
     # Campos adicionales detectados en DB para compatibilidad
     icecat_import_status = db.Column(db.String(20), default='pending', nullable=False)
     icecat_product_id = db.Column(db.String(100), nullable=True)
-    icecat_raw_data = db.Column(db.JSON, nullable=True)
+    icecat_raw_data = db.deferred(db.Column(db.JSON, nullable=True), group=HEAVY_COLUMNS_GROUP)
     icecat_imported_at = db.Column(db.DateTime, nullable=True)
     icecat_last_synced_at = db.Column(db.DateTime, nullable=True)
     user_modified_fields = db.Column(db.JSON, nullable=True)
@@ -556,11 +572,51 @@ class Laptop(TimestampMixin, db.Model):
     # ===== RELACIÃ“N CON USUARIO CREADOR =====
     created_by = db.relationship('User', backref='laptops_created', foreign_keys=[created_by_id])
 
+    # ===== PERFIL DE CARGA =====
+
+    @staticmethod
+    def with_heavy_columns():
+        """
+        Opción de consulta que carga las columnas pesadas en el mismo SELECT
+
+        Uso:
+            Laptop.query.options(Laptop.with_heavy_columns()).get_or_404(id)
+        """
+        return db.undefer_group(HEAVY_COLUMNS_GROUP)
+
+    # ===== SINCRONIZACIÓN CON ICECAT =====
+
+    # Columnas que la re-sincronización con Icecat puede actualizar; las que el
+    # usuario edita a mano quedan en user_modified_fields y no se vuelven a tocar
+    ICECAT_SYNCED_FIELDS = (
+        'brand_id', 'model_id', 'processor_id', 'os_id', 'screen_id', 'graphics_card_id', 'storage_id', 'ram_id',
+        'display_name', 'short_description', 'keywords', 'ram_upgradeable', 'storage_upgradeable',
+        'touchscreen_override', 'connectivity_ports', 'wifi_standard', 'cellular', 'keyboard_backlight',
+        'numeric_keypad', 'keyboard_layout', 'pointing_device', 'keyboard_backlight_color',
+        'keyboard_backlight_zone', 'keyboard_language', 'fingerprint_reader', 'face_recognition', 'weight_lbs',
+    )
+
+    def record_user_modifications(self):
+        """
+        Agrega a user_modified_fields las columnas de Icecat que cambiaron en
+        esta edición (llamar antes del commit)
+
+        Returns:
+            list: Campos agregados
+        """
+        state = inspect(self)
+        changed = [name for name in self.ICECAT_SYNCED_FIELDS if state.attrs[name].history.has_changes()]
+        current = set(self.user_modified_fields or [])
+        added = [name for name in changed if name not in current]
+        if added:
+            self.user_modified_fields = sorted(current.union(added))
+        return added
+
     # ===== PROPIEDADES CALCULADAS =====
 
-    @property
+    @hybrid_property
     def available_quantity(self):
-        """Cantidad disponible (total - reservada)"""
+        """Cantidad disponible (total - reservada). En consultas: Laptop.available_quantity > 0"""
         return self.quantity - self.reserved_quantity
 
     @property
@@ -1012,13 +1068,15 @@ class Laptop(TimestampMixin, db.Model):
 
     # ===== MÃ‰TODOS DE SERIALIZACIÃ“N =====
 
-    def to_dict(self, include_relationships=True, include_specs=False):
+    def to_dict(self, include_relationships=True, include_specs=False, include_heavy=True):
         """
         Serializa el objeto a diccionario (para JSON)
 
         Args:
             include_relationships: Si incluir datos de relaciones (mÃ¡s pesado)
             include_specs: Si incluir especificaciones tÃ©cnicas completas
+            include_heavy: Si incluir descripciÃ³n HTML y puertos (columnas diferidas;
+                           en listados pasar False para no cargarlas fila por fila)
 
         Returns:
             dict con todos los datos del laptop
@@ -1034,7 +1092,6 @@ class Laptop(TimestampMixin, db.Model):
             # Marketing y SEO
             'display_name': self.display_name,
             'short_description': self.short_description,
-            'long_description_html': self.long_description_html,
             'is_published': self.is_published,
             'is_featured': self.is_featured,
             'seo_title': self.seo_title,
@@ -1062,7 +1119,6 @@ class Laptop(TimestampMixin, db.Model):
             'stylus_support': self.stylus_support,
             
             # Conectividad
-            'connectivity_ports': self.connectivity_ports,
             'wifi_standard': self.wifi_standard,
             'bluetooth_version': self.bluetooth_version,
             'ethernet_port': self.ethernet_port,
@@ -1111,6 +1167,11 @@ class Laptop(TimestampMixin, db.Model):
             'public_notes': self.public_notes
         }
         
+        # Columnas pesadas (diferidas)
+        if include_heavy:
+            data['long_description_html'] = self.long_description_html
+            data['connectivity_ports'] = self.connectivity_ports
+
         # Incluir especificaciones unificadas si se solicita
         if include_specs and self.unified_specs:
             data['unified_specs'] = self.unified_specs
@@ -1192,6 +1253,16 @@ class Laptop(TimestampMixin, db.Model):
         db.Index('idx_laptop_entry_date', 'entry_date'),
         db.Index('idx_laptop_store_location', 'store_id', 'location_id'),
         db.Index('idx_laptop_price', 'sale_price'),
+        db.Index('idx_laptop_catalog_keyset', 'is_published', 'created_at', 'id'),
+        # Disponibilidad para facturar (Laptop.available_quantity > 0)
+        db.Index('idx_laptop_available', 'is_published', quantity - reserved_quantity),
+        # Laptops de Icecat con datos vencidos (IcecatSyncService): cada lote es
+        # un rango (icecat_last_synced_at, id); las cargadas a mano no entran
+        db.Index(
+            'idx_laptop_icecat_synced', 'icecat_last_synced_at', 'id',
+            postgresql_where=db.and_(gtin.isnot(None), icecat_import_status.in_(ICECAT_SYNC_STATUSES)),
+            sqlite_where=db.and_(gtin.isnot(None), icecat_import_status.in_(ICECAT_SYNC_STATUSES))
+        ),
     )
 
 
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# MODELO: HECHOS DIARIOS DE VENTAS (ROLLUP)
+# ============================================
+# Tabla agregada por dia x laptop/producto x marca x categoria x
+# metodo de pago x estado. Se mantiene de forma incremental desde
+# SalesFactService cada vez que cambia una factura, y se puede
+# reconstruir completa con: flask rebuild-sales-facts
+
+from datetime import datetime
+from app import db
+
+
+class DailySalesFact(db.Model):
+    """
+    Rollup diario de ventas y costo de ventas (COGS).
+
+    Hay dos tipos de fila:
+      - Filas de linea (item_type = 'laptop' | 'product' | 'custom'):
+        unidades, ingresos, costo y margen de los items de factura.
+      - Filas de cabecera (item_type = 'invoice'):
+        cantidad de facturas, subtotal, impuestos y total por
+        dia x metodo de pago x estado.
+    """
+    __tablename__ = 'daily_sales_facts'
+
+    # Tipo reservado para las filas de cabecera de factura
+    INVOICE_ROW = 'invoice'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # ===== DIMENSIONES =====
+    fact_date = db.Column(db.Date, nullable=False, index=True)
+    item_type = db.Column(db.String(20), nullable=False, default='laptop')
+    laptop_id = db.Column(db.Integer, db.ForeignKey('laptops.id', ondelete='SET NULL'), nullable=True, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='SET NULL'), nullable=True, index=True)
+    brand_name = db.Column(db.String(100), nullable=True)
+    category_name = db.Column(db.String(100), nullable=True)
+    payment_method = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+
+    # ===== MEDIDAS DE LINEA =====
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cost = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    margin_sum = db.Column(db.Numeric(14, 4), nullable=False, default=0)  # Suma de % de margen por linea
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # ===== MEDIDAS DE CABECERA =====
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    subtotal = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    tax_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # ===== FILTROS =====
+
+    @classmethod
+    def line_rows(cls):
+        """Condicion para filas de items de factura"""
+        return cls.item_type != cls.INVOICE_ROW
+
+    @classmethod
+    def invoice_rows(cls):
+        """Condicion para filas de cabecera de factura"""
+        return cls.item_type == cls.INVOICE_ROW
+
+    def __repr__(self):
+        return f'<DailySalesFact {self.fact_date} {self.item_type} {self.status}>'
+
+    # ===== INDICES =====
+    __table_args__ = (
+        db.Index('idx_sales_fact_date_status', 'fact_date', 'status'),
+        db.Index('idx_sales_fact_date_type', 'fact_date', 'item_type'),
+    )
@@ -416,3 +416,89 @@ class SerialMovement(TimestampMixin, db.Model):
         db.Index('idx_movement_serial_type', 'serial_id', 'movement_type'),
         db.Index('idx_movement_date', 'created_at'),
     )
+
+
+# ============================================
+# MODELO: RESERVA DE STOCK
+# ============================================
+# Stock apartado por facturas en borrador/emitidas (ver ReservationService)
+
+RESERVATION_STATUS_CHOICES = [
+    ('active', 'Activa'),
+    ('consumed', 'Vendida'),
+    ('released', 'Liberada'),
+    ('expired', 'Vencida'),
+]
+
+
+class StockReservation(db.Model):
+    """
+    Cantidad (y seriales específicos) de una laptop apartada por una factura.
+
+    Mientras está activa, `quantity` está sumada en Laptop.reserved_quantity
+    y los seriales de `serial_ids` están en estado 'reserved'. Al vencer
+    (expires_at) el sweeper la libera.
+    """
+    __tablename__ = 'stock_reservations'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    invoice_id = db.Column(
+        db.Integer,
+        db.ForeignKey('invoices.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    laptop_id = db.Column(
+        db.Integer,
+        db.ForeignKey('laptops.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+
+    quantity = db.Column(db.Integer, nullable=False)
+    serial_ids = db.Column(db.JSON, nullable=True)
+
+    # 'active', 'consumed', 'released', 'expired'
+    status = db.Column(db.String(20), nullable=False, default='active')
+    expires_at = db.Column(db.DateTime, nullable=False)
+    released_at = db.Column(db.DateTime, nullable=True)
+
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relaciones
+    invoice = db.relationship('Invoice', backref=db.backref('stock_reservations', lazy='dynamic'))
+    laptop = db.relationship('Laptop')
+
+    @property
+    def is_expired(self):
+        """Activa pero con el plazo vencido (pendiente del sweeper)"""
+        return self.status == 'active' and self.expires_at < datetime.utcnow()
+
+    @property
+    def status_display(self):
+        return dict(RESERVATION_STATUS_CHOICES).get(self.status, self.status)
+
+    def to_dict(self):
+        """Serializa a diccionario"""
+        return {
+            'id': self.id,
+            'invoice_id': self.invoice_id,
+            'laptop_id': self.laptop_id,
+            'quantity': self.quantity,
+            'serial_ids': self.serial_ids or [],
+            'status': self.status,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'released_at': self.released_at.isoformat() if self.released_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f'<StockReservation Invoice:{self.invoice_id} Laptop:{self.laptop_id} x{self.quantity} {self.status}>'
+
+    __table_args__ = (
+        # El sweeper busca las activas vencidas
+        db.Index('idx_reservation_status_expires', 'status', 'expires_at'),
+        db.Index('idx_reservation_invoice_status', 'invoice_id', 'status'),
+    )
@@ -8,10 +8,13 @@
 #   - has_permission() ahora verifica expires_at e is_active de user_roles
 #   - get_all_permissions() ya no tiene 'pass' suelto para admin
 #   - increment_failed_login() ya NO hace commit() interno (evita side-effects)
+#   - Permisos compilados en un frozenset cacheado (get_permission_set)
 
 from datetime import datetime
+from flask import g, has_app_context
 from flask_login import UserMixin
 from app import db, bcrypt
+from app.extensions import result_cache
 from sqlalchemy import event
 
 
@@ -145,17 +148,106 @@ class User(UserMixin, db.Model):
             Role.is_active == True
         ).all()
 
+    # ===== CONJUNTO DE PERMISOS COMPILADO =====
+    # Los nombres de permisos efectivos se compilan en un frozenset una vez
+    # por petición (flask.g) y se cachean entre peticiones con la etiqueta
+    # PERMISSION_SET_TAG. Su token de generación es el contador de versión
+    # que RoleService.bump_permissions_version() incrementa en cada cambio
+    # de asignaciones, sincronización o expiración.
+
+    PERMISSION_SET_TAG = 'rbac'
+    PERMISSION_SET_TTL = 300
+
+    def _compile_permission_set(self):
+        """
+        Una sola consulta: permisos de los roles activos y no expirados.
+
+        Returns:
+            tuple: (frozenset de nombres, próxima expiración de un rol o None)
+        """
+        from app.models.rbac_associations import user_roles, role_permissions
+        from app.models.role import Role
+        from app.models.permission import Permission
+
+        now = datetime.utcnow()
+        rows = db.session.query(Permission.name, user_roles.c.expires_at).select_from(user_roles).join(
+            Role, Role.id == user_roles.c.role_id
+        ).join(
+            role_permissions, role_permissions.c.role_id == Role.id
+        ).join(
+            Permission, Permission.id == role_permissions.c.permission_id
+        ).filter(
+            user_roles.c.user_id == self.id,
+            user_roles.c.is_active == True,
+            db.or_(
+                user_roles.c.expires_at.is_(None),
+                user_roles.c.expires_at > now
+            ),
+            Role.is_active == True
+        ).all()
+
+        expirations = [expires_at for _name, expires_at in rows if expires_at]
+        return frozenset(name for name, _expires_at in rows), min(expirations) if expirations else None
+
+    def get_permission_set(self):
+        """
+        frozenset con los nombres de permisos efectivos (sin el atajo de admin).
+        Las verificaciones de permisos son búsquedas O(1) sobre este conjunto.
+        """
+        per_request = g.setdefault('_permission_sets', {}) if has_app_context() else {}
+        if self.id in per_request:
+            return per_request[self.id]
+
+        # Roles vigentes ya leídos por el preámbulo de la petición
+        from app.utils.session_manager import preloaded_auth
+        auth = preloaded_auth(self.id)
+        if auth and auth['role_ids'] is not None:
+            per_request[self.id] = User.permissions_for_roles(auth['role_ids'])
+            return per_request[self.id]
+
+        key = result_cache.make_key('rbac.permission_set', (self.id,), tags=(User.PERMISSION_SET_TAG,))
+        found, entry = result_cache.get(key) if result_cache.enabled else (False, None)
+
+        # Un rol temporal que venció invalida el conjunto aunque no haya cambiado la versión
+        now = datetime.utcnow()
+        if not found or (entry[1] and entry[1] <= now):
+            entry = self._compile_permission_set()
+            if result_cache.enabled:
+                ttl = User.PERMISSION_SET_TTL
+                if entry[1]:
+                    ttl = max(1, min(ttl, int((entry[1] - now).total_seconds()) + 1))
+                result_cache.set(key, entry, ttl)
+
+        per_request[self.id] = entry[0]
+        return entry[0]
+
+    @staticmethod
+    def permissions_for_roles(role_ids):
+        """frozenset de permisos de un conjunto de roles (cacheado por conjunto)"""
+        if not role_ids:
+            return frozenset()
+
+        def compile_permissions():
+            from app.models.rbac_associations import role_permissions
+            from app.models.permission import Permission
+
+            rows = db.session.query(Permission.name).join(
+                role_permissions, role_permissions.c.permission_id == Permission.id
+            ).filter(role_permissions.c.role_id.in_(role_ids)).all()
+            return frozenset(name for name, in rows)
+
+        return result_cache.get_or_set(
+            'rbac.role_permissions', tuple(sorted(role_ids)), compile_permissions,
+            tags=(User.PERMISSION_SET_TAG,), ttl=User.PERMISSION_SET_TTL
+        )
+
     def has_permission(self, permission):
         """
         V3: Verifica permiso considerando expires_at e is_active de user_roles.
         """
         if self.is_admin:
             return True
-        for role in self._get_active_roles():
-            for perm in role.permissions:
-                if perm.name == permission:
-                    return True
-        return False
+        return permission in self.get_permission_set()
 
     def has_role(self, role_name):
         """V3: Verifica rol considerando expiración"""
@@ -167,21 +259,13 @@ class User(UserMixin, db.Model):
         """Verifica si tiene AL MENOS UNO de los permisos"""
         if self.is_admin:
             return True
-        for role in self._get_active_roles():
-            for perm in role.permissions:
-                if perm.name in permission_names:
-                    return True
-        return False
+        return not self.get_permission_set().isdisjoint(permission_names)
 
     def has_all_permissions(self, *permission_names):
         """Verifica si tiene TODOS los permisos"""
         if self.is_admin:
             return True
-        user_permissions = set()
-        for role in self._get_active_roles():
-            for perm in role.permissions:
-                user_permissions.add(perm.name)
-        return all(perm in user_permissions for perm in permission_names)
+        return self.get_permission_set().issuperset(permission_names)
 
     def get_all_permissions(self):
         """
@@ -199,7 +283,9 @@ class User(UserMixin, db.Model):
 
     def get_permission_names(self):
         """Obtiene lista de nombres de permisos"""
-        return [p.name for p in self.get_all_permissions()]
+        if self.is_admin:
+            return [p.name for p in self.get_all_permissions()]
+        return sorted(self.get_permission_set())
 
     def to_dict(self):
         return {
@@ -451,19 +451,32 @@ def get_permissions():
 @login_required
 @permission_required('reports.audit.view')
 def get_audit_logs():
-    """Obtener logs de auditoria con paginacion"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    """Obtener logs de auditoria con paginacion por cursor"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
     
-    logs = AuditService.get_logs(page=page, per_page=per_page)
+    logs = AuditService.search_logs(
+        query=request.args.get('q') or None,
+        user_id=request.args.get('user_id', type=int),
+        module=request.args.get('module') or None,
+        action=request.args.get('action') or None,
+        status=request.args.get('status') or None,
+        limit=limit,
+        cursor=request.args.get('cursor') or None
+    )
     
     return jsonify({
-        'logs': [log.to_dict() for log in logs.items],
-        'total': logs.total,
-        'pages': logs.pages,
-        'current_page': logs.page
+        'logs': [log.to_dict() for log in logs],
+        'next_cursor': AuditService.encode_cursor(logs[-1]) if len(logs) == limit else None
     })
 
+@admin_bp.route('/api/audit/summary', methods=['GET'])
+@login_required
+@permission_required('reports.audit.view')
+def get_audit_summary():
+    """Resumen de actividad de auditoria (agregado en SQL)"""
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+    return jsonify(AuditService.get_activity_summary(days))
+
 # ============================================
 # API ENDPOINTS - ICECAT CONFIGURATION
 # ============================================
@@ -537,6 +550,10 @@ def save_icecat_settings():
             category='icecat'
         )
         
+        # Con otras credenciales un GTIN "no encontrado" puede aparecer
+        from app.extensions import icecat_cache
+        icecat_cache.clear_negative()
+        
         return jsonify({
             'success': True,
             'message': 'Configuracion guardada exitosamente'
@@ -10,6 +10,7 @@ from app.models.customer import Customer
 from app.forms.customer_forms import CustomerForm, QuickSearchForm, FilterForm
 from app.utils.decorators import admin_required, permission_required, any_permission_required
 from app.services.dgii_service import DGIIService  # ===== NUEVA IMPORTACIÓN =====
+from app.services.search_service import SearchService
 from sqlalchemy import or_
 import re
 
@@ -54,16 +55,10 @@ def customers_list():
         # Limpiar busqueda para cedula/RNC
         clean_search = clean_id_number(search_query)
 
-        search_pattern = f'%{search_query}%'
-        query = query.filter(
-            or_(
-                Customer.first_name.ilike(search_pattern),
-                Customer.last_name.ilike(search_pattern),
-                Customer.company_name.ilike(search_pattern),
-                Customer.email.ilike(search_pattern),
-                Customer.id_number.like(f'%{clean_search}%'),
-                Customer.phone_primary.like(search_pattern)
-            )
+        query = SearchService.apply(
+            query, search_query, 'customer',
+            extra_conditions=[Customer.id_number.like(f'%{clean_search}%')] if clean_search else [],
+            order=False
         )
 
     # Aplicar filtros
@@ -420,16 +415,10 @@ def api_search():
 
     # Limpiar busqueda
     clean_search = clean_id_number(query)
-    search_pattern = f'%{query}%'
-
-    customers = Customer.query.filter(
-        Customer.is_active == True,
-        or_(
-            Customer.first_name.ilike(search_pattern),
-            Customer.last_name.ilike(search_pattern),
-            Customer.company_name.ilike(search_pattern),
-            Customer.id_number.like(f'%{clean_search}%')
-        )
+
+    customers = SearchService.apply(
+        Customer.query.filter(Customer.is_active == True), query, 'customer',
+        extra_conditions=[Customer.id_number.like(f'%{clean_search}%')] if clean_search else []
     ).limit(limit).all()
 
     results = [
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 from flask import Blueprint, jsonify, request
-from flask_login import login_required
+from flask_login import login_required, current_user
+from app import db
+from app.models.icecat_job import IcecatJob, IcecatJobItem
 from app.services.icecat_service import IcecatService
-from app.utils.decorators import json_response, handle_exceptions
+from app.services.icecat_import_service import IcecatImportService
+from app.utils.decorators import json_response, handle_exceptions, permission_required
 
 icecat_api_bp = Blueprint('icecat_api', __name__, url_prefix='/api/icecat')
 
+# Filas máximas por importación
+MAX_IMPORT_ROWS = 5000
+
 @icecat_api_bp.route('/fetch/<gtin>', methods=['GET'])
 @login_required
 @json_response
@@ -24,3 +30,83 @@ def fetch_product(gtin):
         import logging
         logging.getLogger(__name__).error(f"Error in fetch_product: {str(e)}")
         return {'success': False, 'message': f'Error al consultar Icecat: {str(e)}'}, 200
+
+
+@icecat_api_bp.route('/import', methods=['POST'])
+@login_required
+@permission_required('inventory.laptops.create', audit_action='icecat_bulk_import', audit_module='inventory')
+@json_response
+@handle_exceptions
+def start_import():
+    """
+    Importación masiva por GTIN (se procesa en segundo plano).
+
+    Acepta un archivo CSV (campo 'file': gtin, costo, precio, cantidad) o
+    JSON {'items': [{'gtin', 'purchase_cost', 'sale_price', 'quantity'}], ...}
+    con opciones store_id, condition, is_published y download_images.
+    """
+    if 'file' in request.files:
+        source = request.files['file'].read()
+        payload = request.form
+    else:
+        payload = request.get_json(silent=True) or {}
+        source = payload.get('items') or []
+
+    rows = IcecatImportService.parse_rows(source)
+    if not rows:
+        return {'success': False, 'error': 'No se recibieron GTINs para importar.'}, 400
+    if len(rows) > MAX_IMPORT_ROWS:
+        return {'success': False, 'error': f'Máximo {MAX_IMPORT_ROWS} filas por importación.'}, 400
+
+    def flag(name, default):
+        value = payload.get(name, default)
+        return value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'on', 'si', 'sí')
+
+    options = {
+        'store_id': payload.get('store_id') or None,
+        'condition': payload.get('condition') or 'new',
+        'is_published': flag('is_published', False),
+        'download_images': flag('download_images', True),
+    }
+    if options['store_id'] and str(options['store_id']).isdigit():
+        options['store_id'] = int(options['store_id'])
+
+    job = IcecatImportService.create_job(rows, options, user_id=current_user.id)
+    IcecatImportService.start(job.id)
+    return {'success': True, 'job': job.to_dict()}, 202
+
+
+@icecat_api_bp.route('/import/<int:job_id>', methods=['GET'])
+@login_required
+@permission_required('inventory.laptops.create')
+@json_response
+@handle_exceptions
+def import_status(job_id):
+    """
+    Progreso de una importación. Con ?items=errors|all incluye las filas.
+    """
+    job = db.session.get(IcecatJob, job_id)
+    if job is None:
+        return {'success': False, 'error': 'Importación no encontrada.'}, 404
+
+    data = {'success': True, 'job': job.to_dict()}
+    detail = request.args.get('items')
+    if detail:
+        query = job.items.order_by(IcecatJobItem.line_number)
+        if detail == 'errors':
+            query = query.filter(IcecatJobItem.status.notin_(['pending', 'created']))
+        data['items'] = [item.to_dict() for item in query.limit(MAX_IMPORT_ROWS).all()]
+    return data
+
+
+@icecat_api_bp.route('/import/<int:job_id>/cancel', methods=['POST'])
+@login_required
+@permission_required('inventory.laptops.create')
+@json_response
+@handle_exceptions
+def cancel_import(job_id):
+    """Cancela una importación (termina el lote en curso)."""
+    job = IcecatImportService.cancel(job_id)
+    if job is None:
+        return {'success': False, 'error': 'Importación no encontrada.'}, 404
+    return {'success': True, 'job': job.to_dict()}
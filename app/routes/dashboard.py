@@ -7,6 +7,7 @@ from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from app.utils.decorators import permission_required
 from app import db
+from app.extensions import result_cache
 from app.models.laptop import Laptop, Brand, LaptopModel
 from app.models.product import Product
 from app.models.customer import Customer
@@ -14,9 +15,12 @@ from app.models.invoice import Invoice, InvoiceItem, InvoiceSettings
 from app.models.expense import Expense
 from app.services.financial_service import FinancialService
 from app.services.ai_service import AIService
+from app.services.sales_trend_service import SalesTrendService
+from app.services.sales_fact_service import SalesFactService
 from sqlalchemy import func, desc, and_, or_, extract, case
 from datetime import datetime, timedelta, date
 from decimal import Decimal
+from collections import namedtuple
 import json
 
 # Crear Blueprint
@@ -34,6 +38,12 @@ PERIODS = {
     'year': 'Este Año'
 }
 
+# Resultado de rendimiento por categoría (nivel de módulo para poder cachearse)
+CatResult = namedtuple('CatResult', ['category', 'units_sold', 'revenue'])
+
+# Etiquetas de invalidación de caché de los paneles
+PANEL_TAGS = ('invoices', 'expenses', 'inventory')
+
 # Colores para gráficos - Purple Gradient Theme
 CHART_COLORS = {
     'primary': '#7c3aed',  # Purple (matching banner)
@@ -103,6 +113,11 @@ def calculate_growth(current, previous):
     return round(((current - previous) / previous) * 100, 1)
 
 
+def cache_day():
+    """Los períodos son relativos a hoy: las entradas de caché no cruzan de día"""
+    return date.today().isoformat()
+
+
 def get_trend_icon(value):
     """Devuelve icono y color basado en tendencia"""
     if value > 0:
@@ -117,84 +132,18 @@ def get_trend_icon(value):
 # FUNCIONES DE DATOS PRINCIPALES
 # ============================================
 
+@result_cache.cached('dashboard.financial', tags=PANEL_TAGS, scoped=True, vary=cache_day)
 def get_financial_metrics(period='month'):
     """Obtiene todas las métricas financieras para el período"""
     start_date, end_date = get_date_range(period)
     prev_start, prev_end = get_previous_period(start_date, end_date)
 
-    # Ventas del período actual
-    current_sales = db.session.query(
-        func.sum(Invoice.subtotal).label('total_sales'),
-        func.count(Invoice.id).label('invoice_count'),
-        func.sum(
-            case(
-                (Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']), Invoice.subtotal),
-                else_=0
-            )
-        ).label('paid_sales')
-    ).filter(
-        Invoice.invoice_date.between(start_date, end_date),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).first()
-
-    # Ventas período anterior
-    previous_sales = db.session.query(
-        func.sum(Invoice.subtotal).label('total_sales'),
-        func.count(Invoice.id).label('invoice_count')
-    ).filter(
-        Invoice.invoice_date.between(prev_start, prev_end),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).first()
+    # Ventas, cantidad de facturas y costos reales (COGS) desde el rollup diario
+    current_totals = SalesFactService.get_period_totals(start_date, end_date)
+    previous_totals = SalesFactService.get_period_totals(prev_start, prev_end)
 
-    # Costos Reales (COGS)
-    # Suma de (cantidad * costo_compra) de todos los items en facturas pagadas/completadas
-    current_cogs_laptop = db.session.query(
-        func.sum(InvoiceItem.quantity * Laptop.purchase_cost)
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).join(
-        Laptop, InvoiceItem.laptop_id == Laptop.id
-    ).filter(
-        Invoice.invoice_date.between(start_date, end_date),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).scalar() or 0
-
-    current_cogs_product = db.session.query(
-        func.sum(InvoiceItem.quantity * Product.purchase_cost)
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).join(
-        Product, InvoiceItem.product_id == Product.id
-    ).filter(
-        Invoice.invoice_date.between(start_date, end_date),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).scalar() or 0
-    
-    current_cogs = float(current_cogs_laptop) + float(current_cogs_product)
-
-    previous_cogs_laptop = db.session.query(
-        func.sum(InvoiceItem.quantity * Laptop.purchase_cost)
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).join(
-        Laptop, InvoiceItem.laptop_id == Laptop.id
-    ).filter(
-        Invoice.invoice_date.between(prev_start, prev_end),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).scalar() or 0
-
-    previous_cogs_product = db.session.query(
-        func.sum(InvoiceItem.quantity * Product.purchase_cost)
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).join(
-        Product, InvoiceItem.product_id == Product.id
-    ).filter(
-        Invoice.invoice_date.between(prev_start, prev_end),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).scalar() or 0
-    
-    previous_cogs = float(previous_cogs_laptop) + float(previous_cogs_product)
+    current_cogs = current_totals['cogs']
+    previous_cogs = previous_totals['cogs']
 
     # Gastos Operativos Reales
     # Suma de gastos pagados en el período
@@ -215,22 +164,22 @@ def get_financial_metrics(period='month'):
     previous_expenses = float(previous_expenses_query.scalar() or 0)
 
     # Ventas
-    current_sales_value = float(current_sales.total_sales or 0)
-    previous_sales_value = float(previous_sales.total_sales or 0)
+    current_sales_value = current_totals['sales']
+    previous_sales_value = previous_totals['sales']
 
     # Calcular métricas financieras con datos reales
     current_data = [{
         'sales': current_sales_value,
         'cogs': current_cogs,
         'expenses': current_expenses,
-        'invoice_count': current_sales.invoice_count or 0
+        'invoice_count': current_totals['invoice_count']
     }]
 
     previous_data = [{
         'sales': previous_sales_value,
         'cogs': previous_cogs,
         'expenses': previous_expenses,
-        'invoice_count': previous_sales.invoice_count or 0
+        'invoice_count': previous_totals['invoice_count']
     }]
 
     # Valor Inventario Real (actual) para cálculo de rotación
@@ -273,6 +222,7 @@ def get_financial_metrics(period='month'):
     }
 
 
+@result_cache.cached('dashboard.inventory', tags=('invoices', 'inventory'), scoped=True, vary=cache_day)
 def get_inventory_analysis():
     """Analiza el estado del inventario"""
     # Total de items
@@ -300,7 +250,11 @@ def get_inventory_analysis():
         Product.quantity > 0
     )
     low_stock_count = low_stock_laptop_query.count() + low_stock_product_query.count()
-    low_stock_items = low_stock_laptop_query.limit(5).all() + low_stock_product_query.limit(5).all()
+    # Solo datos planos (no objetos ORM) para que el resultado se pueda cachear
+    low_stock_items = [
+        {'sku': item.sku, 'name': getattr(item, 'display_name', None) or getattr(item, 'name', ''), 'quantity': item.quantity}
+        for item in low_stock_laptop_query.limit(5).all() + low_stock_product_query.limit(5).all()
+    ]
 
     # Sin stock
     out_of_stock_laptop = Laptop.query.filter(
@@ -375,328 +329,47 @@ def get_inventory_analysis():
     }
 
 
+@result_cache.cached('dashboard.sales_trends', tags=PANEL_TAGS, scoped=True, vary=cache_day)
 def get_sales_trends(period='month'):
     """Obtiene tendencias de ventas para gráficos"""
     start_date, end_date = get_date_range(period)
 
-    # Determinar granularidad basada en período
-    if period == 'today':
-        # Por hora para hoy
-        hours = []
-        sales_data = []
-        profit_data = []
-        
-        for i in range(24):
-            hour_start = datetime.combine(start_date, datetime.min.time()) + timedelta(hours=i)
-            hour_end = hour_start + timedelta(hours=1)
-
-            sales = db.session.query(
-                func.sum(Invoice.subtotal)
-            ).filter(
-                Invoice.created_at >= hour_start,
-                Invoice.created_at < hour_end,
-                Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-            ).scalar() or 0
-            
-            # Ganancia horaria aproximada (Subtotal - Costo)
-            cogs_laptop = db.session.query(
-                func.sum(InvoiceItem.quantity * Laptop.purchase_cost)
-            ).join(
-                Invoice, InvoiceItem.invoice_id == Invoice.id
-            ).join(
-                Laptop, InvoiceItem.laptop_id == Laptop.id
-            ).filter(
-                Invoice.created_at >= hour_start,
-                Invoice.created_at < hour_end,
-                Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-            ).scalar() or 0
-
-            cogs_product = db.session.query(
-                func.sum(InvoiceItem.quantity * Product.purchase_cost)
-            ).join(
-                Invoice, InvoiceItem.invoice_id == Invoice.id
-            ).join(
-                Product, InvoiceItem.product_id == Product.id
-            ).filter(
-                Invoice.created_at >= hour_start,
-                Invoice.created_at < hour_end,
-                Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-            ).scalar() or 0
-            
-            cogs = float(cogs_laptop) + float(cogs_product)
-
-            hours.append(hour_start.strftime('%H:%M'))
-            sales_data.append(float(sales))
-            profit_data.append(float(sales) - float(cogs))
-
-        return {
-            'labels': hours,
-            'datasets': [
-                {
-                    'label': 'Ventas',
-                    'data': sales_data,
-                    'color': CHART_COLORS['primary'],
-                    'type': 'bar'
-                },
-                {
-                    'label': 'Ganancia',
-                    'data': profit_data,
-                    'color': CHART_COLORS['success'],
-                    'type': 'line'
-                }
-            ]
-        }
-
-    elif period == 'week':
-        # Por día para la semana
-        days = []
-        sales_data = []
-        profit_data = []
-
-        for i in range(7):
-            day = start_date + timedelta(days=i)
-            if day > end_date:
-                break
-
-            # Ventas actuales
-            sales = db.session.query(
-                func.sum(Invoice.subtotal)
-            ).filter(
-                Invoice.invoice_date == day,
-                Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-            ).scalar() or 0
-
-            # COGS del día
-            cogs_laptop = db.session.query(
-                func.sum(InvoiceItem.quantity * Laptop.purchase_cost)
-            ).join(
-                Invoice, InvoiceItem.invoice_id == Invoice.id
-            ).join(
-                Laptop, InvoiceItem.laptop_id == Laptop.id
-            ).filter(
-                Invoice.invoice_date == day,
-                Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-            ).scalar() or 0
-
-            cogs_product = db.session.query(
-                func.sum(InvoiceItem.quantity * Product.purchase_cost)
-            ).join(
-                Invoice, InvoiceItem.invoice_id == Invoice.id
-            ).join(
-                Product, InvoiceItem.product_id == Product.id
-            ).filter(
-                Invoice.invoice_date == day,
-                Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-            ).scalar() or 0
-            
-            cogs = float(cogs_laptop) + float(cogs_product)
-
-            days.append(day.strftime('%a'))
-            sales_data.append(float(sales))
-            profit_data.append(float(sales) - float(cogs))
+    # Todos los buckets del período (hora / día / mes) en una sola consulta agrupada
+    trends = SalesTrendService.get_trends(period, start_date, end_date)
 
-        return {
-            'labels': days,
-            'datasets': [
-                {
-                    'label': 'Ventas',
-                    'data': sales_data,
-                    'color': CHART_COLORS['primary'],
-                    'type': 'bar'
-                },
-                {
-                    'label': 'Ganancia',
-                    'data': profit_data,
-                    'color': CHART_COLORS['success'],
-                    'type': 'line'
-                }
-            ]
-        }
-
-    else:
-        # Por mes para períodos más largos
-        months = []
-        sales_data = []
-        profit_data = []
-
-        if period == 'month':
-            # Por día del mes
-            current_day = start_date
-            while current_day <= end_date:
-                sales = db.session.query(
-                    func.sum(Invoice.subtotal)
-                ).filter(
-                    Invoice.invoice_date == current_day,
-                    Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-                ).scalar() or 0
-
-                # Calcular ganancia (Ventas - Costos)
-                cogs_laptop = db.session.query(
-                    func.sum(InvoiceItem.quantity * Laptop.purchase_cost)
-                ).join(
-                    Invoice, InvoiceItem.invoice_id == Invoice.id
-                ).join(
-                    Laptop, InvoiceItem.laptop_id == Laptop.id
-                ).filter(
-                    Invoice.invoice_date == current_day,
-                    Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-                ).scalar() or 0
-
-                cogs_product = db.session.query(
-                    func.sum(InvoiceItem.quantity * Product.purchase_cost)
-                ).join(
-                    Invoice, InvoiceItem.invoice_id == Invoice.id
-                ).join(
-                    Product, InvoiceItem.product_id == Product.id
-                ).filter(
-                    Invoice.invoice_date == current_day,
-                    Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-                ).scalar() or 0
-                
-                cogs = float(cogs_laptop) + float(cogs_product)
-                
-                profit = float(sales) - float(cogs)
-
-                months.append(current_day.strftime('%d/%m'))
-                sales_data.append(float(sales))
-                profit_data.append(profit)
-
-                current_day += timedelta(days=1)
-
-        elif period in ['quarter', 'year']:
-            # Por mes
-            current_month = start_date.replace(day=1)
-            while current_month <= end_date:
-                month_end = (current_month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-                if month_end > end_date:
-                    month_end = end_date
-
-                sales = db.session.query(
-                    func.sum(Invoice.subtotal)
-                ).filter(
-                    Invoice.invoice_date.between(current_month, month_end),
-                    Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-                ).scalar() or 0
-
-                # COGS del mes
-                cogs_laptop = db.session.query(
-                    func.sum(InvoiceItem.quantity * Laptop.purchase_cost)
-                ).join(
-                    Invoice, InvoiceItem.invoice_id == Invoice.id
-                ).join(
-                    Laptop, InvoiceItem.laptop_id == Laptop.id
-                ).filter(
-                    Invoice.invoice_date.between(current_month, month_end),
-                    Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-                ).scalar() or 0
-
-                cogs_product = db.session.query(
-                    func.sum(InvoiceItem.quantity * Product.purchase_cost)
-                ).join(
-                    Invoice, InvoiceItem.invoice_id == Invoice.id
-                ).join(
-                    Product, InvoiceItem.product_id == Product.id
-                ).filter(
-                    Invoice.invoice_date.between(current_month, month_end),
-                    Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-                ).scalar() or 0
-                
-                cogs = float(cogs_laptop) + float(cogs_product)
-
-                # Gastos del mes
-                expenses = db.session.query(
-                    func.sum(Expense.amount)
-                ).filter(
-                    Expense.paid_date.between(current_month, month_end),
-                    Expense.is_paid == True
-                ).scalar() or 0
-
-                profit = float(sales) - float(cogs) - float(expenses)
-
-                months.append(current_month.strftime('%b'))
-                sales_data.append(float(sales))
-                profit_data.append(profit)
-
-                # Siguiente mes
-                current_month = month_end + timedelta(days=1)
-
-        return {
-            'labels': months,
-            'datasets': [
-                {
-                    'label': 'Ventas',
-                    'data': sales_data,
-                    'color': CHART_COLORS['primary'],
-                    'type': 'bar'
-                },
-                {
-                    'label': 'Ganancia',
-                    'data': profit_data,
-                    'color': CHART_COLORS['success'],
-                    'type': 'line'
-                }
-            ]
-        }
+    return {
+        'labels': trends['labels'],
+        'datasets': [
+            {
+                'label': 'Ventas',
+                'data': trends['sales'],
+                'color': CHART_COLORS['primary'],
+                'type': 'bar'
+            },
+            {
+                'label': 'Ganancia',
+                'data': trends['profit'],
+                'color': CHART_COLORS['success'],
+                'type': 'line'
+            }
+        ]
+    }
 
 
+@result_cache.cached('dashboard.brands', tags=('invoices', 'inventory'), scoped=True, vary=cache_day)
 def get_brand_performance(period='month'):
     """Obtiene rendimiento por marca basado en ventas reales CON FILTRO TEMPORAL"""
     start_date, end_date = get_date_range(period)
 
-    # Marcas de Laptops
-    laptop_brand_data = db.session.query(
-        Brand.name,
-        func.count(Laptop.id).label('product_count'),
-        func.sum(InvoiceItem.quantity * InvoiceItem.unit_price).label('sale_value'),
-        func.sum(InvoiceItem.quantity * Laptop.purchase_cost).label('total_cost')
-    ).join(
-        Laptop, Brand.id == Laptop.brand_id
-    ).join(
-        InvoiceItem, Laptop.id == InvoiceItem.laptop_id
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).filter(
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']),
-        Invoice.invoice_date.between(start_date, end_date)
-    ).group_by(Brand.name).all()
-
-    # Marcas de Productos Genéricos (usando el campo string 'brand')
-    product_brand_data = db.session.query(
-        Product.brand.label('name'),
-        func.count(Product.id).label('product_count'),
-        func.sum(InvoiceItem.quantity * InvoiceItem.unit_price).label('sale_value'),
-        func.sum(InvoiceItem.quantity * Product.purchase_cost).label('total_cost')
-    ).join(
-        InvoiceItem, Product.id == InvoiceItem.product_id
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).filter(
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']),
-        Invoice.invoice_date.between(start_date, end_date)
-    ).group_by(Product.brand).all()
-
-    # Combinar resultados
+    # Marcas de Laptops y Productos Genéricos desde el rollup diario
     brands = {}
-    for b in laptop_brand_data:
+    for b in SalesFactService.get_brand_totals(start_date, end_date):
         name = b.name or 'Genérico'
-        brands[name] = {
-            'count': b.product_count,
-            'sales': float(b.sale_value or 0),
-            'cost': float(b.total_cost or 0)
-        }
-    
-    for b in product_brand_data:
-        name = b.name or 'Genérico'
-        if name in brands:
-            brands[name]['count'] += b.product_count
-            brands[name]['sales'] += float(b.sale_value or 0)
-            brands[name]['cost'] += float(b.total_cost or 0)
-        else:
-            brands[name] = {
-                'count': b.product_count,
-                'sales': float(b.sale_value or 0),
-                'cost': float(b.total_cost or 0)
-            }
+        if name not in brands:
+            brands[name] = {'count': 0, 'sales': 0.0, 'cost': 0.0}
+        brands[name]['count'] += int(b.product_count or 0)
+        brands[name]['sales'] += float(b.sale_value or 0)
+        brands[name]['cost'] += float(b.total_cost or 0)
 
     # Formatear para el template
     formatted_brands = []
@@ -733,6 +406,7 @@ def get_brand_performance(period='month'):
         'top_brand': top_brand,
         'top_margin': round(top_margin, 1)
     }
+@result_cache.cached('dashboard.conditions', tags=('invoices', 'inventory'), scoped=True, vary=cache_day)
 def get_condition_performance(period='month'):
     """Obtiene rendimiento por condición basado en ventas reales CON FILTRO TEMPORAL"""
     start_date, end_date = get_date_range(period)
@@ -786,112 +460,36 @@ def get_condition_performance(period='month'):
     }
 
 
+@result_cache.cached('dashboard.categories', tags=('invoices', 'inventory'), scoped=True, vary=cache_day)
 def get_category_performance(period='month'):
     """Obtiene rendimiento por categoría CON FILTRO TEMPORAL, incluyendo productos genéricos"""
     start_date, end_date = get_date_range(period)
     
-    # Categorías de Laptops
-    laptop_categories = db.session.query(
-        Laptop.category.label('category_name'),
-        func.sum(InvoiceItem.quantity).label('units_sold'),
-        func.sum(InvoiceItem.line_total).label('revenue')
-    ).join(
-        InvoiceItem, Laptop.id == InvoiceItem.laptop_id
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).filter(
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']),
-        Invoice.invoice_date.between(start_date, end_date)
-    ).group_by(Laptop.category).all()
-
-    # Categorías de Productos Genéricos
-    from app.models.product import ProductCategory
-    product_categories = db.session.query(
-        ProductCategory.name.label('category_name'),
-        func.sum(InvoiceItem.quantity).label('units_sold'),
-        func.sum(InvoiceItem.line_total).label('revenue')
-    ).join(
-        Product, ProductCategory.id == Product.category_id
-    ).join(
-        InvoiceItem, Product.id == InvoiceItem.product_id
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).filter(
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']),
-        Invoice.invoice_date.between(start_date, end_date)
-    ).group_by(ProductCategory.name).all()
-
-    # Combinar resultados
+    # Categorías de Laptops y Productos Genéricos desde el rollup diario
+    # (las laptops se ordenan primero, igual que antes)
     all_categories = []
-    for cat in laptop_categories:
-        all_categories.append({'category': cat.category_name or 'Laptop', 'units_sold': cat.units_sold, 'revenue': cat.revenue})
-    
-    for cat in product_categories:
-        # Si ya existe el nombre, sumar (poco probable por ser estructuras distintas pero posible)
-        found = False
-        for existing in all_categories:
-            if existing['category'] == cat.category_name:
-                existing['units_sold'] += cat.units_sold
-                existing['revenue'] += cat.revenue
-                found = True
-                break
-        if not found:
-            all_categories.append({'category': cat.category_name, 'units_sold': cat.units_sold, 'revenue': cat.revenue})
+    for cat in SalesFactService.get_category_totals(start_date, end_date):
+        name = cat.category_name or ('Laptop' if cat.item_type == 'laptop' else None)
+        # Si ya existe el nombre, sumar
+        existing = next((c for c in all_categories if c['category'] == name), None)
+        if existing:
+            existing['units_sold'] += cat.units_sold
+            existing['revenue'] += cat.revenue
+        else:
+            all_categories.append({'category': name, 'units_sold': cat.units_sold, 'revenue': cat.revenue})
 
     # Convertir de vuelta a objetos con atributos para compatibilidad
-    from collections import namedtuple
-    CatResult = namedtuple('CatResult', ['category', 'units_sold', 'revenue'])
     return [CatResult(**c) for c in all_categories]
 
 
+@result_cache.cached('dashboard.top_products', tags=('invoices', 'inventory'), scoped=True, vary=cache_day)
 def get_top_products(limit=10, period='month'):
     """Obtiene productos más vendidos y rentables CON FILTRO TEMPORAL"""
     start_date, end_date = get_date_range(period)
 
-    # Laptops top
-    top_laptops = db.session.query(
-        Brand.name.label('brand_name'),
-        LaptopModel.name.label('model_name'),
-        Laptop.sku,
-        Laptop.category,
-        func.sum(InvoiceItem.quantity).label('units_sold'),
-        func.sum(InvoiceItem.quantity * InvoiceItem.unit_price).label('revenue'),
-        func.sum(InvoiceItem.quantity * (InvoiceItem.unit_price - Laptop.purchase_cost)).label('total_profit'),
-        func.avg((InvoiceItem.unit_price - Laptop.purchase_cost) / InvoiceItem.unit_price * 100).label('margin')
-    ).join(
-        InvoiceItem, Laptop.id == InvoiceItem.laptop_id
-    ).join(
-        Brand, Laptop.brand_id == Brand.id
-    ).join(
-        LaptopModel, Laptop.model_id == LaptopModel.id
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).filter(
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']),
-        Invoice.invoice_date.between(start_date, end_date)
-    ).group_by(Laptop.id, Brand.name, LaptopModel.name, Laptop.sku, Laptop.category).all()
-
-    # Productos top
-    from app.models.product import ProductCategory
-    top_products_gen = db.session.query(
-        Product.brand.label('brand_name'),
-        Product.name.label('model_name'),
-        Product.sku,
-        ProductCategory.name.label('category'),
-        func.sum(InvoiceItem.quantity).label('units_sold'),
-        func.sum(InvoiceItem.quantity * InvoiceItem.unit_price).label('revenue'),
-        func.sum(InvoiceItem.quantity * (InvoiceItem.unit_price - Product.purchase_cost)).label('total_profit'),
-        func.avg((InvoiceItem.unit_price - Product.purchase_cost) / InvoiceItem.unit_price * 100).label('margin')
-    ).join(
-        ProductCategory, Product.category_id == ProductCategory.id
-    ).join(
-        InvoiceItem, Product.id == InvoiceItem.product_id
-    ).join(
-        Invoice, InvoiceItem.invoice_id == Invoice.id
-    ).filter(
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending']),
-        Invoice.invoice_date.between(start_date, end_date)
-    ).group_by(Product.id, Product.brand, Product.name, Product.sku, ProductCategory.name).all()
+    # Laptops y productos top desde el rollup diario
+    top_laptops = SalesFactService.get_laptop_totals(start_date, end_date)
+    top_products_gen = SalesFactService.get_product_totals(start_date, end_date)
 
     # Combinar y procesar
     combined = []
@@ -910,7 +508,7 @@ def get_top_products(limit=10, period='month'):
     for item in top_products_gen:
         combined.append({
             'brand': item.brand_name or 'Genérico',
-            'model': item.model_name,
+            'model': item.name,
             'sku': item.sku,
             'category': item.category,
             'units_sold': int(item.units_sold or 0),
@@ -926,58 +524,20 @@ def get_top_products(limit=10, period='month'):
     }
 
 
+@result_cache.cached('dashboard.bcg', tags=('invoices', 'inventory'), scoped=True, vary=cache_day)
 def get_bcg_matrix_data(period='month'):
     """Genera datos para matriz BCG con crecimiento real (Laptops + Productos)"""
     start_date, end_date = get_date_range(period)
     prev_start, prev_end = get_previous_period(start_date, end_date)
 
-    # 1. Obtener rendimiento de Laptops (Incluyendo ID)
-    laptop_stats = db.session.query(
-        Laptop.id,
-        Laptop.display_name.label('name'),
-        Laptop.category.label('category'),
-        Brand.name.label('brand'),
-        func.sum(InvoiceItem.quantity).label('units_sold'),
-        func.sum(InvoiceItem.line_total).label('revenue'),
-        func.avg((InvoiceItem.unit_price - Laptop.purchase_cost) / InvoiceItem.unit_price * 100).label('margin')
-    ).join(InvoiceItem, Laptop.id == InvoiceItem.laptop_id).join(Invoice, InvoiceItem.invoice_id == Invoice.id).join(Brand, Laptop.brand_id == Brand.id).filter(
-        Invoice.invoice_date.between(start_date, end_date),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).group_by(Laptop.id, Laptop.display_name, Laptop.category, Brand.name).all()
-
-    # 2. Obtener rendimiento de Productos Genéricos (Incluyendo ID)
-    from app.models.product import ProductCategory
-    product_stats = db.session.query(
-        Product.id,
-        Product.name.label('name'),
-        ProductCategory.name.label('category'),
-        Product.brand.label('brand'),
-        func.sum(InvoiceItem.quantity).label('units_sold'),
-        func.sum(InvoiceItem.line_total).label('revenue'),
-        func.avg((InvoiceItem.unit_price - Product.purchase_cost) / InvoiceItem.unit_price * 100).label('margin')
-    ).join(InvoiceItem, Product.id == InvoiceItem.product_id).join(Invoice, InvoiceItem.invoice_id == Invoice.id).join(ProductCategory, Product.category_id == ProductCategory.id).filter(
-        Invoice.invoice_date.between(start_date, end_date),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).group_by(Product.id, Product.name, ProductCategory.name, Product.brand).all()
-
-    # 3. Obtener ventas anteriores para crecimiento
-    laptop_prev = db.session.query(
-        InvoiceItem.laptop_id.label('id'),
-        func.sum(InvoiceItem.line_total).label('revenue')
-    ).join(Invoice, InvoiceItem.invoice_id == Invoice.id).filter(
-        Invoice.invoice_date.between(prev_start, prev_end),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).group_by(InvoiceItem.laptop_id).all()
-    prev_laptop_map = {p.id: float(p.revenue or 0) for p in laptop_prev}
-
-    product_prev = db.session.query(
-        InvoiceItem.product_id.label('id'),
-        func.sum(InvoiceItem.line_total).label('revenue')
-    ).join(Invoice, InvoiceItem.invoice_id == Invoice.id).filter(
-        Invoice.invoice_date.between(prev_start, prev_end),
-        Invoice.status.in_(['issued', 'paid', 'completed', 'overdue', 'pending'])
-    ).group_by(InvoiceItem.product_id).all()
-    prev_product_map = {p.id: float(p.revenue or 0) for p in product_prev}
+    # 1. Rendimiento de Laptops (Incluyendo ID) desde el rollup diario
+    laptop_stats = SalesFactService.get_laptop_totals(start_date, end_date)
+
+    # 2. Rendimiento de Productos Genéricos (Incluyendo ID)
+    product_stats = SalesFactService.get_product_totals(start_date, end_date)
+
+    # 3. Ventas anteriores para crecimiento
+    prev_laptop_map, prev_product_map = SalesFactService.get_revenue_by_item(prev_start, prev_end)
 
     # 4. Combinar y calcular metricas
     all_items = []
@@ -1001,7 +561,7 @@ def get_bcg_matrix_data(period='month'):
         all_items.append({
             'name': l.name,
             'category': l.category,
-            'brand': l.brand,
+            'brand': l.brand_name,
             'units_sold': int(l.units_sold or 0),
             'sales': rev,
             'growth_rate': growth,
@@ -1020,7 +580,7 @@ def get_bcg_matrix_data(period='month'):
         all_items.append({
             'name': p.name,
             'category': p.category,
-            'brand': p.brand or 'Genérico',
+            'brand': p.brand_name or 'Genérico',
             'units_sold': int(p.units_sold or 0),
             'sales': rev,
             'growth_rate': growth,
@@ -1415,6 +975,17 @@ def sales_trends_api():
     return jsonify(sales_trends)
 
 
+@dashboard_bp.route('/api/cache-stats')
+@login_required
+@permission_required('dashboard.view')
+def cache_stats_api():
+    """API con contadores de aciertos/fallos de la caché de paneles"""
+    return jsonify({
+        'success': True,
+        'stats': result_cache.stats()
+    })
+
+
 @dashboard_bp.route('/api/generate-report')
 @login_required
 @permission_required('dashboard.view')
@@ -4,6 +4,7 @@ from flask_login import login_required, current_user
 from app.utils.decorators import permission_required, any_permission_required
 from app import db
 from app.models.expense import Expense, ExpenseCategory
+from app.services.export_service import ExportService
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, or_, extract, case, and_
 
@@ -505,46 +506,35 @@ def categories_stats():
 @login_required
 @permission_required('expenses.export')
 def expense_export():
-    """Exportar gastos a CSV"""
+    """Exportar gastos a CSV (o XLSX con ?format=xlsx) en streaming"""
     try:
-        # Obtener todos los gastos del usuario
-        expenses = Expense.query.filter_by(created_by=current_user.id).all()
+        # Gastos del usuario, leidos por lotes (la categoria viene en el mismo JOIN)
+        query = Expense.query.filter_by(created_by=current_user.id).order_by(Expense.due_date.desc(), Expense.id.desc())
 
-        # Crear output en memoria
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Escribir encabezados
-        writer.writerow([
+        header = [
             'ID', 'Descripción', 'Monto', 'Categoría', 'Fecha Vencimiento',
             'Pagado', 'Fecha Pago', 'Recurrente', 'Frecuencia', 'Notas'
-        ])
-
-        # Escribir datos
-        for expense in expenses:
-            writer.writerow([
-                expense.id,
-                expense.description,
-                float(expense.amount),
-                expense.category_ref.name if expense.category_ref else '',
-                expense.due_date.strftime('%Y-%m-%d') if expense.due_date else '',
-                'Sí' if expense.is_paid else 'No',
-                expense.paid_date.strftime('%Y-%m-%d') if expense.paid_date else '',
-                'Sí' if expense.is_recurring else 'No',
-                expense.frequency or '',
-                expense.notes or ''
-            ])
-
-        # Preparar respuesta
-        output.seek(0)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'gastos_export_{timestamp}.csv'
+        ]
+
+        def rows():
+            for expense in ExportService.iter_query(query):
+                yield [
+                    expense.id,
+                    expense.description,
+                    expense.amount,
+                    expense.category_ref.name if expense.category_ref else '',
+                    expense.due_date or '',
+                    'Sí' if expense.is_paid else 'No',
+                    expense.paid_date or '',
+                    'Sí' if expense.is_recurring else 'No',
+                    expense.frequency or '',
+                    expense.notes or ''
+                ]
 
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return ExportService.response(
+            header, rows(), f'gastos_export_{timestamp}',
+            export_format=request.args.get('format', 'csv'), title='Gastos'
         )
 
     except Exception as e:
@@ -17,6 +17,8 @@ from app.forms.laptop_forms import LaptopForm, FilterForm
 from app.services.sku_service import SKUService
 from app.services.catalog_service import CatalogService
 from app.services.serial_service import SerialService
+from app.services.inventory_service import InventoryService
+from app.services.search_service import SearchService
 from app.services.laptop_image_service import LaptopImageService
 from app.utils.task_manager import TaskManager
 from app.utils.decorators import admin_required, permission_required, any_permission_required
@@ -361,17 +363,9 @@ def laptops_list():
     # Query base
     query = Laptop.query
 
-    # Busqueda por texto
+    # Busqueda por texto (indexada; con el orden por defecto, primero los mas relevantes)
     if search_query:
-        search_pattern = f'%{search_query}%'
-        query = query.filter(
-            or_(
-                Laptop.sku.ilike(search_pattern),
-                Laptop.display_name.ilike(search_pattern),
-                Laptop.slug.ilike(search_pattern),
-                Laptop.short_description.ilike(search_pattern)
-            )
-        )
+        query = SearchService.apply(query, search_query, 'laptop', order=(sort_by == 'entry_date_desc'))
 
     # Aplicar filtros
     if store_filter and store_filter > 0:
@@ -465,43 +459,24 @@ def laptops_list():
     laptops = pagination.items
 
     # Calcular estadisticas GLOBALES (todas las laptops, no solo filtradas)
-    all_laptops = Laptop.query.all()
-
-    # VALOR TOTAL = suma del precio de venta * cantidad de TODAS las laptops
-    total_inventory_value = sum(
-        float(laptop.sale_price * laptop.quantity)
-        for laptop in all_laptops
-        if laptop.sale_price and laptop.quantity
-    )
-
-    # Contar laptops con stock bajo
-    low_stock_count = len([l for l in all_laptops if l.is_low_stock])
-
-    # Contar publicadas y destacadas
-    published_count = len([l for l in all_laptops if l.is_published])
-    featured_count = len([l for l in all_laptops if l.is_featured])
-    unpublished_count = len(all_laptops) - published_count
+    # en una sola consulta agregada (cacheada brevemente)
+    list_stats = InventoryService.get_laptop_list_stats()
 
     stats = {
-        'total': len(all_laptops),
-        'total_value': total_inventory_value,
-        'low_stock': low_stock_count,
-        'published': published_count,
-        'unpublished': unpublished_count,
-        'featured': featured_count
+        'total': list_stats['total'],
+        'total_value': list_stats['total_value'],
+        'low_stock': list_stats['low_stock'],
+        'published': list_stats['published'],
+        'unpublished': list_stats['unpublished'],
+        'featured': list_stats['featured']
     }
 
     # Formularios
     filter_form = FilterForm()
 
-    # Obtener rango de precios de la base de datos
-    price_range = db.session.query(
-        db.func.min(Laptop.sale_price),
-        db.func.max(Laptop.sale_price)
-    ).first()
-
-    min_db_price = float(price_range[0]) if price_range[0] else 0
-    max_db_price = float(price_range[1]) if price_range[1] else 10000
+    # Rango de precios de la base de datos (incluido en la misma consulta)
+    min_db_price = list_stats['min_price']
+    max_db_price = list_stats['max_price']
 
     return render_template(
         'inventory/laptops_list.html',
@@ -783,7 +758,7 @@ def laptop_detail(id):
     """
     Muestra el detalle completo de una laptop
     """
-    laptop = Laptop.query.get_or_404(id)
+    laptop = Laptop.query.options(Laptop.with_heavy_columns()).get_or_404(id)
 
     # Obtener laptops similares (misma categoria y marca)
     similar_laptops = Laptop.query.filter(
@@ -848,7 +823,7 @@ def laptop_edit(id):
     """
     Edita una laptop existente
     """
-    laptop = Laptop.query.get_or_404(id)
+    laptop = Laptop.query.options(Laptop.with_heavy_columns()).get_or_404(id)
     form = LaptopForm(obj=laptop)
     
     # ===== CORRECCIÃ“N: Convertir IDs a nombres para mostrar en el formulario =====
@@ -1077,6 +1052,8 @@ def laptop_edit(id):
             # Notas
             laptop.internal_notes = form.internal_notes.data
 
+            # Lo que el usuario cambió no lo pisa la re-sincronización con Icecat
+            laptop.record_user_modifications()
             laptop.updated_at = datetime.utcnow()
 
             # ===== PROCESAR SERIALES EN MODO EDICIÃ“N =====
@@ -1234,7 +1211,7 @@ def laptop_delete(id):
 @login_required
 @permission_required('inventory.laptops.create')
 def laptop_duplicate(id):
-    original = Laptop.query.get_or_404(id)
+    original = Laptop.query.options(Laptop.with_heavy_columns()).get_or_404(id)
 
     # Generar nuevo SKU
     new_sku = SKUService.generate_laptop_sku()
@@ -1336,16 +1313,9 @@ def serials_list():
     if status_filter:
         query = query.filter(LaptopSerial.status == status_filter)
 
-    # Búsqueda
+    # Búsqueda (serial, código de barras o laptop), ordenada por relevancia
     if search:
-        query = query.filter(
-            or_(
-                LaptopSerial.serial_number.ilike(f'%{search}%'),
-                LaptopSerial.barcode.ilike(f'%{search}%'),
-                Laptop.display_name.ilike(f'%{search}%'),
-                Laptop.sku.ilike(f'%{search}%')
-            )
-        )
+        query = SearchService.apply(query, search, 'serial', 'laptop')
 
     # Filtrar por marca
     if brand_filter:
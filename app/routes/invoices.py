@@ -5,7 +5,7 @@
 # Actualizado para manejar NCF con secuencias independientes por tipo
 # Segun regulaciones DGII Republica Dominicana
 
-from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, send_file
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.utils.decorators import permission_required, any_permission_required
@@ -18,12 +18,15 @@ from app.models.customer import Customer
 from app.models.laptop import Laptop
 from app.models.product import Product
 from app.services.invoice_inventory_service import InvoiceInventoryService
+from app.services.reservation_service import ReservationService
+from app.services.sales_fact_service import SalesFactService
+from app.services.search_service import SearchService
+from app.services.export_service import ExportService
 from datetime import datetime, date
 from decimal import Decimal
-import csv
-import io
 import json
 from sqlalchemy import or_, and_
+from sqlalchemy.orm import selectinload
 import os
 from werkzeug.utils import secure_filename
 from flask import current_app
@@ -64,16 +67,7 @@ def invoices_list():
 
     # Aplicar busqueda
     if search_query:
-        query = query.join(Customer).filter(
-            or_(
-                Invoice.invoice_number.ilike(f'%{search_query}%'),
-                Invoice.ncf.ilike(f'%{search_query}%'),
-                Customer.first_name.ilike(f'%{search_query}%'),
-                Customer.last_name.ilike(f'%{search_query}%'),
-                Customer.company_name.ilike(f'%{search_query}%'),
-                Customer.id_number.ilike(f'%{search_query}%')
-            )
-        )
+        query = SearchService.apply(query.join(Customer), search_query, 'invoice', 'customer')
 
     # Aplicar filtro de estado
     if status_filter:
@@ -110,24 +104,12 @@ def invoices_list():
     invoices = pagination.items
 
     # Calcular estadisticas (de toda la consulta filtrada, no solo de la pagina)
-    # Para estadisticas totales, necesitamos una query separada o usar la query base sin paginar
-    all_filtered_invoices = query.all()
-    total_invoices = len(all_filtered_invoices)
-    total_amount = sum(inv.total for inv in all_filtered_invoices)
-
-    # Contar por estado
-    status_counts = {
-        'draft': sum(1 for inv in all_filtered_invoices if inv.status == 'draft'),
-        'issued': sum(1 for inv in all_filtered_invoices if inv.status == 'issued'),
-        'paid': sum(1 for inv in all_filtered_invoices if inv.status == 'paid'),
-        'cancelled': sum(1 for inv in all_filtered_invoices if inv.status == 'cancelled'),
-        'overdue': sum(1 for inv in all_filtered_invoices if inv.is_overdue)
-    }
-
-    # Contar por tipo de NCF
-    ncf_type_counts = {}
-    for ncf_type in NCF_SALES_TYPES:
-        ncf_type_counts[ncf_type] = sum(1 for inv in all_filtered_invoices if inv.ncf_type == ncf_type)
+    # con una sola consulta agrupada en SQL
+    list_stats = Invoice.get_list_stats(query)
+    total_invoices = list_stats['total_invoices']
+    total_amount = list_stats['total_amount']
+    status_counts = list_stats['status_counts']
+    ncf_type_counts = list_stats['ncf_type_counts']
 
     # Obtener configuracion
     settings = InvoiceSettings.get_settings()
@@ -172,14 +154,14 @@ def invoice_new():
     # Obtener clientes activos
     customers = Customer.query.filter_by(is_active=True).order_by(Customer.first_name, Customer.company_name).all()
 
-    # Obtener laptops disponibles y convertir a diccionarios para JSON
+    # Obtener laptops disponibles (stock libre: quantity - reserved_quantity)
     laptops_query = Laptop.query.filter(
         Laptop.is_published == True,
-        Laptop.quantity > 0
+        Laptop.available_quantity > 0
     ).order_by(Laptop.display_name).all()
 
     # Serializar laptops a diccionarios con todas las relaciones
-    laptops = [laptop.to_dict(include_relationships=True) for laptop in laptops_query]
+    laptops = [laptop.to_dict(include_relationships=True, include_heavy=False) for laptop in laptops_query]
 
     # Obtener tipos de NCF disponibles para ventas
     ncf_types_list = get_ncf_types_for_sales()
@@ -382,6 +364,17 @@ def invoice_create():
             # ==========================================
             # FIN MODIFICACIÃƒâ€œN
             # ==========================================
+        elif status in ReservationService.RESERVING_STATUSES:
+            # Borrador/emitida: apartar el stock hasta que se pague o venza
+            try:
+                ReservationService.reserve_invoice(invoice, items_data, user_id=current_user.id)
+            except ValueError as e:
+                db.session.rollback()
+                flash(f'Error de stock: {str(e)}', 'error')
+                return redirect(url_for('invoices.invoice_new'))
+
+        # Actualizar rollup diario de ventas
+        SalesFactService.refresh_invoice(invoice)
 
         # Guardar configuraciÃƒÂ³n actualizada
         db.session.add(settings)
@@ -456,14 +449,15 @@ def invoice_edit(invoice_id):
     settings = InvoiceSettings.get_settings()
     customers = Customer.query.filter_by(is_active=True).order_by(Customer.first_name, Customer.company_name).all()
 
-    # Obtener laptops disponibles y convertir a diccionarios para JSON
+    # Obtener laptops disponibles (incluye las que esta factura ya tiene reservadas)
+    held = ReservationService.held_by(invoice.id)
     laptops_query = Laptop.query.filter(
         Laptop.is_published == True,
-        Laptop.quantity > 0
+        or_(Laptop.available_quantity > 0, Laptop.id.in_(list(held['quantity'])))
     ).order_by(Laptop.display_name).all()
 
     # Serializar laptops a diccionarios con todas las relaciones
-    laptops = [laptop.to_dict(include_relationships=True) for laptop in laptops_query]
+    laptops = [laptop.to_dict(include_relationships=True, include_heavy=False) for laptop in laptops_query]
 
     # Obtener tipos de NCF disponibles para ventas
     ncf_types_list = get_ncf_types_for_sales()
@@ -530,12 +524,15 @@ def invoice_update(invoice_id):
 
         # Si se esta cambiando a 'paid', validar stock
         if new_status == 'paid':
-            is_valid, error_msg = InvoiceInventoryService.validate_stock_for_invoice_items(items_data)
+            is_valid, error_msg = InvoiceInventoryService.validate_stock_for_invoice_items(
+                items_data, invoice_id=invoice.id
+            )
             if not is_valid:
                 flash(f'Error de stock: {error_msg}', 'error')
                 return redirect(url_for('invoices.invoice_edit', invoice_id=invoice.id))
 
         # Actualizar datos basicos (NO se permite cambiar NCF ni tipo de NCF)
+        old_invoice_date = invoice.invoice_date
         invoice.invoice_date = datetime.strptime(request.form.get('invoice_date'), '%Y-%m-%d').date()
         due_date = request.form.get('due_date')
         invoice.due_date = datetime.strptime(due_date, '%Y-%m-%d').date() if due_date else None
@@ -547,6 +544,9 @@ def invoice_update(invoice_id):
         old_status = invoice.status
         invoice.status = new_status
 
+        # Liberar la reserva anterior (se vuelve a reservar con los items nuevos)
+        ReservationService.release_invoice(invoice.id, user_id=current_user.id)
+
         # Eliminar items anteriores
         InvoiceItem.query.filter_by(invoice_id=invoice.id).delete()
         db.session.flush()
@@ -602,6 +602,17 @@ def invoice_update(invoice_id):
                     flash(f'Error al actualizar inventario: {error_msg}', 'error')
                     return redirect(url_for('invoices.invoice_edit', invoice_id=invoice.id))
 
+        if new_status in ReservationService.RESERVING_STATUSES:
+            try:
+                ReservationService.reserve_invoice(invoice, items_data, user_id=current_user.id)
+            except ValueError as e:
+                db.session.rollback()
+                flash(f'Error de stock: {str(e)}', 'error')
+                return redirect(url_for('invoices.invoice_edit', invoice_id=invoice.id))
+
+        # Actualizar rollup diario de ventas (incluye el dia anterior si cambio la fecha)
+        SalesFactService.refresh_invoice(invoice, old_invoice_date)
+
         db.session.commit()
         flash('Factura actualizada exitosamente', 'success')
         return redirect(url_for('invoices.invoice_detail', invoice_id=invoice.id))
@@ -671,6 +682,24 @@ def invoice_change_status(invoice_id):
                     flash(f'Error al actualizar inventario: {error_msg}', 'error')
                     return redirect(url_for('invoices.invoice_detail', invoice_id=invoice.id))
 
+            # Cancelada: devolver el stock que tenía apartado
+            elif new_status not in ReservationService.RESERVING_STATUSES:
+                ReservationService.release_invoice(invoice.id, user_id=current_user.id)
+
+            # Vuelve a un estado abierto (ej: pagada -> emitida): apartar de nuevo su stock
+            if (old_status not in ReservationService.RESERVING_STATUSES
+                    and new_status in ReservationService.RESERVING_STATUSES):
+                try:
+                    ReservationService.reserve_invoice(invoice, user_id=current_user.id)
+                except ValueError as e:
+                    db.session.rollback()
+                    flash(f'Error de stock: {str(e)}', 'error')
+                    return redirect(url_for('invoices.invoice_detail', invoice_id=invoice.id))
+
+        # Actualizar rollup diario de ventas
+        if old_status != new_status:
+            SalesFactService.refresh_invoice(invoice)
+
         db.session.commit()
         flash(f'Estado actualizado a {new_status}', 'success')
 
@@ -716,7 +745,13 @@ def invoice_delete(invoice_id):
             return redirect(url_for('invoices.invoice_detail', invoice_id=invoice.id))
 
     try:
+        invoice_date = invoice.invoice_date
+        ReservationService.release_invoice(invoice.id, user_id=current_user.id)
         db.session.delete(invoice)
+
+        # Actualizar rollup diario de ventas
+        SalesFactService.refresh_dates([invoice_date])
+
         db.session.commit()
         flash('Factura eliminada exitosamente', 'success')
         return redirect(url_for('invoices.invoices_list'))
@@ -735,7 +770,7 @@ def invoice_delete(invoice_id):
 @permission_required('invoices.export')
 def export_csv():
     """
-    Exportar facturas a CSV
+    Exportar facturas a CSV (o XLSX con ?format=xlsx) en streaming
 
     URL: /invoices/export/csv
     """
@@ -749,15 +784,7 @@ def export_csv():
     query = Invoice.query
 
     if search_query:
-        query = query.join(Customer).filter(
-            or_(
-                Invoice.invoice_number.ilike(f'%{search_query}%'),
-                Invoice.ncf.ilike(f'%{search_query}%'),
-                Customer.first_name.ilike(f'%{search_query}%'),
-                Customer.last_name.ilike(f'%{search_query}%'),
-                Customer.company_name.ilike(f'%{search_query}%')
-            )
-        )
+        query = SearchService.apply(query.join(Customer), search_query, 'invoice', 'customer', order=False)
 
     if status_filter:
         query = query.filter(Invoice.status == status_filter)
@@ -779,41 +806,34 @@ def export_csv():
         except ValueError:
             pass
 
-    invoices = query.order_by(Invoice.invoice_date.desc()).all()
-
-    # Crear CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
+    query = query.options(selectinload(Invoice.customer)).order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
 
     # Encabezados (incluye tipo de NCF)
-    writer.writerow([
+    header = [
         'NÃƒÆ’Ã‚Âºmero', 'NCF', 'Tipo NCF', 'Fecha', 'Cliente', 'RNC/CÃƒÆ’Ã‚Â©dula',
         'Subtotal', 'ITBIS', 'Total', 'Estado', 'MÃƒÆ’Ã‚Â©todo de Pago'
-    ])
-
-    # Datos
-    for inv in invoices:
-        writer.writerow([
-            inv.invoice_number,
-            inv.ncf,
-            inv.ncf_type,
-            inv.invoice_date.strftime('%Y-%m-%d'),
-            inv.customer.full_name,
-            inv.customer.id_number,
-            f"{float(inv.subtotal):.2f}",
-            f"{float(inv.tax_amount):.2f}",
-            f"{float(inv.total):.2f}",
-            inv.status,
-            inv.payment_method
-        ])
-
-    # Preparar respuesta
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'facturas_{date.today()}.csv'
+    ]
+
+    def rows():
+        # Lectura por lotes con los clientes cargados una vez por lote
+        for inv in ExportService.iter_query(query):
+            yield [
+                inv.invoice_number,
+                inv.ncf,
+                inv.ncf_type,
+                inv.invoice_date,
+                inv.customer.full_name,
+                inv.customer.id_number,
+                inv.subtotal,
+                inv.tax_amount,
+                inv.total,
+                inv.status,
+                inv.payment_method
+            ]
+
+    return ExportService.response(
+        header, rows(), f'facturas_{date.today()}',
+        export_format=request.args.get('format', 'csv'), title='Facturas'
     )
 
 
@@ -1106,16 +1126,8 @@ def api_search_customers():
     if len(query) < 2:
         return jsonify([])
 
-    customers = Customer.query.filter(
-        and_(
-            Customer.is_active == True,
-            or_(
-                Customer.first_name.ilike(f'%{query}%'),
-                Customer.last_name.ilike(f'%{query}%'),
-                Customer.company_name.ilike(f'%{query}%'),
-                Customer.id_number.ilike(f'%{query}%')
-            )
-        )
+    customers = SearchService.apply(
+        Customer.query.filter(Customer.is_active == True), query, 'customer'
     ).limit(10).all()
 
     # Incluir informaciÃƒÆ’Ã‚Â³n para sugerir tipo de NCF
@@ -1154,15 +1166,8 @@ def api_search_laptops():
     if len(query) < 2:
         return jsonify([])
 
-    laptops = Laptop.query.filter(
-        and_(
-            Laptop.is_published == True,
-            Laptop.quantity > 0,
-            or_(
-                Laptop.display_name.ilike(f'%{query}%'),
-                Laptop.sku.ilike(f'%{query}%')
-            )
-        )
+    laptops = SearchService.apply(
+        Laptop.query.filter(Laptop.is_published == True, Laptop.available_quantity > 0), query, 'laptop'
     ).limit(10).all()
 
     return jsonify([{
@@ -1171,7 +1176,7 @@ def api_search_laptops():
         'sku': l.sku,
         'price': float(l.sale_price),
         'description': l.short_description,
-        'quantity': l.quantity
+        'quantity': l.available_quantity
     } for l in laptops])
 
 
@@ -1344,13 +1349,7 @@ def api_search_all_products():
     search = f"%{query}%"
     
     # Buscar en Laptops
-    laptops = Laptop.query.filter(
-        Laptop.quantity > 0,
-        or_(
-            Laptop.display_name.ilike(search),
-            Laptop.sku.ilike(search),
-        )
-    ).limit(10).all()
+    laptops = SearchService.apply(Laptop.query.filter(Laptop.available_quantity > 0), query, 'laptop').limit(10).all()
     
     for l in laptops:
         results.append({
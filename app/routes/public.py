@@ -12,6 +12,8 @@ from app import db
 from app.models.laptop import Laptop, Brand, LaptopImage, Processor, GraphicsCard, Screen, Storage, Ram, \
     OperatingSystem, LaptopModel
 from app.models.product import Product, ProductCategory
+from app.services.public_catalog_service import PublicCatalogService, CatalogQueryError
+from app.services.catalog_facet_service import CatalogFacetService
 from datetime import datetime, timedelta
 
 # ============================================
@@ -117,91 +119,20 @@ def catalog():
         Laptop.created_at.desc()
     ).all()
 
-    # Obtener datos únicos para filtros desde la base de datos
-    # Marcas
-    brands = Brand.query.filter_by(is_active=True).order_by(Brand.name).all()
+    # Opciones de filtros, rango de precios y stats desde el índice de facetas
+    facets = CatalogFacetService.get_facets()
+    facet_lists = facets['facets']
 
-    # Procesadores únicos de productos publicados
-    processor_subquery = db.session.query(Laptop.processor_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.processor_id.isnot(None)
-    ).distinct().subquery()
-    processors = Processor.query.join(
-        processor_subquery, Processor.id == processor_subquery.c.processor_id
-    ).order_by(Processor.name).all()
-
-    # GPUs únicas
-    gpu_subquery = db.session.query(Laptop.graphics_card_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.graphics_card_id.isnot(None)
-    ).distinct().subquery()
-    gpus = GraphicsCard.query.join(
-        gpu_subquery, GraphicsCard.id == gpu_subquery.c.graphics_card_id
-    ).order_by(GraphicsCard.name).all()
-
-    # Pantallas únicas
-    screen_subquery = db.session.query(Laptop.screen_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.screen_id.isnot(None)
-    ).distinct().subquery()
-    screens = Screen.query.join(
-        screen_subquery, Screen.id == screen_subquery.c.screen_id
-    ).order_by(Screen.name).all()
-
-    # RAMs únicas
-    ram_subquery = db.session.query(Laptop.ram_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.ram_id.isnot(None)
-    ).distinct().subquery()
-    rams = Ram.query.join(
-        ram_subquery, Ram.id == ram_subquery.c.ram_id
-    ).order_by(Ram.name).all()
-
-    # Almacenamientos únicos
-    storage_subquery = db.session.query(Laptop.storage_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.storage_id.isnot(None)
-    ).distinct().subquery()
-    storages = Storage.query.join(
-        storage_subquery, Storage.id == storage_subquery.c.storage_id
-    ).order_by(Storage.name).all()
-
-    # Modelos únicos de productos publicados
-    model_subquery = db.session.query(Laptop.model_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.model_id.isnot(None)
-    ).distinct().subquery()
-    models = LaptopModel.query.join(
-        model_subquery, LaptopModel.id == model_subquery.c.model_id
-    ).order_by(LaptopModel.name).all()
+    brands = facet_lists['brand']
+    processors = facet_lists['processor']
+    gpus = facet_lists['gpu']
+    screens = facet_lists['screen']
+    rams = facet_lists['ram']
+    storages = facet_lists['storage']
+    models = facet_lists['model']
 
-    # Calcular rango de precios real de productos
-    price_range = db.session.query(
-        db.func.min(
-            case(
-                (Laptop.discount_price != None, Laptop.discount_price),
-                else_=Laptop.sale_price
-            )
-        ),
-        db.func.max(
-            case(
-                (Laptop.discount_price != None, Laptop.discount_price),
-                else_=Laptop.sale_price
-            )
-        )
-    ).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0
-    ).first()
-
-    min_price_available = float(price_range[0]) if price_range[0] else 500
-    max_price_available = float(price_range[1]) if price_range[1] else 8000
+    min_price_available = facets['price']['min']
+    max_price_available = facets['price']['max']
 
     # Categorías predefinidas para el filtro
     categories = [
@@ -212,31 +143,12 @@ def catalog():
 
     # Condiciones disponibles - IMPORTANTE: debe coincidir con lo que usa el template
     conditions = ['new', 'used', 'refurbished']
-    
+
     # Stats para filter cards
-    stats = {
-        'total': len(laptops),
-        'new': Laptop.query.filter(
-            Laptop.is_published == True,
-            Laptop.quantity > 0,
-            Laptop.created_at >= datetime.now() - timedelta(days=30)
-        ).count(),
-        'featured': Laptop.query.filter(Laptop.is_published==True, Laptop.is_featured==True, Laptop.quantity > 0).count(),
-        'on_sale': Laptop.query.filter(
-            Laptop.is_published == True,
-            Laptop.quantity > 0,
-            Laptop.discount_price != None,
-            Laptop.discount_price < Laptop.sale_price
-        ).count(),
-    }
-    
+    stats = facets['stats']
+
     # Count by top brands
-    brand_counts = {}
-    for brand in brands[:4]:  # Top 4 brands
-        brand_counts[brand.id] = Laptop.query.filter_by(
-            is_published=True,
-            brand_id=brand.id
-        ).filter(Laptop.quantity > 0).count()
+    brand_counts = {brand['id']: brand['count'] for brand in brands[:4]}
 
     # Pasar los datos con nombres exactos que espera el template
     return render_template(
@@ -486,98 +398,61 @@ def api_laptops():
     return jsonify(laptops_data)
 
 
-@public_bp.route('/api/filters')
-def api_filters():
-    """API para obtener opciones de filtros"""
-    # Obtener solo valores que existen en productos publicados
-    brand_subquery = db.session.query(Laptop.brand_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0
-    ).distinct().subquery()
-
-    brands = Brand.query.join(
-        brand_subquery, Brand.id == brand_subquery.c.brand_id
-    ).filter(Brand.is_active == True).order_by(Brand.name).all()
-
-    processor_subquery = db.session.query(Laptop.processor_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.processor_id.isnot(None)
-    ).distinct().subquery()
-
-    processors = Processor.query.join(
-        processor_subquery, Processor.id == processor_subquery.c.processor_id
-    ).order_by(Processor.name).all()
-
-    gpu_subquery = db.session.query(Laptop.graphics_card_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.graphics_card_id.isnot(None)
-    ).distinct().subquery()
-
-    gpus = GraphicsCard.query.join(
-        gpu_subquery, GraphicsCard.id == gpu_subquery.c.graphics_card_id
-    ).order_by(GraphicsCard.name).all()
-
-    screen_subquery = db.session.query(Laptop.screen_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.screen_id.isnot(None)
-    ).distinct().subquery()
+@public_bp.route('/api/v2/laptops')
+def api_laptops_v2():
+    """
+    API v2 del catálogo: filtros en servidor, paginación keyset y campos a elección
 
-    screens = Screen.query.join(
-        screen_subquery, Screen.id == screen_subquery.c.screen_id
-    ).order_by(Screen.name).all()
+    URL: /api/v2/laptops?brand=1,2&ram=3&min_price=30000&condition=new
+                        &fields=id,name,price,image&limit=24&cursor=<next_cursor>
+    """
+    try:
+        page = PublicCatalogService.get_page(request.args)
+    except CatalogQueryError as e:
+        return jsonify({'error': str(e)}), 400
 
-    ram_subquery = db.session.query(Laptop.ram_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.ram_id.isnot(None)
-    ).distinct().subquery()
+    return jsonify(page)
 
-    rams = Ram.query.join(
-        ram_subquery, Ram.id == ram_subquery.c.ram_id
-    ).order_by(Ram.name).all()
 
-    storage_subquery = db.session.query(Laptop.storage_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.storage_id.isnot(None)
-    ).distinct().subquery()
+@public_bp.route('/api/filters')
+def api_filters():
+    """
+    API para obtener opciones de filtros con conteos
 
-    storages = Storage.query.join(
-        storage_subquery, Storage.id == storage_subquery.c.storage_id
-    ).order_by(Storage.name).all()
+    Acepta los mismos filtros que /api/v2/laptops; el conteo de cada opción
+    considera los demás filtros aplicados. Se responde desde el índice de
+    facetas (sin consultas por petición mientras el índice esté vigente).
+    """
+    facets = CatalogFacetService.get_facets(request.args)
+    facet_lists = facets['facets']
 
-    # NUEVO: obtener modelos únicos de productos publicados
-    model_subquery = db.session.query(Laptop.model_id).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0,
-        Laptop.model_id.isnot(None)
-    ).distinct().subquery()
+    def _options(facet):
+        return [{'id': item['id'], 'name': item['name'], 'count': item['count']} for item in facet_lists[facet]]
 
-    models = LaptopModel.query.join(
-        model_subquery, LaptopModel.id == model_subquery.c.model_id
-    ).order_by(LaptopModel.name).all()
+    def _static_options(facet, options):
+        counts = {item['id']: item['count'] for item in facet_lists[facet]}
+        return [dict(option, count=counts.get(option['id'], 0)) for option in options]
 
     filters_data = {
-        'brands': [{'id': b.id, 'name': b.name} for b in brands],
-        'processors': [{'id': p.id, 'name': p.name} for p in processors],
-        'gpus': [{'id': g.id, 'name': g.name} for g in gpus],
-        'screens': [{'id': s.id, 'name': s.name} for s in screens],
-        'rams': [{'id': r.id, 'name': r.name} for r in rams],
-        'storages': [{'id': s.id, 'name': s.name} for s in storages],
-        'models': [{'id': m.id, 'name': m.name} for m in models],  # NUEVO: agregar modelos a filtros
-        'categories': [
+        'brands': _options('brand'),
+        'processors': _options('processor'),
+        'gpus': _options('gpu'),
+        'screens': _options('screen'),
+        'rams': _options('ram'),
+        'storages': _options('storage'),
+        'models': _options('model'),
+        'categories': _static_options('category', [
             {'id': 'laptop', 'name': 'Laptop'},
             {'id': 'gaming', 'name': 'Gaming'},
             {'id': 'workstation', 'name': 'Workstation'}
-        ],
-        'conditions': [
+        ]),
+        'conditions': _static_options('condition', [
             {'id': 'new', 'name': 'Nuevo'},
             {'id': 'used', 'name': 'Usado'},
             {'id': 'refurbished', 'name': 'Reacondicionado'}
-        ]
+        ]),
+        'price': facets['price'],
+        'count': facets['total']
     }
 
     return jsonify(filters_data)
@@ -662,32 +537,8 @@ def api_search():
 
 @public_bp.route('/api/price-range')
 def api_price_range():
-    """API para obtener el rango de precios de productos"""
-    price_range = db.session.query(
-        db.func.min(
-            case(
-                (Laptop.discount_price != None, Laptop.discount_price),
-                else_=Laptop.sale_price
-            )
-        ),
-        db.func.max(
-            case(
-                (Laptop.discount_price != None, Laptop.discount_price),
-                else_=Laptop.sale_price
-            )
-        )
-    ).filter(
-        Laptop.is_published == True,
-        Laptop.quantity > 0
-    ).first()
-
-    min_price = float(price_range[0]) if price_range[0] else 500
-    max_price = float(price_range[1]) if price_range[1] else 8000
-
-    return jsonify({
-        'min': min_price,
-        'max': max_price
-    })
+    """API para obtener el rango de precios de productos (desde el índice de facetas)"""
+    return jsonify(CatalogFacetService.price_range(CatalogFacetService.get_index()))
 
 
 # ============================================
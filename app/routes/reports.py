@@ -11,7 +11,9 @@ from app.models.laptop import Laptop, Brand
 from app.models.expense import Expense, ExpenseCategory
 from app.models.serial import LaptopSerial, SerialMovement
 from app.models.user import User
-from app.utils.decorators import permission_required
+from app.models.sales_fact import DailySalesFact
+from app.utils.decorators import permission_required, cache_response
+from app.services.sales_fact_service import SalesFactService
 from sqlalchemy import func, desc, and_, or_, extract, text
 from datetime import datetime, date, timedelta
 from decimal import Decimal
@@ -124,6 +126,7 @@ def sales_summary():
 @reports_bp.route('/api/sales/summary')
 @login_required
 @permission_required('reports.sales.view')
+@cache_response(timeout=300, tags=('invoices',))
 def api_sales_summary():
     """
     API: Datos para resumen de ventas
@@ -134,66 +137,42 @@ def api_sales_summary():
         status = request.args.get('status', 'paid')
         payment_method = request.args.get('payment_method', '')
         
-        # Query base
-        query = Invoice.query.filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date <= end_date
-        )
-        
-        if status:
-            query = query.filter(Invoice.status == status)
-        
-        if payment_method:
-            query = query.filter(Invoice.payment_method == payment_method)
-        
-        invoices = query.all()
-        
+        # Totales desde las filas de cabecera del rollup diario
+        query = SalesFactService.invoice_totals_query(start_date, end_date, status, payment_method)
+
+        totals = query.with_entities(
+            func.sum(DailySalesFact.subtotal),
+            func.sum(DailySalesFact.invoice_count)
+        ).one()
+
         # Calcular metricas
-        total_sales = sum(float(inv.subtotal) for inv in invoices)
-        total_invoices = len(invoices)
+        total_sales = float(totals[0] or 0)
+        total_invoices = int(totals[1] or 0)
         avg_ticket = total_sales / total_invoices if total_invoices > 0 else 0
-        
+
         # Ventas por dia para grafico
-        daily_sales_query = db.session.query(
-            Invoice.invoice_date,
-            func.sum(Invoice.subtotal).label('total'),
-            func.count(Invoice.id).label('count')
-        ).filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date <= end_date
-        )
-        
-        if status:
-            daily_sales_query = daily_sales_query.filter(Invoice.status == status)
-        if payment_method:
-            daily_sales_query = daily_sales_query.filter(Invoice.payment_method == payment_method)
-            
-        daily_sales = daily_sales_query.group_by(Invoice.invoice_date).order_by(Invoice.invoice_date).all()
-        
+        daily_sales = query.with_entities(
+            DailySalesFact.fact_date,
+            func.sum(DailySalesFact.subtotal).label('total'),
+            func.sum(DailySalesFact.invoice_count).label('count')
+        ).group_by(DailySalesFact.fact_date).order_by(DailySalesFact.fact_date).all()
+
         chart_data = {
             'labels': [d[0].strftime('%d/%m') for d in daily_sales],
             'sales': [float(d[1]) for d in daily_sales],
-            'count': [d[2] for d in daily_sales]
+            'count': [int(d[2]) for d in daily_sales]
         }
-        
+
         # Comparacion con periodo anterior
         period_days = (end_date - start_date).days
         prev_start = start_date - timedelta(days=period_days + 1)
         prev_end = start_date - timedelta(days=1)
-        
-        prev_query = Invoice.query.filter(
-            Invoice.invoice_date >= prev_start,
-            Invoice.invoice_date <= prev_end
-        )
-        
-        if status:
-            prev_query = prev_query.filter(Invoice.status == status)
-        if payment_method:
-            prev_query = prev_query.filter(Invoice.payment_method == payment_method)
-            
-        prev_invoices = prev_query.all()
-        
-        prev_total = sum(float(inv.subtotal) for inv in prev_invoices)
+
+        prev_total = SalesFactService.invoice_totals_query(
+            prev_start, prev_end, status, payment_method
+        ).with_entities(func.sum(DailySalesFact.subtotal)).scalar()
+
+        prev_total = float(prev_total or 0)
         growth = ((total_sales - prev_total) / prev_total * 100) if prev_total > 0 else (100 if total_sales > 0 else 0)
         
         return jsonify({
@@ -236,6 +215,7 @@ def sales_by_product():
 @reports_bp.route('/api/sales/by-product')
 @login_required
 @permission_required('reports.sales.view')
+@cache_response(timeout=300, tags=('invoices',))
 def api_sales_by_product():
     """
     API: Ventas por producto
@@ -244,19 +224,11 @@ def api_sales_by_product():
         start_date = datetime.strptime(request.args.get('start_date'), '%Y-%m-%d').date()
         end_date = datetime.strptime(request.args.get('end_date'), '%Y-%m-%d').date()
         
-        # Ventas por producto
-        product_sales = db.session.query(
-            Laptop.display_name,
-            Laptop.sku,
-            func.sum(InvoiceItem.quantity).label('units_sold'),
-            func.sum(InvoiceItem.line_total).label('revenue')
-        ).join(InvoiceItem).join(Invoice).filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date <= end_date,
-            Invoice.status == 'paid'
-        ).group_by(Laptop.id, Laptop.display_name, Laptop.sku).order_by(
-            desc('revenue')
-        ).limit(20).all()
+        # Ventas por producto desde el rollup diario
+        product_sales = [
+            (r.name, r.sku, int(r.units_sold or 0), r.revenue)
+            for r in SalesFactService.get_laptop_totals(start_date, end_date, statuses=['paid'], limit=20)
+        ]
         
         products = []
         labels = []
@@ -354,24 +326,22 @@ def sales_by_payment_method():
 @reports_bp.route('/api/sales/by-payment-method')
 @login_required
 @permission_required('reports.sales.view')
+@cache_response(timeout=300, tags=('invoices',))
 def api_sales_by_payment_method():
     """API: Ventas por Metodo de Pago"""
     try:
         start_date = datetime.strptime(request.args.get('start_date'), '%Y-%m-%d').date()
         end_date = datetime.strptime(request.args.get('end_date'), '%Y-%m-%d').date()
         
-        results = db.session.query(
-            Invoice.payment_method,
-            func.count(Invoice.id),
-            func.sum(Invoice.total)
-        ).filter(
-            Invoice.invoice_date.between(start_date, end_date),
-            Invoice.status == 'paid'
-        ).group_by(Invoice.payment_method).all()
+        results = SalesFactService.invoice_totals_query(start_date, end_date, status='paid').with_entities(
+            DailySalesFact.payment_method,
+            func.sum(DailySalesFact.invoice_count),
+            func.sum(DailySalesFact.total)
+        ).group_by(DailySalesFact.payment_method).all()
         
         labels = [r[0].replace('_', ' ').title() if r[0] else 'N/A' for r in results]
         values = [float(r[2]) for r in results]
-        counts = [r[1] for r in results]
+        counts = [int(r[1]) for r in results]
         
         return jsonify({
             'success': True, 
@@ -427,22 +397,27 @@ def sales_trends():
 @reports_bp.route('/api/sales/trends')
 @login_required
 @permission_required('reports.sales.view')
+@cache_response(timeout=300, tags=('invoices',))
 def api_sales_trends():
     try:
         # Ultimos 12 meses
         today = date.today()
         start_date = today - timedelta(days=365)
         
+        year = extract('year', DailySalesFact.fact_date)
+        month = extract('month', DailySalesFact.fact_date)
         results = db.session.query(
-            func.to_char(Invoice.invoice_date, 'YYYY-MM').label('month'),
-            func.sum(Invoice.subtotal)
+            year,
+            month,
+            func.sum(DailySalesFact.subtotal)
         ).filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.status.in_(['issued', 'paid', 'completed'])
-        ).group_by(func.to_char(Invoice.invoice_date, 'YYYY-MM')).order_by(func.to_char(Invoice.invoice_date, 'YYYY-MM')).all()
+            DailySalesFact.invoice_rows(),
+            DailySalesFact.fact_date >= start_date,
+            DailySalesFact.status.in_(['issued', 'paid', 'completed'])
+        ).group_by(year, month).order_by(year, month).all()
         
-        labels = [r[0] for r in results]
-        values = [float(r[1]) for r in results]
+        labels = [f"{int(r[0]):04d}-{int(r[1]):02d}" for r in results]
+        values = [float(r[2]) for r in results]
         
         return jsonify({
             'success': True,
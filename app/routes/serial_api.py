@@ -430,6 +430,9 @@ def create_serials_batch():
         warranty_start: Inicio garantÃƒÂ­a comÃƒÂºn (opcional)
         warranty_end: Fin garantÃƒÂ­a comÃƒÂºn (opcional)
         warranty_provider: Proveedor de garantÃƒÂ­a comÃƒÂºn (opcional)
+
+    Respuesta: created/errors por serial ({'serial', 'error'}) y la
+    cantidad de la laptop ya sincronizada con sus seriales.
     """
     data = request.get_json()
 
@@ -480,7 +483,8 @@ def create_serials_batch():
         'error_count': result['error_count'],
         'total': result['total'],
         'created': [s.to_dict() for s in result['created']],
-        'errors': result['errors']
+        'errors': result['errors'],
+        'laptop_quantity': result['sync']['new_quantity'] if result.get('sync') else None
     })
 
 
@@ -17,6 +17,7 @@ SEGURO PARA RE-EJECUTAR: No duplica permisos ni roles existentes.
 from app import db
 from app.models.permission import Permission
 from app.models.role import Role
+from app.services.role_service import RoleService
 
 # ============================================
 # 1. DEFINICIÓN DE PERMISOS GRANULARES
@@ -652,6 +653,7 @@ def seed():
         print(f'     -> {len(permissions)} permisos asignados')
 
     db.session.commit()
+    RoleService.bump_permissions_version()
 
     # -- Paso 3: Resumen final --
     print('\n' + '=' * 60)
@@ -3,6 +3,9 @@ from app.services.sku_service import SKUService
 from app.services.financial_service import FinancialService
 from app.services.inventory_service import InventoryService
 from app.services.ai_service import AIService
+from app.services.sales_trend_service import SalesTrendService
+from app.services.sales_fact_service import SalesFactService
+from app.services.search_service import SearchService
 
 # RBAC Services
 from app.services.permission_service import PermissionService
@@ -15,6 +18,9 @@ __all__ = [
     'FinancialService',
     'InventoryService',
     'AIService',
+    'SalesTrendService',
+    'SalesFactService',
+    'SearchService',
     # RBAC
     'PermissionService',
     'RoleService',
@@ -3,12 +3,18 @@
 # SERVICIO DE AUDITORÍA
 # ============================================
 # Lógica de negocio para sistema de auditoría
+#
+# Los eventos se escriben por lotes en segundo plano (app.utils.audit_writer):
+# log_action() solo arma la fila y la encola.
 
 from app import db
+from app.extensions import audit_writer
 from app.models.audit_log import AuditLog
 from flask import request
 from flask_login import current_user
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 
 
 class AuditService:
@@ -38,7 +44,7 @@ class AuditService:
             user_id (int, optional): ID del usuario (default: current_user)
         
         Returns:
-            AuditLog: Log creado
+            dict: Evento encolado (se escribe en el siguiente lote)
         
         Ejemplo:
             AuditService.log_action(
@@ -61,19 +67,24 @@ class AuditService:
             ip_address = request.remote_addr
             user_agent = request.headers.get('User-Agent')
         
-        # Crear log
-        return AuditLog.log(
-            user_id=user_id,
-            action=action,
-            module=module,
-            target_type=target_type,
-            target_id=target_id,
-            details=details,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            status=status,
-            error_message=error_message
-        )
+        # Encolar el evento (la fecha es la de la acción, no la de escritura)
+        event = {
+            'user_id': user_id,
+            'action': action,
+            'module': module,
+            'target_type': target_type,
+            'target_id': target_id,
+            'old_value': None,
+            'new_value': None,
+            'details': details,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'status': status,
+            'error_message': error_message,
+            'created_at': datetime.utcnow()
+        }
+        audit_writer.enqueue(event)
+        return event
     
     @staticmethod
     def log_login(user_id, success=True, error_message=None):
@@ -240,15 +251,17 @@ class AuditService:
         return AuditLog.get_failed_actions(limit)
     
     @staticmethod
-    def get_logs_by_date_range(start_date, end_date, module=None, user_id=None):
+    def get_logs_by_date_range(start_date, end_date, module=None, user_id=None, limit=100, cursor=None):
         """
-        Obtiene logs en un rango de fechas
+        Obtiene logs en un rango de fechas (paginado por cursor)
         
         Args:
             start_date (datetime): Fecha inicial
             end_date (datetime): Fecha final
             module (str, optional): Filtrar por módulo
             user_id (int, optional): Filtrar por usuario
+            limit (int): Tamaño de página
+            cursor (str, optional): Cursor de la página anterior (ver search_logs)
         
         Returns:
             list: Lista de logs
@@ -259,24 +272,19 @@ class AuditService:
             end = datetime.now()
             logs = AuditService.get_logs_by_date_range(start, end, module='inventory')
         """
-        query = AuditLog.query.filter(
-            AuditLog.created_at >= start_date,
-            AuditLog.created_at <= end_date
+        return AuditService.search_logs(
+            user_id=user_id, module=module, start_date=start_date, end_date=end_date,
+            limit=limit, cursor=cursor
         )
-        
-        if module:
-            query = query.filter_by(module=module)
-        
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        
-        return query.order_by(AuditLog.created_at.desc()).all()
     
     @staticmethod
     def get_activity_summary(days=7):
         """
         Obtiene resumen de actividad de los últimos N días
         
+        Se agrupa en SQL; los nombres de usuario vienen del JOIN, sin cargar
+        logs ni usuarios uno por uno.
+        
         Args:
             days (int): Número de días a analizar
         
@@ -294,62 +302,92 @@ class AuditService:
             #     'by_user': {...}
             # }
         """
+        from app.models.user import User
+        
         start_date = datetime.utcnow() - timedelta(days=days)
+        in_period = AuditLog.created_at >= start_date
+        
+        # Por estado
+        by_status = dict(
+            db.session.query(AuditLog.status, func.count(AuditLog.id))
+            .filter(in_period)
+            .group_by(AuditLog.status)
+            .all()
+        )
+        
+        # Por módulo
+        by_module = dict(
+            db.session.query(AuditLog.module, func.count(AuditLog.id))
+            .filter(in_period)
+            .group_by(AuditLog.module)
+            .all()
+        )
         
-        logs = AuditLog.query.filter(
-            AuditLog.created_at >= start_date
-        ).all()
-        
-        # Calcular estadísticas
-        total = len(logs)
-        successful = sum(1 for log in logs if log.status == 'success')
-        failed = sum(1 for log in logs if log.status == 'failed')
-        denied = sum(1 for log in logs if log.status == 'denied')
-        
-        # Agrupar por módulo
-        by_module = {}
-        for log in logs:
-            if log.module not in by_module:
-                by_module[log.module] = 0
-            by_module[log.module] += 1
-        
-        # Agrupar por usuario
-        by_user = {}
-        for log in logs:
-            if log.user_id:
-                if log.user_id not in by_user:
-                    by_user[log.user_id] = {
-                        'username': log.user.username if log.user else 'Unknown',
-                        'count': 0
-                    }
-                by_user[log.user_id]['count'] += 1
+        # Por usuario (nombre por JOIN)
+        user_rows = db.session.query(
+            AuditLog.user_id, User.username, func.count(AuditLog.id)
+        ).outerjoin(
+            User, User.id == AuditLog.user_id
+        ).filter(
+            in_period,
+            AuditLog.user_id.isnot(None)
+        ).group_by(AuditLog.user_id, User.username).all()
+        
+        by_user = {
+            user_id: {'username': username or 'Unknown', 'count': count}
+            for user_id, username, count in user_rows
+        }
         
         return {
-            'total_actions': total,
-            'successful': successful,
-            'failed': failed,
-            'denied': denied,
+            'total_actions': sum(by_status.values()),
+            'successful': by_status.get('success', 0),
+            'failed': by_status.get('failed', 0),
+            'denied': by_status.get('denied', 0),
             'by_module': by_module,
             'by_user': by_user,
             'period_days': days
         }
     
+    # ===== BÚSQUEDA PAGINADA (KEYSET) =====
+    # Las páginas se recorren por (created_at, id) descendente: cada página
+    # continúa después del último log de la anterior, sin OFFSET, así el costo
+    # no crece con la profundidad de la página ni con el tamaño de la tabla.
+    
+    @staticmethod
+    def encode_cursor(log):
+        """Cursor de la siguiente página a partir del último log mostrado"""
+        return f'{log.created_at.isoformat()}_{log.id}'
+    
     @staticmethod
-    def search_logs(query=None, user_id=None, module=None, action=None, limit=100):
+    def decode_cursor(cursor):
+        """'2026-01-31T10:00:00_123' -> (datetime, 123). None si es inválido"""
+        try:
+            created_at, log_id = cursor.rsplit('_', 1)
+            return datetime.fromisoformat(created_at), int(log_id)
+        except (AttributeError, ValueError):
+            return None
+    
+    @staticmethod
+    def search_logs(query=None, user_id=None, module=None, action=None, limit=100,
+                    status=None, start_date=None, end_date=None, cursor=None):
         """
-        Busca en los logs con filtros avanzados
+        Busca en los logs con filtros avanzados (paginado por cursor)
         
         Args:
             query (str, optional): Texto a buscar en acción, módulo o tipo
             user_id (int, optional): Filtrar por usuario
             module (str, optional): Filtrar por módulo
             action (str, optional): Filtrar por acción específica
-            limit (int): Límite de resultados
-            
+            limit (int): Tamaño de página
+            status (str, optional): 'success', 'failed' o 'denied'
+            start_date (datetime, optional): Desde
+            end_date (datetime, optional): Hasta
+            cursor (str, optional): encode_cursor() del último log de la página anterior
+        
         Returns:
-            list: Lista de logs
+            list: Lista de logs (con el usuario ya cargado)
         """
-        q = AuditLog.query
+        q = AuditLog.query.options(selectinload(AuditLog.user))
         
         if user_id:
             q = q.filter_by(user_id=user_id)
@@ -357,7 +395,13 @@ class AuditService:
             q = q.filter_by(module=module)
         if action:
             q = q.filter_by(action=action)
-            
+        if status:
+            q = q.filter_by(status=status)
+        if start_date:
+            q = q.filter(AuditLog.created_at >= start_date)
+        if end_date:
+            q = q.filter(AuditLog.created_at <= end_date)
+        
         if query:
             search = f"%{query}%"
             q = q.filter(
@@ -367,8 +411,18 @@ class AuditService:
                     AuditLog.target_type.ilike(search)
                 )
             )
-            
-        return q.order_by(AuditLog.created_at.desc()).limit(limit).all()
+        
+        position = AuditService.decode_cursor(cursor) if cursor else None
+        if position:
+            created_at, log_id = position
+            q = q.filter(
+                db.or_(
+                    AuditLog.created_at < created_at,
+                    db.and_(AuditLog.created_at == created_at, AuditLog.id < log_id)
+                )
+            )
+        
+        return q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit).all()
     
     @staticmethod
     def export_logs_to_dict(logs):
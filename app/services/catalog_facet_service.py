@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# CATALOG FACET SERVICE - Índice de Facetas del Catálogo
+# ============================================
+# Responsabilidad: precalcular los valores disponibles de cada filtro del
+# catálogo público (marca, CPU, GPU, RAM, etc.) y contarlos, incluyendo
+# conteos condicionados a los filtros aplicados.
+#
+# El índice es una lista compacta de tuplas (una por laptop publicada con
+# stock) más las etiquetas de cada valor. Se construye con una consulta de
+# columnas (sin objetos ORM), se guarda en la caché de resultados bajo la
+# etiqueta 'inventory' y se reconstruye cuando se crea, edita, publica o
+# vende una laptop (cualquier commit que toque la tabla laptops).
+
+from datetime import datetime, timedelta
+
+from app import db
+from app.extensions import result_cache
+from app.models.laptop import (
+    Laptop, Brand, LaptopModel, Processor, GraphicsCard, Ram, Storage, Screen
+)
+from app.services.public_catalog_service import PublicCatalogService
+
+
+class CatalogFacetService:
+    """Servicio de facetas (filtros con conteos) del catálogo público"""
+
+    # Orden de las columnas de faceta dentro de cada fila del índice
+    FACETS = ('brand', 'model', 'processor', 'gpu', 'ram', 'storage', 'screen', 'condition', 'category')
+
+    # Facetas por ID de catálogo: faceta -> (columna en Laptop, modelo, columnas de etiqueta)
+    CATALOG_FACETS = {
+        'brand': (Laptop.brand_id, Brand, ('name',)),
+        'model': (Laptop.model_id, LaptopModel, ('name',)),
+        'processor': (Laptop.processor_id, Processor, ('name', 'full_name')),
+        'gpu': (Laptop.graphics_card_id, GraphicsCard, ('name', 'discrete_full_name', 'onboard_full_name')),
+        'ram': (Laptop.ram_id, Ram, ('name', 'full_name')),
+        'storage': (Laptop.storage_id, Storage, ('name', 'full_name')),
+        'screen': (Laptop.screen_id, Screen, ('name', 'full_name')),
+    }
+
+    # Facetas por valor directo
+    VALUE_FACETS = {
+        'condition': Laptop.condition,
+        'category': Laptop.category,
+    }
+
+    # El índice vive hasta que una escritura de laptops lo invalida
+    INDEX_TTL = 3600
+
+    # ===== CONSTRUCCIÓN DEL ÍNDICE =====
+
+    @staticmethod
+    def build_index():
+        """
+        Construye el índice de facetas desde la base de datos
+
+        Returns:
+            dict: {'rows': [(valores de FACETS..., precio, created_at, destacado, en_oferta)],
+                   'labels': {faceta: {valor: {...}}}, 'built_at'}
+        """
+        facet_columns = [
+            CatalogFacetService.CATALOG_FACETS[f][0] if f in CatalogFacetService.CATALOG_FACETS
+            else CatalogFacetService.VALUE_FACETS[f]
+            for f in CatalogFacetService.FACETS
+        ]
+
+        # Mismo precio efectivo que filtra /api/v2/laptops
+        price = PublicCatalogService.effective_price()
+
+        rows = db.session.query(
+            *facet_columns,
+            price,
+            Laptop.created_at,
+            Laptop.is_featured,
+            price < Laptop.sale_price
+        ).filter(
+            Laptop.is_published == True,
+            Laptop.quantity > 0
+        ).all()
+
+        index_rows = [
+            tuple(row[:len(CatalogFacetService.FACETS)]) + (
+                float(row[-4] or 0), row[-3], bool(row[-2]), bool(row[-1])
+            )
+            for row in rows
+        ]
+
+        # Etiquetas solo para los valores presentes
+        labels = {}
+        for position, facet in enumerate(CatalogFacetService.FACETS):
+            present = {row[position] for row in index_rows if row[position] is not None}
+
+            if facet in CatalogFacetService.CATALOG_FACETS:
+                _column, model, label_columns = CatalogFacetService.CATALOG_FACETS[facet]
+                catalog_filter = [model.id.in_(present)]
+                if facet == 'brand':
+                    catalog_filter.append(Brand.is_active == True)
+
+                labels[facet] = {
+                    item.id: {column: getattr(item, column) for column in label_columns}
+                    for item in model.query.filter(*catalog_filter).all()
+                } if present else {}
+            else:
+                labels[facet] = {value: {'name': value} for value in present}
+
+        return {
+            'rows': index_rows,
+            'labels': labels,
+            'built_at': datetime.utcnow().isoformat()
+        }
+
+    @staticmethod
+    def get_index():
+        """Índice de facetas (desde la caché; se reconstruye si fue invalidado)"""
+        return result_cache.get_or_set(
+            'catalog.facet_index', (),
+            CatalogFacetService.build_index,
+            tags=('inventory',),
+            ttl=CatalogFacetService.INDEX_TTL
+        )
+
+    # ===== FILTROS APLICADOS =====
+
+    @staticmethod
+    def parse_selection(args):
+        """
+        Lee los filtros aplicados desde los parámetros de la URL
+        (mismos nombres que /api/v2/laptops: brand=1,2&condition=new...)
+
+        Returns:
+            tuple: ({faceta: set(valores)}, precio_min, precio_max)
+        """
+        selection = {}
+        for facet in CatalogFacetService.FACETS:
+            raw = args.get(facet) if args else None
+            if not raw:
+                continue
+
+            values = [v.strip() for v in raw.split(',') if v.strip()]
+            if facet in CatalogFacetService.CATALOG_FACETS:
+                values = [int(v) for v in values if v.isdigit()]
+            if values:
+                selection[facet] = set(values)
+
+        def _price(name):
+            try:
+                return float(args.get(name)) if args and args.get(name) else None
+            except ValueError:
+                return None
+
+        return selection, _price('min_price'), _price('max_price')
+
+    # ===== CONTEOS =====
+
+    @staticmethod
+    def count(index, selection=None, min_price=None, max_price=None):
+        """
+        Cuenta por valor de cada faceta (conteo disyuntivo)
+
+        Para cada faceta, el conteo de un valor es la cantidad de laptops que
+        cumplen todos los OTROS filtros aplicados y tienen ese valor; así el
+        usuario ve cuántos resultados obtendría al marcar una opción más.
+
+        Returns:
+            tuple: (total que cumple todos los filtros, {faceta: {valor: conteo}})
+        """
+        selection = selection or {}
+        facets = CatalogFacetService.FACETS
+        price_position = len(facets)
+        counts = {facet: {} for facet in facets}
+        total = 0
+
+        for row in index['rows']:
+            price = row[price_position]
+            if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                continue
+
+            failed = [
+                position for position, facet in enumerate(facets)
+                if facet in selection and row[position] not in selection[facet]
+            ]
+            if len(failed) > 1:
+                continue
+
+            if not failed:
+                total += 1
+                for position, facet in enumerate(facets):
+                    value = row[position]
+                    counts[facet][value] = counts[facet].get(value, 0) + 1
+            else:
+                # Solo falla su propia faceta: cuenta para esa faceta
+                position = failed[0]
+                facet_counts = counts[facets[position]]
+                facet_counts[row[position]] = facet_counts.get(row[position], 0) + 1
+
+        return total, counts
+
+    @staticmethod
+    def get_facets(args=None):
+        """
+        Facetas del catálogo con conteos según los filtros aplicados
+
+        Args:
+            args: request.args opcional (brand, model, processor, gpu, ram,
+                  storage, screen, condition, category, min_price, max_price)
+
+        Returns:
+            dict: {'total', 'facets': {faceta: [{'id', 'name', ..., 'count'}]},
+                   'price': {'min', 'max'}, 'stats': {...}, 'built_at'}
+        """
+        index = CatalogFacetService.get_index()
+        selection, min_price, max_price = CatalogFacetService.parse_selection(args)
+        total, counts = CatalogFacetService.count(index, selection, min_price, max_price)
+
+        facets = {}
+        for facet in CatalogFacetService.FACETS:
+            items = [
+                dict(label, id=value, count=counts[facet].get(value, 0))
+                for value, label in index['labels'][facet].items()
+            ]
+            facets[facet] = sorted(items, key=lambda item: (item.get('name') or '').lower())
+
+        return {
+            'total': total,
+            'facets': facets,
+            'price': CatalogFacetService.price_range(index),
+            'stats': CatalogFacetService.stats(index),
+            'built_at': index['built_at']
+        }
+
+    @staticmethod
+    def price_range(index):
+        """Rango de precio efectivo de todo el catálogo publicado"""
+        prices = [row[len(CatalogFacetService.FACETS)] for row in index['rows']]
+        return {
+            'min': min(prices) if prices else 500,
+            'max': max(prices) if prices else 8000
+        }
+
+    @staticmethod
+    def stats(index):
+        """Totales para las tarjetas del catálogo (total, nuevos, destacados, en oferta)"""
+        base = len(CatalogFacetService.FACETS)
+        new_since = datetime.now() - timedelta(days=30)
+        rows = index['rows']
+
+        return {
+            'total': len(rows),
+            'new': sum(1 for row in rows if row[base + 1] and row[base + 1] >= new_since),
+            'featured': sum(1 for row in rows if row[base + 2]),
+            'on_sale': sum(1 for row in rows if row[base + 3]),
+        }
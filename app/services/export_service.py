@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# EXPORT SERVICE - Exportaciones CSV/XLSX en Streaming
+# ============================================
+# Responsabilidad: generar archivos de exportación sin cargar todo el
+# resultado en memoria.
+#
+# - Las filas se leen con Query.yield_per() (cursor del lado del servidor en
+#   PostgreSQL) y las relaciones se cargan por lote con selectinload
+# - CSV: se envía en bloques a medida que se generan las filas
+# - XLSX: openpyxl en modo write-only (las filas van a un archivo
+#   temporal) y luego el archivo se envía en bloques
+
+import csv
+import io
+import os
+import tempfile
+
+from flask import Response, stream_with_context
+
+
+class ExportService:
+    """Servicio de exportación de listados en streaming"""
+
+    # Filas por lote leídas de la base de datos
+    BATCH_SIZE = 500
+
+    # Filas acumuladas antes de enviar un bloque CSV
+    CSV_FLUSH_ROWS = 200
+
+    # Tamaño de los bloques al enviar el XLSX
+    CHUNK_SIZE = 64 * 1024
+
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+    # ===== LECTURA =====
+
+    @staticmethod
+    def iter_query(query, batch_size=None):
+        """
+        Itera una consulta ORM por lotes (memoria constante)
+
+        Las opciones selectinload() de la consulta se resuelven una vez por
+        lote, no por fila.
+        """
+        return query.yield_per(batch_size or ExportService.BATCH_SIZE)
+
+    # ===== FORMATOS =====
+
+    @staticmethod
+    def csv_chunks(header, rows):
+        """Genera el CSV en bloques de bytes UTF-8"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+
+        for index, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if index % ExportService.CSV_FLUSH_ROWS == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def xlsx_chunks(header, rows, title='Datos'):
+        """Genera el XLSX (openpyxl write-only) y lo envía en bloques"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=title[:31])
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        try:
+            workbook.save(path)
+            with open(path, 'rb') as xlsx_file:
+                while True:
+                    chunk = xlsx_file.read(ExportService.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+    # ===== RESPUESTA =====
+
+    @staticmethod
+    def normalize_format(value):
+        """'XLSX' -> 'xlsx'; formatos desconocidos -> 'csv'"""
+        value = (value or '').strip().lower()
+        return value if value in ExportService.FORMATS else 'csv'
+
+    @staticmethod
+    def response(header, rows, filename, export_format='csv', title='Datos'):
+        """
+        Respuesta HTTP en streaming con el archivo exportado
+
+        Args:
+            header: Lista de encabezados
+            rows: Iterable (idealmente generador) de filas
+            filename: Nombre del archivo sin extensión
+            export_format: 'csv' o 'xlsx'
+            title: Nombre de la hoja (XLSX)
+
+        Returns:
+            Response: Respuesta con el archivo como adjunto
+        """
+        export_format = ExportService.normalize_format(export_format)
+        if export_format == 'xlsx':
+            chunks = ExportService.xlsx_chunks(header, rows, title)
+        else:
+            chunks = ExportService.csv_chunks(header, rows)
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype=ExportService.FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+        )
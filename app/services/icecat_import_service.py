@@ -0,0 +1,780 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# ICECAT IMPORT SERVICE - Importación Masiva por GTIN
+# ============================================
+# Responsabilidad: dar de alta un embarque de proveedor (lista o CSV de
+# GTIN + costo/precio/cantidad) sin pasar unidad por unidad por el
+# formulario de laptops.
+#
+# Flujo de run_job():
+#   1. Las filas pendientes se leen por lotes en orden de id (índice
+#      idx_icecat_item_job_status).
+#   2. Los GTIN únicos del lote se consultan en un pool de hilos
+#      (ICECAT_IMPORT_WORKERS) con IcecatService.fetch_by_gtin: caché en
+#      disco, sesión HTTP compartida y como máximo ICECAT_MAX_CONCURRENCY
+#      peticiones simultáneas a Icecat. Cada hilo también normaliza.
+#      Mientras se escribe un lote ya se está consultando el siguiente.
+#   3. Catálogos, SKUs y slugs se resuelven para todo el lote y las laptops
+#      se insertan en una transacción por lote. Si el lote falla, se
+#      reintenta fila por fila para aislar la que da error.
+#   4. El progreso queda en IcecatJob (endpoint /api/icecat/import/<id>).
+#      Si el proceso se reinicia, resume_interrupted() retoma las filas
+#      pendientes.
+
+import csv
+import io
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import insert, or_, select, update
+
+from app import db
+from app.models.icecat_job import IcecatJob, IcecatJobItem
+from app.models.laptop import Laptop, Store
+from app.services.catalog_service import CatalogService
+from app.services.icecat_service import IcecatService
+from app.services.sku_service import SKUService
+
+logger = logging.getLogger(__name__)
+
+
+class IcecatImportService:
+    """Importación masiva de laptops desde Icecat por GTIN"""
+
+    # Encabezados aceptados en el CSV
+    COLUMN_ALIASES = {
+        'gtin': ('gtin', 'ean', 'upc', 'ean/upc', 'codigo'),
+        'purchase_cost': ('purchase_cost', 'cost', 'costo'),
+        'sale_price': ('sale_price', 'price', 'precio'),
+        'quantity': ('quantity', 'qty', 'cantidad'),
+    }
+
+    GTIN_PATTERN = re.compile(r'^\d{8,14}$')
+
+    # Trabajos 'running' sin latido en este tiempo se consideran interrumpidos
+    STALE_AFTER = timedelta(minutes=5)
+
+    # Lotes recientes que se guardan en batch_timings
+    TIMINGS_KEPT = 50
+
+    # Estados de fila que cuentan como correctos en el progreso
+    SUCCESS_STATUSES = ('created', 'synced', 'unchanged')
+
+    # Catálogos obligatorios de una laptop (columna -> texto para el error)
+    REQUIRED_CATALOGS = {
+        'brand_id': 'marca',
+        'model_id': 'modelo',
+        'processor_id': 'procesador',
+        'os_id': 'sistema operativo',
+        'screen_id': 'pantalla',
+        'graphics_card_id': 'tarjeta gráfica',
+        'storage_id': 'almacenamiento',
+        'ram_id': 'memoria RAM',
+    }
+
+    # Campo de la laptop -> rutas del producto normalizado de donde sale
+    # (laptop_fields). normalized_specs es el producto mismo: siempre viene
+    LAPTOP_FIELD_SOURCES = {
+        'display_name': ('nombre_visualizacion', 'nombre_comercial'),
+        'short_description': ('descripcion_corta',),
+        'keywords': ('palabras_clave',),
+        'icecat_id': ('icecat_id',),
+        'icecat_product_id': ('icecat_id',),
+        'ram_upgradeable': ('memoria_ram.ampliable',),
+        'storage_upgradeable': ('almacenamiento.ampliable',),
+        'touchscreen_override': ('pantalla.tactil',),
+        'connectivity_ports': ('conectividad.puertos',),
+        'wifi_standard': ('conectividad.wifi',),
+        'cellular': ('conectividad.celular',),
+        'keyboard_backlight': ('entrada.retroiluminacion',),
+        'numeric_keypad': ('entrada.teclado_numerico',),
+        'keyboard_layout': ('entrada.disposicion_teclado',),
+        'pointing_device': ('entrada.dispositivo_apuntador',),
+        'keyboard_backlight_color': ('entrada.color_retroiluminacion',),
+        'keyboard_backlight_zone': ('entrada.zona_retroiluminacion',),
+        'keyboard_language': ('entrada.idioma_teclado',),
+        'fingerprint_reader': ('entrada.lector_huellas',),
+        'face_recognition': ('entrada.reconocimiento_facial',),
+        'weight_lbs': ('fisico.peso_lbs',),
+        'full_specs_json': ('raw_specs',),
+    }
+
+    # ===== ENTRADA =====
+
+    @staticmethod
+    def _parse_money(value):
+        if value in (None, ''):
+            return None
+        text = str(value).replace('RD$', '').replace('US$', '').replace('$', '').replace(',', '').strip()
+        amount = Decimal(text)
+        if amount < 0:
+            raise InvalidOperation
+        return amount
+
+    @staticmethod
+    def parse_rows(source):
+        """
+        Normaliza la entrada de una importación
+
+        Args:
+            source: Texto CSV (con encabezado) o lista de dicts / GTINs sueltos
+
+        Returns:
+            list: [{'line', 'gtin', 'purchase_cost', 'sale_price', 'quantity', 'error'}]
+        """
+        if isinstance(source, (bytes, str)):
+            text = source.decode('utf-8-sig') if isinstance(source, bytes) else source.lstrip('\ufeff')
+            try:
+                dialect = csv.Sniffer().sniff(text[:2048], delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+            aliases = {
+                alias: field for field, names in IcecatImportService.COLUMN_ALIASES.items() for alias in names
+            }
+            raw_rows = [
+                {aliases.get((key or '').strip().lower(), key): value for key, value in row.items()}
+                for row in reader
+            ]
+            first_line = 2  # la línea 1 es el encabezado
+        else:
+            raw_rows = [row if isinstance(row, dict) else {'gtin': row} for row in source or []]
+            first_line = 1
+
+        rows = []
+        for offset, raw in enumerate(raw_rows):
+            gtin = re.sub(r'[\s-]', '', str(raw.get('gtin') or ''))
+            row = {'line': first_line + offset, 'gtin': gtin, 'purchase_cost': None, 'sale_price': None,
+                   'quantity': 1, 'error': None}
+            try:
+                row['purchase_cost'] = IcecatImportService._parse_money(raw.get('purchase_cost'))
+                row['sale_price'] = IcecatImportService._parse_money(raw.get('sale_price'))
+                quantity = raw.get('quantity')
+                row['quantity'] = 1 if quantity in (None, '') else int(quantity)
+            except (InvalidOperation, TypeError, ValueError):
+                row['error'] = 'Costo, precio o cantidad inválidos'
+
+            if not IcecatImportService.GTIN_PATTERN.match(gtin):
+                row['error'] = f'GTIN inválido: {gtin or "(vacío)"}'
+            elif row['quantity'] < 1:
+                row['error'] = 'La cantidad debe ser mayor que cero'
+            rows.append(row)
+        return rows
+
+    # ===== TRABAJOS =====
+
+    @staticmethod
+    def create_job(rows, options=None, user_id=None):
+        """
+        Registra el trabajo y sus filas (commit)
+
+        Args:
+            rows: Resultado de parse_rows
+            options: {'store_id', 'condition', 'is_published', 'download_images'}
+
+        Returns:
+            IcecatJob
+        """
+        job = IcecatJob(kind='import', status='pending', options=options or {}, total=len(rows),
+                        created_by_id=user_id, batch_timings=[])
+        db.session.add(job)
+        db.session.flush()
+
+        invalid = [row for row in rows if row['error']]
+        if rows:
+            db.session.execute(insert(IcecatJobItem), [
+                {
+                    'job_id': job.id,
+                    'line_number': row['line'],
+                    'gtin': row['gtin'][:20] or None,
+                    'purchase_cost': row['purchase_cost'],
+                    'sale_price': row['sale_price'],
+                    'quantity': row['quantity'] if row['quantity'] and row['quantity'] > 0 else 1,
+                    'status': 'invalid' if row['error'] else 'pending',
+                    'error': row['error'],
+                }
+                for row in rows
+            ])
+        job.processed = job.failed = len(invalid)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def start(job_id):
+        """Ejecuta el trabajo en segundo plano. Retorna el id de la tarea"""
+        from app.utils.task_manager import TaskManager
+
+        app = current_app._get_current_object()
+        return TaskManager.run_async(IcecatImportService._run_in_app, app, job_id)
+
+    @staticmethod
+    def _run_in_app(app, job_id):
+        with app.app_context():
+            IcecatImportService.run_job(job_id)
+            db.session.remove()
+
+    @staticmethod
+    def interrupted_jobs(kind):
+        """IDs de trabajos pendientes o 'running' sin latido reciente (proceso reiniciado)"""
+        cutoff = datetime.utcnow() - IcecatImportService.STALE_AFTER
+        return db.session.execute(
+            select(IcecatJob.id).where(
+                IcecatJob.kind == kind,
+                or_(
+                    IcecatJob.status == 'pending',
+                    (IcecatJob.status == 'running') & or_(
+                        IcecatJob.heartbeat_at.is_(None), IcecatJob.heartbeat_at < cutoff
+                    )
+                )
+            ).order_by(IcecatJob.id)
+        ).scalars().all()
+
+    @staticmethod
+    def resume_interrupted(start=True):
+        """
+        Retoma trabajos de importación que quedaron a medias (reinicio del proceso)
+
+        Returns:
+            list: IDs de los trabajos retomados
+        """
+        job_ids = IcecatImportService.interrupted_jobs('import')
+        if start:
+            for job_id in job_ids:
+                IcecatImportService.start(job_id)
+        return job_ids
+
+    @staticmethod
+    def cancel(job_id):
+        """Marca el trabajo como cancelado; se detiene al terminar el lote en curso"""
+        job = db.session.get(IcecatJob, job_id)
+        if job and job.status in ('pending', 'running'):
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return job
+
+    # ===== EJECUCIÓN =====
+
+    @staticmethod
+    def _pending_batch(job_id, after_id, size):
+        """Siguiente lote de filas pendientes (tuplas: sobreviven al commit sin recargas)"""
+        return db.session.execute(
+            select(
+                IcecatJobItem.id, IcecatJobItem.line_number, IcecatJobItem.gtin,
+                IcecatJobItem.purchase_cost, IcecatJobItem.sale_price, IcecatJobItem.quantity
+            ).where(
+                IcecatJobItem.job_id == job_id,
+                IcecatJobItem.status == 'pending',
+                IcecatJobItem.id > after_id
+            ).order_by(IcecatJobItem.id).limit(size)
+        ).all()
+
+    @staticmethod
+    def run_job(job_id):
+        """
+        Procesa las filas pendientes de un trabajo (en el hilo actual)
+
+        Returns:
+            IcecatJob
+        """
+        batch_size = current_app.config.get('ICECAT_IMPORT_BATCH_SIZE', 25)
+        job = db.session.get(IcecatJob, job_id)
+        if job is None:
+            return None
+
+        options = dict(job.options or {})
+        options.setdefault('user_id', job.created_by_id)
+        catalog_memo = {}
+
+        return IcecatImportService.run_batches(
+            job_id,
+            lambda last: IcecatImportService._pending_batch(job_id, last.id if last else 0, batch_size),
+            lambda batch, products: IcecatImportService._write_batch(batch, products, options, catalog_memo)
+        )
+
+    @staticmethod
+    def run_batches(job_id, next_batch, write_batch, fetch_options=None, cursor_of=None):
+        """
+        Bucle común de los trabajos de Icecat (importación y re-sincronización)
+
+        Lee lotes en orden (keyset), consulta los GTIN de cada lote en un pool de
+        hilos (ICECAT_IMPORT_WORKERS) mientras se escribe el lote anterior y
+        registra el progreso después de cada lote.
+
+        Args:
+            next_batch: f(última fila del lote anterior o None) -> filas con .id
+                        y .gtin ([] al terminar)
+            write_batch: f(batch, {gtin: resultado}) -> [{'id', 'status', ...}]
+            fetch_options: Argumentos extra para IcecatService.fetch_by_gtin
+            cursor_of: f(última fila) -> valor JSON que se guarda en
+                       options['cursor'] después de cada lote (None: no se guarda)
+
+        Returns:
+            IcecatJob
+        """
+        workers = current_app.config.get('ICECAT_IMPORT_WORKERS', 8)
+
+        job = db.session.get(IcecatJob, job_id)
+        if job is None or job.status in ('completed', 'cancelled'):
+            return job
+
+        job.status = 'running'
+        job.started_at = job.started_at or datetime.utcnow()
+        job.heartbeat_at = datetime.utcnow()
+        kind = job.kind
+        db.session.commit()
+
+        credentials = IcecatService.get_credentials()
+        app = current_app._get_current_object()
+
+        def fetch(gtin):
+            with app.app_context():
+                return IcecatService.fetch_by_gtin(gtin, credentials=credentials, **(fetch_options or {}))
+
+        def submit(pool, rows):
+            started = time.perf_counter()
+            futures = {gtin: pool.submit(fetch, gtin) for gtin in dict.fromkeys(row.gtin for row in rows)}
+            return started, futures
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'icecat_{kind}') as pool:
+                batch = next_batch(None)
+                pending_fetch = submit(pool, batch)
+                number = 0
+
+                while batch:
+                    # Consultar el lote siguiente mientras se escribe este
+                    next_rows = next_batch(batch[-1])
+                    next_fetch = submit(pool, next_rows) if next_rows else None
+
+                    started, futures = pending_fetch
+                    products = {gtin: future.result() for gtin, future in futures.items()}
+                    fetch_ms = (time.perf_counter() - started) * 1000
+
+                    write_started = time.perf_counter()
+                    results = write_batch(batch, products)
+                    write_ms = (time.perf_counter() - write_started) * 1000
+
+                    number += 1
+                    cursor = cursor_of(batch[-1]) if cursor_of else None
+                    if not IcecatImportService._record_progress(job_id, number, results, fetch_ms, write_ms, cursor):
+                        logger.info(f"⏹️ Trabajo Icecat {job_id} cancelado")
+                        break
+                    batch, pending_fetch = next_rows, next_fetch
+
+            job = db.session.get(IcecatJob, job_id)
+            if job.status == 'running':
+                job.status = 'completed'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            logger.info(f"✅ Trabajo Icecat {job_id} ({kind}): {job.succeeded} correctas, {job.failed} con error")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Trabajo Icecat {job_id} ({kind}) fallido: {e}", exc_info=True)
+            job = db.session.get(IcecatJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)[:2000]
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return job
+
+    @staticmethod
+    def _record_progress(job_id, number, results, fetch_ms, write_ms, cursor=None):
+        """
+        Suma el resultado del lote al trabajo (commit)
+
+        Returns:
+            bool: False si el trabajo fue cancelado mientras tanto
+        """
+        job = db.session.get(IcecatJob, job_id, populate_existing=True)
+        succeeded = sum(1 for result in results if result['status'] in IcecatImportService.SUCCESS_STATUSES)
+        job.processed += len(results)
+        job.succeeded += succeeded
+        job.failed += len(results) - succeeded
+        job.heartbeat_at = datetime.utcnow()
+        timings = list(job.batch_timings or [])
+        timings.append({'batch': number, 'rows': len(results), 'fetch_ms': round(fetch_ms, 1),
+                        'write_ms': round(write_ms, 1)})
+        job.batch_timings = timings[-IcecatImportService.TIMINGS_KEPT:]
+        if cursor is not None:
+            job.options = {**(job.options or {}), 'cursor': cursor}
+        db.session.commit()
+        return job.status == 'running'
+
+    @staticmethod
+    def _write_batch(batch, products, options, catalog_memo):
+        """
+        Crea las laptops de un lote en una transacción (commit)
+
+        Returns:
+            list: [{'id', 'status', 'laptop_id', 'error'}] por fila
+        """
+        try:
+            results, created = IcecatImportService._build_laptops(batch, products, options, catalog_memo)
+            IcecatImportService._save_results(results)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            catalog_memo.clear()
+            if len(batch) == 1:
+                logger.warning(f"Importación Icecat: fila {batch[0].line_number} con error: {e}")
+                results = [{'id': batch[0].id, 'status': 'error', 'laptop_id': None, 'error': str(e)[:500]}]
+                IcecatImportService._save_results(results)
+                db.session.commit()
+                return results
+
+            # Aislar la fila problemática
+            results = []
+            for row in batch:
+                results.extend(IcecatImportService._write_batch([row], products, options, catalog_memo))
+            return results
+
+        if options.get('download_images', True):
+            IcecatImportService._queue_images(created)
+        return results
+
+    @staticmethod
+    def _save_results(results):
+        """UPDATE por lotes del estado de cada fila"""
+        now = datetime.utcnow()
+        db.session.execute(update(IcecatJobItem), [
+            {'id': r['id'], 'status': r['status'], 'laptop_id': r['laptop_id'], 'error': r['error'],
+             'processed_at': now}
+            for r in results
+        ])
+
+    @staticmethod
+    def failure_status(result):
+        """'not_found' si Icecat no tiene el GTIN, 'error' si la consulta falló"""
+        return 'not_found' if result.get('not_found') else 'error'
+
+    @staticmethod
+    def _build_laptops(batch, products, options, catalog_memo):
+        """Resuelve catálogos/SKUs/slugs del lote e inserta las laptops (sin commit)"""
+        results, ready = [], []
+        for row in batch:
+            result = products.get(row.gtin) or {}
+            if result.get('success'):
+                ready.append((row, result['product']))
+            else:
+                error = result.get('error') or 'Sin respuesta de Icecat'
+                results.append({'id': row.id, 'status': IcecatImportService.failure_status(result), 'laptop_id': None,
+                                'error': error[:500]})
+
+        if not ready:
+            return results, []
+
+        # laptops.gtin es único: un GTIN ya inventariado (o repetido en el
+        # lote) no crea otra laptop
+        existing = dict(db.session.execute(
+            select(Laptop.gtin, Laptop.sku).where(Laptop.gtin.in_({row.gtin for row, _ in ready}))
+        ).all())
+
+        # Catálogos por GTIN (una vez por producto en todo el trabajo)
+        complete = []
+        for row, product in ready:
+            if row.gtin in existing:
+                sku = existing[row.gtin]
+                results.append({'id': row.id, 'status': 'error', 'laptop_id': None,
+                                'error': f'El GTIN ya existe en el inventario (SKU {sku})' if sku
+                                else 'GTIN repetido en la importación'})
+                continue
+            existing[row.gtin] = None
+            if row.gtin not in catalog_memo:
+                catalog_memo[row.gtin] = CatalogService.process_laptop_form_data(
+                    IcecatImportService.catalog_form_data(product)
+                )
+            missing = [label for column, label in IcecatImportService.REQUIRED_CATALOGS.items()
+                       if not catalog_memo[row.gtin].get(column)]
+            if missing:
+                results.append({'id': row.id, 'status': 'error', 'laptop_id': None,
+                                'error': f"Icecat no trae: {', '.join(missing)}"})
+            else:
+                complete.append((row, product))
+        ready = complete
+        if not ready:
+            return results, []
+
+        store_id = IcecatImportService._store_id(options)
+        skus = SKUService.generate_laptop_skus(len(ready))
+        slugs = IcecatImportService._unique_slugs([
+            IcecatImportService._slug_base(product.get('nombre_visualizacion') or product.get('nombre_comercial')
+                                           or row.gtin)
+            for row, product in ready
+        ])
+
+        laptops = []
+        for (row, product), sku, slug in zip(ready, skus, slugs):
+            laptop = IcecatImportService.laptop_from_product(
+                product, catalog_memo[row.gtin], row, options, store_id, sku, slug
+            )
+            laptops.append(laptop)
+
+        db.session.add_all(laptops)
+        db.session.flush()
+
+        created = []
+        for (row, product), laptop in zip(ready, laptops):
+            results.append({'id': row.id, 'status': 'created', 'laptop_id': laptop.id, 'error': None})
+            created.append((laptop.id, laptop.sku, product.get('imagenes') or []))
+        return results, created
+
+    @staticmethod
+    def _queue_images(created):
+        """Descarga las imágenes de Icecat de las laptops creadas en segundo plano"""
+        from app.services.laptop_image_service import LaptopImageService
+        from app.utils.task_manager import TaskManager
+
+        app = current_app._get_current_object()
+        for laptop_id, sku, image_urls in created:
+            if image_urls:
+                TaskManager.run_async(
+                    LaptopImageService.background_save_icecat_images,
+                    laptop_id=laptop_id, sku=sku, image_urls=image_urls, app=app
+                )
+
+    # ===== MAPEO ICECAT -> LAPTOP =====
+
+    @staticmethod
+    def _store_id(options):
+        """Tienda de destino (opción store_id o la primera tienda activa)"""
+        if options.get('store_id'):
+            return CatalogService.get_or_create_store(options['store_id'])
+        store = Store.query.filter_by(is_active=True).order_by(Store.id).first()
+        if store is None:
+            raise ValueError('No hay tiendas activas para asignar las laptops importadas')
+        return store.id
+
+    @staticmethod
+    def _slug_base(text):
+        slug = re.sub(r'[^\w\s-]', '', (text or '').lower().strip())
+        return re.sub(r'[-\s]+', '-', slug).strip('-')[:200] or 'laptop'
+
+    @staticmethod
+    def _unique_slugs(bases):
+        """Slugs únicos para el lote con una sola consulta"""
+        distinct = set(bases)
+        taken = set(db.session.execute(
+            select(Laptop.slug).where(or_(*[
+                or_(Laptop.slug == base, Laptop.slug.like(f'{base}-%')) for base in distinct
+            ]))
+        ).scalars())
+
+        slugs = []
+        for base in bases:
+            slug, counter = base, 1
+            while slug in taken:
+                slug = f'{base}-{counter}'
+                counter += 1
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    @staticmethod
+    def _join_unique(parts):
+        """Une partes no vacías eliminando palabras repetidas consecutivas"""
+        clean = []
+        for part in filter(None, parts):
+            if not clean or str(part).lower() != str(clean[-1]).lower():
+                clean.append(part)
+        return ' '.join(str(part) for part in clean)
+
+    @staticmethod
+    def catalog_form_data(product):
+        """
+        Datos de catálogo de un producto normalizado, con las mismas claves
+        que el formulario de laptops (equivalente a icecat_scanner.js)
+
+        Returns:
+            dict: Entrada para CatalogService.process_laptop_form_data
+        """
+        processor = product.get('procesador') or {}
+        screen = product.get('pantalla') or {}
+        graphics = product.get('tarjeta_grafica') or {}
+        storage = product.get('almacenamiento') or {}
+        ram = product.get('memoria_ram') or {}
+        join = IcecatImportService._join_unique
+
+        capacity = storage.get('capacidad_total_gb') or 0
+        capacity_label = ''
+        if capacity:
+            capacity_label = f'{capacity / 1024:.1f}TB'.replace('.0', '') if capacity >= 1024 else f'{capacity}GB'
+
+        discrete_model = graphics.get('modelo_dedicado') or ''
+        discrete_brand = graphics.get('marca_dedicada') or ''
+        onboard_model = graphics.get('modelo_integrado') or ''
+        onboard_brand = graphics.get('marca_integrada') or ''
+        onboard_family = graphics.get('familia_integrada') or ''
+
+        return {
+            'brand_id': product.get('marca') or None,
+            'model_id': product.get('modelo') or None,
+            'processor_family': processor.get('familia'),
+            'processor_generation': processor.get('generacion'),
+            'processor_model': processor.get('modelo'),
+            'processor_manufacturer': processor.get('fabricante'),
+            'processor_full_name': processor.get('nombre_completo'),
+            'os_id': product.get('sistema_operativo') or None,
+
+            'screen_id': screen.get('resolucion') or None,
+            'screen_diagonal_inches': screen.get('diagonal_pulgadas') or None,
+            'screen_resolution': screen.get('resolucion') or None,
+            'screen_hd_type': screen.get('tipo_hd') or None,
+            'screen_panel_type': screen.get('tipo') or None,
+            'screen_refresh_rate': screen.get('tasa_refresco_hz') or None,
+            'screen_touchscreen_override': screen.get('tactil'),
+            'screen_full_name': join([
+                f"{screen['diagonal_pulgadas']}\"" if screen.get('diagonal_pulgadas') else '',
+                screen.get('tipo_hd'),
+                (screen.get('tipo') or '').replace('-Level', ''),
+                f"{screen['tasa_refresco_hz']}Hz" if screen.get('tasa_refresco_hz') else '',
+            ]) or None,
+
+            'graphics_card_id': (discrete_model or onboard_model) or None,
+            'has_discrete_gpu': graphics.get('tiene_dedicada'),
+            'discrete_gpu_brand': discrete_brand or None,
+            'discrete_gpu_model': discrete_model or None,
+            'discrete_gpu_memory_gb': graphics.get('memoria_dedicada_gb') or None,
+            'discrete_gpu_memory_type': graphics.get('tipo_memoria_dedicada') or None,
+            'discrete_gpu_full_name': join([
+                discrete_brand if discrete_brand.lower() not in discrete_model.lower() else '',
+                discrete_model,
+                f"{graphics['memoria_dedicada_gb']}GB" if graphics.get('memoria_dedicada_gb') else '',
+                graphics.get('tipo_memoria_dedicada'),
+            ]) if graphics.get('tiene_dedicada') else None,
+            'onboard_gpu_brand': onboard_brand or None,
+            'onboard_gpu_model': onboard_model or None,
+            'onboard_gpu_family': onboard_family or None,
+            'onboard_gpu_full_name': join([
+                onboard_brand if onboard_brand.lower() not in onboard_model.lower() else '',
+                onboard_model,
+                onboard_family if onboard_family.lower() not in onboard_model.lower() else '',
+            ]) or None,
+
+            'storage_id': storage.get('tipo_media') or None,
+            'storage_capacity': capacity or None,
+            'storage_media': storage.get('tipo_media') or None,
+            'storage_nvme': storage.get('nvme'),
+            'storage_form_factor': storage.get('factor_forma_ssd') or None,
+            'storage_full_name': join([
+                capacity_label, storage.get('tipo_media'), 'NVMe' if storage.get('nvme') else '',
+                storage.get('factor_forma_ssd'),
+            ]) or None,
+
+            'ram_id': ram.get('tipo') or None,
+            'ram_capacity': ram.get('capacidad_gb') or None,
+            'ram_type_detailed': ram.get('tipo') or None,
+            'ram_speed_mhz': ram.get('velocidad_mhz') or None,
+            'ram_transfer_rate': ram.get('tasa_transferencia') or None,
+            'ram_full_name': join([
+                f"{ram['capacidad_gb']}GB" if ram.get('capacidad_gb') else '',
+                ram.get('tipo'),
+                f"{ram['velocidad_mhz']}MHz" if ram.get('velocidad_mhz') else '',
+                f"{ram['tasa_transferencia']}MT/s" if ram.get('tasa_transferencia') else '',
+            ]) or None,
+        }
+
+    @staticmethod
+    def laptop_fields(product):
+        """Campos de la laptop (no de catálogo) que vienen de Icecat"""
+        connectivity = product.get('conectividad') or {}
+        input_data = product.get('entrada') or {}
+        physical = product.get('fisico') or {}
+        ports = {
+            f"{port.get('cantidad', 1)}x {port.get('tipo')}{' ' + port['version'] if port.get('version') else ''}": 1
+            for port in connectivity.get('puertos') or [] if port.get('tipo')
+        }
+        icecat_id = str(product.get('icecat_id') or '')
+
+        return {
+            'display_name': (product.get('nombre_visualizacion') or product.get('nombre_comercial') or '')[:400],
+            'short_description': product.get('descripcion_corta') or None,
+            'keywords': product.get('palabras_clave') or None,
+            'icecat_id': int(icecat_id) if icecat_id.isdigit() else None,
+            'icecat_product_id': icecat_id or None,
+            'ram_upgradeable': bool((product.get('memoria_ram') or {}).get('ampliable')),
+            'storage_upgradeable': bool((product.get('almacenamiento') or {}).get('ampliable')),
+            'touchscreen_override': (product.get('pantalla') or {}).get('tactil'),
+            'connectivity_ports': ports,
+            'wifi_standard': connectivity.get('wifi') or None,
+            'cellular': connectivity.get('celular') or None,
+            'keyboard_backlight': bool(input_data.get('retroiluminacion')),
+            'numeric_keypad': bool(input_data.get('teclado_numerico')),
+            'keyboard_layout': input_data.get('disposicion_teclado') or 'US',
+            'pointing_device': input_data.get('dispositivo_apuntador') or None,
+            'keyboard_backlight_color': input_data.get('color_retroiluminacion') or None,
+            'keyboard_backlight_zone': input_data.get('zona_retroiluminacion') or None,
+            'keyboard_language': input_data.get('idioma_teclado') or None,
+            'fingerprint_reader': bool(input_data.get('lector_huellas')),
+            'face_recognition': bool(input_data.get('reconocimiento_facial')),
+            'weight_lbs': physical.get('peso_lbs') or None,
+            'full_specs_json': product.get('raw_specs') or {},
+            'normalized_specs': product,
+        }
+
+    @staticmethod
+    def _is_empty(value):
+        return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+    @staticmethod
+    def present_laptop_fields(product):
+        """
+        laptop_fields() solo con los campos que el producto trae
+
+        Para actualizar una laptop existente: los valores por defecto de
+        laptop_fields() (None, 'US', False, {}) no deben pisar datos que ya
+        tiene cuando un producto de Icecat viene incompleto.
+        """
+        def source_value(path):
+            value = product
+            for key in path.split('.'):
+                value = value.get(key) if isinstance(value, dict) else None
+            return value
+
+        sources = IcecatImportService.LAPTOP_FIELD_SOURCES
+        return {
+            field: value
+            for field, value in IcecatImportService.laptop_fields(product).items()
+            if not IcecatImportService._is_empty(value) and (
+                field not in sources
+                or any(not IcecatImportService._is_empty(source_value(path)) for path in sources[field])
+            )
+        }
+
+    @staticmethod
+    def laptop_from_product(product, catalog_data, row, options, store_id, sku, slug):
+        """Laptop nueva (sin agregar a la sesión) a partir del producto normalizado y la fila"""
+        now = datetime.utcnow()
+        sale_price = row.sale_price if row.sale_price is not None else Decimal('0')
+        return Laptop(
+            sku=sku,
+            slug=slug,
+            gtin=row.gtin,
+            brand_id=catalog_data['brand_id'],
+            model_id=catalog_data['model_id'],
+            processor_id=catalog_data['processor_id'],
+            os_id=catalog_data['os_id'],
+            screen_id=catalog_data['screen_id'],
+            graphics_card_id=catalog_data['graphics_card_id'],
+            storage_id=catalog_data['storage_id'],
+            ram_id=catalog_data['ram_id'],
+            store_id=store_id,
+            category='laptop',
+            condition=options.get('condition') or 'new',
+            is_published=bool(options.get('is_published', False)),
+            purchase_cost=row.purchase_cost if row.purchase_cost is not None else sale_price,
+            sale_price=sale_price,
+            quantity=row.quantity,
+            entry_date=date.today(),
+            icecat_import_status='imported',
+            icecat_imported_at=now,
+            icecat_last_synced_at=now,
+            last_icecat_sync=now,
+            created_by_id=options.get('user_id'),
+            **IcecatImportService.laptop_fields(product)
+        )
@@ -22,14 +22,18 @@ import requests
 import logging
 import re
 import json
+import threading
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
+from app.extensions import icecat_cache
 from app.models.system_setting import SystemSetting
 from app.services.standard_specs_map import (
     STANDARD_SPECS_MAP, BRAND_SPECIFIC_MAP, REQUIRED_FIELDS,
     STANDARD_UNITS, PORT_FEATURE_IDS, PORT_NAMES,
-    get_field_ids, get_field_names, is_required_field
+    get_field_keys, is_required_field
 )
+from app.utils.http_pool import HostLimitedSession
+from app.utils.icecat_cache import FOUND, NOT_FOUND
 
 logger = logging.getLogger(__name__)
 
@@ -411,6 +415,14 @@ class IcecatService:
     
     BASE_URL = "https://live.icecat.biz/api/"
     
+    # Subir al cambiar normalize_data o los parsers: las entradas de la caché
+    # con otra versión se re-normalizan desde el cuerpo guardado
+    NORMALIZER_VERSION = 1
+    
+    # Sesión HTTP compartida por el proceso (ver http())
+    _http = None
+    _http_lock = threading.Lock()
+    
     # Palabras clave para detección de NPU
     NPU_KEYWORDS = [
         'Ryzen AI', 'Core Ultra', 'NPU', 'AI Boost', 'Neural',
@@ -421,6 +433,16 @@ class IcecatService:
     DISCRETE_GPU_BRANDS = ['NVIDIA', 'GeForce', 'RTX', 'GTX', 'Quadro',
                            'AMD', 'Radeon', 'RX', 'FirePro']
     
+    # Expresiones de los _parse_* (compiladas una vez, no en cada valor)
+    INT_RE = re.compile(r'\d+')
+    FLOAT_RE = re.compile(r'\d+\.?\d*')
+    INCHES_RE = re.compile(r'(\d+\.?\d*)\s*(?:"|inch|pulgada|pulg)')
+    INTEL_GEN_NEW_RE = re.compile(r'(\d{2})\d{3}')
+    INTEL_GEN_OLD_RE = re.compile(r'([2-9])\d{3}')
+    INTEL_GEN_FIRST_RE = re.compile(r'^[1-9]\d{2}$')
+    AMD_GEN_RE = re.compile(r'(\d)\d{3}')
+    PARENTHESIZED_RE = re.compile(r'^\(.*\)$')
+    
     @staticmethod
     def get_credentials() -> Dict[str, str]:
         """Obtiene las credenciales de Icecat desde SystemSettings."""
@@ -433,17 +455,47 @@ class IcecatService:
             'language': SystemSetting.get_value('icecat_language', 'es')
         }
     
+    @staticmethod
+    def _setting(name: str, default: Any) -> Any:
+        """Valor de app.config (default fuera de un contexto de aplicación)."""
+        from flask import current_app, has_app_context
+        return current_app.config.get(name, default) if has_app_context() else default
+    
+    @staticmethod
+    def base_url() -> str:
+        """URL de la API (ICECAT_BASE_URL permite apuntar a un stub local)."""
+        return IcecatService._setting('ICECAT_BASE_URL', None) or IcecatService.BASE_URL
+    
+    @staticmethod
+    def http() -> HostLimitedSession:
+        """
+        Sesión HTTP del proceso: conexiones reutilizadas, reintentos con
+        backoff y como máximo ICECAT_MAX_CONCURRENCY peticiones simultáneas
+        a Icecat entre todos los hilos.
+        """
+        if IcecatService._http is None:
+            with IcecatService._http_lock:
+                if IcecatService._http is None:
+                    IcecatService._http = HostLimitedSession(
+                        max_per_host=IcecatService._setting('ICECAT_MAX_CONCURRENCY', 4),
+                        retries=IcecatService._setting('ICECAT_HTTP_RETRIES', 3),
+                        backoff=IcecatService._setting('ICECAT_HTTP_BACKOFF', 0.5)
+                    )
+        return IcecatService._http
+    
     @staticmethod
     def _make_request(url: str, params: Dict, headers: Dict = None, 
-                      timeout: int = 15) -> Tuple[Optional[requests.Response], Optional[str]]:
+                      timeout: int = None) -> Tuple[Optional[requests.Response], Optional[str]]:
         """
         Realiza una petición HTTP manejando errores de SSL y reintentos.
         
         Returns:
             Tuple de (response, error_message)
         """
+        timeout = timeout or IcecatService._setting('ICECAT_HTTP_TIMEOUT', 15)
+        http = IcecatService.http()
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=timeout)
+            response = http.get(url, params=params, headers=headers, timeout=timeout)
             
             # Forzar UTF-8 si es necesario (Icecat a veces no lo especifica bien en el header)
             if response.encoding != 'utf-8':
@@ -455,8 +507,8 @@ class IcecatService:
             try:
                 import urllib3
                 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-                response = requests.get(url, params=params, headers=headers, 
-                                       timeout=timeout, verify=False)
+                response = http.get(url, params=params, headers=headers, 
+                                    timeout=timeout, verify=False)
                 
                 if response.encoding != 'utf-8':
                     response.encoding = 'utf-8'
@@ -468,18 +520,8 @@ class IcecatService:
             return None, str(e)
     
     @staticmethod
-    def fetch_by_gtin(gtin: str) -> Dict:
-        """
-        Busca un producto en Icecat por su GTIN (UPC/EAN).
-        
-        Args:
-            gtin: Código GTIN/EAN/UPC del producto
-            
-        Returns:
-            Diccionario con los datos normalizados del producto
-        """
-        creds = IcecatService.get_credentials()
-        
+    def _build_request(gtin: str, creds: Dict) -> Tuple[Dict, Dict]:
+        """Parámetros y headers de autenticación para consultar un GTIN."""
         params = {
             'GTIN': gtin,
             'Language': creds['language'],
@@ -497,30 +539,175 @@ class IcecatService:
             if creds['app_key']:
                 params['AppKey'] = creds['app_key']
         
-        response, error = IcecatService._make_request(IcecatService.BASE_URL, params, headers=headers)
+        return params, headers
+    
+    @staticmethod
+    def _cached_result(entry: Dict, stale: bool = False) -> Dict:
+        """Convierte una entrada de la caché al formato de respuesta de fetch_by_gtin."""
+        if entry['status'] == NOT_FOUND:
+            return {'success': False, 'error': entry['normalized']['error'], 'not_found': True, 'cached': True}
+        return {'success': True, 'product': entry['normalized'], 'cached': True, 'stale': stale}
+    
+    @staticmethod
+    def fetch_by_gtin(gtin: str, force_refresh: bool = False, credentials: Dict = None,
+                      allow_stale: bool = True) -> Dict:
+        """
+        Busca un producto en Icecat por su GTIN (UPC/EAN).
+        
+        Primero consulta la caché en disco (ver app/utils/icecat_cache.py):
+        una entrada fresca se devuelve sin red; una vencida se devuelve y se
+        revalida en segundo plano.
+        
+        Args:
+            gtin: Código GTIN/EAN/UPC del producto
+            force_refresh: Consultar Icecat aunque la entrada esté fresca
+            credentials: Credenciales ya leídas (importaciones por lotes)
+            allow_stale: Con False una entrada vencida se revalida en línea en
+                         vez de servirse (re-sincronización de laptops)
+            
+        Returns:
+            Diccionario con los datos normalizados del producto
+            ('cached'/'stale' indican si vino de la caché; 'not_found' que
+            Icecat no tiene el GTIN, a diferencia de una consulta fallida)
+        """
+        creds = credentials or IcecatService.get_credentials()
+        language = creds['language']
+        
+        entry = icecat_cache.get(gtin, language)
+        if entry and not force_refresh:
+            entry = IcecatService._renormalize_if_outdated(gtin, language, entry)
+            if icecat_cache.is_fresh(entry):
+                icecat_cache.record_hit(entry)
+                return IcecatService._cached_result(entry)
+            if allow_stale and icecat_cache.is_servable(entry):
+                icecat_cache.record_hit(entry, stale=True)
+                IcecatService._schedule_revalidation(gtin, language)
+                return IcecatService._cached_result(entry, stale=True)
+        
+        return IcecatService._fetch_live(gtin, creds, entry)
+    
+    @staticmethod
+    def _renormalize_if_outdated(gtin: str, language: str, entry: Dict) -> Dict:
+        """Si los parsers cambiaron, re-normaliza desde el cuerpo guardado (sin red)."""
+        if entry['status'] != FOUND or entry['normalizer_version'] == IcecatService.NORMALIZER_VERSION:
+            return entry
+        
+        body = icecat_cache.get_raw(gtin, language)
+        if body:
+            entry['normalized'] = IcecatService.normalize_data(json.loads(body)['data'])
+            entry['normalizer_version'] = IcecatService.NORMALIZER_VERSION
+            icecat_cache.update_normalized(gtin, language, entry['normalized'], IcecatService.NORMALIZER_VERSION)
+        return entry
+    
+    @staticmethod
+    def _schedule_revalidation(gtin: str, language: str) -> None:
+        """Revalida una entrada vencida en segundo plano (una sola vez por GTIN a la vez)."""
+        if not icecat_cache.begin_revalidation(gtin, language):
+            return
+        
+        from flask import current_app
+        from app.utils.task_manager import TaskManager
+        
+        app = current_app._get_current_object()
+        
+        def revalidate():
+            try:
+                with app.app_context():
+                    creds = IcecatService.get_credentials()
+                    IcecatService._fetch_live(gtin, creds, icecat_cache.get(gtin, language))
+            finally:
+                icecat_cache.end_revalidation(gtin, language)
+        
+        TaskManager.run_async(revalidate)
+    
+    @staticmethod
+    def _request_gtin(gtin: str, creds: Dict, entry: Optional[Dict] = None
+                      ) -> Tuple[Optional[int], bytes, Dict, Optional[str]]:
+        """
+        Consulta un GTIN a Icecat (o al fixture grabado en modo 'replay').
+        
+        Envía If-None-Match/If-Modified-Since si la entrada en caché los tiene.
+        
+        Returns:
+            Tuple de (status_code, cuerpo, headers, error_message)
+        """
+        language = creds['language']
+        if icecat_cache.fixtures_mode == 'replay':
+            body = icecat_cache.load_fixture(gtin, language)
+            if body is None:
+                return 404, b'', {}, None
+            return 200, body, {}, None
+        
+        params, headers = IcecatService._build_request(gtin, creds)
+        if entry and entry['status'] == FOUND:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        response, error = IcecatService._make_request(IcecatService.base_url(), params, headers=headers)
+        if error:
+            return None, b'', {}, error
+        
+        if response.status_code == 200 and icecat_cache.fixtures_mode == 'record':
+            icecat_cache.record_fixture(gtin, language, response.content)
+        return response.status_code, response.content, response.headers, None
+    
+    @staticmethod
+    def _fetch_live(gtin: str, creds: Dict, entry: Optional[Dict] = None) -> Dict:
+        """
+        Consulta Icecat, normaliza y guarda el resultado en la caché.
+        
+        Si Icecat responde 304 o el mismo contenido que ya estaba guardado, solo
+        se renueva la entrada (sin normalizar de nuevo). Si la consulta falla y
+        hay una entrada previa, se devuelve esa entrada marcada como vencida.
+        """
+        language = creds['language']
+        status_code, body, response_headers, error = IcecatService._request_gtin(gtin, creds, entry)
         
         if error:
             logger.error(f"IcecatService: Error de conexión: {error}")
+            if entry and entry['status'] == FOUND:
+                return IcecatService._cached_result(entry, stale=True)
             return {'success': False, 'error': f'Error de conexión: {error}'}
         
         try:
-            if response.status_code == 200:
-                json_data = response.json()
+            if status_code == 304 and entry:
+                icecat_cache.touch(gtin, language)
+                return IcecatService._cached_result(entry)
+            
+            if status_code == 200:
+                if (entry and entry['status'] == FOUND
+                        and entry['content_hash'] == icecat_cache.content_hash(body)
+                        and entry['normalizer_version'] == IcecatService.NORMALIZER_VERSION):
+                    icecat_cache.touch(gtin, language)
+                    return IcecatService._cached_result(entry)
+                
+                json_data = json.loads(body)
                 if 'data' in json_data and json_data['data']:
                     normalized = IcecatService.normalize_data(json_data['data'])
-                    return {'success': True, 'product': normalized}
+                    icecat_cache.put(
+                        gtin, language, body, normalized, IcecatService.NORMALIZER_VERSION,
+                        etag=response_headers.get('ETag'),
+                        last_modified=response_headers.get('Last-Modified')
+                    )
+                    return {'success': True, 'product': normalized, 'cached': False}
                 else:
                     logger.warning(f"IcecatService: Producto no encontrado para GTIN {gtin}")
-                    return {'success': False, 'error': 'Producto no encontrado en Icecat.'}
-            elif response.status_code == 401:
+                    message = 'Producto no encontrado en Icecat.'
+                    icecat_cache.put_not_found(gtin, language, message)
+                    return {'success': False, 'error': message, 'not_found': True}
+            elif status_code == 401:
                 return {'success': False, 'error': 'Error de autenticación con Icecat.'}
-            elif response.status_code == 404:
-                error_data = response.json() if response.text else {}
+            elif status_code == 404:
+                error_data = json.loads(body) if body else {}
                 message = error_data.get('Message', 'Producto no encontrado')
-                return {'success': False, 'error': f'Error de API Icecat: 404 - {message}'}
+                message = f'Error de API Icecat: 404 - {message}'
+                icecat_cache.put_not_found(gtin, language, message)
+                return {'success': False, 'error': message, 'not_found': True}
             else:
-                logger.error(f"IcecatService: Error de API {response.status_code}")
-                return {'success': False, 'error': f'Error de API Icecat: {response.status_code}'}
+                logger.error(f"IcecatService: Error de API {status_code}")
+                return {'success': False, 'error': f'Error de API Icecat: {status_code}'}
         except Exception as e:
             logger.error(f"IcecatService: Excepción al consultar API: {str(e)}")
             return {'success': False, 'error': f'Error de conexión: {str(e)}'}
@@ -680,18 +867,19 @@ class IcecatService:
         Returns:
             Valor de la especificación o cadena vacía
         """
-        ids = get_field_ids(field_path)
-        names = get_field_names(field_path)
+        ids, names = get_field_keys(field_path)
         
         # Buscar por IDs
+        by_id = indexed_specs['by_id']
         for feat_id in ids:
-            if str(feat_id) in indexed_specs['by_id']:
-                return indexed_specs['by_id'][str(feat_id)]
+            if feat_id in by_id:
+                return by_id[feat_id]
         
         # Buscar por nombres
+        by_name = indexed_specs['by_name']
         for name in names:
-            if name.lower() in indexed_specs['by_name']:
-                return indexed_specs['by_name'][name.lower()]
+            if name in by_name:
+                return by_name[name]
         
         return ''
 
@@ -854,23 +1042,23 @@ class IcecatService:
                 return "Core Ultra Series 1"
             
             # 10th Gen y superiores (5 o más dígitos o prefijo de 2 dígitos)
-            gen_match_new = re.search(r'(\d{2})\d{3}', mod_upper) 
+            gen_match_new = IcecatService.INTEL_GEN_NEW_RE.search(mod_upper) 
             if gen_match_new:
                 return f"{gen_match_new.group(1)}th Gen"
             
             # 2nd a 9th Gen (4 dígitos empezando con 2-9)
-            gen_match_old = re.search(r'([2-9])\d{3}', mod_upper)
+            gen_match_old = IcecatService.INTEL_GEN_OLD_RE.search(mod_upper)
             if gen_match_old:
                 return f"{gen_match_old.group(1)}th Gen"
             
             # 1st Gen o modelos sin guión pero con número
-            if re.search(r'^[1-9]\d{2}$', mod_upper):
+            if IcecatService.INTEL_GEN_FIRST_RE.search(mod_upper):
                 return "1st Gen"
 
         # AMD
         if 'amd' in man_lower or 'ryzen' in fam_lower:
             # Ryzen 5000, 7000, 8000
-            gen_match = re.search(r'(\d)\d{3}', mod_upper)
+            gen_match = IcecatService.AMD_GEN_RE.search(mod_upper)
             if gen_match:
                 return f"Ryzen {gen_match.group(1)}000 Series"
                 
@@ -1721,7 +1909,7 @@ class IcecatService:
             if name:
                 modelo = name
                 # Agregar series si aporta info y no está en el name
-                if series and len(series) > 2 and not re.match(r'^\(.*\)$', series):
+                if series and len(series) > 2 and not IcecatService.PARENTHESIZED_RE.match(series):
                     if series.lower() not in name.lower():
                         modelo = f"{series} {name}"
             elif code and len(code) > 5:
@@ -1791,7 +1979,7 @@ class IcecatService:
                 return 0
                 
             # Extraer números de la cadena
-            numbers = re.findall(r'\d+', value.replace(',', ''))
+            numbers = IcecatService.INT_RE.findall(value.replace(',', ''))
             if numbers:
                 return int(numbers[0])
         
@@ -1813,7 +2001,7 @@ class IcecatService:
             # Reemplazar coma por punto para decimales
             value = value.replace(',', '.')
             # Extraer números decimales
-            numbers = re.findall(r'\d+\.?\d*', value)
+            numbers = IcecatService.FLOAT_RE.findall(value)
             if numbers:
                 return float(numbers[0])
         
@@ -1833,7 +2021,7 @@ class IcecatService:
         
         # 1. Buscar valor con símbolo de pulgadas (") o "inch" o "pulgada"
         # Ejemplo: 15.6", 15.6 inch, 15.6 pulgada
-        inch_match = re.search(r'(\d+\.?\d*)\s*(?:"|inch|pulgada|pulg)', value_norm.lower())
+        inch_match = IcecatService.INCHES_RE.search(value_norm.lower())
         if inch_match:
             try:
                 return float(inch_match.group(1))
@@ -1841,7 +2029,7 @@ class IcecatService:
                 pass
                 
         # 2. Si hay varios números (típico: 39.6 cm (15.6")), buscar el que esté en rango de laptop (10-25)
-        numbers = re.findall(r'\d+\.?\d*', value_norm)
+        numbers = IcecatService.FLOAT_RE.findall(value_norm)
         if len(numbers) >= 2:
             for num_str in reversed(numbers): # El último suele ser el de pulgadas en el formato (Inches)
                 try:
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# ICECAT SYNC SERVICE - Re-sincronización Incremental
+# ============================================
+# Responsabilidad: mantener al día las especificaciones de las laptops que
+# vinieron de Icecat sin re-importarlas una por una.
+#
+# Un trabajo de re-sincronización es un IcecatJob con kind = 'resync':
+#   1. Al crearlo se fija el corte (icecat_last_synced_at < ahora - N días)
+#      en options['cutoff']; así el conjunto de laptops no cambia mientras
+#      se recorre. Solo entran las laptops que vinieron de Icecat
+#      (ICECAT_SYNC_STATUSES); las cargadas a mano con GTIN no se tocan.
+#   2. Las laptops vencidas se leen por lotes en orden
+#      (icecat_last_synced_at, id), primero las que nunca se sincronizaron,
+#      sobre el índice parcial idx_laptop_icecat_synced de esas mismas
+#      laptops: cada lote es un rango del índice, sin recorrer las que están
+#      al día. Después de cada lote se guarda options['cursor'] (fecha e id
+#      de la última procesada): si el proceso se reinicia, el trabajo sigue
+#      desde ahí.
+#   3. Los GTIN se consultan con el mismo bucle de la importación masiva
+#      (IcecatImportService.run_batches): caché en disco, sesión HTTP
+#      compartida y concurrencia acotada. Una entrada vencida de la caché se
+#      revalida en línea (allow_stale=False), no se sirve tal cual.
+#   4. Los cambios se aplican campo por campo, solo con lo que el producto
+#      trae y saltando los que el usuario editó a mano
+#      (Laptop.user_modified_fields).
+
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, func, or_, select
+
+from app import db
+from app.models.icecat_job import IcecatJob
+from app.models.laptop import ICECAT_SYNC_STATUSES, Laptop
+from app.services.catalog_service import CatalogService
+from app.services.icecat_import_service import IcecatImportService
+
+logger = logging.getLogger(__name__)
+
+
+class IcecatSyncService:
+    """Re-sincronización por lotes de laptops con datos de Icecat vencidos"""
+
+    # ===== SELECCIÓN =====
+
+    @staticmethod
+    def _icecat_filter():
+        """Laptops que vinieron de Icecat (las del índice parcial idx_laptop_icecat_synced)"""
+        # Estados en línea, no como parámetros: con parámetros el planificador
+        # (plan genérico de PostgreSQL, SQLite) no puede usar el índice parcial
+        statuses = bindparam('icecat_sync_statuses', ICECAT_SYNC_STATUSES, expanding=True, literal_execute=True)
+        return (
+            Laptop.gtin.isnot(None),
+            Laptop.icecat_import_status.in_(statuses),
+        )
+
+    @staticmethod
+    def _stale_filter(cutoff):
+        """Laptops de Icecat cuyos datos son anteriores al corte (o nunca se sincronizaron)"""
+        return (
+            *IcecatSyncService._icecat_filter(),
+            or_(Laptop.icecat_last_synced_at.is_(None), Laptop.icecat_last_synced_at < cutoff),
+        )
+
+    @staticmethod
+    def count_stale(cutoff):
+        return db.session.execute(
+            select(func.count(Laptop.id)).where(*IcecatSyncService._stale_filter(cutoff))
+        ).scalar()
+
+    @staticmethod
+    def _stale_batch(cutoff, after, size):
+        """
+        Siguiente lote de laptops vencidas (tuplas id, gtin, icecat_last_synced_at)
+
+        Orden (icecat_last_synced_at, id) con las nunca sincronizadas primero.
+
+        Args:
+            after: (icecat_last_synced_at, id) de la última laptop procesada o None
+        """
+        synced_at, after_id = after or (None, 0)
+        base = IcecatSyncService._icecat_filter()
+        columns = (Laptop.id, Laptop.gtin, Laptop.icecat_last_synced_at)
+
+        rows = []
+        if synced_at is None:
+            # Mismo ORDER BY que el índice (aunque todas sean NULL): ordenar solo
+            # por id lleva al planificador a recorrer la PK de toda la tabla
+            rows = db.session.execute(
+                select(*columns).where(
+                    *base, Laptop.icecat_last_synced_at.is_(None), Laptop.id > after_id
+                ).order_by(Laptop.icecat_last_synced_at, Laptop.id).limit(size)
+            ).all()
+            if len(rows) == size:
+                return rows
+
+        stale = [*base, Laptop.icecat_last_synced_at < cutoff]
+        if synced_at is not None:
+            # El >= redundante da el inicio del rango del índice
+            stale += [
+                Laptop.icecat_last_synced_at >= synced_at,
+                or_(
+                    Laptop.icecat_last_synced_at > synced_at,
+                    and_(Laptop.icecat_last_synced_at == synced_at, Laptop.id > after_id)
+                ),
+            ]
+        return rows + db.session.execute(
+            select(*columns).where(*stale).order_by(
+                Laptop.icecat_last_synced_at, Laptop.id
+            ).limit(size - len(rows))
+        ).all()
+
+    @staticmethod
+    def encode_cursor(row):
+        """Última laptop procesada -> options['cursor']"""
+        synced_at = row.icecat_last_synced_at
+        return {'synced_at': synced_at.isoformat() if synced_at else None, 'id': row.id}
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """options['cursor'] -> (icecat_last_synced_at, id) o None"""
+        if not cursor:
+            return None
+        synced_at = cursor.get('synced_at')
+        return (datetime.fromisoformat(synced_at) if synced_at else None), cursor['id']
+
+    # ===== TRABAJOS =====
+
+    @staticmethod
+    def create_job(max_age_days=None, limit=None, user_id=None):
+        """
+        Registra un trabajo de re-sincronización (commit)
+
+        Args:
+            max_age_days: Antigüedad mínima de los datos (default: ICECAT_RESYNC_MAX_AGE_DAYS)
+            limit: Máximo de laptops a procesar en este trabajo
+
+        Returns:
+            IcecatJob o None si no hay laptops vencidas
+        """
+        days = max_age_days or current_app.config.get('ICECAT_RESYNC_MAX_AGE_DAYS', 30)
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        total = IcecatSyncService.count_stale(cutoff)
+        if limit:
+            total = min(total, limit)
+        if not total:
+            return None
+
+        job = IcecatJob(
+            kind='resync', status='pending', total=total, created_by_id=user_id, batch_timings=[],
+            options={'cutoff': cutoff.isoformat(), 'cursor': None, 'max_age_days': days, 'limit': limit}
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def running_job():
+        """Re-sincronización en curso en otro proceso (con latido reciente)"""
+        cutoff = datetime.utcnow() - IcecatImportService.STALE_AFTER
+        return IcecatJob.query.filter(
+            IcecatJob.kind == 'resync',
+            IcecatJob.status == 'running',
+            IcecatJob.heartbeat_at >= cutoff
+        ).first()
+
+    @staticmethod
+    def start(job_id):
+        """Ejecuta el trabajo en segundo plano. Retorna el id de la tarea"""
+        from app.utils.task_manager import TaskManager
+
+        app = current_app._get_current_object()
+        return TaskManager.run_async(IcecatSyncService._run_in_app, app, job_id)
+
+    @staticmethod
+    def _run_in_app(app, job_id):
+        with app.app_context():
+            IcecatSyncService.run_job(job_id)
+            db.session.remove()
+
+    @staticmethod
+    def resume_interrupted(start=True):
+        """
+        Retoma re-sincronizaciones que quedaron a medias desde su cursor
+
+        Returns:
+            list: IDs de los trabajos retomados
+        """
+        job_ids = IcecatImportService.interrupted_jobs('resync')
+        if start:
+            for job_id in job_ids:
+                IcecatSyncService.start(job_id)
+        return job_ids
+
+    # ===== EJECUCIÓN =====
+
+    @staticmethod
+    def run_job(job_id):
+        """
+        Procesa las laptops vencidas desde el cursor del trabajo (en el hilo actual)
+
+        Returns:
+            IcecatJob
+        """
+        batch_size = current_app.config.get('ICECAT_RESYNC_BATCH_SIZE', 50)
+        job = db.session.get(IcecatJob, job_id)
+        if job is None:
+            return None
+
+        options = job.options or {}
+        cutoff = datetime.fromisoformat(options['cutoff'])
+        limit = options.get('limit')
+        start = IcecatSyncService.decode_cursor(options.get('cursor'))
+        queued = [job.processed]
+        catalog_memo = {}
+
+        def next_batch(last):
+            size = min(batch_size, limit - queued[0]) if limit else batch_size
+            if size <= 0:
+                return []
+            after = (last.icecat_last_synced_at, last.id) if last else start
+            rows = IcecatSyncService._stale_batch(cutoff, after, size)
+            queued[0] += len(rows)
+            return rows
+
+        return IcecatImportService.run_batches(
+            job_id,
+            next_batch,
+            lambda batch, products: IcecatSyncService._write_batch(batch, products, catalog_memo),
+            fetch_options={'allow_stale': False},
+            cursor_of=IcecatSyncService.encode_cursor
+        )
+
+    @staticmethod
+    def _write_batch(batch, products, catalog_memo):
+        """
+        Aplica los cambios de Icecat a las laptops del lote en una transacción (commit)
+
+        Returns:
+            list: [{'id', 'status', 'error'}] por laptop
+        """
+        try:
+            results = IcecatSyncService._merge_batch(batch, products, catalog_memo)
+            db.session.commit()
+            return results
+        except Exception as e:
+            db.session.rollback()
+            catalog_memo.clear()
+            if len(batch) == 1:
+                logger.warning(f"Re-sincronización Icecat: laptop {batch[0].id} con error: {e}")
+                return [{'id': batch[0].id, 'status': 'error', 'error': str(e)[:500]}]
+
+            # Aislar la laptop problemática
+            results = []
+            for row in batch:
+                results.extend(IcecatSyncService._write_batch([row], products, catalog_memo))
+            return results
+
+    @staticmethod
+    def _merge_batch(batch, products, catalog_memo):
+        """Bloquea las laptops del lote y les aplica su producto de Icecat (sin commit)"""
+        laptops = {
+            laptop.id: laptop
+            for laptop in Laptop.query.options(Laptop.with_heavy_columns()).filter(
+                Laptop.id.in_([row.id for row in batch])
+            ).with_for_update().all()
+        }
+        now = datetime.utcnow()
+
+        results = []
+        for row in batch:
+            laptop = laptops.get(row.id)
+            if laptop is None:
+                results.append({'id': row.id, 'status': 'error', 'error': 'La laptop ya no existe'})
+                continue
+
+            result = products.get(row.gtin) or {}
+            if not result.get('success'):
+                error = result.get('error') or 'Sin respuesta de Icecat'
+                status = IcecatImportService.failure_status(result)
+                if status == 'not_found':
+                    # Se vuelve a intentar cuando venza otra vez, no en cada corrida
+                    laptop.icecat_import_status = 'not_found'
+                    laptop.icecat_last_synced_at = now
+                results.append({'id': row.id, 'status': status, 'error': error[:500]})
+                continue
+
+            changed = IcecatSyncService.merge(laptop, result['product'], catalog_memo)
+            laptop.icecat_import_status = 'synced'
+            laptop.icecat_last_synced_at = laptop.last_icecat_sync = now
+            results.append({'id': row.id, 'status': 'synced' if changed else 'unchanged', 'error': None})
+        return results
+
+    # ===== MEZCLA =====
+
+    @staticmethod
+    def _same(current, value):
+        """Compara sin falsos cambios por Decimal frente a float del JSON"""
+        if isinstance(current, Decimal) and value is not None:
+            try:
+                return current == Decimal(str(value))
+            except InvalidOperation:
+                return False
+        return current == value
+
+    @staticmethod
+    def merge(laptop, product, catalog_memo=None):
+        """
+        Aplica un producto normalizado de Icecat a una laptop existente
+
+        Solo cambia los campos que el producto trae, cuyo valor es distinto
+        y que el usuario no editó a mano (user_modified_fields). Los
+        catálogos y campos que Icecat no trae se conservan.
+
+        Returns:
+            list: Campos modificados
+        """
+        catalog_memo = catalog_memo if catalog_memo is not None else {}
+        if laptop.gtin not in catalog_memo:
+            catalog_memo[laptop.gtin] = CatalogService.process_laptop_form_data(
+                IcecatImportService.catalog_form_data(product)
+            )
+        catalog_data = catalog_memo[laptop.gtin]
+
+        values = {
+            column: catalog_data[column]
+            for column in IcecatImportService.REQUIRED_CATALOGS if catalog_data.get(column)
+        }
+        values.update(IcecatImportService.present_laptop_fields(product))
+
+        protected = set(laptop.user_modified_fields or [])
+        changed = []
+        for field, value in values.items():
+            if field in protected or IcecatSyncService._same(getattr(laptop, field), value):
+                continue
+            setattr(laptop, field, value)
+            changed.append(field)
+        return changed
@@ -6,6 +6,11 @@
 
 from datetime import datetime, timedelta
 
+from sqlalchemy import func
+
+from app import db
+from app.extensions import result_cache
+
 
 class InventoryService:
     """Servicio para análisis de inventario"""
@@ -114,4 +119,54 @@ class InventoryService:
             'fast_rotation': fast_count,
             'slow_rotation': slow_count,
             'low_stock': low_stock_count
-        }
\ No newline at end of file
+        }
+
+    # Segundos que se cachean las estadísticas globales del listado
+    LIST_STATS_TTL = 60
+
+    @staticmethod
+    def get_laptop_list_stats():
+        """
+        Estadísticas globales del listado de laptops en una sola consulta agregada
+
+        Se calculan en SQL (SUM / COUNT ... FILTER) en lugar de cargar todas las
+        laptops, y se cachean brevemente (se invalidan al escribir laptops).
+
+        Returns:
+            dict: total, total_value, low_stock, published, unpublished,
+                  featured, min_price, max_price
+        """
+        return result_cache.get_or_set(
+            'inventory.laptop_list_stats', (),
+            InventoryService._query_laptop_list_stats,
+            tags=('inventory',),
+            ttl=InventoryService.LIST_STATS_TTL
+        )
+
+    @staticmethod
+    def _query_laptop_list_stats():
+        """Consulta agregada de get_laptop_list_stats()"""
+        from app.models.laptop import Laptop
+
+        row = db.session.query(
+            func.count(Laptop.id).label('total'),
+            func.coalesce(func.sum(Laptop.sale_price * Laptop.quantity), 0).label('total_value'),
+            func.count(Laptop.id).filter(
+                (Laptop.quantity - Laptop.reserved_quantity) <= Laptop.min_alert
+            ).label('low_stock'),
+            func.count(Laptop.id).filter(Laptop.is_published == True).label('published'),
+            func.count(Laptop.id).filter(Laptop.is_featured == True).label('featured'),
+            func.min(Laptop.sale_price).label('min_price'),
+            func.max(Laptop.sale_price).label('max_price')
+        ).one()
+
+        return {
+            'total': row.total,
+            'total_value': float(row.total_value or 0),
+            'low_stock': row.low_stock,
+            'published': row.published,
+            'unpublished': row.total - row.published,
+            'featured': row.featured,
+            'min_price': float(row.min_price) if row.min_price else 0,
+            'max_price': float(row.max_price) if row.max_price else 10000
+        }
@@ -13,6 +13,8 @@ from app.models.laptop import Laptop
 from app.models.invoice import InvoiceItem
 from app.models.serial import LaptopSerial, InvoiceItemSerial, SerialMovement
 from app.services.serial_service import SerialService
+from app.services.reservation_service import ReservationService
+from app.services.stock_allocator import StockAllocator
 from datetime import datetime
 import logging
 
@@ -30,83 +32,39 @@ class InvoiceInventoryServiceWithSerials:
     # ============================================
 
     @staticmethod
-    def validate_stock_for_invoice_items(items_data, require_serials=True):
+    def validate_stock_for_invoice_items(items_data, require_serials=True, invoice_id=None):
         """
         Valida que haya suficiente stock para todos los items de laptop.
 
+        Disponible = quantity - reserved_quantity; lo reservado por la propia
+        factura (invoice_id) cuenta como disponible para ella.
+
         Args:
             items_data: Lista de diccionarios con datos de items (JSON parseado)
             require_serials: Si True, requiere que se especifiquen seriales para cada unidad
+            invoice_id: Factura existente que se está editando (opcional)
 
         Returns:
             tuple: (is_valid, error_message, warnings)
         """
         try:
-            warnings = []
-
-            for item in items_data:
-                if item.get('type') == 'laptop' and item.get('laptop_id'):
-                    laptop_id = int(item['laptop_id'])
-                    quantity = int(item.get('quantity', 1))
-                    serial_ids = item.get('serial_ids', [])
-
-                    laptop = Laptop.query.get(laptop_id)
-                    if not laptop:
-                        return False, f'Laptop ID {laptop_id} no encontrada', []
-
-                    # Verificar cantidad general
-                    if laptop.quantity < quantity:
-                        return False, (
-                            f'Stock insuficiente para {laptop.display_name}. '
-                            f'Disponible: {laptop.quantity}, Solicitado: {quantity}'
-                        ), []
-
-                    # Verificar seriales si se requieren
-                    if require_serials:
-                        # Contar seriales disponibles
-                        available_serials = LaptopSerial.query.filter_by(
-                            laptop_id=laptop_id,
-                            status='available'
-                        ).count()
-
-                        if available_serials < quantity:
-                            return False, (
-                                f'Seriales insuficientes para {laptop.display_name}. '
-                                f'Seriales disponibles: {available_serials}, Solicitado: {quantity}'
-                            ), []
-
-                        # Si se especificaron seriales, validarlos
-                        if serial_ids:
-                            if len(serial_ids) != quantity:
-                                return False, (
-                                    f'Debe especificar exactamente {quantity} serial(es) para {laptop.display_name}. '
-                                    f'Especificados: {len(serial_ids)}'
-                                ), []
-
-                            # Validar cada serial
-                            for serial_id in serial_ids:
-                                serial = LaptopSerial.query.get(serial_id)
-                                if not serial:
-                                    return False, f'Serial ID {serial_id} no encontrado', []
-                                if serial.laptop_id != laptop_id:
-                                    return False, f'Serial {serial.serial_number} no pertenece a {laptop.display_name}', []
-                                if serial.status != 'available':
-                                    return False, f'Serial {serial.serial_number} no está disponible (estado: {serial.status_display})', []
-                        else:
-                            # Warning: no se especificaron seriales
-                            warnings.append(
-                                f'No se especificaron seriales para {laptop.display_name}. '
-                                f'Se asignarán automáticamente.'
-                            )
-                    else:
-                        # Verificar si hay seriales registrados pero no se requieren
-                        total_serials = LaptopSerial.query.filter_by(laptop_id=laptop_id).count()
-                        if total_serials > 0:
-                            warnings.append(
-                                f'{laptop.display_name} tiene seriales registrados. '
-                                f'Considere especificar qué seriales se venden.'
-                            )
+            lines = StockAllocator.laptop_lines(items_data)
+            if not lines:
+                return True, None, []
+
+            # Dos consultas IN (...) para toda la factura; el resto es en memoria
+            snapshot = StockAllocator.load(
+                [line['laptop_id'] for line in lines],
+                [serial_id for line in lines for serial_id in line['serial_ids']],
+                held=ReservationService.held_by(invoice_id) if invoice_id else None
+            )
+            totals = None if require_serials else StockAllocator.serial_totals(snapshot.laptops)
 
+            error, warnings = StockAllocator.validate_lines(
+                lines, snapshot, require_serials=require_serials, serial_totals=totals
+            )
+            if error:
+                return False, error, []
             return True, None, warnings
 
         except Exception as e:
@@ -142,70 +100,92 @@ class InvoiceInventoryServiceWithSerials:
                 'details': []
             }
 
-            for item in invoice.items.all():
-                if item.item_type == 'laptop' and item.laptop_id:
-                    laptop = Laptop.query.get(item.laptop_id)
-                    if not laptop:
-                        return False, f'Laptop ID {item.laptop_id} no encontrada'
+            items = [
+                item for item in invoice.items.all()
+                if item.item_type == 'laptop' and item.laptop_id
+            ]
+
+            # Seriales indicados por laptop (primera línea de cada laptop que los indique)
+            requested = {}
+            for data in items_data:
+                if data.get('laptop_id') and data.get('serial_ids'):
+                    requested.setdefault(int(data['laptop_id']), [int(s) for s in data.get('serial_ids') or []])
+
+            # La reserva de la factura (si estaba en borrador) pasa a la venta;
+            # sus seriales se venden si el formulario no indica otros
+            for laptop_id, serial_ids in ReservationService.consume_invoice(invoice.id, user_id).items():
+                requested.setdefault(laptop_id, serial_ids)
+
+            # Laptops y seriales bloqueados (FOR UPDATE) hasta el commit de la venta
+            snapshot = StockAllocator.load(
+                [item.laptop_id for item in items],
+                [serial_id for serial_ids in requested.values() for serial_id in serial_ids],
+                lock=True
+            )
+            assigned_counts = StockAllocator.assigned_counts([item.id for item in items])
+            assignments = []
 
-                    # Buscar datos del item (para obtener serial_ids)
-                    item_data = next(
-                        (d for d in items_data if d.get('laptop_id') == item.laptop_id),
-                        {}
+            for item in items:
+                laptop = snapshot.laptops.get(item.laptop_id)
+                if not laptop:
+                    return False, f'Laptop ID {item.laptop_id} no encontrada'
+
+                serial_ids = requested.get(item.laptop_id, [])
+
+                # === GUARDIA: Evitar duplicidad si ya tiene seriales asignados ===
+                existing_count = assigned_counts.get(item.id, 0)
+                if existing_count == item.quantity:
+                    logger.info(f"   ℹ️ {laptop.sku}: Ya tiene {existing_count} serial(es) asignados. Saltando asignación.")
+                    results['items_processed'] += 1
+                    results['serials_assigned'] += existing_count
+                    continue
+
+                # laptop.quantity ya refleja las líneas anteriores (se descuenta abajo)
+                available_quantity = laptop.available_quantity
+                if available_quantity < item.quantity:
+                    return False, (
+                        f'Stock insuficiente para {laptop.display_name}. '
+                        f'Disponible: {available_quantity}, Solicitado: {item.quantity}'
                     )
-                    serial_ids = item_data.get('serial_ids', [])
-
-                    # === GUARDIA: Evitar duplicidad si ya tiene seriales asignados ===
-                    existing_count = item.sold_serials.count()
-                    if existing_count == item.quantity:
-                        logger.info(f"   ℹ️ {laptop.sku}: Ya tiene {existing_count} serial(es) asignados. Saltando asignación.")
-                        results['items_processed'] += 1
-                        results['serials_assigned'] += existing_count
-                        continue
-                    
+
+                if serial_ids:
+                    serials, errors = snapshot.check_serials(serial_ids, laptop.id, f'a {laptop.display_name}')
+                    if errors:
+                        return False, f'Error asignando seriales: {errors[0]}'
+                    snapshot.take(serials)
+                else:
                     # Si no se especificaron seriales, auto-asignar
-                    if not serial_ids:
-                        available = SerialService.get_available_serials_for_laptop(laptop.id)
-                        if len(available) >= item.quantity:
-                            serial_ids = [s.id for s in available[:item.quantity]]
-                            results['auto_assigned'] += len(serial_ids)
-                            logger.info(f"   🔄 Auto-asignando {len(serial_ids)} seriales para {laptop.sku}")
-                        else:
-                            # No hay suficientes seriales, proceder sin ellos
-                            logger.warning(f"   ⚠️ No hay suficientes seriales para {laptop.sku}")
-
-                    # Asignar seriales al item
-                    if serial_ids:
-                        success, assign_result = SerialService.assign_serials_to_invoice_item(
-                            invoice_item=item,
-                            serial_ids=serial_ids,
-                            user_id=user_id
-                        )
-
-                        if not success:
-                            return False, f'Error asignando seriales: {assign_result}'
-
-                        results['serials_assigned'] += len(assign_result.get('assigned', []))
-
-                        # Log de seriales asignados
-                        for serial in assign_result.get('assigned', []):
-                            logger.info(f"   ✅ Serial {serial.serial_number} asignado")
-                            results['details'].append({
-                                'laptop_sku': laptop.sku,
-                                'serial': serial.serial_number,
-                                'action': 'assigned'
-                            })
-
-                    # Actualizar cantidad del laptop
-                    old_quantity = laptop.quantity
-                    laptop.quantity -= item.quantity
+                    serials = snapshot.take_available(laptop.id, item.quantity)
+                    if serials:
+                        results['auto_assigned'] += len(serials)
+                        logger.info(f"   🔄 Auto-asignando {len(serials)} seriales para {laptop.sku}")
+                    else:
+                        # No hay suficientes seriales, proceder sin ellos
+                        logger.warning(f"   ⚠️ No hay suficientes seriales para {laptop.sku}")
 
-                    if laptop.quantity == 0:
-                        laptop.sale_date = datetime.now().date()
+                if serials:
+                    assignments.append((item, serials))
+                    for serial in serials:
+                        logger.info(f"   ✅ Serial {serial.serial_number} asignado")
+                        results['details'].append({
+                            'laptop_sku': laptop.sku,
+                            'serial': serial.serial_number,
+                            'action': 'assigned'
+                        })
 
-                    logger.info(f"   📦 {laptop.sku}: {old_quantity} → {laptop.quantity} (-{item.quantity})")
+                # Actualizar cantidad del laptop
+                old_quantity = laptop.quantity
+                laptop.quantity -= item.quantity
 
-                    results['items_processed'] += 1
+                if laptop.quantity == 0:
+                    laptop.sale_date = datetime.now().date()
+
+                logger.info(f"   📦 {laptop.sku}: {old_quantity} → {laptop.quantity} (-{item.quantity})")
+
+                results['items_processed'] += 1
+
+            # Relaciones y movimientos de todas las líneas en INSERT por lotes
+            results['serials_assigned'] += StockAllocator.write_assignments(assignments, user_id=user_id)
 
             db.session.commit()
 
@@ -468,11 +448,12 @@ class InvoiceInventoryService(InvoiceInventoryServiceWithSerials):
     """Alias para compatibilidad con código existente"""
 
     @staticmethod
-    def validate_stock_for_invoice_items(items_data):
+    def validate_stock_for_invoice_items(items_data, invoice_id=None):
         """Versión compatible sin requerir seriales"""
         valid, error, warnings = InvoiceInventoryServiceWithSerials.validate_stock_for_invoice_items(
             items_data,
-            require_serials=False
+            require_serials=False,
+            invoice_id=invoice_id
         )
         return valid, error
 
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# PARTITION SERVICE - Particiones Mensuales y Retención
+# ============================================
+# Responsabilidad: mantener las tablas de solo-inserción (audit_logs,
+# serial_movements) acotadas en tamaño.
+#
+# En PostgreSQL las tablas están particionadas por RANGE (created_at), una
+# partición por mes más una partición DEFAULT (ver migración
+# d9a2f6b3c8e1_partition_audit_and_movements):
+# - ensure_partitions() crea las particiones de los próximos meses
+# - archive() vuelca cada mes vencido a un JSONL comprimido (gzip) en
+#   PARTITION_ARCHIVE_DIR y luego hace DETACH + DROP de la partición
+# - restore() vuelve a cargar un archivo en su mes
+#
+# En SQLite (tests/desarrollo) no hay particiones: los "meses" se obtienen
+# de created_at y archivar = exportar + DELETE del rango.
+
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import func, select, text
+
+from app import db
+from app.models.audit_log import AuditLog
+from app.models.serial import SerialMovement
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionService:
+    """Servicio de particiones mensuales, archivo y restauración"""
+
+    # Tabla -> modelo
+    TABLES = {
+        'audit_logs': AuditLog,
+        'serial_movements': SerialMovement,
+    }
+
+    # Meses que se conservan en la tabla (configurable con PARTITION_RETENTION_MONTHS)
+    DEFAULT_RETENTION_MONTHS = {
+        'audit_logs': 12,
+        'serial_movements': 24,
+    }
+
+    # Particiones creadas por adelantado
+    MONTHS_AHEAD = 3
+
+    # Filas por lote al exportar/restaurar
+    BATCH_SIZE = 2000
+
+    # ===== UTILIDADES =====
+
+    @staticmethod
+    def is_postgres():
+        """True si la base de datos es PostgreSQL"""
+        return db.engine.dialect.name == 'postgresql'
+
+    @staticmethod
+    def month_start(value):
+        """Primer día del mes de una fecha"""
+        return date(value.year, value.month, 1)
+
+    @staticmethod
+    def add_months(month, count):
+        """Suma (o resta) meses a un primer día de mes"""
+        index = month.year * 12 + month.month - 1 + count
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def parse_month(value):
+        """'2026-03' -> date(2026, 3, 1)"""
+        return datetime.strptime(value, '%Y-%m').date()
+
+    @staticmethod
+    def partition_name(table, month):
+        """Nombre de la partición: audit_logs_y2026m03"""
+        return f'{table}_y{month.year}m{month.month:02d}'
+
+    @staticmethod
+    def archive_path(table, month):
+        """Ruta del archivo de un mes archivado"""
+        directory = current_app.config.get('PARTITION_ARCHIVE_DIR') or os.path.join(
+            current_app.instance_path, 'archive'
+        )
+        return os.path.join(directory, table, f'{table}_{month:%Y_%m}.jsonl.gz')
+
+    @staticmethod
+    def retention_months(table):
+        """Meses a conservar para una tabla"""
+        configured = current_app.config.get('PARTITION_RETENTION_MONTHS') or {}
+        return configured.get(table, PartitionService.DEFAULT_RETENTION_MONTHS[table])
+
+    @staticmethod
+    def _table(table):
+        if table not in PartitionService.TABLES:
+            raise ValueError(f'Tabla no particionada: {table}')
+        return PartitionService.TABLES[table].__table__
+
+    @staticmethod
+    def _month_range(table, month):
+        """Condición created_at dentro del mes"""
+        created_at = PartitionService._table(table).c.created_at
+        return (created_at >= month) & (created_at < PartitionService.add_months(month, 1))
+
+    # ===== PARTICIONES =====
+
+    @staticmethod
+    def list_months(table):
+        """
+        Meses con datos en la tabla
+
+        PostgreSQL: particiones mensuales existentes (sin contar DEFAULT) más
+        los meses presentes en DEFAULT. SQLite: meses presentes en created_at.
+        """
+        table_obj = PartitionService._table(table)
+
+        if not PartitionService.is_postgres():
+            month = func.strftime('%Y-%m', table_obj.c.created_at)
+            rows = db.session.execute(select(month).distinct().order_by(month)).scalars()
+            return [PartitionService.parse_month(value) for value in rows if value]
+
+        names = db.session.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ), {'table': table}).scalars()
+
+        months = set()
+        prefix = f'{table}_y'
+        for name in names:
+            if name.startswith(prefix):
+                months.add(datetime.strptime(name[len(prefix):], '%Ym%m').date())
+
+        default_months = db.session.execute(text(
+            f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {table}_default"
+        )).scalars()
+        months.update(default_months)
+        return sorted(months)
+
+    @staticmethod
+    def has_partition(table, month):
+        """True si existe la partición mensual (solo PostgreSQL)"""
+        if not PartitionService.is_postgres():
+            return False
+        return db.session.execute(
+            text('SELECT to_regclass(:name) IS NOT NULL'),
+            {'name': PartitionService.partition_name(table, month)}
+        ).scalar()
+
+    @staticmethod
+    def create_partition(table, month):
+        """
+        Crea la partición de un mes (solo PostgreSQL)
+
+        Si la partición DEFAULT ya tiene filas de ese mes, se mueven a la
+        partición nueva dentro de la misma transacción.
+        """
+        if not PartitionService.is_postgres() or PartitionService.has_partition(table, month):
+            return False
+
+        name = PartitionService.partition_name(table, month)
+        start, end = month.isoformat(), PartitionService.add_months(month, 1).isoformat()
+        in_month = f"created_at >= '{start}' AND created_at < '{end}'"
+
+        db.session.execute(text(f'CREATE TEMP TABLE _partition_rows ON COMMIT DROP AS '
+                                f'SELECT * FROM {table}_default WHERE {in_month}'))
+        db.session.execute(text(f'DELETE FROM {table}_default WHERE {in_month}'))
+        db.session.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        db.session.execute(text(f'INSERT INTO {table} SELECT * FROM _partition_rows'))
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def ensure_partitions(months_ahead=None, today=None):
+        """
+        Crea las particiones del mes actual y los próximos meses
+
+        Returns:
+            list: Nombres de las particiones creadas
+        """
+        if not PartitionService.is_postgres():
+            return []
+
+        months_ahead = PartitionService.MONTHS_AHEAD if months_ahead is None else months_ahead
+        current = PartitionService.month_start(today or date.today())
+        created = []
+        for table in PartitionService.TABLES:
+            for offset in range(months_ahead + 1):
+                month = PartitionService.add_months(current, offset)
+                if PartitionService.create_partition(table, month):
+                    created.append(PartitionService.partition_name(table, month))
+        return created
+
+    # ===== ARCHIVO =====
+
+    @staticmethod
+    def _serialize(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def export_month(table, month, path=None):
+        """
+        Escribe las filas de un mes en JSONL comprimido (escritura atómica)
+
+        Returns:
+            tuple: (ruta, filas escritas)
+        """
+        table_obj = PartitionService._table(table)
+        path = path or PartitionService.archive_path(table, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        query = select(table_obj).where(PartitionService._month_range(table, month)).order_by(table_obj.c.id)
+        result = db.session.execute(query.execution_options(yield_per=PartitionService.BATCH_SIZE))
+
+        rows = 0
+        tmp_path = f'{path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+            for row in result.mappings():
+                record = {key: PartitionService._serialize(value) for key, value in row.items()}
+                archive.write(json.dumps(record, ensure_ascii=False) + '\n')
+                rows += 1
+        os.replace(tmp_path, path)
+        return path, rows
+
+    @staticmethod
+    def drop_month(table, month):
+        """Quita un mes de la tabla: DETACH + DROP de la partición o DELETE del rango"""
+        if PartitionService.has_partition(table, month):
+            name = PartitionService.partition_name(table, month)
+            db.session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {name}'))
+            db.session.execute(text(f'DROP TABLE {name}'))
+        else:
+            db.session.execute(PartitionService._table(table).delete().where(
+                PartitionService._month_range(table, month)
+            ))
+        db.session.commit()
+
+    @staticmethod
+    def archive(table, before=None, dry_run=False):
+        """
+        Archiva y elimina de la tabla los meses anteriores a `before`
+
+        Args:
+            table: 'audit_logs' o 'serial_movements'
+            before: Primer mes que se conserva (default: hoy - retención)
+            dry_run: Solo listar los meses que se archivarían
+
+        Returns:
+            list: [{'month', 'rows', 'path'}] por mes archivado
+        """
+        if before is None:
+            current = PartitionService.month_start(date.today())
+            before = PartitionService.add_months(current, -PartitionService.retention_months(table))
+
+        results = []
+        for month in PartitionService.list_months(table):
+            if month >= before:
+                continue
+            if dry_run:
+                results.append({'month': month, 'rows': None, 'path': None})
+                continue
+
+            path, rows = PartitionService.export_month(table, month)
+            PartitionService.drop_month(table, month)
+            logger.info(f"Archivado {table} {month:%Y-%m}: {rows} filas -> {path}")
+            results.append({'month': month, 'rows': rows, 'path': path})
+        return results
+
+    @staticmethod
+    def restore(table, month, path=None):
+        """
+        Vuelve a cargar un mes archivado (omite los IDs que ya existen)
+
+        Returns:
+            int: Filas insertadas
+        """
+        table_obj = PartitionService._table(table)
+        path = path or PartitionService.archive_path(table, month)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'No existe el archivo {path}')
+
+        PartitionService.create_partition(table, month)
+
+        existing = set(db.session.execute(
+            select(table_obj.c.id).where(PartitionService._month_range(table, month))
+        ).scalars())
+        datetime_columns = [
+            column.name for column in table_obj.columns if isinstance(column.type, db.DateTime)
+        ]
+
+        inserted, batch = 0, []
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                record = json.loads(line)
+                if record['id'] in existing:
+                    continue
+                for name in datetime_columns:
+                    if record.get(name):
+                        record[name] = datetime.fromisoformat(record[name])
+                batch.append(record)
+                if len(batch) >= PartitionService.BATCH_SIZE:
+                    db.session.execute(table_obj.insert(), batch)
+                    inserted, batch = inserted + len(batch), []
+
+        if batch:
+            db.session.execute(table_obj.insert(), batch)
+            inserted += len(batch)
+        db.session.commit()
+        return inserted
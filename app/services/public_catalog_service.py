@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# PUBLIC CATALOG SERVICE - API v2 del Catálogo Público
+# ============================================
+# Responsabilidad: filtrar en servidor, paginar por keyset sobre
+# (created_at, id) y serializar solo los campos pedidos
+
+import base64
+from datetime import date, datetime, timedelta
+
+from flask import url_for
+from sqlalchemy import and_, case, or_
+from sqlalchemy.orm import selectinload
+
+from app.models.laptop import Laptop
+
+
+class CatalogQueryError(ValueError):
+    """Parámetro inválido en la consulta del catálogo (cursor, campos, etc.)"""
+
+
+class PublicCatalogService:
+    """Servicio de consulta del catálogo público (API v2)"""
+
+    DEFAULT_LIMIT = 24
+    MAX_LIMIT = 100
+
+    # Filtros por lista de IDs: parámetro -> columna
+    ID_FILTERS = {
+        'brand': Laptop.brand_id,
+        'model': Laptop.model_id,
+        'processor': Laptop.processor_id,
+        'gpu': Laptop.graphics_card_id,
+        'ram': Laptop.ram_id,
+        'storage': Laptop.storage_id,
+        'screen': Laptop.screen_id,
+    }
+
+    # Filtros por lista de valores: parámetro -> columna
+    VALUE_FILTERS = {
+        'condition': Laptop.condition,
+        'category': Laptop.category,
+    }
+
+    CONDITION_DISPLAY = {
+        'new': 'Nuevo',
+        'used': 'Usado',
+        'refurbished': 'Reacondicionado'
+    }
+
+    # Campos por defecto (tarjeta del catálogo)
+    DEFAULT_FIELDS = ('id', 'name', 'brand', 'price', 'old_price', 'image', 'cpu', 'ram', 'ssd', 'condition', 'url')
+
+    # Campo -> relaciones que necesita cargar
+    FIELD_RELATIONS = {
+        'brand': ('brand',),
+        'model': ('model',),
+        'cpu': ('processor',),
+        'gpu': ('graphics_card',),
+        'ram': ('ram',),
+        'ssd': ('storage',),
+        'screen': ('screen',),
+        'os': ('operating_system',),
+        'image': ('images',),
+    }
+
+    # ===== FILTROS =====
+
+    @staticmethod
+    def _id_list(value):
+        """'1,2,3' -> [1, 2, 3]"""
+        try:
+            return [int(v) for v in value.split(',') if v.strip()]
+        except ValueError:
+            raise CatalogQueryError(f'Lista de IDs inválida: {value}')
+
+    @staticmethod
+    def effective_price():
+        """
+        Precio mostrado: el descuento solo si es positivo y menor que el precio
+        de venta. La misma expresión filtra y se selecciona para serializar.
+        """
+        return case(
+            (and_(Laptop.discount_price > 0, Laptop.discount_price < Laptop.sale_price), Laptop.discount_price),
+            else_=Laptop.sale_price
+        )
+
+    @staticmethod
+    def build_filters(args):
+        """
+        Construye las condiciones SQL a partir de los parámetros de la URL
+
+        Args:
+            args: request.args (brand, model, processor, gpu, ram, storage,
+                  screen, condition, category, min_price, max_price)
+
+        Returns:
+            list: Condiciones para Query.filter()
+        """
+        conditions = [Laptop.is_published == True, Laptop.quantity > 0]
+
+        for param, column in PublicCatalogService.ID_FILTERS.items():
+            if args.get(param):
+                conditions.append(column.in_(PublicCatalogService._id_list(args[param])))
+
+        for param, column in PublicCatalogService.VALUE_FILTERS.items():
+            if args.get(param):
+                conditions.append(column.in_([v.strip() for v in args[param].split(',') if v.strip()]))
+
+        price = PublicCatalogService.effective_price()
+        for param, operator in (('min_price', '__ge__'), ('max_price', '__le__')):
+            if args.get(param):
+                try:
+                    conditions.append(getattr(price, operator)(float(args[param])))
+                except ValueError:
+                    raise CatalogQueryError(f'Precio inválido: {args[param]}')
+
+        return conditions
+
+    # ===== CURSOR (KEYSET) =====
+
+    @staticmethod
+    def encode_cursor(laptop):
+        """Cursor opaco con la posición (created_at, id) del último elemento"""
+        raw = f'{laptop.created_at.isoformat()}|{laptop.id}'
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Inverso de encode_cursor(). Retorna (created_at, id)"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, laptop_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+            return datetime.fromisoformat(created_at), int(laptop_id)
+        except (ValueError, UnicodeDecodeError):
+            raise CatalogQueryError('Cursor inválido')
+
+    @staticmethod
+    def keyset_condition(cursor):
+        """Elementos posteriores al cursor en orden (created_at DESC, id DESC)"""
+        created_at, laptop_id = PublicCatalogService.decode_cursor(cursor)
+        return or_(
+            Laptop.created_at < created_at,
+            and_(Laptop.created_at == created_at, Laptop.id < laptop_id)
+        )
+
+    # ===== CAMPOS =====
+
+    @staticmethod
+    def parse_fields(value):
+        """'id,name,price' -> tupla de campos válidos (o los de por defecto)"""
+        if not value:
+            return PublicCatalogService.DEFAULT_FIELDS
+
+        fields = tuple(f.strip() for f in value.split(',') if f.strip())
+        unknown = [f for f in fields if f not in FIELD_SERIALIZERS and f not in PRICE_SERIALIZERS]
+        if unknown:
+            raise CatalogQueryError(f"Campos desconocidos: {', '.join(unknown)}")
+        return fields
+
+    @staticmethod
+    def serialize(laptop, fields, price):
+        """Serializa solo los campos pedidos (price: valor de effective_price())"""
+        return {
+            field: PRICE_SERIALIZERS[field](laptop, price) if field in PRICE_SERIALIZERS
+            else FIELD_SERIALIZERS[field](laptop)
+            for field in fields
+        }
+
+    # ===== CONSULTA =====
+
+    @staticmethod
+    def get_page(args):
+        """
+        Página del catálogo filtrada en servidor con paginación keyset
+
+        Args:
+            args: request.args (filtros + cursor, limit, fields)
+
+        Returns:
+            dict: {'items', 'next_cursor', 'has_more', 'fields'}
+
+        Raises:
+            CatalogQueryError: Si algún parámetro es inválido
+        """
+        fields = PublicCatalogService.parse_fields(args.get('fields'))
+
+        try:
+            limit = int(args.get('limit', PublicCatalogService.DEFAULT_LIMIT))
+        except ValueError:
+            raise CatalogQueryError('limit debe ser un número')
+        limit = max(1, min(limit, PublicCatalogService.MAX_LIMIT))
+
+        query = Laptop.query.add_columns(
+            PublicCatalogService.effective_price().label('effective_price')
+        ).filter(*PublicCatalogService.build_filters(args))
+
+        if args.get('cursor'):
+            query = query.filter(PublicCatalogService.keyset_condition(args['cursor']))
+
+        # Cargar solo las relaciones que usan los campos pedidos
+        relations = {rel for f in fields for rel in PublicCatalogService.FIELD_RELATIONS.get(f, ())}
+        if relations:
+            query = query.options(*[selectinload(getattr(Laptop, rel)) for rel in sorted(relations)])
+
+        # Se pide un elemento extra para saber si hay más páginas
+        rows = query.order_by(Laptop.created_at.desc(), Laptop.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            'items': [PublicCatalogService.serialize(laptop, fields, price) for laptop, price in rows],
+            'next_cursor': PublicCatalogService.encode_cursor(rows[-1][0]) if has_more else None,
+            'has_more': has_more,
+            'fields': list(fields)
+        }
+
+
+# ============================================
+# SERIALIZADORES POR CAMPO
+# ============================================
+
+def _image_url(laptop):
+    cover_image = next((img for img in laptop.images if img.is_cover), None)
+    if cover_image is None and laptop.images:
+        cover_image = laptop.images[0]
+    filename = cover_image.image_path if cover_image else 'images/default-laptop.jpg'
+    return url_for('static', filename=filename, _external=True)
+
+
+def _old_price(laptop, price):
+    if float(price) < float(laptop.sale_price):
+        return float(laptop.sale_price)
+    return None
+
+
+# Campos de precio: reciben el effective_price() seleccionado en la consulta
+PRICE_SERIALIZERS = {
+    'price': lambda l, price: float(price),
+    'old_price': _old_price,
+    'is_sale': lambda l, price: _old_price(l, price) is not None,
+}
+
+
+FIELD_SERIALIZERS = {
+    'id': lambda l: l.id,
+    'sku': lambda l: l.sku,
+    'slug': lambda l: l.slug,
+    'name': lambda l: l.display_name,
+    'url': lambda l: url_for('public.product_detail_slug', slug=l.slug),
+    'brand': lambda l: l.brand.name if l.brand else 'Sin marca',
+    'model': lambda l: l.model.name if l.model else 'Sin modelo',
+    'category': lambda l: l.category or 'laptop',
+    'cpu': lambda l: l.processor_full_name or (l.processor.name if l.processor else 'Sin especificar'),
+    'gpu': lambda l: l.discrete_gpu_full_name or l.onboard_gpu_full_name or (
+        l.graphics_card.name if l.graphics_card else 'Integrada'
+    ),
+    'ram': lambda l: l.ram_full_name or (l.ram.name if l.ram else 'No especificado'),
+    'ssd': lambda l: l.storage_full_name or (l.storage.name if l.storage else 'No especificado'),
+    'screen': lambda l: l.screen_full_name or (l.screen.name if l.screen else 'No especificado'),
+    'os': lambda l: (l.operating_system.full_name or l.operating_system.name) if l.operating_system else 'No especificado',
+    'condition': lambda l: l.condition or 'new',
+    'condition_display': lambda l: PublicCatalogService.CONDITION_DISPLAY.get(l.condition, 'Nuevo'),
+    'image': _image_url,
+    'entry_date': lambda l: l.entry_date.isoformat() if l.entry_date else None,
+    'is_new': lambda l: bool(l.entry_date and l.entry_date > date.today() - timedelta(days=30)),
+    'is_featured': lambda l: l.is_featured,
+    'quantity': lambda l: l.quantity,
+    'short_description': lambda l: l.short_description or '',
+}
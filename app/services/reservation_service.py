@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# RESERVATION SERVICE - Reservas de Stock por Factura
+# ============================================
+# Responsabilidad: apartar stock para facturas en borrador/emitidas, de
+# modo que dos facturas abiertas no vendan la misma unidad.
+#
+# - reserve(): un solo UPDATE condicional por operación
+#     UPDATE laptops SET reserved_quantity = reserved_quantity + CASE id ... END
+#     WHERE id IN (...) AND quantity - reserved_quantity >= CASE id ... END
+#     RETURNING id
+#   Las laptops que no aparecen en el RETURNING no tenían stock; los
+#   seriales pasan de 'available' a 'reserved' con otro UPDATE condicional.
+# - Cada reserva vence a las STOCK_RESERVATION_TTL_HOURS; release_expired()
+#   (comando `release-expired-reservations`, p. ej. desde cron) las libera.
+# - Al pagar la factura, process_sale_with_serials consume su reserva
+#   dentro de la misma transacción de la venta.
+#
+# Disponibilidad = Laptop.quantity - Laptop.reserved_quantity
+# (Laptop.available_quantity, con índice idx_laptop_available).
+
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, insert, select, update
+
+from app import db
+from app.models.laptop import Laptop
+from app.models.serial import LaptopSerial, SerialMovement, StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationService:
+    """Reservas atómicas de stock y seriales para facturas abiertas"""
+
+    # Estados de factura que mantienen stock apartado
+    RESERVING_STATUSES = ('draft', 'issued', 'overdue')
+
+    DEFAULT_TTL_HOURS = 48
+
+    # ===== UTILIDADES =====
+
+    @staticmethod
+    def ttl():
+        """Vigencia de una reserva nueva"""
+        hours = current_app.config.get('STOCK_RESERVATION_TTL_HOURS') or ReservationService.DEFAULT_TTL_HOURS
+        return timedelta(hours=hours)
+
+    @staticmethod
+    def invoice_lines(invoice, items_data=None):
+        """
+        Cantidades y seriales por laptop de una factura
+
+        Returns:
+            tuple: ({laptop_id: cantidad}, {laptop_id: [serial_ids]})
+        """
+        quantities = {}
+        for item in invoice.items.all():
+            if item.item_type == 'laptop' and item.laptop_id:
+                quantities[item.laptop_id] = quantities.get(item.laptop_id, 0) + item.quantity
+
+        serials = {}
+        for data in items_data or []:
+            if data.get('laptop_id') and data.get('serial_ids'):
+                laptop_id = int(data['laptop_id'])
+                if laptop_id in quantities:
+                    serials.setdefault(laptop_id, []).extend(int(s) for s in data['serial_ids'])
+        return quantities, serials
+
+    @staticmethod
+    def _adjust_reserved(quantities, sign):
+        """
+        Suma (sign=1, condicionado al stock libre) o resta (sign=-1) cantidades
+        reservadas en un solo UPDATE
+
+        Returns:
+            set: IDs de laptops actualizadas
+        """
+        if not quantities:
+            return set()
+
+        table = Laptop.__table__
+        delta = case(quantities, value=table.c.id)
+        statement = update(table).where(table.c.id.in_(list(quantities)))
+
+        if sign > 0:
+            statement = statement.where(table.c.quantity - table.c.reserved_quantity >= delta).values(
+                reserved_quantity=table.c.reserved_quantity + delta
+            )
+        else:
+            remaining = table.c.reserved_quantity - delta
+            statement = statement.values(reserved_quantity=case((remaining < 0, 0), else_=remaining))
+
+        updated = set(db.session.execute(statement.returning(table.c.id)).scalars())
+        ReservationService._expire_laptops(quantities)
+        return updated
+
+    @staticmethod
+    def _set_serial_status(serial_ids, from_status, to_status):
+        """UPDATE condicional de estado. Retorna {serial_id: laptop_id} de los cambiados"""
+        if not serial_ids:
+            return {}
+        table = LaptopSerial.__table__
+        rows = db.session.execute(
+            update(table)
+            .where(table.c.id.in_(list(serial_ids)), table.c.status == from_status)
+            .values(status=to_status, updated_at=datetime.utcnow())
+            .returning(table.c.id, table.c.laptop_id)
+        ).all()
+
+        for instance in list(db.session.identity_map.values()):
+            if isinstance(instance, LaptopSerial) and instance.id in serial_ids:
+                db.session.expire(instance, ['status', 'updated_at'])
+        return dict(rows)
+
+    @staticmethod
+    def _expire_laptops(laptop_ids):
+        """Las instancias cargadas vuelven a leer reserved_quantity"""
+        for instance in list(db.session.identity_map.values()):
+            if isinstance(instance, Laptop) and instance.id in laptop_ids:
+                db.session.expire(instance, ['reserved_quantity'])
+
+    @staticmethod
+    def _log_movements(serial_ids, movement_type, new_status, invoice_id, description, user_id=None):
+        """Movimientos de seriales en un INSERT por lotes"""
+        if serial_ids:
+            previous_status = 'available' if new_status == 'reserved' else 'reserved'
+            db.session.execute(insert(SerialMovement), [
+                {
+                    'serial_id': serial_id,
+                    'movement_type': movement_type,
+                    'previous_status': previous_status,
+                    'new_status': new_status,
+                    'invoice_id': invoice_id,
+                    'description': description,
+                    'user_id': user_id,
+                }
+                for serial_id in serial_ids
+            ])
+
+    # ===== RESERVA =====
+
+    @staticmethod
+    def reserve(invoice_id, quantities, serial_ids=None, user_id=None):
+        """
+        Reserva cantidades y seriales para una factura (sin commit)
+
+        Args:
+            invoice_id: ID de la factura
+            quantities: {laptop_id: cantidad}
+            serial_ids: {laptop_id: [serial_id]} seriales específicos (opcional)
+            user_id: Usuario que reserva
+
+        Returns:
+            list: StockReservation creadas
+
+        Raises:
+            ValueError: Sin stock libre o seriales no disponibles (nada queda reservado)
+        """
+        quantities = {int(k): int(v) for k, v in quantities.items() if int(v) > 0}
+        serial_ids = {int(k): [int(s) for s in v] for k, v in (serial_ids or {}).items()}
+        if not quantities:
+            return []
+
+        reserved = ReservationService._adjust_reserved(quantities, 1)
+        missing = set(quantities) - reserved
+        if missing:
+            # Reservas vencidas que el sweeper aún no liberó: liberarlas y reintentar
+            if ReservationService.release_expired(laptop_ids=missing):
+                reserved |= ReservationService._adjust_reserved({i: quantities[i] for i in missing}, 1)
+                missing = set(quantities) - reserved
+
+        if missing:
+            ReservationService._adjust_reserved({i: quantities[i] for i in reserved}, -1)
+            laptops = dict(db.session.execute(
+                select(Laptop.id, Laptop.display_name).where(Laptop.id.in_(missing))
+            ).all())
+            names = ', '.join(laptops.get(i, f'Laptop ID {i}') for i in sorted(missing))
+            raise ValueError(f'Stock insuficiente para reservar: {names}')
+
+        # Seriales: available -> reserved solo si pertenecen a la laptop de la línea
+        wanted = {serial_id: laptop_id for laptop_id, ids in serial_ids.items() for serial_id in ids}
+        changed = ReservationService._set_serial_status(set(wanted), 'available', 'reserved')
+        wrong = [s for s in wanted if changed.get(s) != wanted[s]]
+        if wrong:
+            ReservationService._set_serial_status(set(changed), 'reserved', 'available')
+            ReservationService._adjust_reserved(quantities, -1)
+            raise ValueError(f'Serial ID {wrong[0]} no está disponible para reservar')
+
+        expires_at = datetime.utcnow() + ReservationService.ttl()
+        reservations = [
+            StockReservation(
+                invoice_id=invoice_id,
+                laptop_id=laptop_id,
+                quantity=quantity,
+                serial_ids=serial_ids.get(laptop_id) or None,
+                status='active',
+                expires_at=expires_at,
+                created_by_id=user_id
+            )
+            for laptop_id, quantity in quantities.items()
+        ]
+        db.session.add_all(reservations)
+        ReservationService._log_movements(
+            list(wanted), 'reserved', 'reserved', invoice_id, f'Reservado para factura ID {invoice_id}', user_id
+        )
+        return reservations
+
+    @staticmethod
+    def reserve_invoice(invoice, items_data=None, user_id=None):
+        """Reserva las líneas de laptop de una factura (ver reserve)"""
+        quantities, serial_ids = ReservationService.invoice_lines(invoice, items_data)
+        return ReservationService.reserve(invoice.id, quantities, serial_ids, user_id)
+
+    # ===== LIBERACIÓN =====
+
+    @staticmethod
+    def _release(reservations, status, user_id=None):
+        """Devuelve al stock libre un conjunto de reservas activas (sin commit)"""
+        if not reservations:
+            return 0
+
+        quantities, serials = {}, {}
+        for reservation in reservations:
+            quantities[reservation.laptop_id] = quantities.get(reservation.laptop_id, 0) + reservation.quantity
+            for serial_id in reservation.serial_ids or []:
+                serials[serial_id] = reservation.invoice_id
+
+        ReservationService._adjust_reserved(quantities, -1)
+        released = ReservationService._set_serial_status(set(serials), 'reserved', 'available')
+
+        for invoice_id in set(serials.values()):
+            ReservationService._log_movements(
+                [s for s in released if serials[s] == invoice_id], 'released', 'available', invoice_id,
+                f'Reserva de factura ID {invoice_id} liberada ({status})', user_id
+            )
+
+        table = StockReservation.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id.in_([r.id for r in reservations]), table.c.status == 'active')
+            .values(status=status, released_at=datetime.utcnow())
+        )
+        for reservation in reservations:
+            db.session.expire(reservation, ['status', 'released_at'])
+        return len(reservations)
+
+    @staticmethod
+    def active_for_invoice(invoice_id, lock=False):
+        """Reservas activas de una factura"""
+        query = StockReservation.query.filter_by(invoice_id=invoice_id, status='active').order_by(StockReservation.id)
+        if lock:
+            query = query.with_for_update()
+        return query.all()
+
+    @staticmethod
+    def release_invoice(invoice_id, status='released', user_id=None):
+        """
+        Libera las reservas activas de una factura (sin commit)
+
+        Args:
+            status: 'released' (edición/cancelación/borrado) o 'consumed' (venta)
+
+        Returns:
+            int: Reservas liberadas
+        """
+        reservations = ReservationService.active_for_invoice(invoice_id, lock=True)
+        return ReservationService._release(reservations, status, user_id)
+
+    @staticmethod
+    def consume_invoice(invoice_id, user_id=None):
+        """
+        Pasa la reserva de una factura a la venta (sin commit)
+
+        Returns:
+            dict: {laptop_id: [serial_ids]} seriales que estaban reservados,
+                  para venderlos a ellos y no a otros
+        """
+        reservations = ReservationService.active_for_invoice(invoice_id, lock=True)
+        serials = {r.laptop_id: list(r.serial_ids) for r in reservations if r.serial_ids}
+        ReservationService._release(reservations, 'consumed', user_id)
+        return serials
+
+    @staticmethod
+    def held_by(invoice_id):
+        """
+        Stock que una factura ya tiene apartado
+
+        Returns:
+            dict: {'quantity': {laptop_id: cantidad}, 'serials': set(serial_ids)}
+        """
+        held = {'quantity': {}, 'serials': set()}
+        for reservation in ReservationService.active_for_invoice(invoice_id):
+            quantity = held['quantity']
+            quantity[reservation.laptop_id] = quantity.get(reservation.laptop_id, 0) + reservation.quantity
+            held['serials'].update(reservation.serial_ids or [])
+        return held
+
+    @staticmethod
+    def release_expired(now=None, laptop_ids=None, limit=500):
+        """
+        Sweeper: libera las reservas activas vencidas (sin commit)
+
+        Args:
+            now: Momento de referencia (default: ahora)
+            laptop_ids: Limitar a estas laptops
+            limit: Reservas por lote
+
+        Returns:
+            int: Reservas liberadas en este lote
+        """
+        query = StockReservation.query.filter(
+            StockReservation.status == 'active',
+            StockReservation.expires_at < (now or datetime.utcnow())
+        )
+        if laptop_ids:
+            query = query.filter(StockReservation.laptop_id.in_(list(laptop_ids)))
+
+        expired = query.order_by(StockReservation.id).limit(limit).with_for_update(skip_locked=True).all()
+        count = ReservationService._release(expired, 'expired')
+        if count:
+            logger.info(f"⏱️ {count} reservas de stock vencidas liberadas")
+        return count
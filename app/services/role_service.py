@@ -5,9 +5,12 @@
 # Lógica de negocio para gestión de roles
 
 from app import db
+from app.extensions import result_cache
 from app.models.role import Role
 from app.models.permission import Permission
 from app.models.user import User
+from app.models.rbac_associations import user_roles
+from flask import g, has_app_context
 from flask_login import current_user
 
 
@@ -21,6 +24,22 @@ class RoleService:
     - Asignar/remover roles a usuarios
     """
     
+    @staticmethod
+    def bump_permissions_version():
+        """
+        Incrementa la versión de roles/permisos: invalida los conjuntos de
+        permisos compilados de todos los usuarios (User.get_permission_set).
+
+        Se llama después del commit de cualquier cambio de asignaciones,
+        sincronización o expiración.
+        """
+        result_cache.invalidate(User.PERMISSION_SET_TAG)
+        if has_app_context():
+            g.pop('_permission_sets', None)
+            # Los roles leídos por el preámbulo de la petición ya no son vigentes
+            if g.get('_request_auth'):
+                g._request_auth['role_ids'] = None
+    
     @staticmethod
     def create_role(name, display_name, description=None, is_system_role=False, created_by_id=None):
         """
@@ -166,6 +185,7 @@ class RoleService:
                 setattr(role, field, value)
         
         db.session.commit()
+        RoleService.bump_permissions_version()
         
         return role
     
@@ -192,6 +212,7 @@ class RoleService:
         
         db.session.delete(role)
         db.session.commit()
+        RoleService.bump_permissions_version()
     
     @staticmethod
     def assign_permission_to_role(role_id, permission_id, granted_by_id=None):
@@ -227,6 +248,7 @@ class RoleService:
         if permission not in role.permissions:
             role.permissions.append(permission)
             db.session.commit()
+            RoleService.bump_permissions_version()
         
         return role
     
@@ -263,6 +285,7 @@ class RoleService:
         if permission in role.permissions:
             role.permissions.remove(permission)
             db.session.commit()
+            RoleService.bump_permissions_version()
         
         return role
     
@@ -300,6 +323,7 @@ class RoleService:
                 role.permissions.append(permission)
         
         db.session.commit()
+        RoleService.bump_permissions_version()
         
         return role
     
@@ -336,6 +360,7 @@ class RoleService:
         role.permissions = permissions
         
         db.session.commit()
+        RoleService.bump_permissions_version()
         
         return role
     
@@ -373,6 +398,7 @@ class RoleService:
         if role not in user.roles:
             user.roles.append(role)
             db.session.commit()
+            RoleService.bump_permissions_version()
         
         return user
     
@@ -409,6 +435,7 @@ class RoleService:
         if role in user.roles:
             user.roles.remove(role)
             db.session.commit()
+            RoleService.bump_permissions_version()
         
         return user
     
@@ -434,9 +461,43 @@ class RoleService:
         # Reemplazar roles
         user.roles = roles
         db.session.commit()
+        RoleService.bump_permissions_version()
         
         return user
     
+    @staticmethod
+    def set_user_role_expiration(user_id, role_id, expires_at=None, is_active=None):
+        """
+        Cambia la expiración (y opcionalmente el estado) de un rol asignado
+        
+        Args:
+            user_id (int): ID del usuario
+            role_id (int): ID del rol
+            expires_at (datetime, optional): Fecha de expiración (None = permanente)
+            is_active (bool, optional): Activar/desactivar la asignación
+        
+        Raises:
+            ValueError: Si el usuario no tiene ese rol asignado
+        
+        Ejemplo:
+            RoleService.set_user_role_expiration(5, 2, datetime(2026, 12, 31))
+        """
+        values = {'expires_at': expires_at}
+        if is_active is not None:
+            values['is_active'] = is_active
+        
+        result = db.session.execute(
+            user_roles.update().where(
+                user_roles.c.user_id == user_id,
+                user_roles.c.role_id == role_id
+            ).values(**values)
+        )
+        if not result.rowcount:
+            raise ValueError(f"El usuario {user_id} no tiene asignado el rol {role_id}")
+        
+        db.session.commit()
+        RoleService.bump_permissions_version()
+    
     @staticmethod
     def get_users_with_role(role_id):
         """
@@ -513,5 +574,6 @@ class RoleService:
         # Copiar permisos
         new_role.permissions = list(source_role.permissions)
         db.session.commit()
+        RoleService.bump_permissions_version()
         
         return new_role
@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# SALES FACT SERVICE - Rollup Diario de Ventas
+# ============================================
+# Responsabilidad: mantener daily_sales_facts de forma incremental
+# y exponer consultas agregadas para dashboard y reportes.
+#
+# El refresco es por dia: cuando cambia una factura se borran y
+# recalculan las filas de los dias afectados dentro de la misma
+# transaccion del request, asi el rollup nunca queda desfasado.
+#
+# Las filas de linea copian el costo, la marca y la categoria de la
+# laptop. Si esos datos cambian despues, los dias donde se vendio se
+# recalculan al hacer commit (ver register_snapshot_events), igual que
+# lo haria la agregacion en vivo.
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, case, inspect, literal, null, insert, select, or_
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.laptop import Laptop, Brand, LaptopModel
+from app.models.sales_fact import DailySalesFact
+
+
+class SalesFactService:
+    """Servicio para el rollup diario de ventas y COGS"""
+
+    # Estados de factura que cuentan como venta
+    SALE_STATUSES = ['issued', 'paid', 'completed', 'overdue', 'pending']
+
+    # Datos de la laptop copiados en las filas de linea
+    LAPTOP_SNAPSHOT_FIELDS = ('purchase_cost', 'brand_id', 'category')
+
+    # Columnas en el orden de los INSERT ... SELECT
+    FACT_COLUMNS = [
+        'fact_date', 'item_type', 'laptop_id', 'product_id', 'brand_name',
+        'category_name', 'payment_method', 'status',
+        'units_sold', 'revenue', 'cost', 'margin_sum', 'line_count',
+        'invoice_count', 'subtotal', 'tax_amount', 'total', 'refreshed_at'
+    ]
+
+    # ============================================
+    # MANTENIMIENTO
+    # ============================================
+
+    @staticmethod
+    def _line_facts_select(invoice_condition, refreshed_at):
+        """SELECT agregado de items de factura con la forma de daily_sales_facts"""
+        from app.models.product import Product, ProductCategory
+
+        unit_cost = func.coalesce(Laptop.purchase_cost, Product.purchase_cost, 0)
+        brand_name = func.coalesce(Brand.name, Product.brand)
+        category_name = func.coalesce(Laptop.category, ProductCategory.name)
+
+        return select(
+            Invoice.invoice_date,
+            InvoiceItem.item_type,
+            InvoiceItem.laptop_id,
+            InvoiceItem.product_id,
+            brand_name,
+            category_name,
+            Invoice.payment_method,
+            Invoice.status,
+            func.sum(InvoiceItem.quantity),
+            func.sum(InvoiceItem.line_total),
+            func.sum(InvoiceItem.quantity * unit_cost),
+            func.sum(
+                case(
+                    (InvoiceItem.unit_price > 0,
+                     (InvoiceItem.unit_price - unit_cost) / InvoiceItem.unit_price * 100),
+                    else_=0
+                )
+            ),
+            func.count(InvoiceItem.id),
+            literal(0),
+            literal(0),
+            literal(0),
+            literal(0),
+            literal(refreshed_at)
+        ).select_from(
+            InvoiceItem
+        ).join(
+            Invoice, InvoiceItem.invoice_id == Invoice.id
+        ).outerjoin(
+            Laptop, InvoiceItem.laptop_id == Laptop.id
+        ).outerjoin(
+            Brand, Laptop.brand_id == Brand.id
+        ).outerjoin(
+            Product, InvoiceItem.product_id == Product.id
+        ).outerjoin(
+            ProductCategory, Product.category_id == ProductCategory.id
+        ).where(
+            invoice_condition
+        ).group_by(
+            Invoice.invoice_date,
+            InvoiceItem.item_type,
+            InvoiceItem.laptop_id,
+            InvoiceItem.product_id,
+            brand_name,
+            category_name,
+            Invoice.payment_method,
+            Invoice.status
+        )
+
+    @staticmethod
+    def _invoice_facts_select(invoice_condition, refreshed_at):
+        """SELECT agregado de cabeceras de factura con la forma de daily_sales_facts"""
+        return select(
+            Invoice.invoice_date,
+            literal(DailySalesFact.INVOICE_ROW),
+            null(),
+            null(),
+            null(),
+            null(),
+            Invoice.payment_method,
+            Invoice.status,
+            literal(0),
+            literal(0),
+            literal(0),
+            literal(0),
+            literal(0),
+            func.count(Invoice.id),
+            func.sum(Invoice.subtotal),
+            func.sum(Invoice.tax_amount),
+            func.sum(Invoice.total),
+            literal(refreshed_at)
+        ).where(
+            invoice_condition
+        ).group_by(
+            Invoice.invoice_date,
+            Invoice.payment_method,
+            Invoice.status
+        )
+
+    @staticmethod
+    def _refresh(invoice_condition, fact_condition):
+        """Borra y recalcula las filas del rollup que cumplen las condiciones"""
+        # Asegurar que los cambios pendientes de la factura se vean en el SELECT
+        db.session.flush()
+
+        db.session.execute(
+            DailySalesFact.__table__.delete().where(fact_condition)
+        )
+
+        refreshed_at = datetime.utcnow()
+        table = DailySalesFact.__table__
+        columns = [table.c[name] for name in SalesFactService.FACT_COLUMNS]
+
+        for statement in (
+            SalesFactService._line_facts_select(invoice_condition, refreshed_at),
+            SalesFactService._invoice_facts_select(invoice_condition, refreshed_at)
+        ):
+            db.session.execute(insert(table).from_select(columns, statement))
+
+    @staticmethod
+    def refresh_dates(dates):
+        """
+        Recalcula el rollup de los dias indicados.
+        No hace commit: el caller es responsable.
+
+        Args:
+            dates: Iterable de fechas (date). Se ignoran los None.
+        """
+        dates = sorted({d for d in dates if d is not None})
+        if not dates:
+            return
+
+        SalesFactService._refresh(
+            Invoice.invoice_date.in_(dates),
+            DailySalesFact.fact_date.in_(dates)
+        )
+
+    @staticmethod
+    def refresh_invoice(invoice, *previous_dates):
+        """
+        Recalcula los dias afectados por una factura creada, editada o
+        con cambio de estado. previous_dates permite incluir la fecha
+        anterior si la factura cambio de dia.
+        """
+        SalesFactService.refresh_dates([invoice.invoice_date, *previous_dates])
+
+    @staticmethod
+    def refresh_laptops(laptop_ids=(), brand_ids=()):
+        """
+        Recalcula los dias con ventas de esas laptops (o de laptops de
+        esas marcas) despues de cambiar su costo, marca o categoria.
+        No hace commit: el caller es responsable.
+        """
+        conditions = []
+        if laptop_ids:
+            conditions.append(DailySalesFact.laptop_id.in_(sorted(laptop_ids)))
+        if brand_ids:
+            conditions.append(DailySalesFact.laptop_id.in_(
+                select(Laptop.id).where(Laptop.brand_id.in_(sorted(brand_ids)))
+            ))
+        if not conditions:
+            return
+
+        dates = db.session.scalars(
+            select(DailySalesFact.fact_date).where(
+                DailySalesFact.line_rows(), or_(*conditions)
+            ).distinct()
+        ).all()
+        SalesFactService.refresh_dates(dates)
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None, chunk_days=31):
+        """
+        Reconstruye el rollup completo (o un rango) por bloques de dias,
+        haciendo commit al final de cada bloque.
+
+        Returns:
+            int: Cantidad de bloques procesados
+        """
+        if start_date is None and end_date is None:
+            # Reconstruccion completa: descartar tambien dias sin facturas
+            DailySalesFact.query.delete()
+            db.session.commit()
+
+        if start_date is None or end_date is None:
+            min_date, max_date = db.session.query(
+                func.min(Invoice.invoice_date),
+                func.max(Invoice.invoice_date)
+            ).one()
+            start_date = start_date or min_date
+            end_date = end_date or max_date
+
+        if start_date is None or end_date is None:
+            return 0
+
+        chunks = 0
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            SalesFactService._refresh(
+                Invoice.invoice_date.between(chunk_start, chunk_end),
+                DailySalesFact.fact_date.between(chunk_start, chunk_end)
+            )
+            db.session.commit()
+            chunks += 1
+            chunk_start = chunk_end + timedelta(days=1)
+
+        return chunks
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    @staticmethod
+    def _sale_window(start_date, end_date, statuses=None):
+        """Filtros de rango de fechas y estado sobre el rollup"""
+        return [
+            DailySalesFact.fact_date.between(start_date, end_date),
+            DailySalesFact.status.in_(statuses or SalesFactService.SALE_STATUSES)
+        ]
+
+    @staticmethod
+    def _catalog_lines():
+        """Filas de linea asociadas a una laptop o producto del catalogo"""
+        return [
+            DailySalesFact.line_rows(),
+            or_(DailySalesFact.laptop_id.isnot(None), DailySalesFact.product_id.isnot(None))
+        ]
+
+    @staticmethod
+    def get_period_totals(start_date, end_date, statuses=None):
+        """
+        Ventas (subtotal), cantidad de facturas y COGS del período.
+
+        Las medidas de cabecera son 0 en filas de linea y viceversa,
+        por lo que se pueden sumar juntas en una sola consulta.
+        """
+        row = db.session.query(
+            func.sum(DailySalesFact.subtotal).label('sales'),
+            func.sum(DailySalesFact.invoice_count).label('invoice_count'),
+            func.sum(DailySalesFact.cost).label('cogs')
+        ).filter(
+            *SalesFactService._sale_window(start_date, end_date, statuses)
+        ).one()
+
+        return {
+            'sales': float(row.sales or 0),
+            'invoice_count': int(row.invoice_count or 0),
+            'cogs': float(row.cogs or 0)
+        }
+
+    @staticmethod
+    def get_brand_totals(start_date, end_date):
+        """Lineas, ventas y costo por marca"""
+        return db.session.query(
+            DailySalesFact.brand_name.label('name'),
+            func.sum(DailySalesFact.line_count).label('product_count'),
+            func.sum(DailySalesFact.revenue).label('sale_value'),
+            func.sum(DailySalesFact.cost).label('total_cost')
+        ).filter(
+            *SalesFactService._sale_window(start_date, end_date),
+            *SalesFactService._catalog_lines()
+        ).group_by(
+            DailySalesFact.brand_name
+        ).all()
+
+    @staticmethod
+    def get_category_totals(start_date, end_date):
+        """Unidades e ingresos por tipo de item y categoria"""
+        return db.session.query(
+            DailySalesFact.item_type,
+            DailySalesFact.category_name,
+            func.sum(DailySalesFact.units_sold).label('units_sold'),
+            func.sum(DailySalesFact.revenue).label('revenue')
+        ).filter(
+            *SalesFactService._sale_window(start_date, end_date),
+            *SalesFactService._catalog_lines()
+        ).group_by(
+            DailySalesFact.item_type,
+            DailySalesFact.category_name
+        ).order_by(
+            DailySalesFact.item_type
+        ).all()
+
+    @staticmethod
+    def _laptop_totals_subquery(start_date, end_date, statuses=None):
+        """Subconsulta con medidas agregadas por laptop"""
+        return db.session.query(
+            DailySalesFact.laptop_id.label('laptop_id'),
+            func.sum(DailySalesFact.units_sold).label('units_sold'),
+            func.sum(DailySalesFact.revenue).label('revenue'),
+            func.sum(DailySalesFact.cost).label('cost'),
+            (func.sum(DailySalesFact.margin_sum) /
+             func.nullif(func.sum(DailySalesFact.line_count), 0)).label('margin')
+        ).filter(
+            *SalesFactService._sale_window(start_date, end_date, statuses),
+            DailySalesFact.line_rows(),
+            DailySalesFact.laptop_id.isnot(None)
+        ).group_by(
+            DailySalesFact.laptop_id
+        ).subquery()
+
+    @staticmethod
+    def _product_totals_subquery(start_date, end_date, statuses=None):
+        """Subconsulta con medidas agregadas por producto generico"""
+        return db.session.query(
+            DailySalesFact.product_id.label('product_id'),
+            func.sum(DailySalesFact.units_sold).label('units_sold'),
+            func.sum(DailySalesFact.revenue).label('revenue'),
+            func.sum(DailySalesFact.cost).label('cost'),
+            (func.sum(DailySalesFact.margin_sum) /
+             func.nullif(func.sum(DailySalesFact.line_count), 0)).label('margin')
+        ).filter(
+            *SalesFactService._sale_window(start_date, end_date, statuses),
+            DailySalesFact.line_rows(),
+            DailySalesFact.product_id.isnot(None)
+        ).group_by(
+            DailySalesFact.product_id
+        ).subquery()
+
+    @staticmethod
+    def get_laptop_totals(start_date, end_date, statuses=None, limit=None):
+        """
+        Medidas por laptop con marca, modelo y datos de catalogo.
+        Con limit devuelve solo las laptops de mayor ingreso.
+        """
+        totals = SalesFactService._laptop_totals_subquery(start_date, end_date, statuses)
+
+        query = db.session.query(
+            Laptop.id,
+            Laptop.display_name.label('name'),
+            Laptop.sku,
+            Laptop.category,
+            Brand.name.label('brand_name'),
+            LaptopModel.name.label('model_name'),
+            totals.c.units_sold,
+            totals.c.revenue,
+            (totals.c.revenue - totals.c.cost).label('total_profit'),
+            totals.c.margin
+        ).join(
+            totals, totals.c.laptop_id == Laptop.id
+        ).join(
+            Brand, Laptop.brand_id == Brand.id
+        ).outerjoin(
+            LaptopModel, Laptop.model_id == LaptopModel.id
+        )
+
+        if limit:
+            query = query.order_by(totals.c.revenue.desc()).limit(limit)
+
+        return query.all()
+
+    @staticmethod
+    def get_product_totals(start_date, end_date, statuses=None):
+        """Medidas por producto generico con datos de catalogo"""
+        from app.models.product import Product, ProductCategory
+
+        totals = SalesFactService._product_totals_subquery(start_date, end_date, statuses)
+
+        return db.session.query(
+            Product.id,
+            Product.name.label('name'),
+            Product.sku,
+            Product.brand.label('brand_name'),
+            ProductCategory.name.label('category'),
+            totals.c.units_sold,
+            totals.c.revenue,
+            (totals.c.revenue - totals.c.cost).label('total_profit'),
+            totals.c.margin
+        ).join(
+            totals, totals.c.product_id == Product.id
+        ).join(
+            ProductCategory, Product.category_id == ProductCategory.id
+        ).all()
+
+    @staticmethod
+    def get_revenue_by_item(start_date, end_date):
+        """Ingresos por laptop_id y product_id (para crecimiento vs período anterior)"""
+        rows = db.session.query(
+            DailySalesFact.laptop_id,
+            DailySalesFact.product_id,
+            func.sum(DailySalesFact.revenue).label('revenue')
+        ).filter(
+            *SalesFactService._sale_window(start_date, end_date),
+            *SalesFactService._catalog_lines()
+        ).group_by(
+            DailySalesFact.laptop_id,
+            DailySalesFact.product_id
+        ).all()
+
+        laptops = {}
+        products = {}
+        for row in rows:
+            if row.laptop_id is not None:
+                laptops[row.laptop_id] = laptops.get(row.laptop_id, 0) + float(row.revenue or 0)
+            if row.product_id is not None:
+                products[row.product_id] = products.get(row.product_id, 0) + float(row.revenue or 0)
+
+        return laptops, products
+
+    @staticmethod
+    def invoice_totals_query(start_date, end_date, status=None, payment_method=None):
+        """
+        Consulta base sobre filas de cabecera para reportes de facturacion.
+
+        Args:
+            status: Estado exacto (None o '' = todos)
+            payment_method: Metodo de pago exacto (None o '' = todos)
+        """
+        query = db.session.query(DailySalesFact).filter(
+            DailySalesFact.invoice_rows(),
+            DailySalesFact.fact_date.between(start_date, end_date)
+        )
+
+        if status:
+            query = query.filter(DailySalesFact.status == status)
+        if payment_method:
+            query = query.filter(DailySalesFact.payment_method == payment_method)
+
+        return query
+
+
+# ============================================
+# REFRESCO POR CAMBIOS DE CATALOGO
+# ============================================
+
+_events_registered = []
+
+
+def register_snapshot_events():
+    """
+    Registra listeners de sesion que anotan las laptops cuyo costo, marca o
+    categoria cambio (y las marcas renombradas) y recalculan sus dias del
+    rollup antes del commit, en la misma transaccion
+    """
+    if _events_registered:
+        return
+    _events_registered.append(True)
+
+    def _changed(obj, fields):
+        state = inspect(obj)
+        return any(state.attrs[field].history.has_changes() for field in fields)
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect_changed(session, flush_context):
+        for obj in session.dirty:
+            if isinstance(obj, Laptop) and _changed(obj, SalesFactService.LAPTOP_SNAPSHOT_FIELDS):
+                session.info.setdefault('sales_fact_laptops', set()).add(obj.id)
+            elif isinstance(obj, Brand) and _changed(obj, ('name',)):
+                session.info.setdefault('sales_fact_brands', set()).add(obj.id)
+
+    @event.listens_for(Session, 'before_commit')
+    def _refresh_changed(session):
+        # Lo pendiente se escribe antes para ver todos los cambios
+        if session.dirty:
+            session.flush()
+        laptop_ids = session.info.pop('sales_fact_laptops', None)
+        brand_ids = session.info.pop('sales_fact_brands', None)
+        if laptop_ids or brand_ids:
+            SalesFactService.refresh_laptops(laptop_ids or (), brand_ids or ())
+
+    @event.listens_for(Session, 'after_soft_rollback')
+    def _discard_changed(session, previous_transaction):
+        if not previous_transaction.nested:
+            session.info.pop('sales_fact_laptops', None)
+            session.info.pop('sales_fact_brands', None)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# SALES TREND SERVICE - Tendencias de Ventas Agrupadas
+# ============================================
+# Responsabilidad: calcular todos los buckets de un período
+# (hora / día / mes) en una sola consulta agrupada
+
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import func, extract, literal, select, union_all
+
+from app import db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.laptop import Laptop
+from app.models.expense import Expense
+
+
+class SalesTrendService:
+    """Servicio para construir series de ventas y ganancia por período"""
+
+    # Estados de factura que cuentan como venta
+    SALE_STATUSES = ['issued', 'paid', 'completed', 'overdue', 'pending']
+
+    # Granularidad por período
+    GRANULARITY = {
+        'today': 'hour',
+        'week': 'day',
+        'month': 'day',
+        'quarter': 'month',
+        'year': 'month'
+    }
+
+    # Formato de etiqueta por período
+    LABEL_FORMATS = {
+        'today': '%H:%M',
+        'week': '%a',
+        'month': '%d/%m',
+        'quarter': '%b',
+        'year': '%b'
+    }
+
+    @staticmethod
+    def build_buckets(period, start_date, end_date):
+        """
+        Genera la lista ordenada de buckets del período
+
+        Args:
+            period: 'today', 'week', 'month', 'quarter' o 'year'
+            start_date: Fecha inicial (date)
+            end_date: Fecha final (date)
+
+        Returns:
+            list: Tuplas (clave, etiqueta). La clave coincide con la que
+                  produce la consulta agrupada para ese bucket.
+        """
+        granularity = SalesTrendService.GRANULARITY.get(period)
+        label_format = SalesTrendService.LABEL_FORMATS.get(period)
+        buckets = []
+
+        if granularity == 'hour':
+            day_start = datetime.combine(start_date, datetime.min.time())
+            for hour in range(24):
+                buckets.append((hour, (day_start + timedelta(hours=hour)).strftime(label_format)))
+
+        elif granularity == 'day':
+            current_day = start_date
+            while current_day <= end_date:
+                buckets.append((current_day, current_day.strftime(label_format)))
+                current_day += timedelta(days=1)
+
+        elif granularity == 'month':
+            current_month = start_date.replace(day=1)
+            while current_month <= end_date:
+                buckets.append(
+                    ((current_month.year, current_month.month), current_month.strftime(label_format))
+                )
+                current_month = (current_month + timedelta(days=32)).replace(day=1)
+
+        return buckets
+
+    @staticmethod
+    def fill_buckets(buckets, rows, include_expenses=False):
+        """
+        Completa en Python los buckets sin ventas
+
+        Args:
+            buckets: Lista de (clave, etiqueta) de build_buckets()
+            rows: Dict {clave: {'sales', 'cogs', 'expenses'}}
+            include_expenses: Si la ganancia descuenta gastos operativos
+
+        Returns:
+            dict: {'labels', 'sales', 'profit'}
+        """
+        labels = []
+        sales_data = []
+        profit_data = []
+
+        for key, label in buckets:
+            row = rows.get(key, {})
+            sales = float(row.get('sales') or 0)
+            cogs = float(row.get('cogs') or 0)
+            expenses = float(row.get('expenses') or 0) if include_expenses else 0
+
+            labels.append(label)
+            sales_data.append(sales)
+            profit_data.append(sales - cogs - expenses)
+
+        return {
+            'labels': labels,
+            'sales': sales_data,
+            'profit': profit_data
+        }
+
+    @staticmethod
+    def _normalize_key(granularity, row):
+        """Convierte las columnas de agrupación al tipo de clave de build_buckets()"""
+        if granularity == 'hour':
+            return int(row.bucket_hour)
+        if granularity == 'day':
+            bucket_day = row.bucket_day
+            if isinstance(bucket_day, str):
+                return date.fromisoformat(bucket_day[:10])
+            if isinstance(bucket_day, datetime):
+                return bucket_day.date()
+            return bucket_day
+        return int(row.bucket_year), int(row.bucket_month)
+
+    @staticmethod
+    def _invoice_window(granularity, start_date, end_date):
+        """Filtros de ventana temporal y estado sobre Invoice"""
+        filters = [Invoice.status.in_(SalesTrendService.SALE_STATUSES)]
+
+        if granularity == 'hour':
+            # La vista diaria agrupa por hora de creación de la factura
+            day_start = datetime.combine(start_date, datetime.min.time())
+            filters.append(Invoice.created_at >= day_start)
+            filters.append(Invoice.created_at < day_start + timedelta(days=1))
+        else:
+            filters.append(Invoice.invoice_date.between(start_date, end_date))
+
+        return filters
+
+    @staticmethod
+    def _bucket_columns(granularity, date_column):
+        """Columnas de agrupación para la granularidad indicada"""
+        if granularity == 'hour':
+            return [extract('hour', date_column).label('bucket_hour')]
+        if granularity == 'day':
+            return [date_column.label('bucket_day')]
+        return [
+            extract('year', date_column).label('bucket_year'),
+            extract('month', date_column).label('bucket_month')
+        ]
+
+    @staticmethod
+    def query_buckets(period, start_date, end_date):
+        """
+        Ejecuta una única consulta agrupada con ventas, COGS y gastos por bucket
+
+        Returns:
+            dict: {clave: {'sales', 'cogs', 'expenses'}}
+        """
+        from app.models.product import Product
+
+        granularity = SalesTrendService.GRANULARITY.get(period)
+        if not granularity:
+            return {}
+
+        window = SalesTrendService._invoice_window(granularity, start_date, end_date)
+
+        # COGS por factura (laptops + productos) dentro de la misma ventana
+        cogs_per_invoice = db.session.query(
+            InvoiceItem.invoice_id.label('invoice_id'),
+            func.sum(
+                func.coalesce(InvoiceItem.quantity * Laptop.purchase_cost, 0) +
+                func.coalesce(InvoiceItem.quantity * Product.purchase_cost, 0)
+            ).label('cogs')
+        ).join(
+            Invoice, InvoiceItem.invoice_id == Invoice.id
+        ).outerjoin(
+            Laptop, InvoiceItem.laptop_id == Laptop.id
+        ).outerjoin(
+            Product, InvoiceItem.product_id == Product.id
+        ).filter(
+            *window
+        ).group_by(
+            InvoiceItem.invoice_id
+        ).subquery()
+
+        date_column = Invoice.created_at if granularity == 'hour' else Invoice.invoice_date
+
+        parts = [
+            select(
+                *SalesTrendService._bucket_columns(granularity, date_column),
+                Invoice.subtotal.label('sales'),
+                func.coalesce(cogs_per_invoice.c.cogs, 0).label('cogs'),
+                literal(0).label('expenses')
+            ).outerjoin(
+                cogs_per_invoice, cogs_per_invoice.c.invoice_id == Invoice.id
+            ).where(*window)
+        ]
+
+        # Vistas mensuales: la ganancia descuenta los gastos pagados del mes
+        if granularity == 'month':
+            parts.append(
+                select(
+                    *SalesTrendService._bucket_columns(granularity, Expense.paid_date),
+                    literal(0).label('sales'),
+                    literal(0).label('cogs'),
+                    Expense.amount.label('expenses')
+                ).where(
+                    Expense.paid_date.between(start_date, end_date),
+                    Expense.is_paid == True
+                )
+            )
+
+        source = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+        bucket_columns = [c for c in source.c if c.name.startswith('bucket_')]
+
+        rows = db.session.query(
+            *bucket_columns,
+            func.sum(source.c.sales).label('sales'),
+            func.sum(source.c.cogs).label('cogs'),
+            func.sum(source.c.expenses).label('expenses')
+        ).group_by(*bucket_columns).all()
+
+        return {
+            SalesTrendService._normalize_key(granularity, row): {
+                'sales': row.sales,
+                'cogs': row.cogs,
+                'expenses': row.expenses
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def get_trends(period, start_date, end_date):
+        """
+        Series de ventas y ganancia para todos los buckets del período
+
+        Args:
+            period: 'today', 'week', 'month', 'quarter' o 'year'
+            start_date: Fecha inicial (date)
+            end_date: Fecha final (date)
+
+        Returns:
+            dict: {'labels', 'sales', 'profit'}
+        """
+        buckets = SalesTrendService.build_buckets(period, start_date, end_date)
+        if not buckets:
+            return {'labels': [], 'sales': [], 'profit': []}
+
+        rows = SalesTrendService.query_buckets(period, start_date, end_date)
+
+        return SalesTrendService.fill_buckets(
+            buckets,
+            rows,
+            include_expenses=SalesTrendService.GRANULARITY.get(period) == 'month'
+        )
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# SEARCH SERVICE - Búsqueda de Texto Indexada
+# ============================================
+# Responsabilidad: búsqueda por texto con ranking para laptops, clientes,
+# facturas y seriales.
+#
+# En PostgreSQL usa:
+# - tsvector con pesos (índice GIN de expresión por tabla) para palabras
+#   y prefijos ("dell lat" -> dell:* & lat:*)
+# - pg_trgm (índices GIN gin_trgm_ops) para subcadenas en códigos,
+#   nombres, NCF, seriales... (ILIKE '%q%' usa el índice trigram)
+# El ranking combina ts_rank_cd y similarity().
+#
+# En SQLite (tests/desarrollo) cae a LIKE con un ranking simple:
+# coincidencia exacta > prefijo (de la columna o de una palabra) > subcadena.
+#
+# Las expresiones de los índices están en la migración
+# c4d8e1f2a3b5_add_search_indexes y deben coincidir con document().
+
+import re
+
+from sqlalchemy import case, func, literal_column, or_
+
+from app import db
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.laptop import Laptop
+from app.models.serial import LaptopSerial
+
+
+class SearchService:
+    """Servicio de búsqueda de texto con ranking"""
+
+    # Configuración de texto de PostgreSQL (sin stemming: SKUs, nombres, códigos)
+    TS_CONFIG = 'simple'
+
+    # Entidad -> (modelo, ((columna, peso tsvector, índice trigram), ...))
+    ENTITIES = {
+        'laptop': (Laptop, (
+            ('sku', 'A', True),
+            ('display_name', 'A', True),
+            ('slug', 'B', False),
+            ('short_description', 'C', False),
+        )),
+        'customer': (Customer, (
+            ('first_name', 'A', True),
+            ('last_name', 'A', True),
+            ('company_name', 'A', True),
+            ('id_number', 'A', True),
+            ('email', 'B', True),
+            ('phone_primary', 'C', False),
+        )),
+        'invoice': (Invoice, (
+            ('invoice_number', 'A', True),
+            ('ncf', 'A', True),
+        )),
+        'serial': (LaptopSerial, (
+            ('serial_number', 'A', True),
+            ('serial_normalized', 'A', False),
+            ('barcode', 'A', True),
+        )),
+    }
+
+    # Peso relativo de cada columna en el ranking de SQLite
+    FALLBACK_WEIGHTS = {'A': 1.0, 'B': 0.6, 'C': 0.3}
+
+    TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+    # ===== UTILIDADES =====
+
+    @staticmethod
+    def is_postgres():
+        """True si la sesión actual usa PostgreSQL"""
+        return db.session.get_bind().dialect.name == 'postgresql'
+
+    @staticmethod
+    def columns(entity):
+        """Columnas (atributo, peso, trigram) de una entidad"""
+        model, spec = SearchService.ENTITIES[entity]
+        return [(getattr(model, name), weight, trigram) for name, weight, trigram in spec]
+
+    @staticmethod
+    def escape_like(text):
+        """Escapa \\, % y _ para buscarlos literalmente en LIKE (con escape='\\')"""
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @staticmethod
+    def prefix_query(text):
+        """'Dell Lat-5' -> 'dell:* & lat:* & 5:*' (vacío si no hay palabras)"""
+        tokens = SearchService.TOKEN_RE.findall(text.lower())
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    @staticmethod
+    def document(entity):
+        """
+        tsvector con pesos de una entidad
+
+        Usa literales (no parámetros) para que PostgreSQL reconozca la misma
+        expresión del índice GIN.
+        """
+        config = literal_column(f"'{SearchService.TS_CONFIG}'")
+        vector = None
+        for column, weight, _trigram in SearchService.columns(entity):
+            part = func.setweight(
+                func.to_tsvector(config, func.coalesce(column, literal_column("''"))),
+                literal_column(f"'{weight}'")
+            )
+            vector = part if vector is None else vector.op('||')(part)
+        return vector
+
+    # ===== BÚSQUEDA =====
+
+    @staticmethod
+    def match(text, *entities):
+        """
+        Condición y ranking de búsqueda sobre una o varias entidades
+
+        Args:
+            text: Texto buscado
+            *entities: Entidades a buscar ('laptop', 'customer', 'invoice', 'serial');
+                       con varias, la consulta debe tener los JOIN necesarios
+
+        Returns:
+            tuple: (condición para filter(), expresión de ranking)
+        """
+        text = (text or '').strip()
+        pattern = f'%{SearchService.escape_like(text)}%'
+
+        if SearchService.is_postgres():
+            return SearchService._match_postgres(text, pattern, entities)
+        return SearchService._match_fallback(text, pattern, entities)
+
+    @staticmethod
+    def _match_postgres(text, pattern, entities):
+        conditions, ranks = [], []
+        prefix_query = SearchService.prefix_query(text)
+        ts_query = func.to_tsquery(literal_column(f"'{SearchService.TS_CONFIG}'"), prefix_query)
+
+        for entity in entities:
+            if prefix_query:
+                document = SearchService.document(entity)
+                conditions.append(document.op('@@')(ts_query))
+                ranks.append(func.ts_rank_cd(document, ts_query))
+
+            trigram_columns = [column for column, _weight, trigram in SearchService.columns(entity) if trigram]
+            conditions.extend(column.ilike(pattern, escape='\\') for column in trigram_columns)
+            ranks.append(func.coalesce(
+                func.greatest(*[func.similarity(column, text) for column in trigram_columns]), 0
+            ))
+
+        return or_(*conditions), sum(ranks[1:], ranks[0])
+
+    @staticmethod
+    def _match_fallback(text, pattern, entities):
+        conditions, ranks = [], []
+        lowered = text.lower()
+        escaped = SearchService.escape_like(lowered)
+
+        for entity in entities:
+            for column, weight, _trigram in SearchService.columns(entity):
+                conditions.append(column.ilike(pattern, escape='\\'))
+                ranks.append(case(
+                    (func.lower(column) == lowered, 3),
+                    (or_(
+                        func.lower(column).like(f'{escaped}%', escape='\\'),
+                        func.lower(column).like(f'% {escaped}%', escape='\\')
+                    ), 2),
+                    (column.ilike(pattern, escape='\\'), 1),
+                    else_=0
+                ) * SearchService.FALLBACK_WEIGHTS[weight])
+
+        return or_(*conditions), sum(ranks[1:], ranks[0])
+
+    @staticmethod
+    def apply(query, text, *entities, extra_conditions=(), order=True):
+        """
+        Aplica la búsqueda a una consulta
+
+        Args:
+            query: Query de SQLAlchemy (con los JOIN de las entidades)
+            text: Texto buscado
+            *entities: Entidades a buscar
+            extra_conditions: Condiciones adicionales unidas con OR
+                              (ej. cédula normalizada)
+            order: Ordenar por relevancia (los order_by posteriores desempatan)
+
+        Returns:
+            Query filtrada (y ordenada por relevancia)
+        """
+        condition, rank = SearchService.match(text, *entities)
+        query = query.filter(or_(condition, *extra_conditions))
+        if order:
+            query = query.order_by(rank.desc())
+        return query
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# SEQUENCE ALLOCATOR - Asignación de NCF y Números de Factura
+# ============================================
+# Responsabilidad: entregar números de NCF y de factura sin colisiones
+# entre cajeros/workers concurrentes.
+#
+# - Un número: UPDATE ... SET current = current + 1 ... RETURNING dentro
+#   de la transacción de la factura. La fila de la secuencia queda
+#   bloqueada hasta el commit, así la numeración no tiene huecos (si la
+#   factura falla, el rollback devuelve el número).
+# - Un bloque (facturación en ráfaga): el UPDATE se hace en una conexión
+#   propia y se confirma de inmediato; el worker consume el bloque sin
+#   volver a tocar la fila. Los números que sobran al cerrar el bloque se
+#   registran en sequence_gaps.
+# - find_gaps() concilia el rango emitido contra las facturas para el
+#   reporte de comprobantes no utilizados de la DGII.
+
+from datetime import date
+
+from sqlalchemy import func, or_, select
+
+from app import db
+from app.models.invoice import Invoice, InvoiceSettings, NCFSequence, SequenceGap
+
+
+class NumberBlock:
+    """
+    Bloque de números consecutivos reservados para un worker
+
+    Uso:
+        with SequenceAllocator.reserve_ncf_block('B02', 100) as block:
+            for data in facturas:
+                ncf = block.next()
+                ...
+        # Los números no usados quedan registrados como huecos
+    """
+
+    def __init__(self, kind, prefix, first, size):
+        self.kind = kind
+        self.prefix = prefix
+        self.first = first
+        self.last = first + size - 1
+        self._next = first
+
+    def format(self, number):
+        return SequenceAllocator.format_number(self.kind, self.prefix, number)
+
+    @property
+    def remaining(self):
+        return self.last - self._next + 1
+
+    def next(self):
+        """Siguiente número con formato. ValueError si el bloque se agotó"""
+        if self._next > self.last:
+            raise ValueError(f"Bloque {self.format(self.first)}..{self.format(self.last)} agotado")
+        number = self._next
+        self._next += 1
+        return self.format(number)
+
+    def close(self, reason='block_unused'):
+        """Registra los números no usados como huecos. Retorna cuántos"""
+        unused = list(range(self._next, self.last + 1))
+        self._next = self.last + 1
+        SequenceAllocator.record_gaps(self.kind, self.prefix, unused, reason)
+        return len(unused)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class SequenceAllocator:
+    """Asignación atómica de números de NCF y de factura"""
+
+    # ===== FORMATO =====
+
+    @staticmethod
+    def format_number(kind, prefix, number):
+        """('ncf', 'B01', 12) -> 'B0100000012'; ('invoice', 'INV', 12) -> 'INV-00000012'"""
+        if kind == 'ncf':
+            return f"{prefix}{str(number).zfill(8)}"
+        return f"{prefix}-{str(number).zfill(8)}"
+
+    # ===== ASIGNACIÓN =====
+
+    @staticmethod
+    def _take_ncf(ncf_type, count, connection=None):
+        """
+        Avanza la secuencia `count` números en un solo UPDATE ... RETURNING
+
+        Returns:
+            int: Primer número asignado
+
+        Raises:
+            ValueError: Secuencia inexistente, inactiva, vencida o agotada
+        """
+        table = NCFSequence.__table__
+        statement = table.update().where(
+            table.c.ncf_type == ncf_type,
+            table.c.is_active == True,
+            or_(table.c.valid_until.is_(None), table.c.valid_until >= date.today()),
+            or_(table.c.range_end.is_(None), table.c.current_sequence + count - 1 <= table.c.range_end)
+        ).values(
+            current_sequence=table.c.current_sequence + count
+        ).returning(table.c.current_sequence)
+
+        new_value = (connection or db.session).execute(statement).scalar()
+        SequenceAllocator._expire_loaded(NCFSequence, 'current_sequence', ncf_type=ncf_type)
+
+        if new_value is None:
+            # Ninguna fila cumplió: reportar el motivo con los mensajes del modelo.
+            # Consulta simple: get_or_create haría commit de la factura a medio armar
+            sequence = NCFSequence.query.filter_by(ncf_type=ncf_type).first()
+            if sequence is None:
+                raise ValueError(f"No existe la secuencia de NCF {ncf_type}")
+            db.session.refresh(sequence)
+            sequence.check_usable(count)
+            raise ValueError(f"No se pudo asignar NCF {ncf_type}")
+
+        return new_value - count
+
+    @staticmethod
+    def _take_invoice(settings, count, connection=None):
+        """Avanza invoice_sequence `count` números. Retorna (prefijo, primer número)"""
+        table = InvoiceSettings.__table__
+        statement = table.update().where(
+            table.c.id == settings.id
+        ).values(
+            invoice_sequence=table.c.invoice_sequence + count
+        ).returning(table.c.invoice_prefix, table.c.invoice_sequence)
+
+        prefix, new_value = (connection or db.session).execute(statement).one()
+        SequenceAllocator._expire_loaded(InvoiceSettings, 'invoice_sequence', id=settings.id)
+        return prefix, new_value - count
+
+    @staticmethod
+    def _expire_loaded(model, attribute, **match):
+        """Marca como vencido el atributo en las instancias ya cargadas en la sesión"""
+        for instance in list(db.session.identity_map.values()):
+            if isinstance(instance, model) and all(getattr(instance, k) == v for k, v in match.items()):
+                db.session.expire(instance, [attribute])
+
+    @staticmethod
+    def next_ncf(ncf_type):
+        """Siguiente NCF (en la transacción actual: sin huecos si hay rollback)"""
+        first = SequenceAllocator._take_ncf(ncf_type, 1)
+        return SequenceAllocator.format_number('ncf', ncf_type, first)
+
+    @staticmethod
+    def next_invoice_number(settings=None):
+        """Siguiente número de factura (en la transacción actual)"""
+        settings = settings or InvoiceSettings.get_settings()
+        prefix, first = SequenceAllocator._take_invoice(settings, 1)
+        return SequenceAllocator.format_number('invoice', prefix, first)
+
+    # ===== BLOQUES =====
+
+    @staticmethod
+    def reserve_ncf_block(ncf_type, size):
+        """
+        Reserva `size` NCF consecutivos y los confirma de inmediato
+
+        El bloqueo de la fila dura solo el UPDATE, así varios workers
+        facturan en paralelo, cada uno con su bloque.
+        """
+        with db.engine.begin() as connection:
+            first = SequenceAllocator._take_ncf(ncf_type, size, connection)
+        return NumberBlock('ncf', ncf_type, first, size)
+
+    @staticmethod
+    def reserve_invoice_block(size, settings=None):
+        """Reserva `size` números de factura consecutivos (confirmados de inmediato)"""
+        settings = settings or InvoiceSettings.get_settings()
+        with db.engine.begin() as connection:
+            prefix, first = SequenceAllocator._take_invoice(settings, size, connection)
+        return NumberBlock('invoice', prefix, first, size)
+
+    # ===== HUECOS =====
+
+    @staticmethod
+    def record_gaps(kind, prefix, numbers, reason):
+        """Registra números no utilizados (conexión propia, un INSERT por lotes)"""
+        if not numbers:
+            return
+        with db.engine.begin() as connection:
+            connection.execute(SequenceGap.__table__.insert(), [
+                {'kind': kind, 'prefix': prefix, 'number': number, 'reason': reason}
+                for number in numbers
+            ])
+
+    @staticmethod
+    def find_gaps(ncf_type):
+        """
+        Concilia el rango emitido de un tipo de NCF contra las facturas
+
+        Returns:
+            list: [{'ncf', 'number', 'reason'}] para cada número emitido por la
+                  secuencia que no está en ninguna factura (reason None si el
+                  hueco no estaba registrado)
+        """
+        sequence = NCFSequence.query.filter_by(ncf_type=ncf_type).first()
+        if not sequence:
+            return []
+
+        number = func.substr(Invoice.ncf, 4)
+        used = {
+            int(value) for value in db.session.execute(
+                select(number).where(Invoice.ncf.like(f'{ncf_type}%'))
+            ).scalars() if value and value.isdigit()
+        }
+        reasons = dict(db.session.execute(
+            select(SequenceGap.number, SequenceGap.reason).where(
+                SequenceGap.kind == 'ncf', SequenceGap.prefix == ncf_type
+            )
+        ).all())
+
+        return [
+            {
+                'ncf': SequenceAllocator.format_number('ncf', ncf_type, value),
+                'number': value,
+                'reason': reasons.get(value)
+            }
+            for value in range(sequence.range_start, sequence.current_sequence)
+            if value not in used
+        ]
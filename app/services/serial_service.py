@@ -13,6 +13,10 @@
 from app import db
 from app.models.serial import LaptopSerial, InvoiceItemSerial, SerialMovement, SERIAL_STATUS_CHOICES
 from app.models.laptop import Laptop
+from app.services.search_service import SearchService
+from app.services.stock_allocator import StockAllocator
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, date
 import logging
 import re
@@ -23,6 +27,12 @@ logger = logging.getLogger(__name__)
 class SerialService:
     """Servicio para gestión de números de serie de fabricante"""
 
+    # Seriales por consulta IN (...) al verificar unicidad de un lote
+    BATCH_LOOKUP_SIZE = 1000
+
+    # Estados que siguen en stock (los reservados los descuenta reserved_quantity)
+    IN_STOCK_STATUSES = ('available', 'reserved')
+
     # ============================================
     # VALIDACIÓN DE SERIALES
     # ============================================
@@ -186,76 +196,156 @@ class SerialService:
     @staticmethod
     def create_serials_batch(laptop_id, serial_numbers, **kwargs):
         """
-        Crea múltiples seriales para una laptop.
+        Crea múltiples seriales para una laptop (recepción de mercancía).
+
+        Todo el lote se valida en memoria: formato, duplicados dentro del
+        lote y una consulta IN (...) contra serial_normalized. Los válidos se
+        insertan con un INSERT por lotes (más otro para sus movimientos) y al
+        final se sincroniza una vez la cantidad de la laptop.
 
         Args:
             laptop_id: ID de la laptop
             serial_numbers: Lista de números de serie
-            **kwargs: Campos adicionales opcionales
+            **kwargs: Campos adicionales opcionales (ver create_serial)
 
         Returns:
             dict: {
                 'success': bool,
                 'created': list of serials,
-                'errors': list of errors,
+                'errors': list of {'serial', 'error'} ('serial' es None
+                          en errores de todo el lote),
                 'total': int,
                 'created_count': int,
-                'error_count': int
+                'error_count': int,
+                'sync': dict o None (resultado de sync_laptop_quantity)
             }
         """
         created = []
         errors = []
 
+        def result(success, sync=None):
+            return {
+                'success': success,
+                'created': created,
+                'errors': errors,
+                'total': len(serial_numbers),
+                'created_count': len(created),
+                'error_count': len(errors),
+                'sync': sync
+            }
+
         try:
             laptop = Laptop.query.get(laptop_id)
             if not laptop:
-                return {
-                    'success': False,
-                    'created': [],
-                    'errors': [f"Laptop con ID {laptop_id} no encontrada"],
-                    'total': len(serial_numbers),
-                    'created_count': 0,
-                    'error_count': len(serial_numbers)
-                }
+                errors.append({'serial': None, 'error': f"Laptop con ID {laptop_id} no encontrada"})
+                result_data = result(False)
+                result_data['error_count'] = len(serial_numbers)
+                return result_data
 
+            # 1. Normalizar y validar formato / duplicados dentro del lote
+            serial_type = kwargs.get('serial_type', 'manufacturer')
+            candidates = {}
             for serial_number in serial_numbers:
-                if not serial_number or not serial_number.strip():
+                if not serial_number or not str(serial_number).strip():
                     continue
+                serial_number = str(serial_number).strip()
 
-                success, result = SerialService.create_serial(
-                    laptop_id=laptop_id,
-                    serial_number=serial_number,
-                    **kwargs
-                )
+                is_valid, error = SerialService.validate_serial_format(serial_number, serial_type)
+                if not is_valid:
+                    errors.append({'serial': serial_number, 'error': error})
+                    continue
 
-                if success:
-                    created.append(result)
-                else:
+                normalized = LaptopSerial.normalize_serial(serial_number)
+                if normalized in candidates:
                     errors.append({
                         'serial': serial_number,
-                        'error': result
+                        'error': f"El serial '{serial_number}' está repetido en el lote ({candidates[normalized]})"
                     })
+                    continue
+                candidates[normalized] = serial_number
+
+            # 2. Unicidad contra la base de datos en una sola consulta
+            existing = {}
+            normalized_list = list(candidates)
+            for start in range(0, len(normalized_list), SerialService.BATCH_LOOKUP_SIZE):
+                chunk = normalized_list[start:start + SerialService.BATCH_LOOKUP_SIZE]
+                existing.update(db.session.query(LaptopSerial.serial_normalized, Laptop.sku).outerjoin(
+                    Laptop, Laptop.id == LaptopSerial.laptop_id
+                ).filter(LaptopSerial.serial_normalized.in_(chunk)).all())
+
+            rows = []
+            for normalized, serial_number in candidates.items():
+                if normalized in existing:
+                    errors.append({
+                        'serial': serial_number,
+                        'error': f"El serial '{serial_number}' ya existe en el sistema (Laptop: {existing[normalized] or 'N/A'})"
+                    })
+                    continue
+                rows.append({
+                    'laptop_id': laptop.id,
+                    'serial_number': serial_number,
+                    'serial_normalized': normalized,
+                    'serial_type': serial_type,
+                    'barcode': kwargs.get('barcode'),
+                    'notes': kwargs.get('notes'),
+                    'unit_cost': kwargs.get('unit_cost'),
+                    'received_date': kwargs.get('received_date', date.today()),
+                    'warranty_start': kwargs.get('warranty_start'),
+                    'warranty_end': kwargs.get('warranty_end'),
+                    'warranty_provider': kwargs.get('warranty_provider'),
+                    'created_by_id': kwargs.get('created_by_id'),
+                    'status': 'available',
+                })
+
+            if not rows:
+                return result(len(errors) == 0)
+
+            # 3. INSERT por lotes de seriales (RETURNING para los IDs) y movimientos
+            created.extend(db.session.scalars(insert(LaptopSerial).returning(LaptopSerial), rows).all())
+            db.session.execute(insert(SerialMovement), [
+                {
+                    'serial_id': serial.id,
+                    'movement_type': 'created',
+                    'previous_status': 'available',
+                    'new_status': 'available',
+                    'description': "Serial ingresado al inventario",
+                    'user_id': kwargs.get('created_by_id'),
+                }
+                for serial in created
+            ])
+            created_ids = [serial.id for serial in created]
+            db.session.commit()
 
-            return {
-                'success': len(errors) == 0,
-                'created': created,
-                'errors': errors,
-                'total': len(serial_numbers),
-                'created_count': len(created),
-                'error_count': len(errors)
-            }
+            # 4. Una sola sincronización de la cantidad de la laptop
+            synced, sync = SerialService.sync_laptop_quantity(laptop.id)
+
+            # Recargar los creados en una consulta (el commit los dejó vencidos)
+            LaptopSerial.query.filter(LaptopSerial.id.in_(created_ids)).all()
+
+            logger.info(f"✅ {len(created)} seriales creados para laptop {laptop.sku} ({len(errors)} con error)")
+            return result(len(errors) == 0, sync if synced else None)
+
+        except IntegrityError as e:
+            # Otro proceso registró alguno de los seriales entre la validación y el INSERT
+            db.session.rollback()
+            logger.error(f"❌ Conflicto de unicidad en batch de seriales: {str(e)}")
+            created.clear()
+            errors.append({
+                'serial': None,
+                'error': "Alguno de los seriales fue registrado por otro usuario al mismo tiempo. Intente de nuevo."
+            })
+            result_data = result(False)
+            result_data['error_count'] = len(serial_numbers)
+            return result_data
 
         except Exception as e:
             db.session.rollback()
             logger.error(f"❌ Error en batch de seriales: {str(e)}", exc_info=True)
-            return {
-                'success': False,
-                'created': created,
-                'errors': errors + [str(e)],
-                'total': len(serial_numbers),
-                'created_count': len(created),
-                'error_count': len(serial_numbers) - len(created)
-            }
+            created.clear()
+            errors.append({'serial': None, 'error': str(e)})
+            result_data = result(False)
+            result_data['error_count'] = len(serial_numbers)
+            return result_data
 
     @staticmethod
     def update_serial(serial_id, **kwargs):
@@ -396,14 +486,7 @@ class SerialService:
         base_query = LaptopSerial.query
 
         if query:
-            search_pattern = f"%{query}%"
-            base_query = base_query.filter(
-                db.or_(
-                    LaptopSerial.serial_number.ilike(search_pattern),
-                    LaptopSerial.serial_normalized.ilike(search_pattern),
-                    LaptopSerial.barcode.ilike(search_pattern),
-                )
-            )
+            base_query = SearchService.apply(base_query, query, 'serial')
 
         if laptop_id:
             base_query = base_query.filter_by(laptop_id=laptop_id)
@@ -473,51 +556,14 @@ class SerialService:
             tuple: (success, result_or_error)
         """
         try:
-            assigned = []
-            errors = []
-
-            for serial_id in serial_ids:
-                serial = LaptopSerial.query.get(serial_id)
-
-                if not serial:
-                    errors.append(f"Serial ID {serial_id} no encontrado")
-                    continue
-
-                if not serial.is_available:
-                    errors.append(f"Serial {serial.serial_number} no está disponible (estado: {serial.status_display})")
-                    continue
-
-                # Verificar que el serial pertenece al laptop del item
-                if invoice_item.laptop_id and serial.laptop_id != invoice_item.laptop_id:
-                    errors.append(f"Serial {serial.serial_number} no pertenece al producto del item")
-                    continue
+            # Una consulta IN (...) para todos los seriales; validación en memoria
+            snapshot = StockAllocator.load([], serial_ids)
+            assigned, errors = snapshot.check_serials(
+                [int(s) for s in serial_ids], invoice_item.laptop_id, 'al producto del item'
+            )
 
-                # Crear relación
-                item_serial = InvoiceItemSerial(
-                    invoice_item_id=invoice_item.id,
-                    serial_id=serial_id,
-                    unit_sale_price=invoice_item.unit_price
-                )
-                db.session.add(item_serial)
-
-                # Marcar serial como vendido
-                old_status = serial.status
-                serial.status = 'sold'
-                serial.sale_price = invoice_item.unit_price
-                serial.sold_date = datetime.utcnow()
-
-                # Registrar movimiento
-                SerialService._log_movement(
-                    serial=serial,
-                    movement_type='sold',
-                    previous_status=old_status,
-                    new_status='sold',
-                    invoice_id=invoice_item.invoice_id,
-                    description=f"Vendido en factura #{invoice_item.invoice.invoice_number if invoice_item.invoice else 'N/A'}",
-                    user_id=user_id
-                )
-
-                assigned.append(serial)
+            # Relación + movimiento en INSERT por lotes, estado en el flush
+            StockAllocator.write_assignments([(invoice_item, assigned)], user_id=user_id)
 
             if errors:
                 # Si hay errores pero también asignaciones, dejamos que el llamador decida si hacer commit parcial o rollback
@@ -643,10 +689,19 @@ class SerialService:
     # SINCRONIZACIÓN CON INVENTARIO
     # ============================================
 
+    @staticmethod
+    def count_in_stock(laptop_id):
+        """Seriales en stock de una laptop (disponibles y reservados)"""
+        return LaptopSerial.query.filter(
+            LaptopSerial.laptop_id == laptop_id,
+            LaptopSerial.status.in_(SerialService.IN_STOCK_STATUSES)
+        ).count()
+
     @staticmethod
     def sync_laptop_quantity(laptop_id):
         """
-        Sincroniza la cantidad de una laptop con sus seriales disponibles.
+        Sincroniza la cantidad de una laptop con sus seriales en stock
+        (disponibles y reservados).
 
         Args:
             laptop_id: ID de la laptop
@@ -659,11 +714,7 @@ class SerialService:
             if not laptop:
                 return False, f"Laptop con ID {laptop_id} no encontrada"
 
-            # Contar seriales disponibles
-            available_count = LaptopSerial.query.filter_by(
-                laptop_id=laptop_id,
-                status='available'
-            ).count()
+            available_count = SerialService.count_in_stock(laptop_id)
 
             # Total de seriales
             total_serials = LaptopSerial.query.filter_by(laptop_id=laptop_id).count()
@@ -693,7 +744,8 @@ class SerialService:
     @staticmethod
     def validate_laptop_serial_count(laptop_id):
         """
-        Valida que la cantidad de seriales coincida con la cantidad del inventario.
+        Valida que la cantidad de seriales en stock (disponibles y reservados)
+        coincida con la cantidad del inventario, igual que sync_laptop_quantity.
 
         Args:
             laptop_id: ID de la laptop
@@ -708,10 +760,7 @@ class SerialService:
                 'error': f"Laptop con ID {laptop_id} no encontrada"
             }
 
-        available_serials = LaptopSerial.query.filter_by(
-            laptop_id=laptop_id,
-            status='available'
-        ).count()
+        available_serials = SerialService.count_in_stock(laptop_id)
 
         return {
             'valid': laptop.quantity == available_serials,
@@ -6,6 +6,7 @@
 
 from app import db
 from app.models.user_session import UserSession
+from app.utils.session_manager import invalidate_user_sessions
 from flask import request
 from datetime import datetime, timedelta
 import secrets
@@ -131,6 +132,7 @@ class SessionService:
         session = UserSession.query.get(session_id)
         if session:
             session.terminate()
+            invalidate_user_sessions(session.user_id)
     
     @staticmethod
     def terminate_all_user_sessions(user_id, except_session_id=None):
@@ -149,6 +151,7 @@ class SessionService:
             )
         """
         UserSession.terminate_all_user_sessions(user_id, except_session_id)
+        invalidate_user_sessions(user_id)
     
     @staticmethod
     def cleanup_expired_sessions():
@@ -46,6 +46,24 @@ class SKUService:
         # Formatear con 4 dígitos
         return f'{prefix}-{date_str}-{new_number:04d}'
 
+    @staticmethod
+    def generate_laptop_skus(count, prefix='LX'):
+        """
+        Genera `count` SKUs consecutivos con una sola consulta (importaciones por lotes)
+
+        Returns:
+            list: ['LX-20250101-0001', 'LX-20250101-0002', ...]
+        """
+        from app.models.laptop import Laptop
+
+        date_str = datetime.utcnow().strftime('%Y%m%d')
+        last_laptop = Laptop.query.with_entities(Laptop.sku).filter(
+            Laptop.sku.like(f'{prefix}-{date_str}-%')
+        ).order_by(Laptop.sku.desc()).first()
+
+        first = int(last_laptop.sku.split('-')[-1]) + 1 if last_laptop else 1
+        return [f'{prefix}-{date_str}-{number:04d}' for number in range(first, first + count)]
+
     @staticmethod
     def generate_custom_sku(prefix, category_code=None):
         """
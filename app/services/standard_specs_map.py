@@ -1440,6 +1440,44 @@ def get_field_description(field_path):
     return current.get('description', '')
 
 
+# =============================================================================
+# ÍNDICE PRECOMPILADO DE CAMPOS
+# =============================================================================
+# STANDARD_SPECS_MAP se compila una sola vez al importar el módulo en
+# {"categoria.campo": (ids, nombres)} con los IDs ya convertidos a texto y
+# los nombres en minúsculas, que es como IcecatService indexa las features
+# de cada producto. Así la normalización no recorre el mapa ni repite
+# str()/lower() en cada sonda.
+
+_EMPTY_FIELD = ((), ())
+
+
+def _compile_field_index(specs_map):
+    index = {}
+    for category, fields in specs_map.items():
+        for field_name, field_def in fields.items():
+            ids = tuple(dict.fromkeys(str(feat_id) for feat_id in field_def.get('ids', [])))
+            names = tuple(dict.fromkeys(name.lower() for name in field_def.get('names', [])))
+            index[f'{category}.{field_name}'] = (ids, names)
+    return index
+
+
+SPEC_FIELD_INDEX = _compile_field_index(STANDARD_SPECS_MAP)
+
+
+def get_field_keys(field_path):
+    """
+    Obtiene los IDs (texto) y nombres (minúsculas) precompilados de un campo.
+    
+    Args:
+        field_path: Ruta al campo (ej: "processor.family")
+    
+    Returns:
+        Tupla (ids, nombres); tuplas vacías si el campo no existe
+    """
+    return SPEC_FIELD_INDEX.get(field_path, _EMPTY_FIELD)
+
+
 # =============================================================================
 # MAPEO DE PUERTOS PARA CONECTIVIDAD
 # =============================================================================
@@ -1495,8 +1533,10 @@ __all__ = [
     'STANDARD_UNITS',
     'PORT_FEATURE_IDS',
     'PORT_NAMES',
+    'SPEC_FIELD_INDEX',
     'get_field_ids',
     'get_field_names',
+    'get_field_keys',
     'is_required_field',
     'get_all_required_fields',
     'get_field_description'
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# STOCK ALLOCATOR - Validación y Asignación de Stock por Conjuntos
+# ============================================
+# Responsabilidad: validar y asignar laptops/seriales de una factura
+# completa con un número fijo de consultas, sin importar cuántas líneas o
+# unidades tenga.
+#
+# - load(): un SELECT ... WHERE id IN (...) para las laptops y otro para
+#   los seriales (los indicados más los disponibles de esas laptops). Con
+#   lock=True ambos llevan FOR UPDATE, ordenados por id para que dos
+#   ventas concurrentes tomen los bloqueos en el mismo orden.
+# - StockSnapshot valida en memoria y va descontando lo que ya tomó cada
+#   línea, así dos líneas del mismo producto no cuentan el mismo stock.
+# - write_assignments(): INSERT por lotes de InvoiceItemSerial y
+#   SerialMovement; los cambios de estado de los seriales y las cantidades
+#   de las laptops se confirman en el flush (UPDATE agrupados).
+
+from datetime import date, datetime
+
+from sqlalchemy import func, insert, or_, and_
+
+from app import db
+from app.models.laptop import Laptop
+from app.models.serial import LaptopSerial, InvoiceItemSerial, SerialMovement, SERIAL_STATUS_CHOICES
+
+
+class StockSnapshot:
+    """
+    Laptops y seriales de una operación, cargados de una vez
+
+    laptops:   {laptop_id: Laptop}
+    serials:   {serial_id: LaptopSerial} (indicados + disponibles)
+    available: {laptop_id: [LaptopSerial disponibles, más recientes primero]}
+    held:      Stock ya apartado por la propia factura (ReservationService.held_by),
+               que cuenta como disponible para ella
+    """
+
+    def __init__(self, laptops, serials, held=None):
+        self.laptops = laptops
+        self.serials = serials
+        self.held_quantity = (held or {}).get('quantity', {})
+        self.held_serials = (held or {}).get('serials', set())
+        self.available = {}
+        for serial in sorted(serials.values(), key=lambda s: s.received_date or date.min, reverse=True):
+            if self._is_free(serial):
+                self.available.setdefault(serial.laptop_id, []).append(serial)
+        self._taken = set()
+        self._quantity_used = {}
+
+    def _is_free(self, serial):
+        return serial.status == 'available' or (serial.status == 'reserved' and serial.id in self.held_serials)
+
+    def available_count(self, laptop_id):
+        """Seriales disponibles que ninguna línea ha tomado todavía"""
+        return sum(1 for s in self.available.get(laptop_id, []) if s.id not in self._taken)
+
+    def quantity_left(self, laptop_id):
+        """Cantidad libre (más lo apartado por la factura) menos lo ya comprometido por otras líneas"""
+        laptop = self.laptops[laptop_id]
+        return (
+            laptop.available_quantity + self.held_quantity.get(laptop_id, 0)
+            - self._quantity_used.get(laptop_id, 0)
+        )
+
+    def use_quantity(self, laptop_id, quantity):
+        self._quantity_used[laptop_id] = self._quantity_used.get(laptop_id, 0) + quantity
+
+    def check_serials(self, serial_ids, laptop_id=None, owner='al producto'):
+        """
+        Valida seriales indicados (y que pertenezcan a laptop_id, si se da)
+
+        Args:
+            owner: Texto para el error de pertenencia ('a Dell XPS 15')
+
+        Returns:
+            tuple: (seriales válidos, lista de errores)
+        """
+        valid, errors = [], []
+        for serial_id in serial_ids:
+            serial = self.serials.get(serial_id)
+            if not serial:
+                errors.append(f'Serial ID {serial_id} no encontrado')
+            elif laptop_id and serial.laptop_id != laptop_id:
+                errors.append(f'Serial {serial.serial_number} no pertenece {owner}')
+            elif not self._is_free(serial) or serial.id in self._taken:
+                status = 'sold' if serial.id in self._taken else serial.status
+                errors.append(
+                    f'Serial {serial.serial_number} no está disponible '
+                    f'(estado: {dict(SERIAL_STATUS_CHOICES).get(status, status)})'
+                )
+            else:
+                valid.append(serial)
+        return valid, errors
+
+    def take(self, serials):
+        """Marca seriales como tomados por una línea"""
+        self._taken.update(serial.id for serial in serials)
+
+    def take_available(self, laptop_id, count):
+        """Toma los `count` seriales disponibles más recientes (lista vacía si no alcanzan)"""
+        pool = [s for s in self.available.get(laptop_id, []) if s.id not in self._taken]
+        if len(pool) < count:
+            return []
+        chosen = pool[:count]
+        self.take(chosen)
+        return chosen
+
+
+class StockAllocator:
+    """Validación y asignación de stock/seriales por conjuntos"""
+
+    # ===== CARGA =====
+
+    @staticmethod
+    def _to_int_ids(values):
+        ids = set()
+        for value in values or []:
+            try:
+                ids.add(int(value))
+            except (TypeError, ValueError):
+                continue
+        return ids
+
+    @staticmethod
+    def laptop_lines(items_data):
+        """
+        Normaliza las líneas de laptop de un formulario/JSON
+
+        Returns:
+            list: [{'laptop_id', 'quantity', 'serial_ids'}]
+        """
+        lines = []
+        for item in items_data:
+            if item.get('type') == 'laptop' and item.get('laptop_id'):
+                lines.append({
+                    'laptop_id': int(item['laptop_id']),
+                    'quantity': int(item.get('quantity', 1)),
+                    'serial_ids': [int(s) for s in item.get('serial_ids') or []]
+                })
+        return lines
+
+    @staticmethod
+    def load(laptop_ids, serial_ids=(), lock=False, held=None):
+        """
+        Carga laptops y seriales en dos consultas IN (...)
+
+        Args:
+            laptop_ids: IDs de laptops involucradas
+            serial_ids: IDs de seriales indicados explícitamente
+            lock: SELECT ... FOR UPDATE (dentro de la transacción de la venta)
+            held: Reserva de la propia factura (ReservationService.held_by)
+
+        Returns:
+            StockSnapshot
+        """
+        laptop_ids = StockAllocator._to_int_ids(laptop_ids)
+        serial_ids = StockAllocator._to_int_ids(serial_ids) | set((held or {}).get('serials', ()))
+
+        laptops, serials = {}, {}
+        if laptop_ids:
+            query = Laptop.query.filter(Laptop.id.in_(laptop_ids)).order_by(Laptop.id)
+            if lock:
+                query = query.with_for_update(of=Laptop).populate_existing()
+            laptops = {laptop.id: laptop for laptop in query.all()}
+
+        conditions = []
+        if serial_ids:
+            conditions.append(LaptopSerial.id.in_(serial_ids))
+        if laptop_ids:
+            conditions.append(and_(LaptopSerial.laptop_id.in_(laptop_ids), LaptopSerial.status == 'available'))
+        if conditions:
+            query = LaptopSerial.query.filter(or_(*conditions)).order_by(LaptopSerial.id)
+            if lock:
+                query = query.with_for_update(of=LaptopSerial).populate_existing()
+            serials = {serial.id: serial for serial in query.all()}
+
+        return StockSnapshot(laptops, serials, held)
+
+    @staticmethod
+    def serial_totals(laptop_ids):
+        """{laptop_id: total de seriales registrados} en un GROUP BY"""
+        laptop_ids = StockAllocator._to_int_ids(laptop_ids)
+        if not laptop_ids:
+            return {}
+        return dict(
+            db.session.query(LaptopSerial.laptop_id, func.count(LaptopSerial.id))
+            .filter(LaptopSerial.laptop_id.in_(laptop_ids))
+            .group_by(LaptopSerial.laptop_id)
+            .all()
+        )
+
+    @staticmethod
+    def assigned_counts(invoice_item_ids):
+        """{invoice_item_id: seriales ya asignados} en un GROUP BY"""
+        invoice_item_ids = StockAllocator._to_int_ids(invoice_item_ids)
+        if not invoice_item_ids:
+            return {}
+        return dict(
+            db.session.query(InvoiceItemSerial.invoice_item_id, func.count(InvoiceItemSerial.id))
+            .filter(InvoiceItemSerial.invoice_item_id.in_(invoice_item_ids))
+            .group_by(InvoiceItemSerial.invoice_item_id)
+            .all()
+        )
+
+    # ===== VALIDACIÓN =====
+
+    @staticmethod
+    def validate_lines(lines, snapshot, require_serials=True, serial_totals=None):
+        """
+        Valida las líneas contra el snapshot (sin consultas)
+
+        Returns:
+            tuple: (error_message o None, warnings)
+        """
+        warnings = []
+        for line in lines:
+            laptop_id, quantity, serial_ids = line['laptop_id'], line['quantity'], line['serial_ids']
+
+            laptop = snapshot.laptops.get(laptop_id)
+            if not laptop:
+                return f'Laptop ID {laptop_id} no encontrada', []
+
+            # Verificar cantidad general (descontando otras líneas del mismo producto)
+            available_quantity = snapshot.quantity_left(laptop_id)
+            if available_quantity < quantity:
+                return (
+                    f'Stock insuficiente para {laptop.display_name}. '
+                    f'Disponible: {available_quantity}, Solicitado: {quantity}'
+                ), []
+            snapshot.use_quantity(laptop_id, quantity)
+
+            if require_serials:
+                available_serials = snapshot.available_count(laptop_id)
+                if available_serials < quantity:
+                    return (
+                        f'Seriales insuficientes para {laptop.display_name}. '
+                        f'Seriales disponibles: {available_serials}, Solicitado: {quantity}'
+                    ), []
+
+                if serial_ids:
+                    if len(serial_ids) != quantity:
+                        return (
+                            f'Debe especificar exactamente {quantity} serial(es) para {laptop.display_name}. '
+                            f'Especificados: {len(serial_ids)}'
+                        ), []
+
+                    valid, errors = snapshot.check_serials(serial_ids, laptop.id, f'a {laptop.display_name}')
+                    if errors:
+                        return errors[0], []
+                    snapshot.take(valid)
+                else:
+                    snapshot.take_available(laptop_id, quantity)
+                    warnings.append(
+                        f'No se especificaron seriales para {laptop.display_name}. '
+                        f'Se asignarán automáticamente.'
+                    )
+            elif (serial_totals or {}).get(laptop_id, 0) > 0:
+                warnings.append(
+                    f'{laptop.display_name} tiene seriales registrados. '
+                    f'Considere especificar qué seriales se venden.'
+                )
+
+        return None, warnings
+
+    # ===== ESCRITURA =====
+
+    @staticmethod
+    def write_assignments(assignments, user_id=None):
+        """
+        Registra la venta de seriales en lote
+
+        Args:
+            assignments: [(invoice_item, [LaptopSerial])]
+            user_id: Usuario que realiza la operación
+
+        Returns:
+            int: Seriales asignados
+
+        Los INSERT de relaciones y movimientos son un executemany cada uno;
+        el cambio de estado de los seriales queda pendiente en la sesión y
+        sale en el flush como un UPDATE agrupado. No hace commit.
+        """
+        links, movements = [], []
+        now = datetime.utcnow()
+
+        for invoice_item, serials in assignments:
+            invoice = invoice_item.invoice
+            description = f"Vendido en factura #{invoice.invoice_number if invoice else 'N/A'}"
+            for serial in serials:
+                links.append({
+                    'invoice_item_id': invoice_item.id,
+                    'serial_id': serial.id,
+                    'unit_sale_price': invoice_item.unit_price,
+                })
+                movements.append({
+                    'serial_id': serial.id,
+                    'movement_type': 'sold',
+                    'previous_status': serial.status,
+                    'new_status': 'sold',
+                    'invoice_id': invoice_item.invoice_id,
+                    'description': description,
+                    'user_id': user_id,
+                })
+                serial.status = 'sold'
+                serial.sold_price = invoice_item.unit_price
+                serial.sold_date = now
+
+        if links:
+            db.session.execute(insert(InvoiceItemSerial), links)
+            db.session.execute(insert(SerialMovement), movements)
+        return len(links)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# ESCRITOR DE AUDITORÍA ASÍNCRONO POR LOTES
+# ============================================
+# Los eventos de auditoría se encolan (cola acotada en memoria del proceso)
+# y un hilo en segundo plano los inserta en lotes con un solo INSERT
+# multi-fila por lote, en su propia conexión. La petición ya no espera la
+# escritura ni comparte la transacción de negocio.
+#
+# - Se escribe un lote cuando se juntan AUDIT_BATCH_SIZE eventos o pasan
+#   AUDIT_FLUSH_INTERVAL segundos desde el primero pendiente
+# - Contrapresión: si la cola está llena, enqueue() espera hasta
+#   AUDIT_ENQUEUE_TIMEOUT; si sigue llena, el propio llamador escribe un lote
+#   (la cola nunca crece sin límite y no se pierden eventos)
+# - Al cerrar el proceso (atexit) se vacía la cola de forma síncrona
+# - Con AUDIT_ASYNC_ENABLED = False (tests) se escribe en línea
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """
+    Cola acotada de eventos de auditoría con escritura por lotes
+
+    Configuración (app.config):
+        AUDIT_ASYNC_ENABLED: Escritura en segundo plano (default: True)
+        AUDIT_QUEUE_SIZE: Eventos máximos en cola (default: 10000)
+        AUDIT_BATCH_SIZE: Eventos por INSERT (default: 200)
+        AUDIT_FLUSH_INTERVAL: Segundos máximos de espera de un evento (default: 2.0)
+        AUDIT_ENQUEUE_TIMEOUT: Espera máxima con la cola llena (default: 0.5)
+    """
+
+    # Tramo máximo de espera del hilo (reacción a shutdown)
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, app=None, sink=None):
+        self.enabled = True
+        self.batch_size = 200
+        self.flush_interval = 2.0
+        self.enqueue_timeout = 0.5
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._app = None
+        self._atexit_registered = False
+        self._counters = {'enqueued': 0, 'written': 0, 'batches': 0, 'inline': 0, 'errors': 0}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Lee la configuración y registra el vaciado al cerrar el proceso"""
+        self._app = app
+        self.enabled = app.config.get('AUDIT_ASYNC_ENABLED', True)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', 2.0)
+        self.enqueue_timeout = app.config.get('AUDIT_ENQUEUE_TIMEOUT', 0.5)
+        if self.sink is None:
+            self.sink = self._insert_rows
+
+        # La cola solo se reemplaza con el hilo detenido y sin eventos pendientes
+        with self._thread_lock:
+            if (self._thread is None or not self._thread.is_alive()) and self._queue.empty():
+                self._queue = queue.Queue(maxsize=app.config.get('AUDIT_QUEUE_SIZE', 10000))
+
+        # Varias apps (tests, factory) comparten el escritor: un solo vaciado al salir
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+        app.extensions['audit_writer'] = self
+
+    # ===== ESCRITURA =====
+
+    def _insert_rows(self, rows):
+        """Sink por defecto: un INSERT multi-fila en una conexión propia"""
+        from app import db
+        from app.models.audit_log import AuditLog
+
+        with self._app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(AuditLog.__table__.insert(), rows)
+
+    def _write(self, rows):
+        """
+        Escribe un lote; los errores se registran y no llegan a la petición
+
+        Si el lote falla se reintenta fila por fila, así un evento inválido
+        no descarta a los demás.
+        """
+        if not rows:
+            return 0
+        try:
+            self.sink(rows)
+        except Exception as e:
+            if len(rows) > 1:
+                logger.warning(f"Lote de auditoría rechazado ({len(rows)} eventos), se escribe fila por fila: {e}")
+                return sum(self._write([row]) for row in rows)
+            self._counters['errors'] += 1
+            logger.error(f"No se pudo escribir un evento de auditoría: {e}")
+            return 0
+
+        self._counters['written'] += len(rows)
+        self._counters['batches'] += 1
+        return len(rows)
+
+    def _drain(self, limit=None):
+        """Saca hasta `limit` eventos de la cola sin esperar"""
+        rows = []
+        while limit is None or len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def flush(self):
+        """Escribe de forma síncrona todo lo pendiente. Retorna eventos escritos"""
+        written = 0
+        while True:
+            rows = self._drain(self.batch_size)
+            if not rows:
+                return written
+            written += self._write(rows)
+
+    # ===== ENCOLADO =====
+
+    def enqueue(self, row):
+        """
+        Encola un evento (dict con las columnas de audit_logs)
+
+        Con la cola llena espera hasta enqueue_timeout y, si sigue llena,
+        escribe un lote en el hilo del llamador (contrapresión).
+        """
+        if not self.enabled:
+            self._counters['inline'] += 1
+            self._write([row])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+            self._counters['enqueued'] += 1
+        except queue.Full:
+            self._counters['inline'] += 1
+            self._write(self._drain(self.batch_size - 1) + [row])
+
+    # ===== HILO EN SEGUNDO PLANO =====
+
+    def _ensure_worker(self):
+        """Arranca el hilo la primera vez (y después de un fork)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='audit_writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        rows = []
+        deadline = None
+        while not self._stopping.is_set():
+            # Espera en tramos cortos para atender shutdown() a tiempo
+            try:
+                rows.append(self._queue.get(timeout=self.POLL_INTERVAL))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            # Lote completo o intervalo vencido desde el primer evento pendiente
+            if rows and (len(rows) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(rows)
+                rows, deadline = [], None
+
+        self._write(rows)
+
+    def shutdown(self, timeout=5.0):
+        """Detiene el hilo y vacía la cola de forma síncrona"""
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+    # ===== ESTADÍSTICAS =====
+
+    def stats(self):
+        """Contadores y tamaño actual de la cola"""
+        return dict(self._counters, pending=self._queue.qsize(), maxsize=self._queue.maxsize)
@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# CACHÉ DE RESULTADOS EN DOS NIVELES
+# ============================================
+# Nivel 1: LRU + TTL en memoria del proceso (acotado por cantidad de entradas)
+# Nivel 2 (opcional): compartido entre workers de gunicorn, en sqlite o en
+#                     archivos dentro de un directorio
+#
+# La invalidación es por etiquetas ('invoices', 'expenses', 'inventory').
+# Cada etiqueta tiene un token de generación que forma parte de la clave;
+# invalidar = generar un token nuevo, con lo que todas las entradas viejas
+# quedan inalcanzables en todos los workers y expiran solas.
+#
+# Las escrituras sobre facturas, gastos y laptops invalidan automáticamente
+# sus etiquetas al hacer commit (ver _register_invalidation_events).
+
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Tabla -> etiqueta de invalidación
+TABLE_TAGS = {
+    'invoices': 'invoices',
+    'invoice_items': 'invoices',
+    'invoice_item_serials': 'invoices',
+    'daily_sales_facts': 'invoices',
+    'customers': 'invoices',
+    'expenses': 'expenses',
+    'expense_categories': 'expenses',
+    'laptops': 'inventory',
+    'laptop_serials': 'inventory',
+    'products': 'inventory',
+    'brands': 'inventory',
+    'laptop_models': 'inventory',
+    'processors': 'inventory',
+    'graphics_cards': 'inventory',
+    'ram': 'inventory',
+    'storage': 'inventory',
+    'screens': 'inventory',
+}
+
+# Cada cuántas escrituras se purgan las entradas vencidas del nivel compartido
+PURGE_EVERY = 200
+
+# Marca para distinguir "no encontrado" de un valor None cacheado
+_MISSING = object()
+
+
+# ============================================
+# NIVEL 1: LRU + TTL EN MEMORIA
+# ============================================
+
+class LocalTier:
+    """Caché en memoria del proceso, acotada (LRU) y con expiración (TTL)"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ============================================
+# NIVEL 2: COMPARTIDO ENTRE PROCESOS
+# ============================================
+
+class SqliteTier:
+    """Caché compartida en un archivo sqlite (un archivo para todos los workers)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries '
+                '(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_generations '
+                '(tag TEXT PRIMARY KEY, token TEXT NOT NULL)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT expires_at, value FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[0] < time.time():
+            return _MISSING
+        return row[1]
+
+    def set(self, key, payload, ttl):
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, expires_at, value) VALUES (?, ?, ?)',
+            (key, time.time() + ttl, payload)
+        )
+
+    def get_tokens(self, tags):
+        placeholders = ','.join('?' * len(tags))
+        rows = self._connect().execute(
+            f'SELECT tag, token FROM cache_generations WHERE tag IN ({placeholders})', tuple(tags)
+        ).fetchall()
+        return dict(rows)
+
+    def bump(self, tags):
+        conn = self._connect()
+        for tag in tags:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_generations (tag, token) VALUES (?, ?)',
+                (tag, uuid.uuid4().hex[:12])
+            )
+
+    def purge_expired(self):
+        self._connect().execute('DELETE FROM cache_entries WHERE expires_at < ?', (time.time(),))
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM cache_entries')
+        conn.execute('DELETE FROM cache_generations')
+
+
+class FileSystemTier:
+    """Caché compartida en un directorio: un archivo por entrada y por etiqueta"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.join(path, 'generations'), exist_ok=True)
+
+    def _entry_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest[:2], digest + '.cache')
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._entry_path(key), 'rb') as fh:
+                expires_at = float(fh.readline())
+                if expires_at < time.time():
+                    return _MISSING
+                return fh.read()
+        except (OSError, ValueError):
+            return _MISSING
+
+    def set(self, key, payload, ttl):
+        header = f'{time.time() + ttl}\n'.encode('ascii')
+        self._write_atomic(self._entry_path(key), header + payload)
+
+    def get_tokens(self, tags):
+        tokens = {}
+        for tag in tags:
+            try:
+                with open(os.path.join(self.path, 'generations', tag), 'r') as fh:
+                    tokens[tag] = fh.read().strip()
+            except OSError:
+                continue
+        return tokens
+
+    def bump(self, tags):
+        for tag in tags:
+            self._write_atomic(
+                os.path.join(self.path, 'generations', tag),
+                uuid.uuid4().hex[:12].encode('ascii')
+            )
+
+    def purge_expired(self):
+        now = time.time()
+        for root, _dirs, files in os.walk(self.path):
+            for name in files:
+                if not name.endswith('.cache'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    with open(file_path, 'rb') as fh:
+                        expired = float(fh.readline()) < now
+                    if expired:
+                        os.remove(file_path)
+                except (OSError, ValueError):
+                    continue
+
+    def clear(self):
+        for root, _dirs, files in os.walk(self.path):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    continue
+
+
+SHARED_BACKENDS = {
+    'sqlite': SqliteTier,
+    'filesystem': FileSystemTier,
+}
+
+
+# ============================================
+# FACHADA
+# ============================================
+
+class ResultCache:
+    """
+    Caché de resultados con nivel local y nivel compartido opcional
+
+    Configuración (app.config):
+        RESULT_CACHE_ENABLED: Activa/desactiva la caché (default: True)
+        RESULT_CACHE_TTL: Segundos de vida por defecto (default: 300)
+        RESULT_CACHE_MAX_ENTRIES: Tamaño máximo del nivel local (default: 512)
+        RESULT_CACHE_SHARED_BACKEND: None, 'sqlite' o 'filesystem'
+        RESULT_CACHE_SHARED_PATH: Archivo sqlite o directorio del nivel compartido
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.default_ttl = 300
+        self.local = LocalTier()
+        self.shared = None
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits_local': 0, 'hits_shared': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+        self._writes = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Lee la configuración y registra la invalidación automática por commit"""
+        self.enabled = app.config.get('RESULT_CACHE_ENABLED', True)
+        self.default_ttl = app.config.get('RESULT_CACHE_TTL', 300)
+        self.local = LocalTier(app.config.get('RESULT_CACHE_MAX_ENTRIES', 512))
+
+        backend = app.config.get('RESULT_CACHE_SHARED_BACKEND')
+        if backend:
+            default_path = os.path.join(
+                app.instance_path, 'result_cache.sqlite3' if backend == 'sqlite' else 'result_cache'
+            )
+            path = app.config.get('RESULT_CACHE_SHARED_PATH') or default_path
+            os.makedirs(os.path.dirname(path) if backend == 'sqlite' else path, exist_ok=True)
+            self.shared = SHARED_BACKENDS[backend](path)
+
+        _register_invalidation_events(self)
+        app.extensions['result_cache'] = self
+
+    # ===== CONTADORES =====
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Contadores de aciertos/fallos y tamaño actual"""
+        with self._lock:
+            stats = dict(self._counters)
+
+        lookups = stats['hits_local'] + stats['hits_shared'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits_local'] + stats['hits_shared']) / lookups * 100, 2) if lookups else 0
+        stats['local_entries'] = len(self.local)
+        stats['local_evictions'] = self.local.evictions
+        stats['shared_backend'] = type(self.shared).__name__ if self.shared else None
+        return stats
+
+    # ===== CLAVES =====
+
+    def _current_tokens(self, tags):
+        if not tags:
+            return {}
+        if self.shared is not None:
+            try:
+                return self.shared.get_tokens(tags)
+            except Exception as e:
+                logger.warning(f"Caché compartida no disponible (tokens): {e}")
+                self._count('errors')
+        return {tag: self._tokens.get(tag, '0') for tag in tags}
+
+    def make_key(self, namespace, parts, tags=()):
+        """Arma la clave final: namespace + partes + tokens de generación de cada etiqueta"""
+        tokens = self._current_tokens(tags)
+        generation = ','.join(f'{tag}={tokens.get(tag, "0")}' for tag in sorted(tags))
+        raw = repr(parts)
+        if len(raw) > 200:
+            raw = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return f'{namespace}:{raw}|{generation}'
+
+    # ===== LECTURA / ESCRITURA =====
+
+    def get(self, key):
+        """Busca en el nivel local y luego en el compartido. Retorna (encontrado, valor)"""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count('hits_local')
+            return True, copy.deepcopy(value)
+
+        if self.shared is not None:
+            try:
+                payload = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Caché compartida no disponible (get): {e}")
+                self._count('errors')
+                payload = _MISSING
+
+            if payload is not _MISSING:
+                value = pickle.loads(zlib.decompress(payload))
+                self.local.set(key, value, self.default_ttl)
+                self._count('hits_shared')
+                return True, copy.deepcopy(value)
+
+        self._count('misses')
+        return False, None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.default_ttl
+        self.local.set(key, copy.deepcopy(value), ttl)
+
+        if self.shared is not None:
+            try:
+                self.shared.set(key, zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), ttl)
+
+                # Limpieza periódica de entradas vencidas del nivel compartido
+                self._writes += 1
+                if self._writes % PURGE_EVERY == 0:
+                    self.shared.purge_expired()
+            except Exception as e:
+                logger.warning(f"No se pudo guardar en la caché compartida: {e}")
+                self._count('errors')
+
+    def get_or_set(self, namespace, parts, compute, tags=(), ttl=None):
+        """
+        Retorna el valor cacheado o lo calcula con compute() y lo guarda
+
+        Args:
+            namespace: Prefijo de la clave (ej: 'dashboard.financial')
+            parts: Tupla con las partes variables de la clave
+            compute: Función sin argumentos que calcula el valor
+            tags: Etiquetas de invalidación de las que depende el valor
+            ttl: Segundos de vida (default: RESULT_CACHE_TTL)
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(namespace, parts, tags)
+        found, value = self.get(key)
+        if found:
+            return value
+
+        value = compute()
+        self.set(key, value, ttl)
+        return value
+
+    # ===== INVALIDACIÓN =====
+
+    def invalidate(self, *tags):
+        """Invalida todas las entradas que dependen de alguna de las etiquetas"""
+        tags = [tag for tag in tags if tag]
+        if not tags:
+            return
+
+        with self._lock:
+            for tag in tags:
+                self._tokens[tag] = uuid.uuid4().hex[:12]
+            self._counters['invalidations'] += 1
+
+        if self.shared is not None:
+            try:
+                self.shared.bump(tags)
+            except Exception as e:
+                logger.warning(f"No se pudo invalidar la caché compartida: {e}")
+                self._count('errors')
+
+    def clear(self):
+        """Vacía ambos niveles"""
+        self.local.clear()
+        with self._lock:
+            self._tokens.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    # ===== DECORADOR =====
+
+    def cached(self, namespace=None, tags=(), ttl=None, scoped=False, vary=None):
+        """
+        Decorador que cachea el resultado de una función según sus argumentos
+
+        Args:
+            namespace: Prefijo de la clave (default: módulo.nombre de la función)
+            tags: Etiquetas de invalidación
+            ttl: Segundos de vida
+            scoped: Si True, la clave incluye el alcance de permisos del usuario
+            vary: Función opcional cuyo resultado se agrega a la clave
+        """
+
+        def decorator(f):
+            key_namespace = namespace or f'{f.__module__}.{f.__qualname__}'
+
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                parts = (args, tuple(sorted(kwargs.items())))
+                if scoped:
+                    parts += (permission_scope(),)
+                if vary is not None:
+                    parts += (vary(),)
+
+                return self.get_or_set(
+                    key_namespace, parts, lambda: f(*args, **kwargs), tags=tags, ttl=ttl
+                )
+
+            decorated_function.uncached = f
+            return decorated_function
+
+        return decorator
+
+
+def permission_scope():
+    """
+    Alcance de permisos del usuario actual para separar entradas de caché
+
+    Los administradores comparten un alcance; el resto se agrupa por el
+    conjunto exacto de permisos (usuarios con el mismo rol comparten entradas).
+    """
+    from flask import has_request_context
+    from flask_login import current_user
+
+    if not has_request_context() or not current_user.is_authenticated:
+        return 'anonymous'
+    if current_user.is_admin:
+        return 'admin'
+
+    names = ','.join(sorted(current_user.get_permission_set()))
+    return 'perms:' + hashlib.sha1(names.encode('utf-8')).hexdigest()[:16]
+
+
+# ============================================
+# INVALIDACIÓN AUTOMÁTICA POR COMMIT
+# ============================================
+
+_events_registered = []
+
+
+def _register_invalidation_events(cache):
+    """
+    Registra listeners de sesión que recolectan las tablas modificadas en cada
+    flush (y en UPDATE/DELETE masivos) e invalidan sus etiquetas tras el commit
+    """
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if _events_registered:
+        _events_registered[0] = cache
+        return
+    _events_registered.append(cache)
+
+    def _pending_tags(session):
+        return session.info.setdefault('result_cache_tags', set())
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect_flushed(session, flush_context):
+        tags = _pending_tags(session)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table in TABLE_TAGS:
+                tags.add(TABLE_TAGS[table])
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def _collect_bulk(orm_execute_state):
+        if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            table = mapper.local_table.name
+        else:
+            # insert()/delete() sobre una Table sin mapper
+            table = getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None)
+        if table in TABLE_TAGS:
+            _pending_tags(orm_execute_state.session).add(TABLE_TAGS[table])
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate_committed(session):
+        tags = session.info.pop('result_cache_tags', None)
+        if tags:
+            _events_registered[0].invalidate(*tags)
+
+    @event.listens_for(Session, 'after_soft_rollback')
+    def _discard_pending(session, previous_transaction):
+        # Un rollback de SAVEPOINT no descarta lo pendiente de la transacción externa
+        if not previous_transaction.nested:
+            session.info.pop('result_cache_tags', None)
@@ -383,50 +383,75 @@ def rate_limit(max_requests=60, window=60):
     return decorator
 
 
-def cache_response(timeout=300):
+def cache_response(timeout=300, tags=(), scoped=True):
     """
-    Decorador simple de caché
-    (En producción usar Flask-Caching)
+    Decorador de caché de respuestas sobre la caché de resultados de la app
+    (LRU + TTL en memoria, nivel compartido opcional, invalidación por etiquetas)
 
     Uso:
         @app.route('/api/stats')
-        @cache_response(timeout=60)
+        @cache_response(timeout=60, tags=('invoices',))
         def get_stats():
-            # Esta función se ejecuta solo cada 60 segundos
+            # Se recalcula cada 60 segundos o cuando cambian las facturas
             ...
 
     Args:
         timeout: Tiempo en segundos para cachear
+        tags: Etiquetas de invalidación ('invoices', 'expenses', 'inventory')
+        scoped: Si la clave incluye el alcance de permisos del usuario
     """
 
     def decorator(f):
-        cache = {}
+        from app.extensions import result_cache
+        from app.utils.cache import permission_scope
+
+        namespace = f'response.{f.__module__}.{f.__qualname__}'
 
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            from time import time
-
-            # Crear clave de caché basada en la función y argumentos
-            cache_key = f"{f.__name__}:{str(args)}:{str(kwargs)}"
-            current_time = time()
+            # Clave: argumentos de la vista + query string + alcance de permisos
+            parts = (args, tuple(sorted(kwargs.items())), request.query_string.decode('utf-8'))
+            if scoped:
+                parts += (permission_scope(),)
+
+            def compute():
+                result = f(*args, **kwargs)
+                status = 200
+                if isinstance(result, tuple):
+                    if len(result) != 2:
+                        raise _Uncacheable(result)
+                    result, status = result
+
+                # Solo se cachean respuestas JSON exitosas (se guarda el contenido, no el objeto Response)
+                if hasattr(result, 'get_json'):
+                    if not result.is_json or result.status_code != 200:
+                        raise _Uncacheable((result, status))
+                    result = result.get_json()
+
+                if status != 200:
+                    raise _Uncacheable((result, status))
+                return result
 
-            # Verificar si existe en caché y no ha expirado
-            if cache_key in cache:
-                cached_time, cached_result = cache[cache_key]
-                if current_time - cached_time < timeout:
-                    return cached_result
-
-            # Ejecutar función y cachear resultado
-            result = f(*args, **kwargs)
-            cache[cache_key] = (current_time, result)
+            try:
+                data = result_cache.get_or_set(namespace, parts, compute, tags=tags, ttl=timeout)
+            except _Uncacheable as uncached:
+                return uncached.response
 
-            return result
+            return jsonify(data)
 
         return decorated_function
 
     return decorator
 
 
+class _Uncacheable(Exception):
+    """Respuesta que no se debe cachear (errores o contenido no JSON)"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
 def log_activity(action):
     """
     Decorador que registra actividades de usuarios
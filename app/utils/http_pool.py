@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# SESIÓN HTTP COMPARTIDA CON LÍMITE POR HOST
+# ============================================
+# Un requests.Session por proceso, con pool de conexiones keep-alive,
+# reintentos con backoff exponencial (429/5xx, respetando Retry-After) y un
+# semáforo por host para no superar N peticiones simultáneas al mismo
+# servidor aunque haya muchos hilos de trabajo.
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Estados que se reintentan
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostLimitedSession:
+    """
+    requests.Session con pool, reintentos y concurrencia acotada por host
+
+    Uso:
+        http = HostLimitedSession(max_per_host=4, retries=3, backoff=0.5)
+        response = http.get('https://live.icecat.biz/api/', params=..., timeout=15)
+    """
+
+    def __init__(self, max_per_host=4, retries=3, backoff=0.5, pool_size=None):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'waits': 0, 'errors': 0}
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=pool_size or max(max_per_host, 4),
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _semaphore(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return semaphore
+
+    def get(self, url, **kwargs):
+        """GET dentro del cupo del host (espera si ya hay max_per_host en curso)"""
+        semaphore = self._semaphore(url)
+        if not semaphore.acquire(blocking=False):
+            with self._lock:
+                self._counters['waits'] += 1
+            semaphore.acquire()
+        try:
+            with self._lock:
+                self._counters['requests'] += 1
+            return self.session.get(url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        finally:
+            semaphore.release()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# ============================================
+# CACHÉ PERSISTENTE DE RESPUESTAS DE ICECAT
+# ============================================
+# Una entrada por (GTIN, idioma) en un archivo sqlite compartido por todos
+# los workers:
+#   - raw:        cuerpo de la respuesta de Icecat comprimido (zlib)
+#   - normalized: resultado de IcecatService.normalize_data (JSON + zlib)
+#   - etag / last_modified / content_hash: para revalidar sin re-normalizar
+#   - normalizer_version: si cambian los parsers, se re-normaliza desde raw
+#                         sin volver a consultar la API
+#
+# Estados de una entrada según su antigüedad:
+#   fresca   (< ICECAT_CACHE_TTL)        -> se sirve tal cual
+#   vencida  (< ICECAT_CACHE_STALE_TTL)  -> se sirve y se revalida en segundo plano
+#   caducada                              -> se consulta Icecat en línea
+# Los "no encontrado" se guardan como entradas negativas con su propio TTL
+# (ICECAT_NEGATIVE_TTL), para que re-escanear una caja no repita la consulta.
+#
+# Fixtures (pruebas sin red): con ICECAT_FIXTURES_DIR y
+# ICECAT_FIXTURES_MODE = 'replay' las respuestas se leen de
+# <dir>/<gtin>.<idioma>.json o <dir>/<gtin>.json (sin archivo = no encontrado);
+# con 'record' se guardan ahí las respuestas reales.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Estados de una entrada
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+
+
+class IcecatCache:
+    """
+    Caché en disco de respuestas de Icecat por GTIN e idioma
+
+    Configuración (app.config):
+        ICECAT_CACHE_ENABLED: Activa/desactiva la caché (default: True)
+        ICECAT_CACHE_PATH: Archivo sqlite (default: instance/icecat_cache.sqlite3)
+        ICECAT_CACHE_TTL: Segundos en que una entrada es fresca (default: 7 días)
+        ICECAT_CACHE_STALE_TTL: Segundos en que una entrada vencida aún se sirve
+                                mientras se revalida (default: 90 días)
+        ICECAT_NEGATIVE_TTL: Segundos de vida de un "no encontrado" (default: 1 día)
+        ICECAT_FIXTURES_DIR: Directorio de respuestas grabadas
+        ICECAT_FIXTURES_MODE: None, 'replay' (sin red) o 'record'
+    """
+
+    def __init__(self, app=None, path=None):
+        self.enabled = True
+        self.ttl = 7 * 86400
+        self.stale_ttl = 90 * 86400
+        self.negative_ttl = 86400
+        self.fixtures_dir = None
+        self.fixtures_mode = None
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._counters = {'hits': 0, 'stale_hits': 0, 'negative_hits': 0, 'misses': 0, 'revalidations': 0,
+                          'errors': 0}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Lee la configuración; el archivo se crea en el primer uso"""
+        self.enabled = app.config.get('ICECAT_CACHE_ENABLED', True)
+        self.ttl = app.config.get('ICECAT_CACHE_TTL', self.ttl)
+        self.stale_ttl = app.config.get('ICECAT_CACHE_STALE_TTL', self.stale_ttl)
+        self.negative_ttl = app.config.get('ICECAT_NEGATIVE_TTL', self.negative_ttl)
+        self.fixtures_dir = app.config.get('ICECAT_FIXTURES_DIR')
+        self.fixtures_mode = app.config.get('ICECAT_FIXTURES_MODE') if self.fixtures_dir else None
+        self.path = app.config.get('ICECAT_CACHE_PATH') or os.path.join(app.instance_path, 'icecat_cache.sqlite3')
+        app.extensions['icecat_cache'] = self
+
+    # ===== CONEXIÓN =====
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'path', None) != self.path:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS icecat_responses ('
+                'gtin TEXT NOT NULL, language TEXT NOT NULL, status TEXT NOT NULL, '
+                'fetched_at REAL NOT NULL, etag TEXT, last_modified TEXT, content_hash TEXT, '
+                'normalizer_version INTEGER, raw BLOB, normalized BLOB, '
+                'PRIMARY KEY (gtin, language))'
+            )
+            self._local.conn = conn
+            self._local.path = self.path
+        return conn
+
+    def _execute(self, operation, sql, params=()):
+        """
+        Ejecuta una sentencia. Si el archivo no se puede abrir, está bloqueado
+        o dañado se registra y retorna None: la caché falla como un miss, nunca
+        hacia la petición.
+        """
+        try:
+            return self._connect().execute(sql, params)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Caché de Icecat no disponible ({operation}): {e}")
+            self._count('errors')
+            return None
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _pack(value):
+        return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _unpack(blob):
+        return json.loads(zlib.decompress(blob).decode('utf-8')) if blob else None
+
+    @staticmethod
+    def content_hash(body):
+        """Huella del cuerpo crudo: si no cambió, no hace falta re-normalizar"""
+        return hashlib.sha1(body).hexdigest()
+
+    # ===== LECTURA =====
+
+    def get(self, gtin, language):
+        """
+        Entrada de (gtin, idioma) sin el cuerpo crudo
+
+        Returns:
+            dict o None: {'status', 'normalized' (o {'error'} si es negativa),
+                          'fetched_at', 'age', 'etag', 'last_modified',
+                          'content_hash', 'normalizer_version'}
+        """
+        if not self.enabled:
+            return None
+        cursor = self._execute(
+            'get',
+            'SELECT status, fetched_at, etag, last_modified, content_hash, normalizer_version, normalized '
+            'FROM icecat_responses WHERE gtin = ? AND language = ?', (gtin, language)
+        )
+        if cursor is None:
+            return None
+
+        row = cursor.fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+
+        status, fetched_at, etag, last_modified, digest, version, normalized = row
+        return {
+            'status': status,
+            'fetched_at': fetched_at,
+            'age': time.time() - fetched_at,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': digest,
+            'normalizer_version': version,
+            'normalized': self._unpack(normalized),
+        }
+
+    def get_raw(self, gtin, language):
+        """Cuerpo crudo guardado (bytes) o None"""
+        cursor = self._execute(
+            'get_raw', 'SELECT raw FROM icecat_responses WHERE gtin = ? AND language = ?', (gtin, language)
+        )
+        row = cursor.fetchone() if cursor is not None else None
+        return zlib.decompress(row[0]) if row and row[0] else None
+
+    def is_fresh(self, entry):
+        ttl = self.negative_ttl if entry['status'] == NOT_FOUND else self.ttl
+        return entry['age'] < ttl
+
+    def is_servable(self, entry):
+        """Vencida pero dentro del margen en que se sirve mientras se revalida"""
+        return entry['status'] == FOUND and entry['age'] < self.stale_ttl
+
+    def record_hit(self, entry, stale=False):
+        if entry['status'] == NOT_FOUND:
+            self._count('negative_hits')
+        else:
+            self._count('stale_hits' if stale else 'hits')
+
+    # ===== ESCRITURA =====
+
+    def put(self, gtin, language, body, normalized, normalizer_version, etag=None, last_modified=None):
+        """Guarda una respuesta encontrada (body: bytes crudos de Icecat)"""
+        self._write(
+            gtin, language, FOUND, etag, last_modified, self.content_hash(body), normalizer_version,
+            zlib.compress(body), self._pack(normalized)
+        )
+
+    def put_not_found(self, gtin, language, error):
+        """Entrada negativa con el mensaje que se devolvió al usuario"""
+        self._write(gtin, language, NOT_FOUND, None, None, None, None, None, self._pack({'error': error}))
+
+    def _write(self, gtin, language, status, etag, last_modified, digest, version, raw, normalized):
+        if not self.enabled:
+            return
+        self._execute(
+            'put',
+            'INSERT OR REPLACE INTO icecat_responses (gtin, language, status, fetched_at, etag, '
+            'last_modified, content_hash, normalizer_version, raw, normalized) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (gtin, language, status, time.time(), etag, last_modified, digest, version, raw, normalized)
+        )
+
+    def update_normalized(self, gtin, language, normalized, normalizer_version):
+        """Reemplaza el resultado normalizado (parsers nuevos) sin tocar fetched_at"""
+        self._execute(
+            'update_normalized',
+            'UPDATE icecat_responses SET normalized = ?, normalizer_version = ? WHERE gtin = ? AND language = ?',
+            (self._pack(normalized), normalizer_version, gtin, language)
+        )
+
+    def touch(self, gtin, language):
+        """Revalidación sin cambios (304 o mismo contenido): la entrada vuelve a ser fresca"""
+        self._execute(
+            'touch',
+            'UPDATE icecat_responses SET fetched_at = ? WHERE gtin = ? AND language = ?',
+            (time.time(), gtin, language)
+        )
+
+    # ===== REVALIDACIÓN EN SEGUNDO PLANO =====
+
+    def begin_revalidation(self, gtin, language):
+        """True si nadie más en este proceso está revalidando la entrada"""
+        with self._lock:
+            if (gtin, language) in self._revalidating:
+                return False
+            self._revalidating.add((gtin, language))
+            self._counters['revalidations'] += 1
+            return True
+
+    def end_revalidation(self, gtin, language):
+        with self._lock:
+            self._revalidating.discard((gtin, language))
+
+    # ===== FIXTURES =====
+
+    def _fixture_paths(self, gtin, language):
+        return (
+            os.path.join(self.fixtures_dir, f'{gtin}.{language}.json'),
+            os.path.join(self.fixtures_dir, f'{gtin}.json'),
+        )
+
+    def load_fixture(self, gtin, language):
+        """Cuerpo grabado (bytes) o None si no hay fixture para el GTIN"""
+        for path in self._fixture_paths(gtin, language):
+            if os.path.exists(path):
+                with open(path, 'rb') as fh:
+                    return fh.read()
+        return None
+
+    def record_fixture(self, gtin, language, body):
+        """Graba una respuesta real como fixture (ICECAT_FIXTURES_MODE = 'record')"""
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        with open(self._fixture_paths(gtin, language)[0], 'wb') as fh:
+            fh.write(body)
+
+    # ===== MANTENIMIENTO =====
+
+    def stats(self):
+        """Contadores del proceso y tamaño del archivo"""
+        with self._lock:
+            stats = dict(self._counters)
+        try:
+            count, negatives, size = self._connect().execute(
+                "SELECT COUNT(*), SUM(status = 'not_found'), SUM(LENGTH(raw) + LENGTH(normalized)) "
+                "FROM icecat_responses"
+            ).fetchone()
+            stats.update(entries=count, negative_entries=negatives or 0, stored_bytes=size or 0)
+        except (sqlite3.Error, OSError):
+            pass
+        return stats
+
+    def purge(self, older_than=None):
+        """Borra entradas caducadas (ni siquiera servibles). Retorna cuántas"""
+        now = time.time()
+        cursor = self._execute(
+            'purge',
+            'DELETE FROM icecat_responses WHERE (status = ? AND fetched_at < ?) OR (status = ? AND fetched_at < ?)',
+            (FOUND, now - (older_than or self.stale_ttl), NOT_FOUND, now - self.negative_ttl)
+        )
+        return cursor.rowcount if cursor is not None else 0
+
+    def clear_negative(self):
+        """Olvida los "no encontrado" (p. ej. al cambiar las credenciales de Icecat)"""
+        self._execute('clear_negative', 'DELETE FROM icecat_responses WHERE status = ?', (NOT_FOUND,))
+
+    def clear(self):
+        self._execute('clear', 'DELETE FROM icecat_responses')
@@ -851,5 +851,9 @@ def generate_financial_history(admin_id, months=24, avg_sales=3000000, avg_expen
             total_expenses += amount
             
         db.session.commit()
+
+    # Recalcular el rollup diario de ventas para el rango simulado
+    from app.services.sales_fact_service import SalesFactService
+    SalesFactService.rebuild(start_date, date.today())
     
     return f"Simulados {months} meses de historia: Ventas promedio ~{avg_sales}, Gastos promedio ~{avg_expenses}"
\ No newline at end of file
@@ -1,8 +1,20 @@
 # -*- coding: utf-8 -*-
-from flask import session, request, current_app
+from flask import session, request, current_app, g, has_request_context
+from flask_login import current_user
+from sqlalchemy import bindparam
+from app import db
+from app.extensions import result_cache
 from app.models.user_session import UserSession
 from app.models.user import User
+from datetime import datetime
+import atexit
+import hashlib
+import logging
 import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 def create_session(user):
     """
@@ -33,6 +45,193 @@ def create_session(user):
     
     return user_session
 
+# ============================================
+# VALIDACIÓN CACHEADA Y ACTIVIDAD WRITE-BEHIND
+# ============================================
+# validate_session() corre en cada petición autenticada. Para no pagar una
+# lectura y una escritura por página/XHR:
+# - Los tokens validados se cachean VALIDATION_TTL segundos (result_cache,
+#   etiqueta por usuario). SessionService.terminate_* invalida la etiqueta,
+#   así la revocación se aplica en la siguiente petición. En las peticiones
+#   normales el preámbulo (load_request_auth) ya trae la sesión y esta
+#   caché no se consulta; ver "Cuál camino gana" más abajo.
+# - last_activity se acumula en memoria y se escribe con un UPDATE por lotes
+#   como máximo cada ACTIVITY_FLUSH_INTERVAL segundos. Lo pendiente se
+#   escribe también al cerrar el proceso (atexit).
+
+VALIDATION_TTL = 30
+ACTIVITY_FLUSH_INTERVAL = 60
+
+
+def user_sessions_tag(user_id):
+    """Etiqueta de caché de las sesiones validadas de un usuario"""
+    return f'user_sessions:{user_id}'
+
+
+def invalidate_user_sessions(*user_ids):
+    """Señal de revocación: descarta las validaciones cacheadas de esos usuarios"""
+    result_cache.invalidate(*[user_sessions_tag(user_id) for user_id in user_ids if user_id])
+
+
+class ActivityBuffer:
+    """
+    Acumula la última actividad por sesión y la escribe por lotes
+
+    Como máximo un UPDATE por lote cada `interval` segundos por proceso; cada
+    sesión aparece una sola vez en el lote con su actividad más reciente.
+    """
+
+    def __init__(self, interval=ACTIVITY_FLUSH_INTERVAL):
+        self.interval = interval
+        self._app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def init_app(self, app):
+        """Registra la escritura de lo pendiente al cerrar el proceso"""
+        if self._app is None:
+            atexit.register(self.shutdown)
+        self._app = app
+
+    def record(self, session_id, when=None):
+        """Registra actividad; escribe el lote si ya pasó el intervalo"""
+        with self._lock:
+            self._pending[session_id] = when or datetime.utcnow()
+            due = time.monotonic() - self._last_flush >= self.interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Escribe todas las actividades pendientes en un solo UPDATE por lotes"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        table = UserSession.__table__
+        statement = table.update().where(
+            table.c.id == bindparam('session_id')
+        ).values(last_activity=bindparam('last_activity'))
+
+        try:
+            # Conexión propia: no toca la transacción de la petición
+            with db.engine.begin() as connection:
+                connection.execute(statement, [
+                    {'session_id': session_id, 'last_activity': when}
+                    for session_id, when in pending.items()
+                ])
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la actividad de sesiones: {e}")
+            return 0
+
+        return len(pending)
+
+    def shutdown(self):
+        """Escribe lo pendiente (fuera de una petición, con el contexto de la app)"""
+        if self._app is None:
+            return self.flush()
+        with self._app.app_context():
+            return self.flush()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
+activity_buffer = ActivityBuffer()
+
+
+# ============================================
+# PREÁMBULO DE AUTENTICACIÓN (una consulta por petición)
+# ============================================
+# El user_loader de Flask-Login llama a load_request_auth(): una sola consulta
+# trae el usuario, su fila de sesión (por el token de la cookie) y los IDs de
+# sus roles vigentes. El resultado queda en g._request_auth y lo reutilizan
+# current_user, validate_session() y User.get_permission_set()
+# (permission_required).
+#
+# Cuál camino gana: si el preámbulo cargó al usuario actual con el mismo
+# token, validate_session() usa su fila de sesión y no consulta nada más.
+# La validación cacheada (VALIDATION_TTL) solo atiende las llamadas sin
+# preámbulo para ese usuario/token (p. ej. el token cambió durante la
+# petición o validate_session() se llama fuera del user_loader).
+
+def load_request_auth(user_id):
+    """
+    Carga usuario + sesión + roles vigentes en una consulta y los deja en g
+
+    Returns:
+        User o None si no existe
+    """
+    from app.models.rbac_associations import user_roles
+    from app.models.role import Role
+
+    token = session.get('session_token')
+    now = datetime.utcnow()
+
+    rows = db.session.query(User, UserSession, Role.id).outerjoin(
+        UserSession, db.and_(
+            UserSession.user_id == User.id,
+            UserSession.session_token == (token or '')
+        )
+    ).outerjoin(
+        user_roles, db.and_(
+            user_roles.c.user_id == User.id,
+            user_roles.c.is_active == True,
+            db.or_(
+                user_roles.c.expires_at.is_(None),
+                user_roles.c.expires_at > now
+            )
+        )
+    ).outerjoin(
+        Role, db.and_(
+            Role.id == user_roles.c.role_id,
+            Role.is_active == True
+        )
+    ).filter(User.id == user_id).all()
+
+    if not rows:
+        return None
+
+    user, user_session = rows[0][0], rows[0][1]
+    g._request_auth = {
+        'user_id': user.id,
+        'token': token,
+        'session': {
+            'id': user_session.id,
+            'user_id': user_session.user_id,
+            'expires_at': user_session.expires_at
+        } if user_session and user_session.is_valid() else None,
+        'role_ids': frozenset(role_id for _user, _session, role_id in rows if role_id)
+    }
+    return user
+
+
+def preloaded_auth(user_id):
+    """Estado de autenticación cargado en el preámbulo para ese usuario (o None)"""
+    if not has_request_context():
+        return None
+    auth = g.get('_request_auth')
+    return auth if auth and auth['user_id'] == user_id else None
+
+
+def _load_session(token):
+    """Lee la sesión de la DB. Retorna dict cacheable o None si no es válida"""
+    user_session = UserSession.query.filter_by(session_token=token).first()
+    if not user_session or not user_session.is_valid():
+        return None
+
+    return {
+        'id': user_session.id,
+        'user_id': user_session.user_id,
+        'expires_at': user_session.expires_at
+    }
+
+
 def validate_session():
     """
     Valida si la sesión actual es válida.
@@ -42,16 +241,34 @@ def validate_session():
     
     if not token:
         return False
-        
-    # Buscar sesión en DB
-    user_session = UserSession.query.filter_by(session_token=token).first()
-    
-    if user_session and user_session.is_valid():
-        # Actualizar última actividad
-        user_session.update_activity()
+
+    user_id = getattr(current_user, 'id', None)
+
+    # Sesión ya leída por el preámbulo en esta petición
+    auth = preloaded_auth(user_id) if user_id else None
+    if auth and auth['token'] == token:
+        if auth['session'] is None:
+            return False
+        activity_buffer.record(auth['session']['id'])
         return True
-        
-    return False
+
+    tags = (user_sessions_tag(user_id),) if user_id else ()
+    token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    # Validación cacheada (se vuelve a leer la DB si la sesión venció)
+    key = result_cache.make_key('session.valid', (token_hash,), tags=tags) if result_cache.enabled else None
+    found, info = result_cache.get(key) if key else (False, None)
+
+    if not found or info['expires_at'] <= datetime.utcnow():
+        info = _load_session(token)
+        if info is None:
+            return False
+        if key:
+            result_cache.set(key, info, VALIDATION_TTL)
+
+    # Actualizar última actividad (write-behind)
+    activity_buffer.record(info['id'])
+    return True
 
 def terminate_current_session():
     """
@@ -63,5 +280,6 @@ def terminate_current_session():
         user_session = UserSession.query.filter_by(session_token=token).first()
         if user_session:
             user_session.terminate()
+            invalidate_user_sessions(user_session.user_id)
             
     session.pop('session_token', None)
@@ -66,6 +66,50 @@ class Config:
     ALLOW_REGISTRATION = False  # Solo creación manual de usuarios
     REQUIRE_EMAIL_VERIFICATION = False
 
+    # CACHÉ DE RESULTADOS (dashboard y reportes)
+    RESULT_CACHE_ENABLED = True
+    RESULT_CACHE_TTL = 300  # segundos
+    RESULT_CACHE_MAX_ENTRIES = 512
+    # Nivel compartido entre workers: None, 'sqlite' o 'filesystem'
+    RESULT_CACHE_SHARED_BACKEND = os.environ.get('RESULT_CACHE_SHARED_BACKEND') or None
+    RESULT_CACHE_SHARED_PATH = os.environ.get('RESULT_CACHE_SHARED_PATH')  # default: instance/
+
+    # AUDITORÍA (escritura asíncrona por lotes)
+    AUDIT_ASYNC_ENABLED = True
+    AUDIT_QUEUE_SIZE = 10000  # eventos máximos en cola (contrapresión al llenarse)
+    AUDIT_BATCH_SIZE = 200  # eventos por INSERT
+    AUDIT_FLUSH_INTERVAL = 2.0  # segundos
+    AUDIT_ENQUEUE_TIMEOUT = 0.5  # segundos de espera con la cola llena
+
+    # PARTICIONES Y RETENCIÓN (audit_logs, serial_movements)
+    PARTITION_ARCHIVE_DIR = os.environ.get('PARTITION_ARCHIVE_DIR')  # default: instance/archive
+    PARTITION_RETENTION_MONTHS = {'audit_logs': 12, 'serial_movements': 24}
+
+    # RESERVAS DE STOCK (facturas en borrador/emitidas)
+    STOCK_RESERVATION_TTL_HOURS = 48  # vencidas las libera `flask release-expired-reservations`
+
+    # CACHÉ DE ICECAT (respuestas por GTIN e idioma, en disco)
+    ICECAT_CACHE_ENABLED = True
+    ICECAT_CACHE_PATH = os.environ.get('ICECAT_CACHE_PATH')  # default: instance/icecat_cache.sqlite3
+    ICECAT_CACHE_TTL = 7 * 86400  # segundos en que una entrada es fresca
+    ICECAT_CACHE_STALE_TTL = 90 * 86400  # vencida: se sirve y se revalida en segundo plano
+    ICECAT_NEGATIVE_TTL = 86400  # "no encontrado"
+    ICECAT_FIXTURES_DIR = os.environ.get('ICECAT_FIXTURES_DIR')
+    ICECAT_FIXTURES_MODE = os.environ.get('ICECAT_FIXTURES_MODE')  # None, 'replay' o 'record'
+
+    # CLIENTE HTTP DE ICECAT E IMPORTACIÓN MASIVA
+    ICECAT_BASE_URL = os.environ.get('ICECAT_BASE_URL')  # default: https://live.icecat.biz/api/
+    ICECAT_MAX_CONCURRENCY = 4  # peticiones simultáneas a Icecat por proceso
+    ICECAT_HTTP_RETRIES = 3  # reintentos en 429/5xx y errores de conexión
+    ICECAT_HTTP_BACKOFF = 0.5  # segundos (exponencial)
+    ICECAT_HTTP_TIMEOUT = 15
+    ICECAT_IMPORT_WORKERS = 8  # hilos que consultan y normalizan
+    ICECAT_IMPORT_BATCH_SIZE = 25  # laptops por transacción
+
+    # RE-SINCRONIZACIÓN PROGRAMADA CON ICECAT (flask icecat-resync)
+    ICECAT_RESYNC_MAX_AGE_DAYS = 30  # laptops con datos de Icecat más viejos que esto
+    ICECAT_RESYNC_BATCH_SIZE = 50  # laptops por transacción
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -77,12 +121,18 @@ class ProductionConfig(Config):
     TESTING = False
     SESSION_COOKIE_SECURE = True
     SQLALCHEMY_ECHO = False
+    RESULT_CACHE_SHARED_BACKEND = os.environ.get('RESULT_CACHE_SHARED_BACKEND', 'sqlite')
 
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    RESULT_CACHE_ENABLED = False
+    AUDIT_ASYNC_ENABLED = False
+    ICECAT_CACHE_PATH = ':memory:'
+    ICECAT_FIXTURES_DIR = os.path.join(basedir, 'tests', 'fixtures', 'icecat')
+    ICECAT_FIXTURES_MODE = 'replay'
 
 
 config = {
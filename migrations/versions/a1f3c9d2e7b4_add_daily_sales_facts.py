@@ -0,0 +1,62 @@
+"""add daily sales facts rollup
+
+Revision ID: a1f3c9d2e7b4
+Revises: 854478d0d9b3
+Create Date: 2026-10-16 09:12:41.218034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1f3c9d2e7b4'
+down_revision = '854478d0d9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales_facts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fact_date', sa.Date(), nullable=False),
+    sa.Column('item_type', sa.String(length=20), nullable=False),
+    sa.Column('laptop_id', sa.Integer(), nullable=True),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('brand_name', sa.String(length=100), nullable=True),
+    sa.Column('category_name', sa.String(length=100), nullable=True),
+    sa.Column('payment_method', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('units_sold', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('cost', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('margin_sum', sa.Numeric(precision=14, scale=4), nullable=False),
+    sa.Column('line_count', sa.Integer(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('subtotal', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('tax_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['laptop_id'], ['laptops.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('daily_sales_facts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_sales_facts_fact_date'), ['fact_date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_daily_sales_facts_laptop_id'), ['laptop_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_daily_sales_facts_product_id'), ['product_id'], unique=False)
+        batch_op.create_index('idx_sales_fact_date_status', ['fact_date', 'status'], unique=False)
+        batch_op.create_index('idx_sales_fact_date_type', ['fact_date', 'item_type'], unique=False)
+
+    # Nota: poblar con `flask rebuild-sales-facts` despues de migrar
+
+
+def downgrade():
+    with op.batch_alter_table('daily_sales_facts', schema=None) as batch_op:
+        batch_op.drop_index('idx_sales_fact_date_type')
+        batch_op.drop_index('idx_sales_fact_date_status')
+        batch_op.drop_index(batch_op.f('ix_daily_sales_facts_product_id'))
+        batch_op.drop_index(batch_op.f('ix_daily_sales_facts_laptop_id'))
+        batch_op.drop_index(batch_op.f('ix_daily_sales_facts_fact_date'))
+
+    op.drop_table('daily_sales_facts')
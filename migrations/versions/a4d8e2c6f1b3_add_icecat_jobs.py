@@ -0,0 +1,71 @@
+"""add icecat_jobs and icecat_job_items for bulk GTIN import
+
+Revision ID: a4d8e2c6f1b3
+Revises: f3c9a7d1b2e8
+Create Date: 2026-10-16 19:42:11.308164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8e2c6f1b3'
+down_revision = 'f3c9a7d1b2e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('icecat_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('options', sa.JSON(), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('succeeded', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('batch_timings', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('icecat_jobs', schema=None) as batch_op:
+        batch_op.create_index('idx_icecat_job_status', ['status', 'kind'], unique=False)
+
+    op.create_table('icecat_job_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('line_number', sa.Integer(), nullable=False),
+    sa.Column('gtin', sa.String(length=20), nullable=True),
+    sa.Column('purchase_cost', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('sale_price', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('laptop_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['icecat_jobs.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['laptop_id'], ['laptops.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('icecat_job_items', schema=None) as batch_op:
+        batch_op.create_index('idx_icecat_item_job_status', ['job_id', 'status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('icecat_job_items', schema=None) as batch_op:
+        batch_op.drop_index('idx_icecat_item_job_status')
+
+    op.drop_table('icecat_job_items')
+
+    with op.batch_alter_table('icecat_jobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_icecat_job_status')
+
+    op.drop_table('icecat_jobs')
@@ -0,0 +1,26 @@
+"""add laptop catalog keyset index
+
+Revision ID: b7e2d4a9c1f0
+Revises: a1f3c9d2e7b4
+Create Date: 2026-10-16 11:03:27.554120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4a9c1f0'
+down_revision = 'a1f3c9d2e7b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('laptops', schema=None) as batch_op:
+        batch_op.create_index('idx_laptop_catalog_keyset', ['is_published', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('laptops', schema=None) as batch_op:
+        batch_op.drop_index('idx_laptop_catalog_keyset')
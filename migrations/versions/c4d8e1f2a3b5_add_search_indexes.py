@@ -0,0 +1,76 @@
+"""add full-text and trigram search indexes
+
+Revision ID: c4d8e1f2a3b5
+Revises: b7e2d4a9c1f0
+Create Date: 2026-10-16 12:41:08.217305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1f2a3b5'
+down_revision = 'b7e2d4a9c1f0'
+branch_labels = None
+depends_on = None
+
+
+# Debe coincidir con SearchService.ENTITIES: tabla -> ((columna, peso, trigram), ...)
+SEARCH_COLUMNS = {
+    'laptops': (
+        ('sku', 'A', True),
+        ('display_name', 'A', True),
+        ('slug', 'B', False),
+        ('short_description', 'C', False),
+    ),
+    'customers': (
+        ('first_name', 'A', True),
+        ('last_name', 'A', True),
+        ('company_name', 'A', True),
+        ('id_number', 'A', True),
+        ('email', 'B', True),
+        ('phone_primary', 'C', False),
+    ),
+    'invoices': (
+        ('invoice_number', 'A', True),
+        ('ncf', 'A', True),
+    ),
+    'laptop_serials': (
+        ('serial_number', 'A', True),
+        ('serial_normalized', 'A', False),
+        ('barcode', 'A', True),
+    ),
+}
+
+
+def _document(columns):
+    return ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({name}, '')), '{weight}')"
+        for name, weight, _trigram in columns
+    )
+
+
+def upgrade():
+    # Solo PostgreSQL: en SQLite la búsqueda usa LIKE
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table, columns in SEARCH_COLUMNS.items():
+        op.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_search_tsv ON {table} USING gin (({_document(columns)}))')
+        for name, _weight, trigram in columns:
+            if trigram:
+                op.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{name}_trgm ON {table} USING gin ({name} gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, columns in SEARCH_COLUMNS.items():
+        op.execute(f'DROP INDEX IF EXISTS idx_{table}_search_tsv')
+        for name, _weight, trigram in columns:
+            if trigram:
+                op.execute(f'DROP INDEX IF EXISTS idx_{table}_{name}_trgm')
@@ -0,0 +1,32 @@
+"""add laptop icecat sync index
+
+Revision ID: c5f1e9a3d7b2
+Revises: a4d8e2c6f1b3
+Create Date: 2026-10-16 21:18:40.662917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f1e9a3d7b2'
+down_revision = 'a4d8e2c6f1b3'
+branch_labels = None
+depends_on = None
+
+
+ICECAT_LAPTOPS = sa.text("gtin IS NOT NULL AND icecat_import_status IN ('imported', 'synced', 'not_found')")
+
+
+def upgrade():
+    with op.batch_alter_table('laptops', schema=None) as batch_op:
+        batch_op.create_index(
+            'idx_laptop_icecat_synced', ['icecat_last_synced_at', 'id'], unique=False,
+            postgresql_where=ICECAT_LAPTOPS, sqlite_where=ICECAT_LAPTOPS
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('laptops', schema=None) as batch_op:
+        batch_op.drop_index('idx_laptop_icecat_synced')
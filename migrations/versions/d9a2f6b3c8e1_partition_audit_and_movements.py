@@ -0,0 +1,101 @@
+"""partition audit_logs and serial_movements by month
+
+Revision ID: d9a2f6b3c8e1
+Revises: c4d8e1f2a3b5
+Create Date: 2026-10-16 15:22:41.903118
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a2f6b3c8e1'
+down_revision = 'c4d8e1f2a3b5'
+branch_labels = None
+depends_on = None
+
+
+# Tablas de solo-inserción particionadas por RANGE (created_at)
+PARTITIONED_TABLES = ('audit_logs', 'serial_movements')
+
+# Particiones creadas por adelantado (el resto lo crea PartitionService)
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rebuild(table, partitioned):
+    """
+    Recrea la tabla (particionada o normal) con las mismas columnas, índices,
+    claves foráneas y secuencia, y copia los datos.
+    """
+    conn = op.get_bind()
+    old = f'{table}_old'
+
+    indexes = conn.execute(sa.text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :table AND indexname <> :pkey"
+    ), {'table': table, 'pkey': f'{table}_pkey'}).fetchall()
+    foreign_keys = conn.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {'table': table}).fetchall()
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+
+    # Liberar los nombres de la tabla vieja
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER INDEX {table}_pkey RENAME TO {old}_pkey')
+    for name, _definition in indexes:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_old')
+
+    if partitioned:
+        # La clave primaria de una tabla particionada debe incluir created_at
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                   f'PARTITION BY RANGE (created_at)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)')
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+        first = conn.execute(sa.text(f'SELECT min(created_at) FROM {old}')).scalar()
+        current = date.today().replace(day=1)
+        month = date(first.year, first.month, 1) if first else current
+        while month <= _add_months(current, MONTHS_AHEAD):
+            end = _add_months(month, 1)
+            op.execute(f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+                       f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')")
+            month = end
+    else:
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+
+    # Las definiciones se leyeron antes del RENAME: apuntan a la tabla nueva
+    for _name, definition in indexes:
+        op.execute(definition)
+    for name, definition in foreign_keys:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    op.execute(f'DROP TABLE {old}')
+
+
+def upgrade():
+    # Solo PostgreSQL: en SQLite PartitionService trabaja por rangos de created_at
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in PARTITIONED_TABLES:
+        _rebuild(table, partitioned=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in PARTITIONED_TABLES:
+        _rebuild(table, partitioned=False)
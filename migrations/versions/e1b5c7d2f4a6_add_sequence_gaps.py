@@ -0,0 +1,33 @@
+"""add sequence_gaps table
+
+Revision ID: e1b5c7d2f4a6
+Revises: d9a2f6b3c8e1
+Create Date: 2026-10-16 16:48:10.371254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b5c7d2f4a6'
+down_revision = 'd9a2f6b3c8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sequence_gaps',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('prefix', sa.String(length=10), nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=30), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'prefix', 'number', name='uq_sequence_gap')
+    )
+
+
+def downgrade():
+    op.drop_table('sequence_gaps')
@@ -0,0 +1,56 @@
+"""add stock_reservations and available quantity index
+
+Revision ID: f3c9a7d1b2e8
+Revises: e1b5c7d2f4a6
+Create Date: 2026-10-16 18:05:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9a7d1b2e8'
+down_revision = 'e1b5c7d2f4a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('laptop_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('serial_ids', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['laptop_id'], ['laptops.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_reservations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stock_reservations_invoice_id'), ['invoice_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_stock_reservations_laptop_id'), ['laptop_id'], unique=False)
+        batch_op.create_index('idx_reservation_status_expires', ['status', 'expires_at'], unique=False)
+        batch_op.create_index('idx_reservation_invoice_status', ['invoice_id', 'status'], unique=False)
+
+    # Índice de expresión para Laptop.available_quantity > 0
+    op.create_index('idx_laptop_available', 'laptops',
+                    ['is_published', sa.text('(quantity - reserved_quantity)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_laptop_available', table_name='laptops')
+
+    with op.batch_alter_table('stock_reservations', schema=None) as batch_op:
+        batch_op.drop_index('idx_reservation_invoice_status')
+        batch_op.drop_index('idx_reservation_status_expires')
+        batch_op.drop_index(batch_op.f('ix_stock_reservations_laptop_id'))
+        batch_op.drop_index(batch_op.f('ix_stock_reservations_invoice_id'))
+
+    op.drop_table('stock_reservations')
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: normalización de respuestas de Icecat por marca
+
+Normaliza las respuestas grabadas (tests/fixtures/icecat/*.json) agrupadas
+por marca y reporta, por cada una:
+- productos/s y ms por producto (mejor de 3 corridas)
+- memoria por producto: pico de KB asignados durante la normalización
+  (tracemalloc) y bloques/KB que retiene el resultado
+
+Con --compare-map también mide la búsqueda original que recorría
+STANDARD_SPECS_MAP en cada campo, frente al índice SPEC_FIELD_INDEX.
+
+Con --save guarda el reporte en JSON; con --baseline compara contra un
+reporte anterior y termina con código 1 si alguna marca es más lenta que
+la tolerancia o asigna más memoria. No usa red ni base de datos.
+
+Uso:
+    python scripts/benchmark_icecat_normalization.py
+    python scripts/benchmark_icecat_normalization.py --save /tmp/icecat_bench.json
+    python scripts/benchmark_icecat_normalization.py --baseline /tmp/icecat_bench.json --tolerance 0.25
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from unittest import mock
+
+sys.path.append(os.getcwd())
+
+from app.services.icecat_service import IcecatService
+from app.services.standard_specs_map import get_field_ids, get_field_names
+
+DEFAULT_FIXTURES = os.path.join('tests', 'fixtures', 'icecat')
+
+
+def map_get_spec_value(indexed_specs, field_path):
+    """Búsqueda original: recorre el mapa y normaliza IDs/nombres en cada sonda"""
+    for feat_id in get_field_ids(field_path):
+        if str(feat_id) in indexed_specs['by_id']:
+            return indexed_specs['by_id'][str(feat_id)]
+    for name in get_field_names(field_path):
+        if name.lower() in indexed_specs['by_name']:
+            return indexed_specs['by_name'][name.lower()]
+    return ''
+
+
+def load_payloads(directory):
+    """{marca: [payload, ...]} de las respuestas grabadas"""
+    by_brand = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, 'rb') as fh:
+            data = json.loads(fh.read())
+        if isinstance(data, dict) and isinstance(data.get('data'), dict):
+            brand = data['data'].get('GeneralInfo', {}).get('Brand') or '?'
+            by_brand[brand.upper()].append(data['data'])
+    return dict(sorted(by_brand.items()))
+
+
+def time_per_product(payloads, rounds):
+    """Segundos por producto (mejor de 3 corridas)"""
+    best = None
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for payload in payloads:
+                IcecatService.normalize_data(payload)
+        elapsed = (time.perf_counter() - started) / (rounds * len(payloads))
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def allocations_per_product(payloads):
+    """(KB pico, KB retenidos, bloques retenidos) promedio por producto"""
+    peak_total = retained_total = blocks_total = 0
+    tracemalloc.start()
+    try:
+        for payload in payloads:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            blocks = sys.getallocatedblocks()
+            result = IcecatService.normalize_data(payload)
+            blocks_total += sys.getallocatedblocks() - blocks
+            current, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - base
+            retained_total += current - base
+            del result
+    finally:
+        tracemalloc.stop()
+    count = len(payloads)
+    return peak_total / 1024 / count, retained_total / 1024 / count, blocks_total / count
+
+
+def benchmark(by_brand, rounds):
+    report = {}
+    for brand, payloads in by_brand.items():
+        seconds = time_per_product(payloads, rounds)
+        peak_kb, retained_kb, blocks = allocations_per_product(payloads)
+        report[brand] = {
+            'products': len(payloads),
+            'ms_per_product': round(seconds * 1000, 4),
+            'products_per_sec': round(1 / seconds, 1),
+            'peak_kb': round(peak_kb, 2),
+            'retained_kb': round(retained_kb, 2),
+            'retained_blocks': round(blocks, 1),
+        }
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"  {'marca':<11}{'prod':>5}{'ms/prod':>10}{'prod/s':>10}{'KB pico':>10}{'KB ret.':>9}{'bloques':>9}")
+    for brand, row in report.items():
+        line = (f"  {brand:<11}{row['products']:>5}{row['ms_per_product']:>10.3f}{row['products_per_sec']:>10.0f}"
+                f"{row['peak_kb']:>10.1f}{row['retained_kb']:>9.1f}{row['retained_blocks']:>9.0f}")
+        previous = (baseline or {}).get(brand)
+        if previous:
+            line += f"   ({row['ms_per_product'] / previous['ms_per_product'] - 1:+.0%} tiempo, " \
+                    f"{row['peak_kb'] / previous['peak_kb'] - 1:+.0%} memoria)"
+        print(line)
+
+
+def regressions(report, baseline, tolerance):
+    found = []
+    for brand, row in report.items():
+        previous = baseline.get(brand)
+        if not previous:
+            continue
+        if row['ms_per_product'] > previous['ms_per_product'] * (1 + tolerance):
+            found.append(f"{brand}: {previous['ms_per_product']:.3f} -> {row['ms_per_product']:.3f} ms/producto")
+        if row['peak_kb'] > previous['peak_kb'] * (1 + tolerance):
+            found.append(f"{brand}: {previous['peak_kb']:.1f} -> {row['peak_kb']:.1f} KB pico")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de normalización de Icecat por marca')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--compare-map', action='store_true', help='Medir también la búsqueda sin índice')
+    parser.add_argument('--save', help='Guardar el reporte en este archivo JSON')
+    parser.add_argument('--baseline', help='Reporte JSON anterior contra el que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Regresión tolerada (default: 0.25)')
+    args = parser.parse_args()
+
+    by_brand = load_payloads(args.fixtures)
+    if not by_brand:
+        print(f"No hay respuestas grabadas en {args.fixtures}")
+        return 1
+    total = sum(len(payloads) for payloads in by_brand.values())
+    print(f"{total} productos de {len(by_brand)} marcas x {args.rounds} rondas\n")
+
+    # Calentamiento (imports perezosos, cachés de re)
+    for payloads in by_brand.values():
+        time_per_product(payloads, 1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+
+    report = benchmark(by_brand, args.rounds)
+    print_report(report, baseline)
+
+    if args.compare_map:
+        every = [payload for payloads in by_brand.values() for payload in payloads]
+        with mock.patch.object(IcecatService, '_get_spec_value', staticmethod(map_get_spec_value)):
+            before = time_per_product(every, args.rounds)
+        after = time_per_product(every, args.rounds)
+        print(f"\n  mapa   {before * 1000:.3f} ms/producto   índice {after * 1000:.3f} ms/producto   "
+              f"({before / after:.2f}x)")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nReporte guardado en {args.save}")
+
+    if baseline:
+        found = regressions(report, baseline, args.tolerance)
+        for message in found:
+            print(f"❌ Regresión {message}")
+        if found:
+            return 1
+        print("\n✅ Sin regresiones respecto al reporte base")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: asignación concurrente de NCF y números de factura
+
+Crea facturas desde varios hilos a la vez y compara tres estrategias:
+- legacy:  leer la secuencia, incrementar en Python y confiar en el commit
+- atomica: UPDATE ... RETURNING en la transacción de cada factura
+- bloque:  cada hilo reserva un bloque de números y lo consume
+
+Reporta facturas/s, errores (colisiones de NCF/número o bloqueos) y huecos.
+
+Uso:
+    python scripts/benchmark_invoice_numbering.py                       # sqlite temporal
+    BENCH_DATABASE_URL=postgresql+psycopg://... python scripts/benchmark_invoice_numbering.py --threads 16
+
+Con PostgreSQL usar una base de datos descartable: el script crea y borra tablas.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+sys.path.append(os.getcwd())
+
+from config import TestingConfig, config
+
+from app import create_app, db
+
+
+class BenchmarkConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL') or (
+        'sqlite:///' + os.path.join(tempfile.gettempdir(), 'luxera_numbering_bench.sqlite3')
+    )
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 32, 'max_overflow': 0} if os.environ.get('BENCH_DATABASE_URL') else {
+        'connect_args': {'timeout': 30}
+    }
+
+
+def reset(app):
+    """Tablas limpias, un cliente y la secuencia B02"""
+    from app.models.customer import Customer
+    from app.models.invoice import InvoiceSettings, NCFSequence
+
+    db.drop_all()
+    db.create_all()
+    customer = Customer(id_number='00100000001', id_type='cedula', first_name='Bench', last_name='Cliente')
+    db.session.add_all([customer, InvoiceSettings(), NCFSequence(ncf_type='B02', name='Consumo', range_end=99999999)])
+    db.session.commit()
+    return customer.id
+
+
+def legacy_numbers():
+    """Estrategia anterior: leer, incrementar en Python, commit con la factura"""
+    from app.models.invoice import InvoiceSettings, NCFSequence
+
+    sequence = NCFSequence.query.filter_by(ncf_type='B02').first()
+    settings = InvoiceSettings.query.first()
+    ncf = f"B02{str(sequence.current_sequence).zfill(8)}"
+    sequence.current_sequence += 1
+    number = f"{settings.invoice_prefix}-{str(settings.invoice_sequence).zfill(8)}"
+    settings.invoice_sequence += 1
+    return ncf, number
+
+
+def atomic_numbers():
+    from app.models.invoice import InvoiceSettings, NCFSequence
+
+    settings = InvoiceSettings.query.first()
+    return NCFSequence.query.filter_by(ncf_type='B02').first().get_next_ncf(), settings.get_next_invoice_number()
+
+
+def worker(app, strategy, customer_id, count, stats, lock):
+    from app.models.invoice import Invoice
+    from app.services.sequence_allocator import SequenceAllocator
+
+    with app.app_context():
+        blocks = None
+        if strategy == 'bloque':
+            blocks = (SequenceAllocator.reserve_ncf_block('B02', count), SequenceAllocator.reserve_invoice_block(count))
+
+        ok = errors = 0
+        for _ in range(count):
+            try:
+                if strategy == 'legacy':
+                    ncf, number = legacy_numbers()
+                elif strategy == 'atomica':
+                    ncf, number = atomic_numbers()
+                else:
+                    ncf, number = blocks[0].next(), blocks[1].next()
+
+                db.session.add(Invoice(
+                    invoice_number=number, ncf=ncf, ncf_type='B02', customer_id=customer_id,
+                    subtotal=Decimal('100'), tax_amount=Decimal('18'), total=Decimal('118')
+                ))
+                db.session.commit()
+                ok += 1
+            except Exception:
+                db.session.rollback()
+                errors += 1
+
+        if blocks:
+            for block in blocks:
+                block.close()
+        db.session.remove()
+
+    with lock:
+        stats['ok'] += ok
+        stats['errors'] += errors
+
+
+def run(app, strategy, threads, per_thread):
+    from app.services.sequence_allocator import SequenceAllocator
+
+    with app.app_context():
+        customer_id = reset(app)
+
+    stats, lock = {'ok': 0, 'errors': 0}, threading.Lock()
+    pool = [
+        threading.Thread(target=worker, args=(app, strategy, customer_id, per_thread, stats, lock))
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        gaps = len(SequenceAllocator.find_gaps('B02'))
+    return stats['ok'], stats['errors'], elapsed, gaps
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--invoices', type=int, default=50, help='Facturas por hilo')
+    args = parser.parse_args()
+
+    config['benchmark'] = BenchmarkConfig
+    app = create_app('benchmark')
+    with app.app_context():
+        db.engine.echo = False
+
+    backend = BenchmarkConfig.SQLALCHEMY_DATABASE_URI.split(':')[0]
+    print(f"{args.threads} hilos x {args.invoices} facturas ({backend})")
+    print(f"\n{'Estrategia':<12}{'OK':>8}{'Errores':>10}{'Fact/s':>10}{'Huecos':>9}")
+    print('-' * 49)
+    for strategy in ('legacy', 'atomica', 'bloque'):
+        ok, errors, elapsed, gaps = run(app, strategy, args.threads, args.invoices)
+        print(f'{strategy:<12}{ok:>8}{errors:>10}{ok / elapsed:>10.0f}{gaps:>9}')
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: carga diferida de columnas pesadas de Laptop
+
+Compara memoria pico (tracemalloc) y latencia de las consultas de listado
+(catálogo público, búsqueda de facturación, página del inventario) con las
+columnas pesadas diferidas (perfil por defecto) y cargadas de una vez
+(Laptop.with_heavy_columns()), sobre un catálogo sintético.
+
+Uso:
+    python scripts/benchmark_laptop_loading.py            # 10.000 laptops
+    python scripts/benchmark_laptop_loading.py --laptops 2000 --repeat 5
+
+Usa la configuración 'testing' (sqlite en memoria), no toca la base real.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import or_
+
+from app import create_app, db
+
+
+def build_payloads():
+    """Contenido representativo de las columnas pesadas (~8 KB por laptop)"""
+    features = {f'Feature {i}': {'value': 'x' * 40, 'unit': 'mm', 'group': f'Grupo {i % 12}'} for i in range(60)}
+    return {
+        'long_description_html': '<p>' + ('Descripción de marketing. ' * 60) + '</p>',
+        'unified_specs': {'procesador': {'modelo': 'Core i7-1355U', 'nucleos': 10}, 'extra': ['a' * 50] * 40},
+        'connectivity_ports': {'USB-C': 2, 'USB-A': 2, 'HDMI': 1, 'RJ45': 1},
+        'full_specs_json': features,
+        'normalized_specs': {k: v['value'] for k, v in features.items()},
+        'icecat_raw_data': {'data': {'FeaturesGroups': [features], 'Gallery': ['img'] * 30}},
+    }
+
+
+def seed(count):
+    """Crea catálogos mínimos y `count` laptops con columnas pesadas llenas"""
+    from app.models.laptop import (
+        Laptop, Brand, LaptopModel, Processor, OperatingSystem,
+        Screen, GraphicsCard, Storage, Ram, Store
+    )
+
+    catalog_ids = {}
+    for key, model in (
+        ('brand_id', Brand), ('model_id', LaptopModel), ('processor_id', Processor),
+        ('os_id', OperatingSystem), ('screen_id', Screen), ('graphics_card_id', GraphicsCard),
+        ('storage_id', Storage), ('ram_id', Ram), ('store_id', Store)
+    ):
+        item = model(name=f'Bench {model.__name__}')
+        db.session.add(item)
+        db.session.flush()
+        catalog_ids[key] = item.id
+
+    payloads = build_payloads()
+    rows = []
+    for i in range(count):
+        rows.append(dict(
+            sku=f'BENCH-{i:06d}', slug=f'bench-{i:06d}', display_name=f'Laptop Benchmark {i}',
+            short_description='Laptop de prueba', is_published=True,
+            purchase_cost=500, sale_price=800 + i % 300, quantity=1 + i % 5,
+            **catalog_ids, **payloads
+        ))
+        if len(rows) == 1000:
+            db.session.bulk_insert_mappings(Laptop, rows)
+            rows = []
+    if rows:
+        db.session.bulk_insert_mappings(Laptop, rows)
+    db.session.commit()
+
+
+def scenarios():
+    """Consultas equivalentes a las vistas de listado"""
+    from app.models.laptop import Laptop
+
+    published = (Laptop.is_published == True, Laptop.quantity > 0)
+
+    return {
+        'public.catalog / api_laptops': lambda q: q.filter(*published).order_by(Laptop.created_at.desc()).all(),
+        'invoices.api_search_laptops': lambda q: q.filter(
+            *published, or_(Laptop.display_name.ilike('%benchmark 9%'), Laptop.sku.ilike('%benchmark 9%'))
+        ).limit(10).all(),
+        'inventory.laptops_list (pag. 20)': lambda q: q.order_by(Laptop.entry_date.desc()).paginate(
+            page=1, per_page=20, error_out=False
+        ).items,
+    }
+
+
+def measure(run, query, repeat):
+    """Retorna (ms promedio, KB de memoria pico promedio)"""
+    times, peaks = [], []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        tracemalloc.start()
+        started = time.perf_counter()
+        run(query())
+        times.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    return sum(times) / repeat, sum(peaks) / repeat
+
+
+def run_benchmark(count=10000, repeat=3):
+    from app.models.laptop import Laptop
+
+    print(f'Sembrando {count} laptops...')
+    seed(count)
+
+    profiles = {
+        'diferido': lambda: Laptop.query,
+        'completo': lambda: Laptop.query.options(Laptop.with_heavy_columns()),
+    }
+
+    print(f"\n{'Vista':<36}{'Perfil':<10}{'ms':>10}{'KB pico':>12}")
+    print('-' * 68)
+    for name, run in scenarios().items():
+        results = {}
+        for profile, query in profiles.items():
+            results[profile] = measure(run, query, repeat)
+            ms, kb = results[profile]
+            print(f'{name:<36}{profile:<10}{ms:>10.1f}{kb:>12.0f}')
+
+        full_ms, full_kb = results['completo']
+        lazy_ms, lazy_kb = results['diferido']
+        if lazy_ms and lazy_kb:
+            print(f"{'':<36}{'ahorro':<10}{full_ms / lazy_ms:>9.1f}x{full_kb / lazy_kb:>11.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--laptops', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        run_benchmark(args.laptops, args.repeat)
@@ -0,0 +1,96 @@
+"""
+Servidor HTTP local que reemplaza a la API de Icecat en las pruebas.
+
+Sirve los fixtures de tests/fixtures/icecat por parámetro GTIN (404 si no
+hay archivo). Con fail_first=N las primeras N peticiones de cada GTIN
+responden 503, para probar los reintentos. Cuenta peticiones y el máximo
+de peticiones simultáneas observado.
+
+Uso:
+    stub = IcecatStub(delay=0.05)
+    base_url = stub.start()   # http://127.0.0.1:<puerto>/api/
+    ...
+    stub.stop()
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'icecat')
+
+
+class IcecatStub:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, delay=0.0, fail_first=0):
+        self.fixtures_dir = fixtures_dir
+        self.delay = delay
+        self.fail_first = fail_first
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def _body(self, gtin, language):
+        for name in (f'{gtin}.{language}.json', f'{gtin}.json'):
+            path = os.path.join(self.fixtures_dir, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as fh:
+                    return fh.read()
+        return None
+
+    def _handle(self, handler):
+        query = parse_qs(urlsplit(handler.path).query)
+        gtin = query.get('GTIN', [''])[0]
+        language = query.get('Language', ['es'])[0]
+
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            attempt = self._attempts[gtin] = self._attempts.get(gtin, 0) + 1
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if attempt <= self.fail_first:
+                status, body = 503, b'{"Message": "Service Unavailable"}'
+            else:
+                body = self._body(gtin, language)
+                status, body = (200, body) if body is not None else (404, b'{"Message": "Not found"}')
+
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(body)))
+            if status == 503:
+                handler.send_header('Retry-After', '0')
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return f'http://127.0.0.1:{self._server.server_address[1]}/api/'
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
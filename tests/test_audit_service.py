@@ -0,0 +1,144 @@
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app import create_app, db
+from app.models.audit_log import AuditLog
+from app.models.user import User
+from app.services.audit_service import AuditService
+
+
+class AuditCursorTestCase(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        log = SimpleNamespace(created_at=datetime(2026, 3, 1, 10, 30, 15, 120000), id=4521)
+
+        cursor = AuditService.encode_cursor(log)
+
+        self.assertEqual(AuditService.decode_cursor(cursor), (log.created_at, log.id))
+
+    def test_invalid_cursor_is_ignored(self):
+        self.assertIsNone(AuditService.decode_cursor('no-es-un-cursor'))
+        self.assertIsNone(AuditService.decode_cursor(None))
+
+
+class AuditQueryTestCase(unittest.TestCase):
+    """Resumen agrupado y búsqueda keyset contra el cálculo anterior en Python / OFFSET"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.ana = User(username='ana', email='ana@test.com')
+        self.luis = User(username='luis', email='luis@test.com')
+        for user in (self.ana, self.luis):
+            user.set_password('pass')
+        db.session.add_all([self.ana, self.luis])
+        db.session.flush()
+
+        now = datetime.utcnow().replace(microsecond=0)
+        users = [self.ana.id, self.luis.id, None, 999]  # 999: usuario borrado
+        modules = ['inventory', 'invoices', 'auth']
+        statuses = ['success', 'success', 'failed', 'denied', 'success']
+        for i in range(23):
+            db.session.add(AuditLog(
+                user_id=users[i % 4], action='update_laptop' if i % 3 == 0 else f'action_{i % 5}',
+                module=modules[i % 3], target_type='Laptop' if i % 2 else 'Invoice', status=statuses[i % 5],
+                # Grupos de tres logs con el mismo created_at (empates)
+                created_at=now - timedelta(minutes=i // 3)
+            ))
+        # Fuera del periodo del resumen
+        db.session.add(AuditLog(user_id=self.ana.id, action='login', module='auth',
+                                created_at=now - timedelta(days=30)))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    # ===== RESUMEN =====
+
+    def test_activity_summary_matches_per_log_computation(self):
+        summary = AuditService.get_activity_summary(7)
+
+        start = datetime.utcnow() - timedelta(days=7)
+        logs = AuditLog.query.filter(AuditLog.created_at >= start).all()
+        statuses = Counter(log.status for log in logs)
+        by_user = {}
+        for log in logs:
+            if log.user_id:
+                entry = by_user.setdefault(log.user_id, {'username': log.user.username if log.user else 'Unknown', 'count': 0})
+                entry['count'] += 1
+
+        self.assertEqual(summary, {
+            'total_actions': len(logs),
+            'successful': statuses['success'],
+            'failed': statuses['failed'],
+            'denied': statuses['denied'],
+            'by_module': dict(Counter(log.module for log in logs)),
+            'by_user': by_user,
+            'period_days': 7
+        })
+        self.assertEqual(summary['total_actions'], 23)
+        self.assertEqual(summary['by_user'][999]['username'], 'Unknown')
+
+    # ===== BÚSQUEDA KEYSET =====
+
+    def offset_pages(self, limit, **filters):
+        """Paginación anterior con OFFSET, en el mismo orden"""
+        query = AuditLog.query
+        for column, value in filters.items():
+            query = query.filter(getattr(AuditLog, column) == value)
+        query = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+        pages, page = [], 0
+        while True:
+            ids = [log.id for log in query.offset(page * limit).limit(limit).all()]
+            if not ids:
+                return pages
+            pages.append(ids)
+            page += 1
+
+    def keyset_pages(self, limit, **filters):
+        pages, cursor = [], None
+        while True:
+            logs = AuditService.search_logs(limit=limit, cursor=cursor, **filters)
+            if not logs:
+                return pages
+            pages.append([log.id for log in logs])
+            cursor = AuditService.encode_cursor(logs[-1])
+
+    def test_pages_match_offset_across_ties(self):
+        # Páginas de 4 cortan los grupos de tres logs con el mismo created_at
+        pages = self.keyset_pages(4)
+
+        self.assertEqual(pages, self.offset_pages(4))
+        self.assertEqual(sum(len(page) for page in pages), 24)
+
+    def test_last_page_is_partial_and_then_empty(self):
+        pages = self.keyset_pages(5)
+
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 4])
+        last = db.session.get(AuditLog, pages[-1][-1])
+        self.assertEqual(AuditService.search_logs(limit=5, cursor=AuditService.encode_cursor(last)), [])
+
+    def test_filtered_search_matches_offset(self):
+        self.assertEqual(self.keyset_pages(2, module='inventory'), self.offset_pages(2, module='inventory'))
+        self.assertEqual(self.keyset_pages(3, status='success', user_id=self.ana.id),
+                         self.offset_pages(3, status='success', user_id=self.ana.id))
+
+    def test_text_search_pages(self):
+        expected = [
+            log.id for log in AuditLog.query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).all()
+            if 'laptop' in log.action.lower() or 'laptop' in (log.target_type or '').lower()
+        ]
+
+        pages = self.keyset_pages(3, query='LAPTOP')
+
+        self.assertEqual([log_id for page in pages for log_id in page], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import threading
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.extensions import audit_writer
+from app.models.audit_log import AuditLog
+from app.services.audit_service import AuditService
+from app.utils.audit_writer import AuditWriter
+
+
+class RecordingSink:
+    def __init__(self, block=None, reject=None):
+        self.batches = []
+        self.block = block
+        self.reject = reject
+
+    def __call__(self, rows):
+        # Solo el hilo de fondo se bloquea (simula una base de datos lenta)
+        if self.block is not None and threading.current_thread().name == 'audit_writer':
+            self.block.wait(5)
+        if self.reject and any(row.get('action') == self.reject for row in rows):
+            raise ValueError('fila inválida')
+        self.batches.append(list(rows))
+
+
+class AuditWriterTestCase(unittest.TestCase):
+    def make_writer(self, sink, **options):
+        writer = AuditWriter(sink=sink)
+        writer.batch_size = options.get('batch_size', 10)
+        writer.flush_interval = options.get('flush_interval', 0.05)
+        writer.enqueue_timeout = options.get('enqueue_timeout', 0.01)
+        return writer
+
+    def test_events_are_written_in_batches(self):
+        sink = RecordingSink()
+        writer = self.make_writer(sink, batch_size=10)
+
+        for i in range(25):
+            writer.enqueue({'action': f'a{i}'})
+        writer.shutdown()
+
+        self.assertEqual(sum(len(batch) for batch in sink.batches), 25)
+        self.assertLessEqual(max(len(batch) for batch in sink.batches), 10)
+
+    def test_shutdown_flushes_pending_events(self):
+        sink = RecordingSink()
+        writer = self.make_writer(sink, flush_interval=60)
+
+        writer.enqueue({'action': 'login'})
+        writer.shutdown()
+
+        self.assertEqual(sink.batches[-1], [{'action': 'login'}])
+        self.assertEqual(writer.stats()['pending'], 0)
+
+    def test_full_queue_writes_in_caller(self):
+        release = threading.Event()
+        sink = RecordingSink(block=release)
+        writer = self.make_writer(sink, batch_size=1)
+        writer._queue.maxsize = 2
+
+        # El hilo queda bloqueado en el primer lote; la cola se llena
+        for i in range(6):
+            if i == 5:
+                release.set()
+            writer.enqueue({'action': f'a{i}'})
+        writer.shutdown()
+
+        self.assertGreater(writer.stats()['inline'], 0)
+        self.assertEqual(sum(len(batch) for batch in sink.batches), 6)
+
+    def test_bad_row_does_not_drop_the_batch(self):
+        sink = RecordingSink(reject='bad')
+        writer = self.make_writer(sink)
+
+        written = writer._write([{'action': 'a'}, {'action': 'bad'}, {'action': 'b'}])
+
+        self.assertEqual(written, 2)
+        self.assertEqual(sink.batches, [[{'action': 'a'}], [{'action': 'b'}]])
+        self.assertEqual(writer.stats()['errors'], 1)
+
+
+class AuditWriterInitTestCase(unittest.TestCase):
+    def test_init_app_registers_atexit_once(self):
+        writer = AuditWriter(sink=RecordingSink())
+
+        with mock.patch('app.utils.audit_writer.atexit.register') as register:
+            writer.init_app(create_app('testing'))
+            writer.init_app(create_app('testing'))
+
+        register.assert_called_once_with(writer.shutdown)
+
+    def test_init_app_keeps_the_queue_of_a_running_worker(self):
+        release = threading.Event()
+        writer = AuditWriter(sink=RecordingSink(block=release))
+        writer.flush_interval = 0.01
+        writer.enqueue({'action': 'a'})
+        writer.enqueue({'action': 'b'})
+        running_queue = writer._queue
+
+        with mock.patch('app.utils.audit_writer.atexit.register'):
+            writer.init_app(create_app('testing'))
+
+        self.assertIs(writer._queue, running_queue)
+        release.set()
+        writer.shutdown()
+        self.assertEqual(sum(len(batch) for batch in writer.sink.batches), 2)
+
+
+class AuditWriterDatabaseTestCase(unittest.TestCase):
+    """log_action a través del sink real (_insert_rows) hasta audit_logs"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.errors = audit_writer.stats()['errors']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_log_action_is_inserted(self):
+        with self.app.test_request_context(headers={'User-Agent': 'tests'}):
+            AuditService.log_action('create_laptop', 'inventory', target_type='Laptop', target_id=7,
+                                    details={'sku': 'LAP-1'}, user_id=3)
+
+        log = AuditLog.query.one()
+        self.assertEqual((log.action, log.module, log.target_id, log.user_id), ('create_laptop', 'inventory', 7, 3))
+        self.assertEqual((log.details, log.user_agent, log.status), ({'sku': 'LAP-1'}, 'tests', 'success'))
+
+    def test_invalid_row_is_skipped_and_the_rest_written(self):
+        with self.app.test_request_context():
+            rows = [
+                AuditService.log_action('a', 'inventory', user_id=1),
+                AuditService.log_action('b', 'inventory', user_id=1),
+            ]
+        bad = dict(rows[0], action='bad', status='unknown')  # viola ck_audit_status
+        AuditLog.query.delete()
+        db.session.commit()
+
+        self.assertEqual(audit_writer._write([rows[0], bad, rows[1]]), 2)
+        self.assertEqual(sorted(action for (action,) in db.session.query(AuditLog.action)), ['a', 'b'])
+        self.assertEqual(audit_writer.stats()['errors'], self.errors + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from app.services.catalog_facet_service import CatalogFacetService
+
+
+def row(brand, condition, price):
+    """Fila del índice: facetas (marca, condición; resto vacío) + precio, fecha, destacado, oferta"""
+    values = dict.fromkeys(CatalogFacetService.FACETS)
+    values.update(brand=brand, condition=condition)
+    return tuple(values[f] for f in CatalogFacetService.FACETS) + (price, None, False, False)
+
+
+INDEX = {'rows': [row(1, 'new', 100), row(1, 'used', 200), row(2, 'new', 300), row(2, 'new', 400)]}
+
+
+class FacetCountTestCase(unittest.TestCase):
+    def test_counts_without_filters(self):
+        total, counts = CatalogFacetService.count(INDEX)
+
+        self.assertEqual(total, 4)
+        self.assertEqual(counts['brand'], {1: 2, 2: 2})
+        self.assertEqual(counts['condition'], {'new': 3, 'used': 1})
+
+    def test_facet_counts_ignore_their_own_filter(self):
+        total, counts = CatalogFacetService.count(INDEX, {'brand': {1}})
+
+        self.assertEqual(total, 2)
+        self.assertEqual(counts['brand'], {1: 2, 2: 2})
+        self.assertEqual(counts['condition'], {'new': 1, 'used': 1})
+
+    def test_price_range_applies_to_every_facet(self):
+        total, counts = CatalogFacetService.count(INDEX, {'condition': {'new'}}, min_price=250)
+
+        self.assertEqual(total, 2)
+        self.assertEqual(counts['brand'], {2: 2})
+        self.assertEqual(counts['condition'], {'new': 2})
+
+    def test_parse_selection(self):
+        selection, min_price, max_price = CatalogFacetService.parse_selection(
+            {'brand': '1,x,2', 'condition': 'new', 'max_price': 'abc'}
+        )
+
+        self.assertEqual(selection, {'brand': {1, 2}, 'condition': {'new'}})
+        self.assertEqual((min_price, max_price), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import io
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.services.export_service import ExportService
+
+
+class ExportServiceTestCase(unittest.TestCase):
+    def rows(self, count):
+        for i in range(count):
+            yield [i, f'Factura {i}', date(2026, 1, 1), Decimal('118.00')]
+
+    def test_csv_is_streamed_in_chunks(self):
+        chunks = list(ExportService.csv_chunks(['id', 'nombre', 'fecha', 'total'], self.rows(450)))
+        lines = b''.join(chunks).decode('utf-8').splitlines()
+
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(lines), 451)
+        self.assertEqual(lines[1], '0,Factura 0,2026-01-01,118.00')
+
+    def test_xlsx_keeps_native_types(self):
+        from openpyxl import load_workbook
+
+        data = b''.join(ExportService.xlsx_chunks(['id', 'nombre', 'fecha', 'total'], self.rows(3), 'Facturas'))
+        sheet = load_workbook(io.BytesIO(data))['Facturas']
+
+        self.assertEqual(sheet.max_row, 4)
+        self.assertEqual(sheet['A2'].value, 0)
+        self.assertEqual(sheet['D2'].value, 118)
+
+    def test_unknown_format_falls_back_to_csv(self):
+        self.assertEqual(ExportService.normalize_format('XLSX'), 'xlsx')
+        self.assertEqual(ExportService.normalize_format('pdf'), 'csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
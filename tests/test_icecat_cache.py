@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from app.services.icecat_service import IcecatService
+from app.utils.icecat_cache import IcecatCache
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'icecat')
+GTIN = '0196802261036'
+CREDENTIALS = {
+    'api_token': '', 'content_token': '', 'api_username': '', 'app_key': '',
+    'content_username': '', 'language': 'es'
+}
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = IcecatCache(path=os.path.join(self.tmp.name, 'icecat.sqlite3'))
+        self.cache.fixtures_dir = FIXTURES_DIR
+        self.cache.fixtures_mode = 'replay'
+
+        patches = [
+            mock.patch('app.services.icecat_service.icecat_cache', self.cache),
+            mock.patch.object(IcecatService, 'get_credentials', return_value=dict(CREDENTIALS)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class IcecatCacheTestCase(CacheTestCase):
+    def test_repeat_lookup_is_served_from_cache(self):
+        with mock.patch.object(IcecatService, 'normalize_data', wraps=IcecatService.normalize_data) as normalize:
+            first = IcecatService.fetch_by_gtin(GTIN)
+            second = IcecatService.fetch_by_gtin(GTIN)
+
+        self.assertTrue(first['success'])
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['product'], first['product'])
+        self.assertEqual(normalize.call_count, 1)
+
+    def test_not_found_is_cached_as_negative_entry(self):
+        first = IcecatService.fetch_by_gtin('0000000000000')
+        second = IcecatService.fetch_by_gtin('0000000000000')
+
+        self.assertFalse(second['success'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['error'], first['error'])
+        self.assertEqual(self.cache.stats()['negative_entries'], 1)
+
+    def test_unchanged_content_is_revalidated_without_normalizing(self):
+        IcecatService.fetch_by_gtin(GTIN)
+        self.cache.ttl = 0
+
+        with mock.patch.object(IcecatService, 'normalize_data') as normalize:
+            result = IcecatService.fetch_by_gtin(GTIN, force_refresh=True)
+
+        self.assertTrue(result['success'])
+        normalize.assert_not_called()
+
+    def test_outdated_normalizer_version_renormalizes_from_stored_body(self):
+        IcecatService.fetch_by_gtin(GTIN)
+
+        with mock.patch.object(IcecatService, 'NORMALIZER_VERSION', IcecatService.NORMALIZER_VERSION + 1), \
+                mock.patch.object(IcecatService, '_request_gtin') as request_gtin:
+            result = IcecatService.fetch_by_gtin(GTIN)
+            entry = self.cache.get(GTIN, 'es')
+
+        request_gtin.assert_not_called()
+        self.assertTrue(result['cached'])
+        self.assertEqual(entry['normalizer_version'], IcecatService.NORMALIZER_VERSION + 1)
+
+    def test_stale_entry_is_served_and_revalidated_in_background(self):
+        IcecatService.fetch_by_gtin(GTIN)
+        self.cache.ttl = 0
+
+        with mock.patch.object(IcecatService, '_schedule_revalidation') as schedule:
+            result = IcecatService.fetch_by_gtin(GTIN)
+
+        self.assertTrue(result['stale'])
+        schedule.assert_called_once_with(GTIN, 'es')
+
+
+class IcecatCacheFailureTestCase(CacheTestCase):
+    """Un archivo de caché bloqueado o inaccesible degrada a miss, no a error"""
+
+    def lock_cache(self):
+        """Otro proceso con un bloqueo de escritura: las lecturas siguen, las escrituras fallan"""
+        self.cache._connect().execute('PRAGMA busy_timeout = 0')
+        locker = sqlite3.connect(self.cache.path, isolation_level=None)
+        locker.execute('BEGIN EXCLUSIVE')
+        self.addCleanup(locker.close)
+        self.addCleanup(locker.execute, 'ROLLBACK')
+
+    def test_failed_touch_keeps_the_revalidated_result(self):
+        IcecatService.fetch_by_gtin(GTIN)
+        self.cache.ttl = 0
+        self.lock_cache()
+
+        result = IcecatService.fetch_by_gtin(GTIN, force_refresh=True)
+
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertEqual(self.cache.stats()['errors'], 1)
+
+    def test_failed_renormalize_write_still_serves_the_entry(self):
+        IcecatService.fetch_by_gtin(GTIN)
+        self.lock_cache()
+
+        with mock.patch.object(IcecatService, 'NORMALIZER_VERSION', IcecatService.NORMALIZER_VERSION + 1):
+            result = IcecatService.fetch_by_gtin(GTIN)
+
+        self.assertTrue(result['success'])
+        self.assertTrue(result['cached'])
+        self.assertEqual(self.cache.stats()['errors'], 1)
+
+    def test_maintenance_on_a_locked_file_does_not_raise(self):
+        IcecatService.fetch_by_gtin('0000000000000')
+        self.lock_cache()
+
+        self.assertEqual(self.cache.purge(older_than=-1), 0)
+        self.cache.clear_negative()
+        self.cache.clear()
+
+        self.assertEqual(self.cache.stats()['errors'], 3)
+        self.assertEqual(self.cache.stats()['negative_entries'], 1)
+
+    def test_unopenable_file_is_a_miss(self):
+        # Un directorio en lugar del archivo sqlite
+        self.cache.path = self.tmp.name
+
+        result = IcecatService.fetch_by_gtin(GTIN)
+
+        self.assertTrue(result['success'])
+        self.assertFalse(result['cached'])
+        self.assertIsNone(self.cache.get_raw(GTIN, 'es'))
+        self.cache.touch(GTIN, 'es')
+        self.cache.update_normalized(GTIN, 'es', {}, 1)
+        self.assertGreaterEqual(self.cache.stats()['errors'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Regresión de IcecatService.normalize_data contra salidas doradas.
+
+Cada respuesta grabada en tests/fixtures/icecat/<gtin>.json tiene su
+resultado normalizado esperado en tests/fixtures/icecat/golden/<gtin>.json.
+Si un cambio en los parsers o en standard_specs_map altera la salida a
+propósito, regenerar las salidas y subir IcecatService.NORMALIZER_VERSION:
+
+    ICECAT_UPDATE_GOLDEN=1 python -m pytest tests/test_icecat_golden.py
+"""
+import glob
+import json
+import os
+import unittest
+
+from app.services.icecat_service import IcecatService
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'icecat')
+GOLDEN_DIR = os.path.join(FIXTURES_DIR, 'golden')
+UPDATE_GOLDEN = os.environ.get('ICECAT_UPDATE_GOLDEN') == '1'
+
+# Marcas con parser propio: cada una debe tener al menos una respuesta grabada
+BRANDS = ('lenovo', 'hp', 'dell', 'apple', 'asus', 'acer', 'msi', 'microsoft', 'lg', 'samsung')
+
+
+def load_corpus():
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.json'))):
+        gtin = os.path.basename(path).split('.')[0]
+        with open(path, 'rb') as fh:
+            corpus[gtin] = json.loads(fh.read())['data']
+    return corpus
+
+
+def normalize(payload):
+    # Ida y vuelta por JSON: así se guarda en la caché y en la base de datos
+    return json.loads(json.dumps(IcecatService.normalize_data(payload), ensure_ascii=False))
+
+
+class IcecatGoldenTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = load_corpus()
+
+    def test_corpus_covers_every_brand_parser(self):
+        brands = {payload['GeneralInfo']['Brand'].lower() for payload in self.corpus.values()}
+        self.assertEqual(set(BRANDS) - brands, set())
+
+    def test_normalized_output_matches_golden(self):
+        for gtin, payload in self.corpus.items():
+            golden_path = os.path.join(GOLDEN_DIR, f'{gtin}.json')
+            result = normalize(payload)
+
+            if UPDATE_GOLDEN:
+                os.makedirs(GOLDEN_DIR, exist_ok=True)
+                with open(golden_path, 'w', encoding='utf-8') as fh:
+                    json.dump(result, fh, ensure_ascii=False, indent=2, sort_keys=True)
+                    fh.write('\n')
+                continue
+
+            with self.subTest(gtin=gtin, brand=payload['GeneralInfo']['Brand']):
+                self.assertTrue(os.path.exists(golden_path), f'Falta la salida dorada de {gtin}')
+                with open(golden_path, encoding='utf-8') as fh:
+                    self.assertEqual(result, json.load(fh))
+
+    def test_normalization_is_deterministic(self):
+        for gtin, payload in self.corpus.items():
+            self.assertEqual(normalize(payload), normalize(payload), gtin)
+
+
+if __name__ == '__main__':
+    unittest.main()
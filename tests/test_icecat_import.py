@@ -0,0 +1,330 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from flask import Flask
+
+from app import create_app, db
+from app.models.icecat_job import IcecatJob, IcecatJobItem
+from app.models.laptop import Laptop, Store
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.services.icecat_import_service import IcecatImportService
+from app.services.icecat_service import IcecatService
+from app.utils.http_pool import HostLimitedSession
+from app.utils.icecat_cache import IcecatCache
+from tests.icecat_stub import IcecatStub, FIXTURES_DIR
+
+GTIN = '0196802261036'
+OTHER_GTIN = '0884116465182'
+MISSING_GTIN = '0000000000000'
+CREDENTIALS = {
+    'api_token': '', 'content_token': '', 'api_username': '', 'app_key': '',
+    'content_username': '', 'language': 'es'
+}
+
+
+class ParseRowsTestCase(unittest.TestCase):
+    def test_csv_with_aliases_and_semicolons(self):
+        rows = IcecatImportService.parse_rows(
+            '\ufeffEAN;Costo;Precio;Cantidad\n0196802261036;RD$1,500.00;2000;3\n123;1;1;1\n'.encode('utf-8')
+        )
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['line'], 2)
+        self.assertEqual(rows[0]['gtin'], GTIN)
+        self.assertEqual(rows[0]['purchase_cost'], Decimal('1500.00'))
+        self.assertEqual(rows[0]['quantity'], 3)
+        self.assertIsNone(rows[0]['error'])
+        self.assertIn('GTIN inválido', rows[1]['error'])
+
+    def test_list_of_gtins_and_dicts(self):
+        rows = IcecatImportService.parse_rows([
+            '0196-8022-61036', {'gtin': GTIN, 'sale_price': 'abc'}, {'gtin': GTIN, 'quantity': 0}
+        ])
+
+        self.assertEqual([row['line'] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0]['gtin'], GTIN)
+        self.assertIsNone(rows[0]['error'])
+        self.assertIsNotNone(rows[1]['error'])
+        self.assertIsNotNone(rows[2]['error'])
+
+
+class CatalogMappingTestCase(unittest.TestCase):
+    def test_catalog_form_data_uses_form_keys(self):
+        with open(os.path.join(FIXTURES_DIR, f'{GTIN}.json'), 'rb') as fh:
+            product = IcecatService.normalize_data(json.loads(fh.read())['data'])
+
+        data = IcecatImportService.catalog_form_data(product)
+
+        self.assertEqual(data['brand_id'], 'Lenovo')
+        self.assertTrue(data['model_id'])
+        self.assertTrue(data['processor_full_name'])
+        self.assertEqual(data['ram_capacity'], 16)
+        self.assertEqual(data['storage_capacity'], 512)
+        self.assertIn('512GB', data['storage_full_name'])
+
+
+class StubbedIcecatTestCase(unittest.TestCase):
+    """fetch_by_gtin y la sesión HTTP contra el stub local (sin red)"""
+
+    def setUp(self):
+        self.stub = IcecatStub(delay=0.05)
+        self.base_url = self.stub.start()
+        self.addCleanup(self.stub.stop)
+
+        self.app = Flask(__name__)
+        self.app.config.update(ICECAT_BASE_URL=self.base_url, ICECAT_MAX_CONCURRENCY=2,
+                               ICECAT_HTTP_RETRIES=2, ICECAT_HTTP_BACKOFF=0)
+        self.cache = IcecatCache(path=':memory:')
+
+        patches = [
+            mock.patch('app.services.icecat_service.icecat_cache', self.cache),
+            mock.patch.object(IcecatService, 'get_credentials', return_value=dict(CREDENTIALS)),
+            mock.patch.object(IcecatService, '_http', None),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_fetch_by_gtin_against_stub(self):
+        with self.app.app_context():
+            found = IcecatService.fetch_by_gtin(GTIN)
+            missing = IcecatService.fetch_by_gtin(MISSING_GTIN)
+            cached_missing = IcecatService.fetch_by_gtin(MISSING_GTIN)
+
+        self.assertTrue(found['success'])
+        self.assertEqual(found['product']['marca'], 'Lenovo')
+        self.assertNotIn('not_found', found)
+        self.assertFalse(missing['success'])
+        self.assertTrue(missing['not_found'])
+        self.assertEqual((cached_missing['not_found'], cached_missing['cached']), (True, True))
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_unavailable_service_is_not_a_missing_product(self):
+        self.stub.fail_first = 5
+        self.app.config['ICECAT_HTTP_RETRIES'] = 0
+
+        with self.app.app_context():
+            result = IcecatService.fetch_by_gtin(GTIN)
+
+        self.assertEqual(result, {'success': False, 'error': 'Error de API Icecat: 503'})
+        self.assertEqual(IcecatImportService.failure_status(result), 'error')
+
+    def test_session_caps_concurrency_per_host(self):
+        http = HostLimitedSession(max_per_host=2, retries=0)
+        threads = [
+            threading.Thread(target=http.get, args=(self.base_url,), kwargs={'params': {'GTIN': str(n)}})
+            for n in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.stub.requests, 8)
+        self.assertLessEqual(self.stub.max_in_flight, 2)
+        self.assertGreater(http.stats()['waits'], 0)
+
+    def test_session_retries_unavailable(self):
+        self.stub.fail_first = 1
+        http = HostLimitedSession(max_per_host=2, retries=2, backoff=0)
+
+        response = http.get(self.base_url, params={'GTIN': GTIN, 'Language': 'es'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.requests, 2)
+
+
+class ImportJobTestCase(unittest.TestCase):
+    """run_job contra el stub local: lotes, escritura, reintento por fila y progreso"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config.update(ICECAT_IMPORT_BATCH_SIZE=2, ICECAT_HTTP_RETRIES=0, ICECAT_HTTP_BACKOFF=0)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.stub = IcecatStub()
+        self.app.config['ICECAT_BASE_URL'] = self.stub.start()
+        self.addCleanup(self.stub.stop)
+
+        # Caché en archivo (no en memoria por hilo) y sin fixtures: todo pasa por el stub
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patches = [
+            mock.patch('app.services.icecat_service.icecat_cache', IcecatCache(path=os.path.join(tmp.name, 'c.db'))),
+            mock.patch.object(IcecatService, 'get_credentials', return_value=dict(CREDENTIALS)),
+            mock.patch.object(IcecatService, '_http', None),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.store = Store(name='Tienda Principal')
+        db.session.add(self.store)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_job(self, source):
+        rows = IcecatImportService.parse_rows(source)
+        return IcecatImportService.create_job(rows, {'download_images': False, 'condition': 'new'}, user_id=7)
+
+    def items(self, job_id):
+        return db.session.execute(
+            db.select(IcecatJobItem.line_number, IcecatJobItem.status, IcecatJobItem.laptop_id, IcecatJobItem.error)
+            .where(IcecatJobItem.job_id == job_id).order_by(IcecatJobItem.line_number)
+        ).all()
+
+
+class RunJobTestCase(ImportJobTestCase):
+    def test_job_creates_laptops_and_records_each_row(self):
+        job = self.create_job([
+            {'gtin': GTIN, 'purchase_cost': '900', 'sale_price': '1200', 'quantity': 2},
+            GTIN,
+            MISSING_GTIN,
+            {'gtin': OTHER_GTIN, 'sale_price': '800'},
+            'abc',
+        ])
+
+        job = IcecatImportService.run_job(job.id)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total, job.processed, job.succeeded, job.failed), (5, 5, 2, 3))
+        # 4 filas válidas en lotes de 2
+        self.assertEqual([timing['rows'] for timing in job.batch_timings], [2, 2])
+
+        items = self.items(job.id)
+        self.assertEqual([item.status for item in items], ['created', 'error', 'not_found', 'created', 'invalid'])
+        self.assertEqual(items[1].error, 'GTIN repetido en la importación')
+
+        laptop = db.session.get(Laptop, items[0].laptop_id)
+        self.assertEqual((laptop.gtin, laptop.quantity, laptop.store_id), (GTIN, 2, self.store.id))
+        self.assertEqual((laptop.purchase_cost, laptop.sale_price), (Decimal('900.00'), Decimal('1200.00')))
+        self.assertEqual((laptop.icecat_import_status, laptop.created_by_id), ('imported', 7))
+        self.assertTrue(laptop.brand_id and laptop.processor_id and laptop.ram_id)
+        # Sin costo en la fila se usa el precio
+        self.assertEqual(db.session.get(Laptop, items[3].laptop_id).purchase_cost, Decimal('800.00'))
+        self.assertEqual(Laptop.query.count(), 2)
+
+    def test_gtin_already_in_inventory_is_not_duplicated(self):
+        first = IcecatImportService.run_job(self.create_job([GTIN]).id)
+        sku = Laptop.query.one().sku
+
+        second = IcecatImportService.run_job(self.create_job([GTIN]).id)
+
+        self.assertEqual((first.succeeded, second.succeeded, second.failed), (1, 0, 1))
+        self.assertEqual(self.items(second.id)[0].error, f'El GTIN ya existe en el inventario (SKU {sku})')
+        self.assertEqual(Laptop.query.count(), 1)
+
+    def test_failed_request_is_an_error_not_a_missing_product(self):
+        self.stub.fail_first = 1
+
+        job = IcecatImportService.run_job(self.create_job([GTIN]).id)
+
+        item = self.items(job.id)[0]
+        self.assertEqual((item.status, item.error), ('error', 'Error de API Icecat: 503'))
+        self.assertEqual(job.failed, 1)
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        build = IcecatImportService.laptop_from_product
+
+        def laptop_from_product(product, catalog_data, row, *args):
+            if row.gtin == OTHER_GTIN:
+                raise ValueError('Precio fuera de rango')
+            return build(product, catalog_data, row, *args)
+
+        job = self.create_job([GTIN, OTHER_GTIN])
+        with mock.patch.object(IcecatImportService, 'laptop_from_product', side_effect=laptop_from_product):
+            job = IcecatImportService.run_job(job.id)
+
+        items = self.items(job.id)
+        self.assertEqual([(item.status, item.error) for item in items],
+                         [('created', None), ('error', 'Precio fuera de rango')])
+        self.assertEqual(Laptop.query.one().id, items[0].laptop_id)
+        self.assertEqual((job.processed, job.succeeded, job.failed), (2, 1, 1))
+        self.assertEqual(len(job.batch_timings), 1)
+
+    def test_resume_interrupted_picks_up_pending_rows(self):
+        stale = datetime.utcnow() - IcecatImportService.STALE_AFTER - timedelta(minutes=1)
+        pending = self.create_job([GTIN])
+        interrupted = self.create_job([OTHER_GTIN, GTIN])
+        alive = self.create_job([GTIN])
+        done = self.create_job([GTIN])
+        interrupted.status, interrupted.heartbeat_at = 'running', stale
+        alive.status, alive.heartbeat_at = 'running', datetime.utcnow()
+        done.status = 'completed'
+        db.session.commit()
+
+        with mock.patch.object(IcecatImportService, 'start') as start:
+            resumed = IcecatImportService.resume_interrupted()
+
+        self.assertEqual(resumed, [pending.id, interrupted.id])
+        self.assertEqual([call.args for call in start.call_args_list], [(pending.id,), (interrupted.id,)])
+        self.assertEqual(IcecatImportService.resume_interrupted(start=False), resumed)
+
+        # La primera fila ya se había escrito antes del reinicio
+        first = IcecatJobItem.query.filter_by(job_id=interrupted.id, line_number=1).one()
+        first.status = 'created'
+        interrupted.processed = interrupted.succeeded = 1
+        db.session.commit()
+
+        job = IcecatImportService.run_job(interrupted.id)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed, job.succeeded), (2, 2))
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(Laptop.query.one().gtin, GTIN)
+
+
+class ImportStatusApiTestCase(ImportJobTestCase):
+    """GET /api/icecat/import/<id>: progreso y filas con error"""
+
+    def setUp(self):
+        super().setUp()
+        admin = User(username='admin', email='admin@test.com', is_admin=True)
+        admin.set_password('pass')
+        db.session.add(admin)
+        db.session.commit()
+        UserSession.create_session(user_id=admin.id, session_token='token-admin')
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+            session['session_token'] = 'token-admin'
+
+    def test_status_reports_progress_and_failed_rows(self):
+        job = IcecatImportService.run_job(self.create_job([GTIN, MISSING_GTIN, '12']).id)
+
+        data = self.client.get(f'/api/icecat/import/{job.id}?items=errors').get_json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['job']['status'], 'completed')
+        self.assertEqual((data['job']['processed'], data['job']['succeeded'], data['job']['failed']), (3, 1, 2))
+        self.assertEqual(data['job']['progress_percent'], 100)
+        self.assertEqual([(item['line'], item['status']) for item in data['items']],
+                         [(2, 'not_found'), (3, 'invalid')])
+
+        summary = self.client.get(f'/api/icecat/import/{job.id}').get_json()
+        self.assertNotIn('items', summary)
+
+    def test_unknown_job_returns_404(self):
+        response = self.client.get('/api/icecat/import/999')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.get_json()['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.laptop import Laptop
+from app.services.icecat_import_service import IcecatImportService
+from app.services.icecat_service import IcecatService
+from app.services.icecat_sync_service import IcecatSyncService
+from app.utils.icecat_cache import IcecatCache
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'icecat')
+GTIN = '0196802261036'
+CREDENTIALS = {
+    'api_token': '', 'content_token': '', 'api_username': '', 'app_key': '',
+    'content_username': '', 'language': 'es'
+}
+PRODUCT = {
+    'nombre_visualizacion': 'Lenovo ThinkPad T14 Gen 4',
+    'palabras_clave': 'thinkpad t14',
+    'fisico': {'peso_lbs': 3.04},
+    'entrada': {'retroiluminacion': True},
+}
+
+
+class MergeTestCase(unittest.TestCase):
+    def make_laptop(self, **fields):
+        laptop = SimpleNamespace(
+            gtin=GTIN, user_modified_fields=None, brand_id=1, model_id=2, processor_id=3,
+            display_name='Lenovo ThinkPad T14 Gen 4', keywords=None, weight_lbs=Decimal('3.04'),
+            keyboard_backlight=False
+        )
+        for name in IcecatImportService.laptop_fields(PRODUCT):
+            if not hasattr(laptop, name):
+                setattr(laptop, name, None)
+        for name, value in fields.items():
+            setattr(laptop, name, value)
+        return laptop
+
+    def merge(self, laptop, catalog_data=None):
+        memo = {GTIN: catalog_data or {'brand_id': 1, 'model_id': 9, 'processor_id': None}}
+        return IcecatSyncService.merge(laptop, PRODUCT, memo)
+
+    def test_changed_fields_are_updated_and_missing_catalogs_kept(self):
+        laptop = self.make_laptop()
+        changed = self.merge(laptop)
+
+        self.assertIn('model_id', changed)
+        self.assertIn('keywords', changed)
+        self.assertIn('keyboard_backlight', changed)
+        self.assertEqual(laptop.model_id, 9)
+        self.assertEqual(laptop.processor_id, 3)
+        self.assertNotIn('brand_id', changed)
+        # 3.04 (JSON) frente a Decimal('3.04') de la columna no es un cambio
+        self.assertNotIn('weight_lbs', changed)
+        self.assertNotIn('display_name', changed)
+
+    def test_user_modified_fields_are_not_overwritten(self):
+        laptop = self.make_laptop(keywords='mis palabras', user_modified_fields=['keywords', 'model_id'])
+        changed = self.merge(laptop)
+
+        self.assertNotIn('keywords', changed)
+        self.assertNotIn('model_id', changed)
+        self.assertEqual(laptop.keywords, 'mis palabras')
+        self.assertEqual(laptop.model_id, 2)
+
+    def test_fields_missing_from_the_product_are_kept(self):
+        laptop = self.make_laptop(
+            short_description='Descripción curada', keyboard_layout='ES', ram_upgradeable=True,
+            full_specs_json={'Peso': '1.38 kg'}, wifi_standard='Wi-Fi 6E'
+        )
+        changed = self.merge(laptop)
+
+        for field in ('short_description', 'keyboard_layout', 'ram_upgradeable', 'full_specs_json', 'wifi_standard'):
+            self.assertNotIn(field, changed)
+        self.assertEqual(laptop.short_description, 'Descripción curada')
+        self.assertEqual(laptop.keyboard_layout, 'ES')
+        self.assertTrue(laptop.ram_upgradeable)
+        self.assertEqual(laptop.full_specs_json, {'Peso': '1.38 kg'})
+
+    def test_values_the_product_brings_are_applied(self):
+        product = {
+            'descripcion_corta': 'Nueva', 'memoria_ram': {'ampliable': False},
+            'entrada': {'disposicion_teclado': 'LatAm'}, 'pantalla': {'tactil': False}
+        }
+        fields = IcecatImportService.present_laptop_fields(product)
+
+        self.assertEqual(fields['short_description'], 'Nueva')
+        self.assertEqual(fields['keyboard_layout'], 'LatAm')
+        # Un False que Icecat sí trae es un dato, no un valor por defecto
+        self.assertIs(fields['ram_upgradeable'], False)
+        self.assertIs(fields['touchscreen_override'], False)
+        self.assertNotIn('storage_upgradeable', fields)
+        self.assertNotIn('display_name', fields)
+
+
+class StaleSelectionTestCase(unittest.TestCase):
+    """Solo se re-sincronizan las laptops que vinieron de Icecat"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.cutoff = datetime.utcnow() - timedelta(days=30)
+        old, recent = self.cutoff - timedelta(days=1), self.cutoff + timedelta(days=1)
+        rows = [
+            ('imported', old), ('synced', None), ('pending', old), ('pending', None),
+            ('synced', recent), ('not_found', old), ('imported', old),
+        ]
+        self.laptops = []
+        for number, (status, synced_at) in enumerate(rows):
+            laptop = Laptop(
+                sku=f'LAP-{number}', slug=f'lap-{number}', display_name=f'Laptop {number}', gtin=f'{number:013d}',
+                brand_id=1, model_id=1, processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1,
+                ram_id=1, store_id=1, purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'),
+                icecat_import_status=status, icecat_last_synced_at=synced_at
+            )
+            self.laptops.append(laptop)
+        self.laptops[-1].gtin = None
+        db.session.add_all(self.laptops)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def batch_ids(self, after=None, size=10):
+        return [row.id for row in IcecatSyncService._stale_batch(self.cutoff, after, size)]
+
+    def test_manual_laptops_with_gtin_are_not_selected(self):
+        self.assertEqual(IcecatSyncService.count_stale(self.cutoff), 3)
+        # Nunca sincronizadas primero, luego por (icecat_last_synced_at, id)
+        self.assertEqual(self.batch_ids(), [self.laptops[i].id for i in (1, 0, 5)])
+
+    def test_batches_resume_from_the_saved_cursor(self):
+        first = IcecatSyncService._stale_batch(self.cutoff, None, 2)
+        cursor = IcecatSyncService.encode_cursor(first[-1])
+        after = IcecatSyncService.decode_cursor(cursor)
+
+        self.assertEqual([row.id for row in first], [self.laptops[1].id, self.laptops[0].id])
+        self.assertEqual(after, (self.laptops[0].icecat_last_synced_at, self.laptops[0].id))
+        self.assertEqual(self.batch_ids(after), [self.laptops[5].id])
+        self.assertEqual(self.batch_ids((None, self.laptops[1].id)), [self.laptops[i].id for i in (0, 5)])
+        self.assertIsNone(IcecatSyncService.decode_cursor(None))
+
+    def test_job_walks_stale_laptops_and_saves_the_cursor(self):
+        job = IcecatSyncService.create_job(max_age_days=30)
+        job.options = {**job.options, 'cutoff': self.cutoff.isoformat()}
+        db.session.commit()
+        last = {'synced_at': self.laptops[5].icecat_last_synced_at.isoformat(), 'id': self.laptops[5].id}
+        fetched = []
+
+        def fetch(gtin, **kwargs):
+            fetched.append(gtin)
+            return {'success': True, 'product': PRODUCT}
+
+        self.app.config['ICECAT_RESYNC_BATCH_SIZE'] = 2
+        with mock.patch.object(IcecatService, 'fetch_by_gtin', side_effect=fetch), \
+                mock.patch.object(IcecatService, 'get_credentials', return_value=dict(CREDENTIALS)), \
+                mock.patch.object(IcecatSyncService, 'merge', return_value=[]):
+            job = IcecatSyncService.run_job(job.id)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.processed, 3)
+        self.assertEqual(sorted(fetched), sorted(self.laptops[i].gtin for i in (0, 1, 5)))
+        self.assertEqual(job.options['cursor'], last)
+        self.assertEqual(IcecatSyncService.count_stale(self.cutoff), 0)
+        self.assertEqual(db.session.get(Laptop, self.laptops[2].id).icecat_import_status, 'pending')
+
+    def test_batch_queries_use_the_partial_index(self):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            rows = IcecatSyncService._stale_batch(self.cutoff, None, 10)
+            IcecatSyncService._stale_batch(self.cutoff, (rows[-1].icecat_last_synced_at, rows[-1].id), 10)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+        self.assertEqual(len(statements), 3)
+        for statement, parameters in statements:
+            plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+            self.assertIn('idx_laptop_icecat_synced', ' '.join(row[-1] for row in plan))
+
+class FetchForResyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = IcecatCache(path=os.path.join(self.tmp.name, 'icecat.sqlite3'))
+        self.cache.fixtures_dir = FIXTURES_DIR
+        self.cache.fixtures_mode = 'replay'
+
+        patches = [
+            mock.patch('app.services.icecat_service.icecat_cache', self.cache),
+            mock.patch.object(IcecatService, 'get_credentials', return_value=dict(CREDENTIALS)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_stale_entry_is_revalidated_inline_when_not_allowed(self):
+        IcecatService.fetch_by_gtin(GTIN)
+        self.cache.ttl = 0
+
+        with mock.patch.object(IcecatService, '_schedule_revalidation') as schedule:
+            result = IcecatService.fetch_by_gtin(GTIN, allow_stale=False)
+
+        schedule.assert_not_called()
+        self.assertTrue(result['success'])
+        self.assertFalse(result.get('stale'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from decimal import Decimal
+
+from app import create_app, db
+from app.models.laptop import Laptop
+from app.services.inventory_service import InventoryService
+
+
+class LaptopListStatsTestCase(unittest.TestCase):
+    """La consulta agregada coincide con el calculo anterior laptop por laptop"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # (precio, cantidad, reservada, alerta, publicada, destacada)
+        seed = [
+            ('1000.00', 5, 0, 1, True, True),
+            ('850.50', 1, 1, 1, True, False),
+            ('1500.00', 0, 0, 2, False, False),
+            ('499.99', 3, 1, 2, True, True),
+            ('2200.00', 10, 2, 1, False, True),
+        ]
+        for index, (price, quantity, reserved, alert, published, featured) in enumerate(seed):
+            # Catalogos sin FK forzada en SQLite
+            db.session.add(Laptop(
+                sku=f'LAP-{index}', slug=f'lap-{index}', display_name=f'Laptop {index}', brand_id=1, model_id=1,
+                processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1, store_id=1,
+                purchase_cost=Decimal('400.00'), sale_price=Decimal(price), quantity=quantity,
+                reserved_quantity=reserved, min_alert=alert, is_published=published, is_featured=featured
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def per_row_stats(self):
+        """Calculo previo del listado: cargar todas las laptops y recorrerlas"""
+        all_laptops = Laptop.query.all()
+        published = len([l for l in all_laptops if l.is_published])
+        prices = [l.sale_price for l in all_laptops]
+        return {
+            'total': len(all_laptops),
+            'total_value': sum(
+                float(l.sale_price * l.quantity) for l in all_laptops if l.sale_price and l.quantity
+            ),
+            'low_stock': len([l for l in all_laptops if l.is_low_stock]),
+            'published': published,
+            'unpublished': len(all_laptops) - published,
+            'featured': len([l for l in all_laptops if l.is_featured]),
+            'min_price': float(min(prices)),
+            'max_price': float(max(prices))
+        }
+
+    def test_aggregate_matches_per_row_computation(self):
+        stats = InventoryService._query_laptop_list_stats()
+
+        expected = self.per_row_stats()
+        self.assertAlmostEqual(stats.pop('total_value'), expected.pop('total_value'), places=2)
+        self.assertEqual(stats, expected)
+        self.assertEqual(expected['low_stock'], 3)
+
+    def test_empty_inventory_uses_default_price_range(self):
+        Laptop.query.delete()
+        db.session.commit()
+
+        stats = InventoryService._query_laptop_list_stats()
+
+        self.assertEqual((stats['total'], stats['total_value'], stats['low_stock']), (0, 0.0, 0))
+        self.assertEqual((stats['min_price'], stats['max_price']), (0, 10000))
+
+
+if __name__ == '__main__':
+    unittest.main()
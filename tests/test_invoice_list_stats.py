@@ -0,0 +1,87 @@
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app import create_app, db
+from app.models.customer import Customer
+from app.models.invoice import Invoice, NCF_SALES_TYPES
+
+
+class InvoiceListStatsTestCase(unittest.TestCase):
+    """La consulta agrupada coincide con los conteos anteriores factura por factura"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        customer = Customer(customer_type='person', first_name='Ana', id_number='00100000001', id_type='cedula')
+        db.session.add(customer)
+        db.session.flush()
+
+        today = date.today()
+        # (estado, tipo de NCF, total, vencimiento)
+        seed = [
+            ('draft', 'B02', '100.00', None),
+            ('issued', 'B02', '250.50', today - timedelta(days=3)),   # vencida
+            ('issued', 'B01', '400.00', today + timedelta(days=3)),
+            ('paid', 'B01', '1000.00', today - timedelta(days=10)),   # pagada: no vence
+            ('cancelled', 'B02', '80.00', today - timedelta(days=1)),  # anulada: no vence
+            ('overdue', 'B14', '60.00', today - timedelta(days=1)),
+            ('issued', 'B02', '30.25', today),                         # vence hoy: aún no
+            ('pending', None, '15.00', today - timedelta(days=2)),
+        ]
+        for number, (status, ncf_type, total, due_date) in enumerate(seed, start=1):
+            db.session.add(Invoice(
+                invoice_number=f'INV-{number:05d}', ncf=f'B02{number:08d}', ncf_type=ncf_type,
+                customer_id=customer.id, status=status, total=Decimal(total), due_date=due_date
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def per_row_stats(self, query):
+        """Calculo previo del listado: cargar todas las facturas filtradas y recorrerlas"""
+        all_filtered_invoices = query.all()
+        return {
+            'total_invoices': len(all_filtered_invoices),
+            'total_amount': sum(inv.total for inv in all_filtered_invoices),
+            'status_counts': {
+                'draft': sum(1 for inv in all_filtered_invoices if inv.status == 'draft'),
+                'issued': sum(1 for inv in all_filtered_invoices if inv.status == 'issued'),
+                'paid': sum(1 for inv in all_filtered_invoices if inv.status == 'paid'),
+                'cancelled': sum(1 for inv in all_filtered_invoices if inv.status == 'cancelled'),
+                'overdue': sum(1 for inv in all_filtered_invoices if inv.is_overdue)
+            },
+            'ncf_type_counts': {
+                ncf_type: sum(1 for inv in all_filtered_invoices if inv.ncf_type == ncf_type)
+                for ncf_type in NCF_SALES_TYPES
+            }
+        }
+
+    def test_grouped_query_matches_per_row_computation(self):
+        query = Invoice.query.order_by(Invoice.invoice_date.desc())
+
+        stats = Invoice.get_list_stats(query)
+
+        self.assertEqual(stats, self.per_row_stats(query))
+        self.assertEqual(stats['status_counts']['overdue'], 3)
+
+    def test_filtered_query(self):
+        query = Invoice.query.filter(Invoice.ncf_type == 'B02')
+
+        self.assertEqual(Invoice.get_list_stats(query), self.per_row_stats(query))
+
+    def test_empty_result(self):
+        stats = Invoice.get_list_stats(Invoice.query.filter(Invoice.id < 0))
+
+        self.assertEqual((stats['total_invoices'], stats['total_amount']), (0, Decimal('0')))
+        self.assertEqual(set(stats['status_counts'].values()), {0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from app import create_app, db
+from app.models.audit_log import AuditLog
+from app.services.partition_service import PartitionService
+
+
+class PartitionMonthTestCase(unittest.TestCase):
+    def test_add_months_crosses_years(self):
+        self.assertEqual(PartitionService.add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(PartitionService.add_months(date(2026, 1, 1), -12), date(2025, 1, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(PartitionService.partition_name('audit_logs', date(2026, 3, 1)), 'audit_logs_y2026m03')
+
+
+class ArchiveRestoreTestCase(unittest.TestCase):
+    """Camino SQLite: archivar = exportar + DELETE del rango; restaurar lo vuelve a cargar"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.app = create_app('testing')
+        self.app.config['PARTITION_ARCHIVE_DIR'] = self.tmp.name
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        for month, day, status in [(1, 5, 'success'), (1, 31, 'denied'), (2, 1, 'success'), (3, 10, 'failed')]:
+            db.session.add(AuditLog(
+                action='login', module='auth', status=status, created_at=datetime(2026, month, day, 23, 59, 59),
+                details={'ip': '10.0.0.1', 'intentos': day}
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def rows(self, month):
+        query = AuditLog.query.filter(PartitionService._month_range('audit_logs', month)).order_by(AuditLog.id)
+        return [(log.id, log.status, log.created_at, log.details) for log in query]
+
+    def test_archive_then_restore_round_trip(self):
+        january = date(2026, 1, 1)
+        original = self.rows(january)
+
+        results = PartitionService.archive('audit_logs', before=date(2026, 2, 1))
+
+        self.assertEqual([(r['month'], r['rows']) for r in results], [(january, 2)])
+        self.assertEqual(self.rows(january), [])
+        self.assertEqual(PartitionService.list_months('audit_logs'), [date(2026, 2, 1), date(2026, 3, 1)])
+
+        path = results[0]['path']
+        self.assertEqual(path, os.path.join(self.tmp.name, 'audit_logs', 'audit_logs_2026_01.jsonl.gz'))
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            self.assertEqual([json.loads(line)['id'] for line in archive], [row[0] for row in original])
+
+        self.assertEqual(PartitionService.restore('audit_logs', january), 2)
+        self.assertEqual(self.rows(january), original)
+
+        # Restaurar de nuevo no duplica filas
+        self.assertEqual(PartitionService.restore('audit_logs', january), 0)
+        self.assertEqual(AuditLog.query.count(), 4)
+
+    def test_dry_run_keeps_rows(self):
+        results = PartitionService.archive('audit_logs', before=date(2026, 3, 1), dry_run=True)
+
+        self.assertEqual([r['month'] for r in results], [date(2026, 1, 1), date(2026, 2, 1)])
+        self.assertEqual(AuditLog.query.count(), 4)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'audit_logs')))
+
+    def test_restore_without_archive_fails(self):
+        with self.assertRaises(FileNotFoundError):
+            PartitionService.restore('audit_logs', date(2025, 6, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app import create_app, db
+from app.extensions import result_cache
+from app.models.permission import Permission
+from app.models.rbac_associations import role_permissions
+from app.models.role import Role
+from app.models.user import User
+from app.services.role_service import RoleService
+
+
+class PermissionSetCacheTestCase(unittest.TestCase):
+    """El conjunto compilado se reutiliza entre peticiones y se invalida en cada cambio"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # TestingConfig desactiva la caché; aquí es lo que se prueba
+        result_cache.enabled = True
+        result_cache.clear()
+
+        self.view = Permission(name='inventory.view', display_name='Ver', module='inventory')
+        self.edit = Permission(name='inventory.edit', display_name='Editar', module='inventory')
+        self.role = Role(name='staff', display_name='Staff')
+        user = User(username='staff', email='staff@example.com')
+        user.set_password('password')
+        db.session.add_all([self.view, self.edit, self.role, user])
+        db.session.commit()
+        self.user_id = user.id
+
+        RoleService.sync_permissions(self.role.id, [self.view.id])
+        RoleService.assign_role_to_user(self.user_id, self.role.id)
+
+    def tearDown(self):
+        result_cache.clear()
+        result_cache.enabled = False
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def permissions(self):
+        """Conjunto de permisos visto por una petición nueva (g y sesión propios)"""
+        with self.app.app_context():
+            return db.session.get(User, self.user_id).get_permission_set()
+
+    def test_compiled_set_is_reused_until_the_version_changes(self):
+        self.assertEqual(self.permissions(), {'inventory.view'})
+
+        # Cambio por fuera de RoleService: la entrada cacheada sigue vigente
+        db.session.execute(role_permissions.insert().values(role_id=self.role.id, permission_id=self.edit.id))
+        db.session.commit()
+        self.assertEqual(self.permissions(), {'inventory.view'})
+
+        RoleService.bump_permissions_version()
+        self.assertEqual(self.permissions(), {'inventory.view', 'inventory.edit'})
+
+    def test_role_edits_invalidate(self):
+        self.assertEqual(self.permissions(), {'inventory.view'})
+
+        RoleService.sync_permissions(self.role.id, [self.view.id, self.edit.id])
+        self.assertEqual(self.permissions(), {'inventory.view', 'inventory.edit'})
+
+        RoleService.update_role(self.role.id, is_active=False)
+        self.assertEqual(self.permissions(), frozenset())
+
+    def test_role_removal_invalidates_within_the_same_request(self):
+        user = db.session.get(User, self.user_id)
+        self.assertTrue(user.has_permission('inventory.view'))
+
+        RoleService.remove_role_from_user(self.user_id, self.role.id)
+
+        self.assertFalse(user.has_permission('inventory.view'))
+
+    def test_set_user_role_expiration_invalidates(self):
+        self.assertEqual(self.permissions(), {'inventory.view'})
+
+        RoleService.set_user_role_expiration(self.user_id, self.role.id, datetime.utcnow() - timedelta(minutes=1))
+        self.assertEqual(self.permissions(), frozenset())
+
+        RoleService.set_user_role_expiration(self.user_id, self.role.id, None)
+        self.assertEqual(self.permissions(), {'inventory.view'})
+
+        RoleService.set_user_role_expiration(self.user_id, self.role.id, None, is_active=False)
+        self.assertEqual(self.permissions(), frozenset())
+
+    def test_role_expiry_drops_the_cached_set_without_a_version_change(self):
+        expires_at = datetime.utcnow() + timedelta(hours=1)
+        RoleService.set_user_role_expiration(self.user_id, self.role.id, expires_at)
+        self.assertEqual(self.permissions(), {'inventory.view'})
+
+        later = mock.Mock(wraps=datetime)
+        later.utcnow.return_value = expires_at + timedelta(seconds=1)
+        with mock.patch('app.models.user.datetime', later):
+            self.assertEqual(self.permissions(), frozenset())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app import create_app, db
+from app.models.laptop import Laptop
+from app.services.catalog_facet_service import CatalogFacetService
+
+BASE = datetime(2026, 3, 2, 12, 0)
+
+
+class CatalogApiV2TestCase(unittest.TestCase):
+    """/api/v2/laptops: filtros en servidor, orden keyset, cursor y campos"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # (nombre, marca, condicion, precio, descuento, publicada, cantidad, minutos)
+        seed = [
+            ('A', 1, 'new', '1000.00', None, True, 2, 0),
+            ('B', 2, 'used', '800.00', '700.00', True, 1, 10),
+            ('C', 1, 'new', '600.00', '0.00', True, 3, 20),         # descuento en cero: sin oferta
+            ('D', 2, 'new', '500.00', '900.00', True, 1, 30),       # descuento mayor: sin oferta
+            ('E', 1, 'refurbished', '1200.00', None, True, 1, 30),  # empata en created_at con D
+            ('F', 1, 'new', '400.00', None, False, 5, 40),          # no publicada
+            ('G', 2, 'new', '300.00', None, True, 0, 50),           # sin stock
+        ]
+        self.ids = {}
+        for name, brand_id, condition, price, discount, published, quantity, minutes in seed:
+            # Catalogos sin FK forzada en SQLite
+            laptop = Laptop(
+                sku=f'LAP-{name}', slug=f'lap-{name.lower()}', display_name=f'Laptop {name}', brand_id=brand_id,
+                model_id=1, processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1,
+                store_id=1, purchase_cost=Decimal('300.00'), sale_price=Decimal(price),
+                discount_price=Decimal(discount) if discount else None, condition=condition,
+                is_published=published, quantity=quantity, created_at=BASE + timedelta(minutes=minutes)
+            )
+            db.session.add(laptop)
+            db.session.flush()
+            self.ids[name] = laptop.id
+        db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get(self, query=''):
+        response = self.client.get(f'/api/v2/laptops?fields=id,price,old_price,is_sale&{query}')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        return response.get_json()
+
+    def names(self, page):
+        by_id = {laptop_id: name for name, laptop_id in self.ids.items()}
+        return [by_id[item['id']] for item in page['items']]
+
+    def test_lists_published_in_stock_newest_first(self):
+        page = self.get()
+
+        # D y E empatan en created_at: desempata el id descendente
+        self.assertEqual(self.names(page), ['E', 'D', 'C', 'B', 'A'])
+        self.assertFalse(page['has_more'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_filters_by_ids_and_values(self):
+        self.assertEqual(self.names(self.get('brand=2')), ['D', 'B'])
+        self.assertEqual(self.names(self.get('brand=1&condition=new,refurbished')), ['E', 'C', 'A'])
+
+    def test_price_filter_and_display_use_the_same_price(self):
+        items = {item['id']: item for item in self.get()['items']}
+
+        self.assertEqual(items[self.ids['B']], {'id': self.ids['B'], 'price': 700.0, 'old_price': 800.0, 'is_sale': True})
+        self.assertEqual((items[self.ids['C']]['price'], items[self.ids['C']]['is_sale']), (600.0, False))
+        self.assertEqual((items[self.ids['D']]['price'], items[self.ids['D']]['old_price']), (500.0, None))
+
+        # D vale 500 (su descuento es mayor) y C 600 (descuento en cero)
+        self.assertEqual(self.names(self.get('max_price=600')), ['D', 'C'])
+        self.assertEqual(self.names(self.get('min_price=650&max_price=1000')), ['B', 'A'])
+
+        # Las facetas aplican el mismo rango de precio
+        total, _ = CatalogFacetService.count(CatalogFacetService.build_index(), {}, max_price=600)
+        self.assertEqual(total, 2)
+
+    def test_cursor_walks_every_page_once(self):
+        seen, cursor = [], None
+        while True:
+            page = self.get('limit=2' + (f'&cursor={cursor}' if cursor else ''))
+            seen.extend(self.names(page))
+            self.assertLessEqual(len(page['items']), 2)
+            if not page['has_more']:
+                break
+            cursor = page['next_cursor']
+
+        self.assertEqual(seen, ['E', 'D', 'C', 'B', 'A'])
+
+    def test_cursor_keeps_the_filters(self):
+        first = self.get('brand=1&limit=1')
+        second = self.get(f"brand=1&limit=5&cursor={first['next_cursor']}")
+
+        self.assertEqual(self.names(first) + self.names(second), ['E', 'C', 'A'])
+
+    def test_default_fields(self):
+        item = self.client.get('/api/v2/laptops?limit=1').get_json()['items'][0]
+
+        self.assertEqual(set(item), {'id', 'name', 'brand', 'price', 'old_price', 'image', 'cpu', 'ram', 'ssd',
+                                     'condition', 'url'})
+        self.assertEqual((item['name'], item['url']), ('Laptop E', '/laptop/lap-e'))
+
+    def test_invalid_parameters_return_400(self):
+        for query in ('cursor=@@@', 'fields=id,secret', 'brand=x', 'min_price=abc', 'limit=many'):
+            response = self.client.get(f'/api/v2/laptops?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
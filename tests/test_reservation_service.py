@@ -0,0 +1,273 @@
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app import create_app, db
+from app.models.customer import Customer
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.laptop import Laptop
+from app.models.serial import LaptopSerial, SerialMovement, StockReservation
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.services.invoice_inventory_service import InvoiceInventoryService
+from app.services.reservation_service import ReservationService
+from app.services.serial_service import SerialService
+
+
+class ReservationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.customer = Customer(customer_type='person', first_name='Ana', id_number='00100000001', id_type='cedula')
+        db.session.add(self.customer)
+
+        # Catalogos sin FK forzada en SQLite
+        self.laptop_a = self.make_laptop('A', quantity=3)
+        self.laptop_b = self.make_laptop('B', quantity=1)
+        db.session.flush()
+
+        self.serials = [
+            LaptopSerial(serial_number=f'SNA{i}', serial_normalized=f'SNA{i}', laptop_id=self.laptop_a.id)
+            for i in range(3)
+        ]
+        self.serial_b = LaptopSerial(serial_number='SNB0', serial_normalized='SNB0', laptop_id=self.laptop_b.id)
+        db.session.add_all(self.serials + [self.serial_b])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def make_laptop(self, name, quantity):
+        laptop = Laptop(
+            sku=f'LAP-{name}', slug=f'lap-{name.lower()}', display_name=f'Laptop {name}', brand_id=1, model_id=1,
+            processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1, store_id=1,
+            purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'), quantity=quantity
+        )
+        db.session.add(laptop)
+        return laptop
+
+    def make_invoice(self, lines, status='draft', number=1):
+        invoice = Invoice(
+            invoice_number=f'INV-{number:05d}', ncf=f'B02{number:08d}', customer_id=self.customer.id, status=status
+        )
+        db.session.add(invoice)
+        db.session.flush()
+        for laptop, quantity in lines:
+            item = InvoiceItem(
+                invoice_id=invoice.id, item_type='laptop', laptop_id=laptop.id, description=laptop.display_name,
+                quantity=quantity, unit_price=Decimal('1000.00')
+            )
+            item.calculate_line_total()
+            db.session.add(item)
+        db.session.commit()
+        return invoice
+
+    def reserved(self, laptop):
+        return db.session.execute(
+            db.select(Laptop.reserved_quantity).where(Laptop.id == laptop.id)
+        ).scalar_one()
+
+    def statuses(self, serials):
+        ids = [serial.id for serial in serials]
+        rows = dict(db.session.execute(
+            db.select(LaptopSerial.id, LaptopSerial.status).where(LaptopSerial.id.in_(ids))
+        ).all())
+        return [rows[serial_id] for serial_id in ids]
+
+
+class ReserveTestCase(ReservationTestCase):
+    def test_reserve_updates_counters_and_records_reservations(self):
+        invoice = self.make_invoice([(self.laptop_a, 2), (self.laptop_b, 1)])
+
+        reservations = ReservationService.reserve_invoice(invoice)
+        db.session.commit()
+
+        self.assertEqual((self.reserved(self.laptop_a), self.reserved(self.laptop_b)), (2, 1))
+        self.assertEqual(self.laptop_a.available_quantity, 1)
+        self.assertEqual({(r.laptop_id, r.quantity, r.status) for r in reservations}, {
+            (self.laptop_a.id, 2, 'active'), (self.laptop_b.id, 1, 'active')
+        })
+
+    def test_missing_stock_on_one_laptop_undoes_the_others(self):
+        with self.assertRaisesRegex(ValueError, 'Stock insuficiente para reservar: Laptop B'):
+            ReservationService.reserve(1, {self.laptop_a.id: 2, self.laptop_b.id: 2})
+
+        self.assertEqual((self.reserved(self.laptop_a), self.reserved(self.laptop_b)), (0, 0))
+        self.assertEqual(StockReservation.query.count(), 0)
+
+    def test_second_invoice_cannot_take_reserved_units(self):
+        ReservationService.reserve(1, {self.laptop_b.id: 1})
+        db.session.commit()
+
+        with self.assertRaises(ValueError):
+            ReservationService.reserve(2, {self.laptop_b.id: 1})
+        self.assertEqual(self.reserved(self.laptop_b), 1)
+
+    def test_serials_are_reserved_and_logged(self):
+        wanted = self.serials[:2]
+
+        ReservationService.reserve(1, {self.laptop_a.id: 2}, {self.laptop_a.id: [s.id for s in wanted]})
+        db.session.commit()
+
+        self.assertEqual(self.statuses(self.serials), ['reserved', 'reserved', 'available'])
+        movements = SerialMovement.query.filter_by(movement_type='reserved').all()
+        self.assertEqual({m.serial_id for m in movements}, {s.id for s in wanted})
+
+    def test_unavailable_serial_rolls_back_quantities_and_serials(self):
+        # El serial de B no pertenece a la laptop A: nada queda reservado
+        requested = [self.serials[0].id, self.serial_b.id]
+
+        with self.assertRaisesRegex(ValueError, f'Serial ID {self.serial_b.id} no está disponible'):
+            ReservationService.reserve(1, {self.laptop_a.id: 2}, {self.laptop_a.id: requested})
+
+        self.assertEqual(self.reserved(self.laptop_a), 0)
+        self.assertEqual(self.statuses([self.serials[0], self.serial_b]), ['available', 'available'])
+        self.assertEqual(StockReservation.query.count(), 0)
+
+    def test_release_invoice_returns_stock_and_serials(self):
+        ReservationService.reserve(1, {self.laptop_a.id: 1}, {self.laptop_a.id: [self.serials[0].id]})
+        db.session.commit()
+
+        self.assertEqual(ReservationService.release_invoice(1), 1)
+        db.session.commit()
+
+        self.assertEqual(self.reserved(self.laptop_a), 0)
+        self.assertEqual(self.statuses([self.serials[0]]), ['available'])
+        self.assertEqual(StockReservation.query.one().status, 'released')
+
+
+class ConsumeTestCase(ReservationTestCase):
+    def test_payment_consumes_the_reservation_and_sells_its_serials(self):
+        invoice = self.make_invoice([(self.laptop_a, 2)])
+        reserved_serials = [self.serials[0].id, self.serials[2].id]
+        ReservationService.reserve_invoice(
+            invoice, [{'laptop_id': self.laptop_a.id, 'serial_ids': reserved_serials}]
+        )
+        db.session.commit()
+
+        invoice.status = 'paid'
+        success, error = InvoiceInventoryService.update_inventory_for_invoice(invoice, action='subtract')
+
+        self.assertTrue(success, error)
+        self.assertEqual(db.session.get(Laptop, self.laptop_a.id).quantity, 1)
+        self.assertEqual(self.reserved(self.laptop_a), 0)
+        self.assertEqual(StockReservation.query.one().status, 'consumed')
+        self.assertEqual(self.statuses(self.serials), ['sold', 'available', 'sold'])
+
+    def test_consume_without_reservation_returns_nothing(self):
+        self.assertEqual(ReservationService.consume_invoice(99), {})
+
+
+class ReleaseExpiredTestCase(ReservationTestCase):
+    def test_sweeper_releases_only_expired_reservations(self):
+        ReservationService.reserve(1, {self.laptop_a.id: 1}, {self.laptop_a.id: [self.serials[0].id]})
+        ReservationService.reserve(2, {self.laptop_b.id: 1})
+        db.session.commit()
+        StockReservation.query.filter_by(invoice_id=1).update({'expires_at': datetime.utcnow() - timedelta(hours=1)})
+        db.session.commit()
+
+        self.assertEqual(ReservationService.release_expired(), 1)
+        db.session.commit()
+
+        self.assertEqual((self.reserved(self.laptop_a), self.reserved(self.laptop_b)), (0, 1))
+        self.assertEqual(self.statuses([self.serials[0]]), ['available'])
+        statuses = dict(db.session.execute(db.select(StockReservation.invoice_id, StockReservation.status)).all())
+        self.assertEqual(statuses, {1: 'expired', 2: 'active'})
+        self.assertEqual(ReservationService.release_expired(), 0)
+
+    def test_reserve_frees_expired_stock_before_failing(self):
+        ReservationService.reserve(1, {self.laptop_b.id: 1})
+        db.session.commit()
+
+        later = datetime.utcnow() + ReservationService.ttl() + timedelta(minutes=1)
+        StockReservation.query.update({'expires_at': later - timedelta(days=30)})
+        db.session.commit()
+
+        ReservationService.reserve(2, {self.laptop_b.id: 1})
+        db.session.commit()
+
+        self.assertEqual(self.reserved(self.laptop_b), 1)
+        statuses = dict(db.session.execute(db.select(StockReservation.invoice_id, StockReservation.status)).all())
+        self.assertEqual(statuses, {1: 'expired', 2: 'active'})
+
+
+class StatusChangeTestCase(ReservationTestCase):
+    """Ruta de cambio de estado: volver de pagada a un estado abierto vuelve a reservar"""
+
+    def setUp(self):
+        super().setUp()
+        admin = User(username='admin', email='admin@test.com', is_admin=True)
+        admin.set_password('pass')
+        db.session.add(admin)
+        db.session.commit()
+        UserSession.create_session(user_id=admin.id, session_token='token-admin')
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+            session['session_token'] = 'token-admin'
+
+    def change_status(self, invoice, status):
+        response = self.client.post(f'/invoices/{invoice.id}/status', data={'status': status})
+        self.assertEqual(response.status_code, 302)
+        db.session.expire_all()
+
+    def test_paid_back_to_issued_reserves_again(self):
+        invoice = self.make_invoice([(self.laptop_a, 2)], status='issued')
+        ReservationService.reserve_invoice(invoice)
+        db.session.commit()
+
+        self.change_status(invoice, 'paid')
+        self.assertEqual((self.laptop_a.quantity, self.reserved(self.laptop_a)), (1, 0))
+
+        self.change_status(invoice, 'issued')
+        self.assertEqual(db.session.get(Invoice, invoice.id).status, 'issued')
+        self.assertEqual((self.laptop_a.quantity, self.reserved(self.laptop_a)), (3, 2))
+        self.assertEqual(ReservationService.held_by(invoice.id)['quantity'], {self.laptop_a.id: 2})
+
+    def test_cancelled_releases_and_reopening_reserves(self):
+        invoice = self.make_invoice([(self.laptop_b, 1)], status='issued')
+        ReservationService.reserve_invoice(invoice)
+        db.session.commit()
+
+        self.change_status(invoice, 'cancelled')
+        self.assertEqual(self.reserved(self.laptop_b), 0)
+
+        self.change_status(invoice, 'draft')
+        self.assertEqual(self.reserved(self.laptop_b), 1)
+
+
+class SyncQuantityTestCase(ReservationTestCase):
+    """sync_laptop_quantity no descuenta dos veces lo reservado"""
+
+    def test_reserved_serials_stay_in_stock(self):
+        ReservationService.reserve(1, {self.laptop_a.id: 1}, {self.laptop_a.id: [self.serials[0].id]})
+        db.session.commit()
+
+        success, info = SerialService.sync_laptop_quantity(self.laptop_a.id)
+
+        self.assertTrue(success, info)
+        laptop = db.session.get(Laptop, self.laptop_a.id)
+        self.assertEqual((laptop.quantity, laptop.reserved_quantity), (3, 1))
+        self.assertEqual(info['new_quantity'], 3)
+        # Lo que queda para vender son exactamente los seriales disponibles
+        self.assertEqual(laptop.available_quantity, self.statuses(self.serials).count('available'))
+
+    def test_sold_serials_leave_the_stock(self):
+        LaptopSerial.query.filter_by(id=self.serials[2].id).update({'status': 'sold'})
+        db.session.commit()
+
+        SerialService.sync_laptop_quantity(self.laptop_a.id)
+
+        self.assertEqual(db.session.get(Laptop, self.laptop_a.id).quantity, 2)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
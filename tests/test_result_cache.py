@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from flask import jsonify
+
+from app import create_app, db
+from app.extensions import result_cache
+from app.models.laptop import Laptop
+from app.models.sales_fact import DailySalesFact
+from app.utils.cache import LocalTier, ResultCache, SqliteTier
+from app.utils.decorators import cache_response
+
+
+class LocalTierTestCase(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        tier = LocalTier(max_entries=2)
+        tier.set('a', 1, ttl=60)
+        tier.set('b', 2, ttl=60)
+        tier.get('a')
+        tier.set('c', 3, ttl=60)
+
+        self.assertEqual(tier.get('a'), 1)
+        self.assertEqual(tier.get('c'), 3)
+        self.assertEqual(len(tier), 2)
+        self.assertEqual(tier.evictions, 1)
+
+    def test_expired_entries_are_misses(self):
+        tier = LocalTier()
+        tier.set('a', 1, ttl=-1)
+
+        self.assertNotEqual(tier.get('a'), 1)
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'value': self.calls}
+
+    def test_hits_and_misses_are_counted(self):
+        cache = ResultCache()
+        cache.get_or_set('panel', ('month',), self.compute, tags=('invoices',))
+        cache.get_or_set('panel', ('month',), self.compute, tags=('invoices',))
+
+        stats = cache.stats()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((stats['hits_local'], stats['misses']), (1, 1))
+
+    def test_invalidate_only_affects_tagged_entries(self):
+        cache = ResultCache()
+        cache.get_or_set('sales', (), self.compute, tags=('invoices',))
+        cache.get_or_set('stock', (), self.compute, tags=('inventory',))
+
+        cache.invalidate('invoices')
+
+        self.assertEqual(cache.get_or_set('sales', (), self.compute, tags=('invoices',)), {'value': 3})
+        self.assertEqual(cache.get_or_set('stock', (), self.compute, tags=('inventory',)), {'value': 2})
+
+    def test_cached_values_are_copies(self):
+        cache = ResultCache()
+        first = cache.get_or_set('panel', (), self.compute)
+        first['value'] = 'mutated'
+
+        self.assertEqual(cache.get_or_set('panel', (), self.compute), {'value': 1})
+
+    def test_shared_tier_is_seen_by_other_workers(self):
+        """Otro proceso (nivel local vacío) lee el valor y la invalidación del nivel compartido"""
+        path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+        worker_a, worker_b = ResultCache(), ResultCache()
+        worker_a.shared, worker_b.shared = SqliteTier(path), SqliteTier(path)
+
+        worker_a.get_or_set('panel', (), self.compute, tags=('invoices',))
+        self.assertEqual(worker_b.get_or_set('panel', (), self.compute, tags=('invoices',)), {'value': 1})
+        self.assertEqual(worker_b.stats()['hits_shared'], 1)
+
+        worker_a.invalidate('invoices')
+        self.assertEqual(worker_b.get_or_set('panel', (), self.compute, tags=('invoices',)), {'value': 2})
+
+
+class CommitInvalidationTestCase(unittest.TestCase):
+    """Los commits invalidan las etiquetas de las tablas tocadas; los rollbacks no"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        result_cache.enabled = True
+        result_cache.clear()
+
+        self.calls = 0
+
+        @cache_response(timeout=60, tags=('inventory',), scoped=False)
+        def stock():
+            self.calls += 1
+            return jsonify({'laptops': Laptop.query.count()})
+
+        self.app.add_url_rule('/test/stock', 'test_stock', stock)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        result_cache.clear()
+        result_cache.enabled = False
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def compute(self):
+        self.calls += 1
+        return {'value': self.calls}
+
+    def add_laptop(self, name='A'):
+        db.session.add(Laptop(
+            sku=f'LAP-{name}', slug=f'lap-{name.lower()}', display_name=f'Laptop {name}', brand_id=1, model_id=1,
+            processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1, store_id=1,
+            purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'), quantity=1
+        ))
+
+    def cached(self, tag):
+        return result_cache.get_or_set(tag, (), self.compute, tags=(tag,))
+
+    def test_commit_rebuilds_the_cached_response(self):
+        self.assertEqual(self.client.get('/test/stock').get_json(), {'laptops': 0})
+        self.assertEqual(self.client.get('/test/stock').get_json(), {'laptops': 0})
+        self.assertEqual(self.calls, 1)
+
+        self.add_laptop()
+        db.session.commit()
+
+        self.assertEqual(self.client.get('/test/stock').get_json(), {'laptops': 1})
+        self.assertEqual(self.calls, 2)
+
+    def test_commit_evicts_only_the_touched_tags(self):
+        self.cached('inventory')
+        self.cached('invoices')
+
+        self.add_laptop()
+        db.session.commit()
+
+        self.assertEqual(self.cached('inventory'), {'value': 3})
+        self.assertEqual(self.cached('invoices'), {'value': 2})
+
+    def test_rollback_keeps_the_entries(self):
+        self.client.get('/test/stock')
+        self.cached('inventory')
+        invalidations = result_cache.stats()['invalidations']
+
+        self.add_laptop()
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+
+        self.assertEqual(self.client.get('/test/stock').get_json(), {'laptops': 0})
+        self.assertEqual(self.cached('inventory'), {'value': 2})
+        self.assertEqual(result_cache.stats()['invalidations'], invalidations)
+
+    def test_bulk_and_core_statements_are_tagged(self):
+        self.add_laptop()
+        db.session.commit()
+        self.cached('inventory')
+        self.cached('invoices')
+
+        Laptop.query.update({'quantity': 5})
+        db.session.execute(db.insert(DailySalesFact.__table__).values(
+            fact_date=date(2026, 3, 2), item_type=DailySalesFact.INVOICE_ROW, status='paid'
+        ))
+        db.session.commit()
+
+        self.assertEqual(self.cached('inventory'), {'value': 3})
+        self.assertEqual(self.cached('invoices'), {'value': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
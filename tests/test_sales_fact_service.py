@@ -0,0 +1,205 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app import create_app, db
+from app.models.customer import Customer
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.laptop import Brand, Laptop
+from app.models.sales_fact import DailySalesFact
+from app.services.sales_fact_service import SalesFactService
+
+DAY = date(2026, 3, 2)
+NEXT_DAY = date(2026, 3, 3)
+
+
+class SalesFactRollupTestCase(unittest.TestCase):
+    """El rollup de un dia coincide con la agregacion en vivo de facturas y lineas"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        brand = Brand(name='Lenovo')
+        self.customer = Customer(customer_type='person', first_name='Ana', id_number='00100000001', id_type='cedula')
+        db.session.add_all([brand, self.customer])
+        db.session.flush()
+
+        # Catalogos restantes sin FK forzada en SQLite
+        self.laptop = Laptop(
+            sku='LAP-1', slug='lap-1', display_name='ThinkPad T14', brand_id=brand.id, model_id=1,
+            processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1,
+            store_id=1, purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'), quantity=5
+        )
+        db.session.add(self.laptop)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_invoice(self, number, lines, status='issued', invoice_date=DAY, payment_method='cash'):
+        invoice = Invoice(
+            invoice_number=f'INV-{number:05d}', ncf=f'B02{number:08d}', customer_id=self.customer.id,
+            invoice_date=invoice_date, status=status, payment_method=payment_method
+        )
+        db.session.add(invoice)
+        db.session.flush()
+
+        for order, (laptop_id, quantity, price) in enumerate(lines):
+            item = InvoiceItem(
+                invoice_id=invoice.id, item_type='laptop' if laptop_id else 'custom',
+                laptop_id=laptop_id, description='Linea', quantity=quantity,
+                unit_price=Decimal(price), line_order=order
+            )
+            item.calculate_line_total()
+            db.session.add(item)
+        db.session.flush()
+
+        invoice.subtotal = sum(item.line_total for item in invoice.items.all())
+        invoice.tax_amount = invoice.subtotal * Decimal('0.18')
+        invoice.total = invoice.subtotal + invoice.tax_amount
+
+        SalesFactService.refresh_invoice(invoice)
+        db.session.commit()
+        return invoice
+
+    def rollup(self, day):
+        """{clave: medidas} leidas de daily_sales_facts"""
+        lines, headers = {}, {}
+        for fact in DailySalesFact.query.filter_by(fact_date=day).all():
+            if fact.item_type == DailySalesFact.INVOICE_ROW:
+                headers[(fact.payment_method, fact.status)] = (
+                    fact.invoice_count, Decimal(fact.subtotal), Decimal(fact.total)
+                )
+            else:
+                lines[(fact.item_type, fact.laptop_id, fact.payment_method, fact.status)] = (
+                    fact.units_sold, Decimal(fact.revenue), Decimal(fact.cost)
+                )
+        return lines, headers
+
+    def live(self, day):
+        """Las mismas medidas calculadas directamente de facturas y lineas"""
+        lines, headers = {}, {}
+        for invoice in Invoice.query.filter_by(invoice_date=day).all():
+            count, subtotal, total = headers.get((invoice.payment_method, invoice.status), (0, 0, 0))
+            headers[(invoice.payment_method, invoice.status)] = (
+                count + 1, subtotal + invoice.subtotal, total + invoice.total
+            )
+            for item in invoice.items.all():
+                key = (item.item_type, item.laptop_id, invoice.payment_method, invoice.status)
+                unit_cost = item.laptop.purchase_cost if item.laptop else 0
+                units, revenue, cost = lines.get(key, (0, 0, 0))
+                lines[key] = (units + item.quantity, revenue + item.line_total, cost + item.quantity * unit_cost)
+        return (
+            {key: (units, Decimal(revenue), Decimal(cost)) for key, (units, revenue, cost) in lines.items()},
+            {key: (count, Decimal(subtotal), Decimal(total)) for key, (count, subtotal, total) in headers.items()}
+        )
+
+    def assertRollupMatches(self, *days):
+        for day in days:
+            self.assertEqual(self.rollup(day), self.live(day))
+
+    def test_create(self):
+        self.create_invoice(1, [(self.laptop.id, 2, '1000.00'), (None, 1, '50.00')])
+        self.create_invoice(2, [(self.laptop.id, 1, '950.00')], payment_method='transfer')
+
+        self.assertRollupMatches(DAY)
+        lines, headers = self.rollup(DAY)
+        self.assertEqual(lines[('laptop', self.laptop.id, 'cash', 'issued')], (2, Decimal('2000.00'), Decimal('1200.00')))
+        self.assertEqual(headers[('cash', 'issued')][0], 1)
+
+    def test_edit_date_moves_facts_to_the_new_day(self):
+        invoice = self.create_invoice(1, [(self.laptop.id, 1, '1000.00')])
+        self.create_invoice(2, [(None, 1, '80.00')])
+
+        old_date = invoice.invoice_date
+        invoice.invoice_date = NEXT_DAY
+        SalesFactService.refresh_invoice(invoice, old_date)
+        db.session.commit()
+
+        self.assertRollupMatches(DAY, NEXT_DAY)
+        self.assertNotIn(('laptop', self.laptop.id, 'cash', 'issued'), self.rollup(DAY)[0])
+
+    def test_status_change(self):
+        invoice = self.create_invoice(1, [(self.laptop.id, 2, '1000.00')])
+        self.create_invoice(2, [(self.laptop.id, 1, '1000.00')])
+
+        invoice.status = 'paid'
+        SalesFactService.refresh_invoice(invoice)
+        db.session.commit()
+
+        self.assertRollupMatches(DAY)
+        self.assertEqual(self.rollup(DAY)[0][('laptop', self.laptop.id, 'cash', 'paid')][0], 2)
+
+    def test_delete(self):
+        invoice = self.create_invoice(1, [(self.laptop.id, 1, '1000.00')], status='draft')
+        self.create_invoice(2, [(None, 2, '40.00')])
+
+        db.session.delete(invoice)
+        SalesFactService.refresh_dates([DAY])
+        db.session.commit()
+
+        self.assertRollupMatches(DAY)
+        self.assertNotIn((invoice.payment_method, 'draft'), self.rollup(DAY)[1])
+
+    def test_rebuild_matches_incremental_refresh(self):
+        self.create_invoice(1, [(self.laptop.id, 1, '1000.00')])
+        self.create_invoice(2, [(None, 3, '25.00')], invoice_date=NEXT_DAY, status='paid')
+        incremental = (self.rollup(DAY), self.rollup(NEXT_DAY))
+
+        SalesFactService.rebuild()
+
+        self.assertEqual((self.rollup(DAY), self.rollup(NEXT_DAY)), incremental)
+
+
+    def labels(self, day):
+        """Marca y categoria copiadas en las filas de linea de la laptop"""
+        return {
+            (fact.brand_name, fact.category_name)
+            for fact in DailySalesFact.query.filter_by(fact_date=day, laptop_id=self.laptop.id).all()
+        }
+
+    def test_laptop_edit_refreshes_its_sale_days(self):
+        self.create_invoice(1, [(self.laptop.id, 2, '1000.00')])
+        self.create_invoice(2, [(self.laptop.id, 1, '1000.00')], invoice_date=NEXT_DAY)
+        other = Brand(name='Dell')
+        db.session.add(other)
+        db.session.flush()
+
+        self.laptop.purchase_cost = Decimal('550.00')
+        self.laptop.brand_id = other.id
+        self.laptop.category = 'business'
+        db.session.commit()
+
+        self.assertRollupMatches(DAY, NEXT_DAY)
+        self.assertEqual(self.rollup(DAY)[0][('laptop', self.laptop.id, 'cash', 'issued')][2], Decimal('1100.00'))
+        self.assertEqual(self.labels(NEXT_DAY), {('Dell', 'business')})
+
+    def test_brand_rename_refreshes_its_laptops(self):
+        self.create_invoice(1, [(self.laptop.id, 1, '1000.00')])
+
+        db.session.get(Brand, self.laptop.brand_id).name = 'Lenovo Group'
+        db.session.commit()
+
+        self.assertEqual(self.labels(DAY), {('Lenovo Group', 'laptop')})
+
+    def test_rollback_leaves_facts_untouched(self):
+        self.create_invoice(1, [(self.laptop.id, 1, '1000.00')])
+        before = self.rollup(DAY)
+
+        self.laptop.purchase_cost = Decimal('1.00')
+        db.session.flush()
+        db.session.rollback()
+        # Un commit posterior sin cambios no arrastra lo descartado
+        db.session.commit()
+
+        self.assertEqual(self.rollup(DAY), before)
+        self.assertRollupMatches(DAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from app.services.sales_trend_service import SalesTrendService
+
+
+class SalesTrendBucketsTestCase(unittest.TestCase):
+    def test_today_has_24_hour_buckets(self):
+        """Hourly view always returns 24 buckets keyed by hour"""
+        buckets = SalesTrendService.build_buckets('today', date(2026, 3, 4), date(2026, 3, 4))
+
+        self.assertEqual(len(buckets), 24)
+        self.assertEqual(buckets[0], (0, '00:00'))
+        self.assertEqual(buckets[23], (23, '23:00'))
+
+    def test_week_stops_at_end_date(self):
+        """Weekly view has one bucket per day up to the end date"""
+        buckets = SalesTrendService.build_buckets('week', date(2026, 3, 2), date(2026, 3, 4))
+
+        self.assertEqual([key for key, _ in buckets], [date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 4)])
+
+    def test_year_buckets_by_month(self):
+        """Quarter/year views bucket by (year, month)"""
+        buckets = SalesTrendService.build_buckets('year', date(2026, 1, 1), date(2026, 3, 15))
+
+        self.assertEqual([key for key, _ in buckets], [(2026, 1), (2026, 2), (2026, 3)])
+
+    def test_unknown_period_has_no_buckets(self):
+        self.assertEqual(SalesTrendService.build_buckets('decade', date(2026, 1, 1), date(2026, 1, 1)), [])
+
+    def test_fill_buckets_zero_fills_missing(self):
+        """Buckets without rows are filled with zero sales and profit"""
+        buckets = SalesTrendService.build_buckets('week', date(2026, 3, 2), date(2026, 3, 4))
+        rows = {date(2026, 3, 3): {'sales': 500, 'cogs': 300, 'expenses': 50}}
+
+        result = SalesTrendService.fill_buckets(buckets, rows)
+
+        self.assertEqual(result['sales'], [0.0, 500.0, 0.0])
+        self.assertEqual(result['profit'], [0.0, 200.0, 0.0])
+
+    def test_fill_buckets_subtracts_expenses_when_requested(self):
+        """Monthly views discount paid expenses from profit"""
+        buckets = SalesTrendService.build_buckets('quarter', date(2026, 1, 1), date(2026, 1, 20))
+        rows = {(2026, 1): {'sales': 1000, 'cogs': 600, 'expenses': 150}}
+
+        result = SalesTrendService.fill_buckets(buckets, rows, include_expenses=True)
+
+        self.assertEqual(result['profit'], [250.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import importlib.util
+import os
+import re
+import unittest
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql
+
+from app import create_app, db
+from app.models.laptop import Laptop
+from app.services.search_service import SearchService
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), '..', 'migrations', 'versions', 'c4d8e1f2a3b5_add_search_indexes.py'
+)
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location('search_indexes_migration', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def normalize(sql):
+    """Quita calificación de tabla, paréntesis y espacios para comparar expresiones"""
+    sql = re.sub(r'\b\w+\.', '', sql)
+    return re.sub(r'[\s()]', '', sql)
+
+
+class SearchServiceTestCase(unittest.TestCase):
+    def test_prefix_query(self):
+        self.assertEqual(SearchService.prefix_query('Dell Lat-5'), 'dell:* & lat:* & 5:*')
+        self.assertEqual(SearchService.prefix_query(" '&|! "), '')
+
+    def test_document_matches_index_expression(self):
+        """La expresión tsvector de las consultas debe ser la del índice GIN"""
+        migration = load_migration()
+        tables = {'laptop': 'laptops', 'customer': 'customers', 'invoice': 'invoices', 'serial': 'laptop_serials'}
+
+        for entity, table in tables.items():
+            _model, columns = SearchService.ENTITIES[entity]
+            self.assertEqual(columns, migration.SEARCH_COLUMNS[table])
+
+            rendered = str(SearchService.document(entity).compile(dialect=postgresql.dialect()))
+            self.assertEqual(normalize(rendered), normalize(migration._document(columns)))
+
+
+class FallbackSearchTestCase(unittest.TestCase):
+    """Ranking y filtrado con LIKE en SQLite"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # (sku, nombre, descripción)
+        seed = [
+            ('DELL-5420', 'Dell', None),
+            ('DL-LAT', 'Dell Latitude 5420', None),
+            ('MD-7', 'Modell 7', None),
+            ('XPS-13', 'XPS 13', 'Sucesora de la dell xps'),
+            ('LT-7', 'Latitude 7420', None),
+            ('ASUS-1', 'Asus 100% Pro', None),
+            ('ASUS-2', 'Asus 1000 Pro', None),
+            ('HP_X', 'HP Envy', None),
+            ('HP-X', 'HP Pavilion', 'Ruta C:\\equipos'),
+        ]
+        for sku, name, description in seed:
+            # Catalogos sin FK forzada en SQLite
+            db.session.add(Laptop(
+                sku=sku, slug=sku.lower(), display_name=name,
+                short_description=description, brand_id=1, model_id=1, processor_id=1, os_id=1, screen_id=1,
+                graphics_card_id=1, storage_id=1, ram_id=1, store_id=1,
+                purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'), quantity=1
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def search(self, text):
+        return [laptop.sku for laptop in SearchService.apply(Laptop.query, text, 'laptop').order_by(Laptop.id).all()]
+
+    def test_exact_beats_prefix_beats_substring(self):
+        results = self.search('dell')
+
+        # Exacta (y prefijo del SKU) > prefijo del nombre > subcadena > palabra en la descripción
+        self.assertEqual(results, ['DELL-5420', 'DL-LAT', 'MD-7', 'XPS-13'])
+
+    def test_search_is_case_insensitive(self):
+        self.assertEqual(self.search('LATITUDE'), ['DL-LAT', 'LT-7'])
+
+    def test_wildcards_are_matched_literally(self):
+        self.assertEqual(self.search('100%'), ['ASUS-1'])
+        self.assertEqual(self.search('HP_'), ['HP_X'])
+        self.assertEqual(self.search('%'), ['ASUS-1'])
+        self.assertEqual(self.search('C:\\eq'), ['HP-X'])
+
+    def test_escape_like(self):
+        self.assertEqual(SearchService.escape_like('a\\b%c_d'), 'a\\\\b\\%c\\_d')
+
+
+if __name__ == '__main__':
+    unittest.main()
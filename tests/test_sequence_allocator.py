@@ -0,0 +1,108 @@
+import unittest
+
+from app import create_app, db
+from app.models.customer import Customer
+from app.models.invoice import Invoice, NCFSequence, SequenceGap
+from app.services.sequence_allocator import NumberBlock, SequenceAllocator
+
+
+class NumberBlockTestCase(unittest.TestCase):
+    def test_block_hands_out_consecutive_numbers(self):
+        block = NumberBlock('ncf', 'B02', 41, 3)
+
+        self.assertEqual([block.next() for _ in range(3)], ['B0200000041', 'B0200000042', 'B0200000043'])
+        self.assertEqual(block.remaining, 0)
+        with self.assertRaises(ValueError):
+            block.next()
+
+    def test_invoice_number_format(self):
+        self.assertEqual(SequenceAllocator.format_number('invoice', 'INV', 7), 'INV-00000007')
+
+
+class SequenceAllocatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sequence = NCFSequence(ncf_type='B02', name='Consumo', current_sequence=1, range_start=1, range_end=99)
+        db.session.add(self.sequence)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def current(self, ncf_type='B02'):
+        return db.session.execute(
+            db.select(NCFSequence.current_sequence).where(NCFSequence.ncf_type == ncf_type)
+        ).scalar_one()
+
+    def test_next_ncf_advances_and_rollback_returns_the_number(self):
+        self.assertEqual(SequenceAllocator.next_ncf('B02'), 'B0200000001')
+        self.assertEqual(SequenceAllocator.next_ncf('B02'), 'B0200000002')
+        self.assertEqual(self.sequence.current_sequence, 3)
+
+        db.session.rollback()
+
+        self.assertEqual(self.current(), 1)
+        self.assertEqual(SequenceAllocator.next_ncf('B02'), 'B0200000001')
+
+    def test_allocation_fails_at_range_end(self):
+        self.sequence.current_sequence = 99
+        db.session.commit()
+
+        self.assertEqual(SequenceAllocator.next_ncf('B02'), 'B0200000099')
+        db.session.commit()
+        with self.assertRaisesRegex(ValueError, 'Se agoto el rango'):
+            SequenceAllocator.next_ncf('B02')
+        with self.assertRaisesRegex(ValueError, 'Se agoto el rango'):
+            SequenceAllocator.reserve_ncf_block('B02', 2)
+        self.assertEqual(self.current(), 100)
+
+    def test_failure_does_not_commit_the_callers_transaction(self):
+        db.session.add(Customer(customer_type='person', first_name='Ana', id_number='00100000001', id_type='cedula'))
+        db.session.flush()
+
+        with self.assertRaisesRegex(ValueError, 'No existe la secuencia'):
+            SequenceAllocator.next_ncf('B15')
+        db.session.rollback()
+
+        self.assertEqual(Customer.query.count(), 0)
+        self.assertIsNone(NCFSequence.query.filter_by(ncf_type='B15').first())
+
+    def test_closed_block_records_unused_numbers_as_gaps(self):
+        block = SequenceAllocator.reserve_ncf_block('B02', 5)
+        self.assertEqual(self.current(), 6)
+
+        self.assertEqual([block.next(), block.next()], ['B0200000001', 'B0200000002'])
+        self.assertEqual(block.close(), 3)
+
+        gaps = SequenceGap.query.order_by(SequenceGap.number).all()
+        self.assertEqual([(g.kind, g.prefix, g.number, g.reason) for g in gaps], [
+            ('ncf', 'B02', number, 'block_unused') for number in (3, 4, 5)
+        ])
+
+    def test_find_gaps_reconciles_against_invoices(self):
+        customer = Customer(customer_type='person', first_name='Ana', id_number='00100000001', id_type='cedula')
+        db.session.add(customer)
+        db.session.flush()
+
+        for number in range(1, 6):
+            ncf = SequenceAllocator.next_ncf('B02')
+            if number in (1, 3, 5):
+                db.session.add(Invoice(invoice_number=f'INV-{number:08d}', ncf=ncf, customer_id=customer.id))
+        db.session.commit()
+        SequenceAllocator.record_gaps('ncf', 'B02', [4], 'voided')
+
+        self.assertEqual(SequenceAllocator.find_gaps('B02'), [
+            {'ncf': 'B0200000002', 'number': 2, 'reason': None},
+            {'ncf': 'B0200000004', 'number': 4, 'reason': 'voided'},
+        ])
+        self.assertEqual(SequenceAllocator.find_gaps('B01'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models.laptop import Laptop
+from app.models.serial import LaptopSerial, SerialMovement
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.services.serial_service import SerialService
+
+
+class SerialTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Catalogos sin FK forzada en SQLite
+        self.laptop = Laptop(
+            sku='LAP-A', slug='lap-a', display_name='Laptop A', brand_id=1, model_id=1, processor_id=1, os_id=1,
+            screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1, store_id=1,
+            purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'), quantity=0
+        )
+        db.session.add(self.laptop)
+        db.session.flush()
+        db.session.add(LaptopSerial(serial_number='OLD-001', serial_normalized='OLD001', laptop_id=self.laptop.id))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def serial_numbers(self):
+        return sorted(number for (number,) in db.session.query(LaptopSerial.serial_number))
+
+
+class SerialBatchTestCase(SerialTestCase):
+    """create_serials_batch: validación del lote, unicidad e inserción por lotes"""
+
+    def test_creates_valid_serials_and_reports_each_rejection(self):
+        result = SerialService.create_serials_batch(
+            self.laptop.id, ['SN-100', 'sn-100', 'old001', 'X', 'SN-200', '  '], created_by_id=5
+        )
+
+        self.assertFalse(result['success'])
+        self.assertEqual(sorted(s.serial_number for s in result['created']), ['SN-100', 'SN-200'])
+        self.assertEqual(result['errors'], [
+            {'serial': 'sn-100', 'error': "El serial 'sn-100' está repetido en el lote (SN-100)"},
+            {'serial': 'X', 'error': 'El número de serie debe tener al menos 3 caracteres'},
+            {'serial': 'old001', 'error': "El serial 'old001' ya existe en el sistema (Laptop: LAP-A)"},
+        ])
+        self.assertEqual((result['total'], result['created_count'], result['error_count']), (6, 2, 3))
+
+        self.assertEqual(self.serial_numbers(), ['OLD-001', 'SN-100', 'SN-200'])
+        movements = SerialMovement.query.filter_by(movement_type='created').all()
+        self.assertEqual({(m.serial_id, m.user_id) for m in movements}, {(s.id, 5) for s in result['created']})
+
+    def test_quantity_is_synced_once_with_serials_in_stock(self):
+        LaptopSerial.query.filter_by(serial_number='OLD-001').update({'status': 'reserved'})
+        db.session.commit()
+
+        result = SerialService.create_serials_batch(self.laptop.id, ['SN-100', 'SN-200'])
+
+        self.assertTrue(result['success'])
+        # El reservado sigue en stock
+        self.assertEqual((result['sync']['old_quantity'], result['sync']['new_quantity']), (0, 3))
+        self.assertEqual(db.session.get(Laptop, self.laptop.id).quantity, 3)
+        self.assertTrue(SerialService.validate_laptop_serial_count(self.laptop.id)['valid'])
+
+    def test_unique_conflict_at_insert_creates_nothing(self):
+        # Otro proceso registra SN-200 entre la verificación y el INSERT
+        real_insert = insert
+
+        def racing_insert(model):
+            if model is LaptopSerial:
+                db.session.execute(real_insert(LaptopSerial).values(
+                    serial_number='SN-200', serial_normalized='SN200', laptop_id=self.laptop.id
+                ))
+            return real_insert(model)
+
+        with mock.patch('app.services.serial_service.insert', side_effect=racing_insert):
+            result = SerialService.create_serials_batch(self.laptop.id, ['SN-100', 'SN-200'])
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['created'], [])
+        self.assertEqual(len(result['errors']), 1)
+        self.assertIsNone(result['errors'][0]['serial'])
+        self.assertIn('registrado por otro usuario', result['errors'][0]['error'])
+        self.assertEqual(result['error_count'], 2)
+        self.assertEqual(self.serial_numbers(), ['OLD-001'])
+
+    def test_unknown_laptop_uses_the_same_error_shape(self):
+        result = SerialService.create_serials_batch(999, ['SN-100'])
+
+        self.assertEqual(result['errors'], [{'serial': None, 'error': 'Laptop con ID 999 no encontrada'}])
+        self.assertEqual(result['error_count'], 1)
+
+
+class SerialBatchApiTestCase(SerialTestCase):
+    """POST /api/serials/batch devuelve la cantidad sincronizada"""
+
+    def setUp(self):
+        super().setUp()
+        admin = User(username='admin', email='admin@test.com', is_admin=True)
+        admin.set_password('pass')
+        db.session.add(admin)
+        db.session.commit()
+        UserSession.create_session(user_id=admin.id, session_token='token-admin')
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+            session['session_token'] = 'token-admin'
+
+    def test_batch_endpoint_returns_laptop_quantity(self):
+        response = self.client.post('/api/serials/batch', json={
+            'laptop_id': self.laptop.id, 'serial_numbers': ['SN-100', 'OLD-001']
+        })
+
+        data = response.get_json()
+        self.assertEqual(data['laptop_quantity'], 2)
+        self.assertEqual(data['errors'], [
+            {'serial': 'OLD-001', 'error': "El serial 'OLD-001' ya existe en el sistema (Laptop: LAP-A)"}
+        ])
+        self.assertEqual(data['created'][0]['serial_number'], 'SN-100')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from flask import session
+
+from app import create_app, db
+from app.extensions import result_cache
+from app.models.permission import Permission
+from app.models.role import Role
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.services.role_service import RoleService
+from app.utils import session_manager
+from app.utils.session_manager import (
+    ActivityBuffer, _load_session, invalidate_user_sessions, load_request_auth, validate_session
+)
+
+
+class SessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        user = User(username='test', email='test@example.com')
+        user.set_password('StrongPass1!')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        self.user_session = UserSession.create_session(user_id=user.id, session_token='token-1')
+        self.session_id = self.user_session.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def last_activity(self):
+        return db.session.execute(
+            db.select(UserSession.last_activity).where(UserSession.id == self.session_id)
+        ).scalar_one()
+
+
+class ValidationCacheTestCase(SessionTestCase):
+    """validate_session sin preámbulo: validación cacheada VALIDATION_TTL segundos"""
+
+    def setUp(self):
+        super().setUp()
+        result_cache.enabled = True
+        result_cache.clear()
+
+        patches = [
+            mock.patch.object(session_manager, 'current_user', SimpleNamespace(id=self.user_id)),
+            mock.patch.object(session_manager, 'activity_buffer', ActivityBuffer()),
+            mock.patch.object(session_manager, '_load_session', wraps=session_manager._load_session),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.load_session = session_manager._load_session
+
+    def tearDown(self):
+        result_cache.clear()
+        result_cache.enabled = False
+        super().tearDown()
+
+    def validate(self, token='token-1'):
+        with self.app.test_request_context():
+            session['session_token'] = token
+            return validate_session()
+
+    def test_validation_is_cached(self):
+        self.assertTrue(self.validate())
+        self.assertTrue(self.validate())
+
+        self.assertEqual(self.load_session.call_count, 1)
+        self.assertEqual(set(session_manager.activity_buffer._pending), {self.session_id})
+
+    def test_revocation_invalidates_the_cached_validation(self):
+        self.assertTrue(self.validate())
+
+        self.user_session.terminate()
+        invalidate_user_sessions(self.user_id)
+
+        self.assertFalse(self.validate())
+        self.assertEqual(self.load_session.call_count, 2)
+
+    def test_cache_entry_past_session_expiry_is_reloaded(self):
+        expires_at = datetime.utcnow() + timedelta(minutes=5)
+        self.user_session.expires_at = expires_at
+        db.session.commit()
+        self.assertTrue(self.validate())
+
+        later = mock.Mock(wraps=datetime)
+        later.utcnow.return_value = expires_at + timedelta(seconds=1)
+        with mock.patch.object(session_manager, 'datetime', later), \
+                mock.patch('app.models.user_session.datetime', later):
+            self.assertFalse(self.validate())
+
+        self.assertEqual(self.load_session.call_count, 2)
+
+    def test_unknown_token_is_not_cached(self):
+        self.assertFalse(self.validate('otro-token'))
+        self.assertFalse(self.validate('otro-token'))
+
+        self.assertEqual(self.load_session.call_count, 2)
+
+
+class ActivityBufferTestCase(SessionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.old_activity = self.last_activity()
+
+    def test_records_are_batched_until_the_interval(self):
+        buffer = ActivityBuffer(interval=3600)
+        first, latest = datetime(2026, 3, 1, 10, 0), datetime(2026, 3, 1, 10, 5)
+
+        buffer.record(self.session_id, first)
+        buffer.record(self.session_id, latest)
+
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(self.last_activity(), self.old_activity)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(self.last_activity(), latest)
+
+    def test_record_flushes_once_the_interval_passed(self):
+        buffer = ActivityBuffer(interval=0)
+        when = datetime(2026, 3, 1, 10, 0)
+
+        buffer.record(self.session_id, when)
+
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(self.last_activity(), when)
+
+    def test_shutdown_writes_pending_outside_the_app_context(self):
+        buffer = ActivityBuffer(interval=3600)
+        with mock.patch.object(session_manager.atexit, 'register'):
+            buffer.init_app(self.app)
+        when = datetime(2026, 3, 1, 10, 0)
+        buffer.record(self.session_id, when)
+
+        self.app_context.pop()
+        try:
+            self.assertEqual(buffer.shutdown(), 1)
+        finally:
+            self.app_context.push()
+
+        self.assertEqual(self.last_activity(), when)
+
+    def test_init_app_registers_the_exit_hook_once(self):
+        buffer = ActivityBuffer()
+        with mock.patch.object(session_manager.atexit, 'register') as register:
+            buffer.init_app(self.app)
+            buffer.init_app(self.app)
+
+        register.assert_called_once_with(buffer.shutdown)
+
+
+class RequestPreambleTestCase(SessionTestCase):
+    """load_request_auth devuelve lo mismo que las consultas por separado"""
+
+    def setUp(self):
+        super().setUp()
+        permissions = [
+            Permission(name=f'inventory.{name}', display_name=name, module='inventory')
+            for name in ('view', 'edit', 'delete', 'export')
+        ]
+        self.roles = [Role(name=f'role{i}', display_name=f'Role {i}') for i in range(4)]
+        db.session.add_all(permissions + self.roles)
+        db.session.commit()
+
+        for role, permission in zip(self.roles, permissions):
+            RoleService.sync_permissions(role.id, [permission.id])
+            RoleService.assign_role_to_user(self.user_id, role.id)
+
+        # Vigente, vencido, asignación inactiva y rol inactivo
+        RoleService.set_user_role_expiration(self.user_id, self.roles[0].id, datetime.utcnow() + timedelta(days=1))
+        RoleService.set_user_role_expiration(self.user_id, self.roles[1].id, datetime.utcnow() - timedelta(days=1))
+        RoleService.set_user_role_expiration(self.user_id, self.roles[2].id, None, is_active=False)
+        RoleService.update_role(self.roles[3].id, is_active=False)
+
+        other = User(username='other', email='other@example.com')
+        other.set_password('StrongPass1!')
+        db.session.add(other)
+        db.session.commit()
+        self.other_id = other.id
+
+    def separate_queries(self, user_id, token):
+        """Camino anterior: usuario, sesión y roles con consultas independientes"""
+        user = db.session.get(User, user_id)
+        return user, _load_session(token) if token else None, {role.id for role in user._get_active_roles()}
+
+    def preamble(self, user_id, token):
+        with self.app.test_request_context():
+            if token:
+                session['session_token'] = token
+            user = load_request_auth(user_id)
+            auth = session_manager.preloaded_auth(user_id)
+            return user, auth['session'], set(auth['role_ids']), user.get_permission_set()
+
+    def assertSameAuth(self, user_id, token):
+        user, user_session, role_ids, permissions = self.preamble(user_id, token)
+        expected_user, expected_session, expected_role_ids = self.separate_queries(user_id, token)
+
+        self.assertEqual(user.id, expected_user.id)
+        self.assertEqual(user_session, expected_session)
+        self.assertEqual(role_ids, expected_role_ids)
+        with self.app.app_context():
+            self.assertEqual(permissions, db.session.get(User, user_id)._compile_permission_set()[0])
+
+    def test_valid_session_and_active_roles(self):
+        self.assertSameAuth(self.user_id, 'token-1')
+
+        _user, _session, role_ids, permissions = self.preamble(self.user_id, 'token-1')
+        self.assertEqual(role_ids, {self.roles[0].id})
+        self.assertEqual(permissions, {'inventory.view'})
+
+    def test_without_token(self):
+        self.assertSameAuth(self.user_id, None)
+
+    def test_terminated_and_expired_sessions(self):
+        self.user_session.terminate()
+        self.assertSameAuth(self.user_id, 'token-1')
+
+        expired = UserSession.create_session(user_id=self.user_id, session_token='token-2', duration_hours=-1)
+        self.assertFalse(expired.is_valid())
+        self.assertSameAuth(self.user_id, 'token-2')
+
+    def test_user_without_roles(self):
+        UserSession.create_session(user_id=self.other_id, session_token='token-3')
+        self.assertSameAuth(self.other_id, 'token-3')
+
+    def test_unknown_user(self):
+        with self.app.test_request_context():
+            self.assertIsNone(load_request_auth(9999))
+
+
+if __name__ == '__main__':
+    unittest.main()
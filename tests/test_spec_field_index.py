@@ -0,0 +1,34 @@
+import unittest
+
+from app.services.icecat_service import IcecatService
+from app.services.standard_specs_map import (
+    SPEC_FIELD_INDEX, STANDARD_SPECS_MAP, get_field_ids, get_field_keys, get_field_names
+)
+
+
+class SpecFieldIndexTestCase(unittest.TestCase):
+    def test_index_covers_every_field_of_the_map(self):
+        for category, fields in STANDARD_SPECS_MAP.items():
+            for field_name in fields:
+                path = f'{category}.{field_name}'
+                ids, names = get_field_keys(path)
+                self.assertEqual(list(ids), list(dict.fromkeys(str(i) for i in get_field_ids(path))))
+                self.assertEqual(list(names), list(dict.fromkeys(n.lower() for n in get_field_names(path))))
+
+        self.assertEqual(len(SPEC_FIELD_INDEX), sum(len(fields) for fields in STANDARD_SPECS_MAP.values()))
+        self.assertEqual(get_field_keys('processor.no_existe'), ((), ()))
+
+    def test_get_spec_value_prefers_id_then_name(self):
+        family_id = get_field_keys('processor.family')[0][-1]
+        family_name = get_field_keys('processor.family')[1][0]
+
+        by_id = {'by_id': {family_id: 'Core i7'}, 'by_name': {family_name: 'Otro'}}
+        by_name = {'by_id': {}, 'by_name': {family_name: 'Ryzen 7'}}
+
+        self.assertEqual(IcecatService._get_spec_value(by_id, 'processor.family'), 'Core i7')
+        self.assertEqual(IcecatService._get_spec_value(by_name, 'processor.family'), 'Ryzen 7')
+        self.assertEqual(IcecatService._get_spec_value(by_name, 'connectivity.raw_specs.by_name.x'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
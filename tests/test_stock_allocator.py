@@ -0,0 +1,232 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.customer import Customer
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.laptop import Laptop
+from app.models.serial import InvoiceItemSerial, LaptopSerial, SerialMovement
+from app.services.invoice_inventory_service import InvoiceInventoryService
+from app.services.stock_allocator import StockAllocator, StockSnapshot
+
+
+def laptop(laptop_id, quantity, reserved=0):
+    return SimpleNamespace(id=laptop_id, quantity=quantity, reserved_quantity=reserved,
+                           available_quantity=quantity - reserved, display_name=f'Laptop {laptop_id}')
+
+
+def serial(serial_id, laptop_id, status='available', day=1):
+    return SimpleNamespace(id=serial_id, laptop_id=laptop_id, status=status,
+                           serial_number=f'SN{serial_id}', received_date=date(2026, 1, day))
+
+
+class StockSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = StockSnapshot(
+            {1: laptop(1, 3), 2: laptop(2, 5)},
+            {10: serial(10, 1, day=1), 11: serial(11, 1, day=5), 12: serial(12, 1, day=3),
+             20: serial(20, 2, status='sold')}
+        )
+
+    def test_lines_share_stock_of_the_same_laptop(self):
+        lines = [
+            {'laptop_id': 1, 'quantity': 2, 'serial_ids': []},
+            {'laptop_id': 1, 'quantity': 2, 'serial_ids': []},
+        ]
+        error, _warnings = StockAllocator.validate_lines(lines, self.snapshot)
+
+        self.assertEqual(error, 'Stock insuficiente para Laptop 1. Disponible: 1, Solicitado: 2')
+
+    def test_serial_validation_messages(self):
+        lines = [{'laptop_id': 1, 'quantity': 1, 'serial_ids': [20]}]
+        error, _warnings = StockAllocator.validate_lines(lines, self.snapshot)
+
+        self.assertEqual(error, 'Serial SN20 no pertenece a Laptop 1')
+
+    def test_auto_assignment_takes_newest_serials_once(self):
+        self.assertEqual([s.id for s in self.snapshot.take_available(1, 2)], [11, 12])
+        self.assertEqual(self.snapshot.take_available(1, 2), [])
+
+        valid, errors = self.snapshot.check_serials([11], 1)
+        self.assertEqual(valid, [])
+        self.assertEqual(len(errors), 1)
+
+    def test_own_reservation_counts_as_available(self):
+        snapshot = StockSnapshot(
+            {1: laptop(1, 3, reserved=3)},
+            {10: serial(10, 1, status='reserved'), 11: serial(11, 1, status='reserved')},
+            held={'quantity': {1: 2}, 'serials': {10}}
+        )
+        lines = [{'laptop_id': 1, 'quantity': 2, 'serial_ids': []}]
+
+        self.assertEqual(snapshot.quantity_left(1), 2)
+        self.assertEqual(snapshot.check_serials([10, 11], 1)[0], [snapshot.serials[10]])
+        self.assertEqual(StockAllocator.validate_lines(lines, snapshot)[0],
+                         'Seriales insuficientes para Laptop 1. Seriales disponibles: 1, Solicitado: 2')
+
+
+class StockAllocatorDatabaseTestCase(unittest.TestCase):
+    """Venta con seriales sobre SQLite: estados, movimientos, cantidades y consultas"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.customer = Customer(customer_type='person', first_name='Ana', id_number='00100000001', id_type='cedula')
+        db.session.add(self.customer)
+
+        self.laptops = []
+        for name in ('A', 'B', 'C'):
+            # Catalogos sin FK forzada en SQLite
+            laptop = Laptop(
+                sku=f'LAP-{name}', slug=f'lap-{name.lower()}', display_name=f'Laptop {name}', brand_id=1,
+                model_id=1, processor_id=1, os_id=1, screen_id=1, graphics_card_id=1, storage_id=1, ram_id=1,
+                store_id=1, purchase_cost=Decimal('600.00'), sale_price=Decimal('1000.00'), quantity=3
+            )
+            db.session.add(laptop)
+            self.laptops.append(laptop)
+        db.session.flush()
+
+        self.serials = {}
+        for laptop in self.laptops:
+            self.serials[laptop.id] = [
+                LaptopSerial(serial_number=f'{laptop.sku}-{i}', serial_normalized=f'{laptop.sku}{i}',
+                             laptop_id=laptop.id, received_date=date(2026, 1, i + 1))
+                for i in range(3)
+            ]
+            db.session.add_all(self.serials[laptop.id])
+        db.session.commit()
+        self.invoice_number = 0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def make_invoice(self, lines):
+        self.invoice_number += 1
+        invoice = Invoice(invoice_number=f'INV-{self.invoice_number:05d}', ncf=f'B02{self.invoice_number:08d}',
+                          customer_id=self.customer.id, status='paid')
+        db.session.add(invoice)
+        db.session.flush()
+        for laptop, quantity in lines:
+            item = InvoiceItem(invoice_id=invoice.id, item_type='laptop', laptop_id=laptop.id,
+                               description=laptop.display_name, quantity=quantity, unit_price=Decimal('950.00'))
+            item.calculate_line_total()
+            db.session.add(item)
+        db.session.commit()
+        return invoice
+
+    def count_statements(self, operation):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            result = operation()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return result, statements
+
+    def quantities(self):
+        db.session.expire_all()
+        return [db.session.get(Laptop, laptop.id).quantity for laptop in self.laptops]
+
+    def test_sale_sells_requested_and_newest_serials(self):
+        laptop_a, laptop_b, _laptop_c = self.laptops
+        chosen = self.serials[laptop_a.id][0]
+        invoice = self.make_invoice([(laptop_a, 1), (laptop_b, 2)])
+
+        success, result = InvoiceInventoryService.process_sale_with_serials(
+            invoice, [{'laptop_id': laptop_a.id, 'serial_ids': [chosen.id]}], user_id=7
+        )
+
+        self.assertTrue(success, result)
+        self.assertEqual((result['serials_assigned'], result['auto_assigned']), (3, 2))
+        self.assertEqual(self.quantities(), [2, 1, 3])
+
+        sold = {serial.serial_number: serial for serial in LaptopSerial.query.filter_by(status='sold')}
+        # B se auto-asigna con los seriales recibidos más recientemente
+        self.assertEqual(set(sold), {'LAP-A-0', 'LAP-B-2', 'LAP-B-1'})
+        self.assertEqual({serial.sold_price for serial in sold.values()}, {Decimal('950.00')})
+
+        movements = SerialMovement.query.all()
+        self.assertEqual(
+            {(m.serial_id, m.movement_type, m.previous_status, m.new_status, m.invoice_id, m.user_id) for m in movements},
+            {(serial.id, 'sold', 'available', 'sold', invoice.id, 7) for serial in sold.values()}
+        )
+        links = {(link.invoice_item_id, link.serial_id) for link in InvoiceItemSerial.query.all()}
+        items = {item.laptop_id: item.id for item in invoice.items}
+        self.assertEqual(links, {(items[serial.laptop_id], serial.id) for serial in sold.values()})
+
+    def test_statement_count_does_not_grow_with_lines_or_units(self):
+        # Ninguna laptop se agota: agotarla también fija sale_date (otro UPDATE agrupado)
+        small = self.make_invoice([(self.laptops[0], 1)])
+        large = self.make_invoice([(self.laptops[1], 2), (self.laptops[2], 2)])
+
+        (success, _), small_statements = self.count_statements(
+            lambda: InvoiceInventoryService.process_sale_with_serials(small, [])
+        )
+        self.assertTrue(success)
+        (success, result), large_statements = self.count_statements(
+            lambda: InvoiceInventoryService.process_sale_with_serials(large, [])
+        )
+
+        self.assertTrue(success, result)
+        self.assertEqual(result['serials_assigned'], 4)
+        self.assertEqual(len(large_statements), len(small_statements))
+        self.assertEqual(self.quantities(), [2, 1, 1])
+
+    def test_write_assignments_batches_inserts_and_defers_status(self):
+        laptop = self.laptops[0]
+        invoice = self.make_invoice([(laptop, 2)])
+        item = invoice.items.first()
+        # Factura y seriales ya cargados, como en process_sale_with_serials
+        self.assertEqual(item.invoice, invoice)
+        snapshot = StockAllocator.load([laptop.id])
+        serials = snapshot.take_available(laptop.id, 2)
+
+        count, statements = self.count_statements(
+            lambda: StockAllocator.write_assignments([(item, serials)], user_id=3)
+        )
+
+        self.assertEqual(count, 2)
+        # Un UPDATE agrupado de los seriales (autoflush) y un INSERT por tabla
+        self.assertEqual([statement.split()[:3] for statement in statements], [
+            ['UPDATE', 'laptop_serials', 'SET'],
+            ['INSERT', 'INTO', 'invoice_item_serials'],
+            ['INSERT', 'INTO', 'serial_movements'],
+        ])
+        self.assertEqual({serial.status for serial in serials}, {'sold'})
+        db.session.commit()
+
+        self.assertEqual(LaptopSerial.query.filter_by(status='sold').count(), 2)
+        self.assertEqual(SerialMovement.query.filter_by(invoice_id=invoice.id, user_id=3).count(), 2)
+        self.assertEqual(InvoiceItemSerial.query.filter_by(invoice_item_id=item.id).count(), 2)
+
+    def test_serial_of_another_laptop_is_rejected(self):
+        laptop_a, laptop_b, _laptop_c = self.laptops
+        invoice = self.make_invoice([(laptop_a, 1)])
+        foreign = self.serials[laptop_b.id][0]
+
+        success, error = InvoiceInventoryService.process_sale_with_serials(
+            invoice, [{'laptop_id': laptop_a.id, 'serial_ids': [foreign.id]}]
+        )
+        db.session.rollback()
+
+        self.assertFalse(success)
+        self.assertEqual(error, 'Error asignando seriales: Serial LAP-B-0 no pertenece a Laptop A')
+        self.assertEqual(self.quantities(), [3, 3, 3])
+        self.assertEqual(SerialMovement.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()